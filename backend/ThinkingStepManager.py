@@ -4,16 +4,17 @@ Thinking Step Manager - Tracks and broadcasts thinking progress
 import asyncio
 import logging
 from typing import Optional
-from agents.utils.protocol import AgentMessage, MessageType, AgentType, Channels
+from agents.utils.protocol import InternalMessage, MessageType, AgentType, Channels
 from agents.utils.broker import broker
+from agents.utils.shared_state import shared_dict
 
 logger = logging.getLogger(__name__)
 
 class ThinkingStepManager:
     """Manages thinking step updates across agents"""
     
-    # Global thinking steps being tracked
-    active_sessions = {}  # session_id -> current_step
+    # Global thinking steps being tracked (shared across workers)
+    active_sessions = shared_dict("thinking_steps")  # session_id -> current_step
     
     @staticmethod
     async def update_step(session_id: str, step: str, message_id: str):
@@ -32,7 +33,7 @@ class ThinkingStepManager:
         
         # Broadcast to frontend via broker
         try:
-            update_msg = AgentMessage(
+            update_msg = InternalMessage(
                 message_type=MessageType.STATUS_UPDATE,
                 sender=AgentType.COORDINATOR,
                 receiver=AgentType.LANGUAGE,
@@ -45,10 +46,33 @@ class ThinkingStepManager:
                 }
             )
             
-            await broker.publish(Channels.BROADCAST, update_msg)
+            await broker.publish(Channels.session_topic(Channels.BROADCAST, session_id), update_msg)
         except Exception as e:
             logger.warning(f"⚠️ Failed to broadcast thinking update: {e}")
     
+    @staticmethod
+    async def task_progress(session_id: str, task_id: str, status: str, description: str = "", error: Optional[str] = None):
+        """Broadcast a task-level progress event (running/success/failed/skipped) for a session"""
+        try:
+            progress_msg = InternalMessage(
+                message_type=MessageType.STATUS_UPDATE,
+                sender=AgentType.COORDINATOR,
+                receiver=AgentType.LANGUAGE,
+                session_id=session_id,
+                task_id=task_id,
+                payload={
+                    "action": "task_progress",
+                    "task_id": task_id,
+                    "status": status,
+                    "description": description,
+                    "error": error,
+                    "session_id": session_id
+                }
+            )
+            await broker.publish(Channels.session_topic(Channels.BROADCAST, session_id), progress_msg)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to broadcast task progress: {e}")
+    
     @staticmethod
     async def clear_steps(session_id: str):
         """Clear thinking steps for a session"""
@@ -58,7 +82,7 @@ class ThinkingStepManager:
 
         # Broadcast a clear message so clients can remove UI indicators
         try:
-            clear_msg = AgentMessage(
+            clear_msg = InternalMessage(
                 message_type=MessageType.STATUS_UPDATE,
                 sender=AgentType.COORDINATOR,
                 receiver=AgentType.LANGUAGE,
@@ -68,7 +92,7 @@ class ThinkingStepManager:
                     "session_id": session_id
                 }
             )
-            await broker.publish(Channels.BROADCAST, clear_msg)
+            await broker.publish(Channels.session_topic(Channels.BROADCAST, session_id), clear_msg)
             logger.info(f"🧠 [{session_id}] Broadcasted thinking_clear to clients")
         except Exception as e:
             logger.warning(f"⚠️ Failed to broadcast thinking_clear: {e}")
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""
+Admission Control - Per-user and global limits for the HTTP entry points
+
+Each controller guards one class of work (/process + /jobs, /transcribe,
+/text-to-speech) with:
+    - token buckets (global and per user) bounding the request rate
+    - concurrency limits (global and per user) bounding work in progress
+    - a bounded FIFO wait queue with a maximum queue time
+
+Requests over the rate, or arriving to a full queue, or waiting too long,
+are shed with AdmissionRejected carrying a Retry-After hint, so overload
+turns into fast 429s instead of cascading 60 second timeouts.
+
+/jobs only checks the rate at submission; a job takes its concurrency slot
+when it starts executing (acquire_for_job) and waits as "queued" until then.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class AdmissionRejected(Exception):
+    """Request shed by admission control"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens/second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def try_take(self) -> float:
+        """Take one token; returns 0 on success or the seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Concurrency + rate limits with a bounded wait queue for one kind of request"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_per_user: int,
+        rate: float,
+        burst: float,
+        user_rate: float,
+        user_burst: float,
+        max_queue: int,
+        max_queue_seconds: float,
+        max_users: int = 10000
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.max_queue_seconds = max_queue_seconds
+        self.max_users = max_users
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+
+        self.bucket = TokenBucket(rate, burst)
+        self.user_buckets: Dict[str, TokenBucket] = {}
+        self.active = 0
+        self.active_by_user: Dict[str, int] = {}
+        self.waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+        self.job_waiters = 0
+
+        # Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.shed_rate = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.avg_service_s = 1.0   # EWMA of time a slot is held, for Retry-After
+        self.max_wait_ms = 0.0
+
+    @classmethod
+    def from_env(cls, name: str, **defaults) -> "AdmissionController":
+        """Build from ADMISSION_<NAME>_<SETTING> variables, falling back to defaults"""
+        prefix = f"ADMISSION_{name.upper()}_"
+
+        def setting(key: str, cast):
+            return cast(os.getenv(prefix + key.upper(), defaults[key]))
+
+        return cls(
+            name,
+            max_concurrent=setting("max_concurrent", int),
+            max_per_user=setting("max_per_user", int),
+            rate=setting("rate", float),
+            burst=setting("burst", float),
+            user_rate=setting("user_rate", float),
+            user_burst=setting("user_burst", float),
+            max_queue=setting("max_queue", int),
+            max_queue_seconds=setting("max_queue_seconds", float),
+        )
+
+    # ------------------------------------------------------------------
+    # Acquire / release
+    # ------------------------------------------------------------------
+
+    def check_rate(self, user_id: Optional[str] = None):
+        """
+        Take a token from the global bucket (user_id None) or the user's bucket.
+        Never waits - the global check is cheap enough to run before the
+        request body is read. Raises AdmissionRejected when over the rate.
+        """
+        bucket = self.bucket if user_id is None else self._user_bucket(user_id)
+        wait = bucket.try_take()
+        if wait:
+            self.shed_rate += 1
+            raise AdmissionRejected(f"{self.name}: rate limit exceeded", wait)
+
+    async def acquire(self, user_id: str) -> float:
+        """
+        Wait (bounded queue, max_queue_seconds) for a slot for user_id; returns
+        the acquire time to pass to release(). Raises AdmissionRejected when shed.
+        Rate limits are checked separately with check_rate().
+        """
+        if self._has_capacity(user_id) and not self.waiters:
+            return self._grant(user_id)
+
+        # Queued jobs don't count against the HTTP wait queue
+        if len(self.waiters) - self.job_waiters >= self.max_queue:
+            self.shed_queue_full += 1
+            raise AdmissionRejected(f"{self.name}: server busy", self._estimated_wait())
+        return await self._wait_for_slot(user_id, self.max_queue_seconds)
+
+    async def acquire_for_job(self, user_id: str, max_wait: float) -> float:
+        """
+        Slot for a background job, taken when the job starts executing.
+        Jobs were rate checked at submission and are bounded by the job
+        store, so they wait past max_queue / max_queue_seconds.
+        """
+        if self._has_capacity(user_id) and not self.waiters:
+            return self._grant(user_id)
+        self.job_waiters += 1
+        try:
+            return await self._wait_for_slot(user_id, max_wait)
+        finally:
+            self.job_waiters -= 1
+
+    async def _wait_for_slot(self, user_id: str, max_wait: float) -> float:
+        future = asyncio.get_running_loop().create_future()
+        entry = (user_id, future)
+        self.waiters.append(entry)
+        self.queued += 1
+        # Capacity may be free for this user while earlier waiters are capped per user
+        self._wake_waiters()
+        if future.done():
+            return future.result()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=max_wait)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Slot was handed over just as the wait expired - keep it
+                return future.result()
+            self._remove_waiter(entry)
+            self.shed_timeout += 1
+            raise AdmissionRejected(f"{self.name}: queue wait exceeded", self._estimated_wait())
+        except asyncio.CancelledError:
+            # Client went away while queued; give back a slot it may have received
+            self._remove_waiter(entry)
+            if future.done() and not future.cancelled():
+                self.release(user_id, future.result())
+            raise
+        finally:
+            waited_ms = (time.monotonic() - started) * 1000
+            if waited_ms > self.max_wait_ms:
+                self.max_wait_ms = waited_ms
+        return future.result()
+
+    def release(self, user_id: str, acquired_at: float):
+        """Free a slot and hand it to the first waiter that is within its limits"""
+        self.active -= 1
+        remaining = self.active_by_user.get(user_id, 1) - 1
+        if remaining > 0:
+            self.active_by_user[user_id] = remaining
+        else:
+            self.active_by_user.pop(user_id, None)
+
+        held = time.monotonic() - acquired_at
+        self.avg_service_s = 0.9 * self.avg_service_s + 0.1 * held
+        self._wake_waiters()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _has_capacity(self, user_id: str) -> bool:
+        return (self.active < self.max_concurrent
+                and self.active_by_user.get(user_id, 0) < self.max_per_user)
+
+    def _grant(self, user_id: str) -> float:
+        self.active += 1
+        self.active_by_user[user_id] = self.active_by_user.get(user_id, 0) + 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def _wake_waiters(self):
+        # FIFO, skipping users already at their own limit
+        for entry in list(self.waiters):
+            if self.active >= self.max_concurrent:
+                break
+            user_id, future = entry
+            if future.done():
+                self._remove_waiter(entry)
+                continue
+            if self._has_capacity(user_id):
+                self._remove_waiter(entry)
+                future.set_result(self._grant(user_id))
+
+    def _remove_waiter(self, entry):
+        try:
+            self.waiters.remove(entry)
+        except ValueError:
+            pass
+
+    def _user_bucket(self, user_id: str) -> TokenBucket:
+        bucket = self.user_buckets.get(user_id)
+        if bucket is None:
+            if len(self.user_buckets) >= self.max_users:
+                # Forget the oldest idle user; a fresh bucket starts full anyway
+                self.user_buckets.pop(next(iter(self.user_buckets)))
+            bucket = self.user_buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    def _estimated_wait(self) -> float:
+        """Rough time until a queued request would be served"""
+        return self.avg_service_s * (len(self.waiters) + 1) / max(1, self.max_concurrent)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "active_users": len(self.active_by_user),
+            "queue_depth": len(self.waiters),
+            "queued_jobs": self.job_waiters,
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_rate": self.shed_rate,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+            "avg_service_s": round(self.avg_service_s, 3),
+        }
+
+
+# Global controllers - tune via ADMISSION_<NAME>_<SETTING>, e.g. ADMISSION_PROCESS_MAX_CONCURRENT
+process_admission = AdmissionController.from_env(
+    "process",
+    max_concurrent=16, max_per_user=2,
+    rate=20, burst=40, user_rate=1, user_burst=5,
+    max_queue=64, max_queue_seconds=10,
+)
+transcribe_admission = AdmissionController.from_env(
+    "transcribe",
+    max_concurrent=8, max_per_user=2,
+    rate=10, burst=20, user_rate=2, user_burst=5,
+    max_queue=32, max_queue_seconds=5,
+)
+tts_admission = AdmissionController.from_env(
+    "tts",
+    max_concurrent=8, max_per_user=2,
+    rate=10, burst=20, user_rate=2, user_burst=5,
+    max_queue=32, max_queue_seconds=5,
+)
+
+
+def get_admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {c.name: c.get_stats() for c in (process_admission, transcribe_admission, tts_admission)}
@@ -0,0 +1,74 @@
+"""
+Run a single agent in its own process, connected to the server's broker daemon.
+
+Usage:
+    # terminal 1 - server hosts the broker daemon and skips the external agents
+    BROKER_TRANSPORT=ipc AURA_EXTERNAL_AGENTS=execution,reasoning python server.py
+
+    # terminals 2 and 3
+    python agent_worker.py execution
+    python agent_worker.py reasoning
+
+CPU-heavy or blocking work in a worker (SentenceTransformer encode, BLIP
+captioning, sync Groq calls, subprocess.run) no longer stalls the server's
+event loop or the other agents.
+"""
+import os
+import sys
+import asyncio
+import logging
+
+# Must be set before the broker module creates the process-wide broker
+os.environ["BROKER_TRANSPORT"] = "ipc"
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("agent_worker")
+
+AGENTS = ("language", "coordinator", "reasoning", "execution")
+
+
+async def run_agent(name: str):
+    from agents.utils.broker import broker
+    from agents.utils.llm_gateway import llm_gateway
+
+    # chat_sync() from this worker's threads must share one loop, pool and semaphore
+    llm_gateway.bind_loop()
+    await broker.start()
+    logger.info(f"🚀 Starting {name} agent worker (pid {os.getpid()})")
+
+    try:
+        if name == "language":
+            from agents.language_agent import start_language_agent
+            await start_language_agent(broker)
+        elif name == "coordinator":
+            from agents.coordinator_agent.coordinator_agent import start_coordinator_agent
+            await start_coordinator_agent(broker)
+        elif name == "reasoning":
+            from agents.reasoning_agent import start_reasoning_agent
+            await start_reasoning_agent()
+        elif name == "execution":
+            from agents.execution_agent.RAG.code_execution import initialize_execution_agent_for_server
+            await initialize_execution_agent_for_server(broker)
+            # Fallback agents return immediately on some init failures - keep serving
+            while True:
+                await asyncio.sleep(1)
+    finally:
+        await broker.stop()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in AGENTS:
+        print(f"Usage: python agent_worker.py [{'|'.join(AGENTS)}]")
+        sys.exit(1)
+
+    try:
+        asyncio.run(run_agent(sys.argv[1]))
+    except KeyboardInterrupt:
+        logger.info("🛑 Worker stopped")
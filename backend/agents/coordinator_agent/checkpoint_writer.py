@@ -0,0 +1,254 @@
+"""
+Write-behind checkpointing of plan progress
+
+The executor records small deltas (plan started, task streamed in, task
+finished with its output) that apply to an in-memory resume point right
+away and are written to MongoDB later:
+
+    - every CHECKPOINT_FLUSH_SECONDS, or immediately when a plan finishes
+    - one update per session per flush, however many deltas it coalesces
+    - from a worker thread, so no checkpoint I/O sits on the plan path
+    - after a failed write, a session's deltas are folded into one write
+      and retried up to CHECKPOINT_MAX_RETRIES times, then dropped (the
+      in-memory resume point stays)
+
+Each session's document (collection execution_progress):
+
+    {_id: session_id, input, plan: [task dicts], completed_task_ids: [...],
+     outputs: {task_id: output}, status: {task_id: success|failed},
+     state: running|finished, updated}
+"""
+import asyncio
+import copy
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SECONDS = float(os.getenv("CHECKPOINT_FLUSH_SECONDS", "1.0"))
+MEMORY_SESSIONS = int(os.getenv("CHECKPOINT_MEMORY_SESSIONS", "1000"))
+MAX_RETRIES = int(os.getenv("CHECKPOINT_MAX_RETRIES", "5"))
+
+# A delta: ("reset", fields) | ("set", path, value) | ("push", path, item)
+# | ("add", path, item) | ("delete",) - paths are dotted, as in MongoDB
+Delta = Tuple[Any, ...]
+
+
+def apply_delta(document: Dict[str, Any], delta: Delta) -> Dict[str, Any]:
+    """Apply one delta to a plain dict (the in-memory view of the document)"""
+    op = delta[0]
+    if op == "reset":
+        return copy.deepcopy(delta[1])
+    if op == "delete":
+        return {}
+    *parents, field = delta[1].split(".")
+    target = document
+    for name in parents:
+        target = target.setdefault(name, {})
+    if op == "set":
+        target[field] = delta[2]
+    elif op == "push":
+        target.setdefault(field, []).append(delta[2])
+    elif op == "add" and delta[2] not in target.setdefault(field, []):
+        target[field].append(delta[2])
+    return document
+
+
+def coalesce(deltas: List[Delta]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Fold a session's pending deltas into one write: ("replace", document)
+    when they start with a reset, ("update", mongo update) otherwise, or
+    ("delete", {}).
+    """
+    document: Optional[Dict[str, Any]] = None  # whole document once a reset is seen
+    deleted = False
+    update: Dict[str, Dict[str, Any]] = {}
+    for delta in deltas:
+        if delta[0] == "delete":
+            document, deleted, update = None, True, {}
+        elif delta[0] == "reset" or deleted or document is not None:
+            document, deleted = apply_delta(document or {}, delta), False
+        elif delta[0] == "set":
+            update.setdefault("$set", {})[delta[1]] = delta[2]
+        else:
+            operator = "$push" if delta[0] == "push" else "$addToSet"
+            update.setdefault(operator, {}).setdefault(delta[1], {"$each": []})["$each"].append(delta[2])
+
+    if deleted:
+        return "delete", {}
+    if document is not None:
+        return "replace", document
+    return "update", update
+
+
+def fold(deltas: List[Delta]) -> List[Delta]:
+    """Deltas that write the same as deltas: one reset/delete when they collapse to it"""
+    kind, body = coalesce(deltas)
+    if kind == "delete":
+        return [("delete",)]
+    if kind == "replace":
+        return [("reset", body)]
+    return deltas
+
+
+class CheckpointWriter:
+    """Resume points per session, held in memory and written behind to MongoDB"""
+
+    def __init__(self, collection=None, flush_seconds: float = FLUSH_SECONDS):
+        self.collection = collection
+        self.flush_seconds = flush_seconds
+        self.documents: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.pending: Dict[str, List[Delta]] = {}
+        self.attempts: Dict[str, int] = {}  # consecutive failed writes per session
+        self._urgent = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self.deltas = 0
+        self.writes = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_flush_ms: Optional[float] = None
+
+    # ---- deltas ----
+
+    def record(self, session_id: str, delta: Delta, urgent: bool = False):
+        document = self.documents.get(session_id)
+        # A session evicted from memory is only rebuilt from a reset - a partial
+        # copy built from later deltas would hide the stored document from load()
+        if document is not None or delta[0] == "reset":
+            self.documents[session_id] = apply_delta(document or {}, delta)
+            self.documents.move_to_end(session_id)
+            while len(self.documents) > MEMORY_SESSIONS:
+                self.documents.popitem(last=False)
+
+        self.pending.setdefault(session_id, []).append(delta)
+        self.deltas += 1
+        if urgent:
+            self._urgent.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._run())
+
+    def begin(self, session_id: str, request: Dict[str, Any], plan: List[Dict[str, Any]],
+              completed: Dict[str, Optional[str]]):
+        self.record(session_id, ("reset", {
+            "input": request,
+            "plan": plan,
+            "completed_task_ids": list(completed),
+            "outputs": {task_id: output for task_id, output in completed.items() if output},
+            "status": {task_id: "success" for task_id in completed},
+            "state": "running",
+        }))
+
+    def add_task(self, session_id: str, task: Dict[str, Any]):
+        self.record(session_id, ("push", "plan", task))
+
+    def task_finished(self, session_id: str, task_id: str, status: str, output: Optional[str] = None):
+        self.record(session_id, ("set", f"status.{task_id}", status))
+        if status == "success":
+            self.record(session_id, ("add", "completed_task_ids", task_id))
+            if output:
+                self.record(session_id, ("set", f"outputs.{task_id}", output))
+
+    def finish(self, session_id: str):
+        """Plan completed - flush now instead of at the next tick"""
+        self.record(session_id, ("set", "state", "finished"), urgent=True)
+
+    def clear(self, session_id: str):
+        self.record(session_id, ("delete",), urgent=True)
+        self.documents.pop(session_id, None)
+
+    # ---- reads ----
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """The session's resume point: this worker's copy, else the stored document"""
+        document = self.documents.get(session_id)
+        if (not document or not document.get("plan")) and self.collection is not None:
+            try:
+                document = await asyncio.to_thread(self.collection.find_one, {"_id": session_id})
+            except Exception as e:
+                logger.debug(f"No stored execution progress for {session_id}: {e}")
+        if not document or not document.get("plan"):
+            return None
+
+        completed = set(document.get("completed_task_ids", []))
+        return {
+            "input": document.get("input", {}),
+            "plan": document["plan"],
+            "completed_task_ids": [t["task_id"] for t in document["plan"] if t.get("task_id") in completed],
+            "outputs": document.get("outputs", {}),
+            "failed_task_id": next((t.get("task_id") for t in document["plan"] if t.get("task_id") not in completed), None),
+        }
+
+    # ---- writes ----
+
+    async def _run(self):
+        while self.pending:
+            try:
+                await asyncio.wait_for(self._urgent.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._urgent.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        if self.collection is None:
+            return
+
+        now = time.time()
+        operations = []
+        for session_id, deltas in batch.items():
+            kind, body = coalesce(deltas)
+            if kind == "delete":
+                operations.append(DeleteOne({"_id": session_id}))
+            elif kind == "replace":
+                operations.append(ReplaceOne({"_id": session_id}, {**body, "updated": now}, upsert=True))
+            else:
+                body.setdefault("$set", {})["updated"] = now
+                operations.append(UpdateOne({"_id": session_id}, body, upsert=True))
+
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.collection.bulk_write, operations, ordered=False)
+            self.writes += len(operations)
+            self.flushes += 1
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            for session_id in batch:
+                self.attempts.pop(session_id, None)
+            logger.debug(f"💾 Flushed progress of {len(operations)} session(s) in {self.last_flush_ms:.0f}ms")
+        except Exception as e:
+            # Retry at the next tick, folded with anything recorded since so a
+            # long outage holds one write per session, not every delta
+            self.failures += 1
+            logger.error(f"❌ Failed to write execution progress: {e}")
+            for session_id, deltas in batch.items():
+                attempts = self.attempts.get(session_id, 0) + 1
+                if attempts > MAX_RETRIES:
+                    self.attempts.pop(session_id, None)
+                    self.pending.pop(session_id, None)
+                    self.dropped += 1
+                    logger.warning(f"⚠️ Dropped execution progress of {session_id} after {MAX_RETRIES} retries")
+                    continue
+                self.attempts[session_id] = attempts
+                self.pending[session_id] = fold(deltas + self.pending.get(session_id, []))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "persistent": self.collection is not None,
+            "deltas": self.deltas,
+            "writes": self.writes,
+            # > 1 means bursts of deltas were coalesced into fewer writes
+            "deltas_per_write": round(self.deltas / self.writes, 1) if self.writes else None,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "pending_sessions": len(self.pending),
+            "last_flush_ms": round(self.last_flush_ms, 1) if self.last_flush_ms is not None else None,
+        }
@@ -1,7 +1,7 @@
-import os, uuid, asyncio, json, re
+import os, uuid, asyncio, json, re, time, math
 from dotenv import load_dotenv   
 from langgraph.graph import StateGraph, END
-from typing import Dict, Any, List, Optional, Literal
+from typing import Dict, Any, List, Optional, Literal, Tuple
 from pydantic import BaseModel, Field
 from pymongo import MongoClient
 from datetime import datetime
@@ -12,24 +12,34 @@ from langgraph.checkpoint.mongodb import MongoDBSaver
 
 import logging
 from agents.utils.protocol import (
-    Channels, AgentMessage, MessageType, AgentType, 
+    Channels, AgentMessage, InternalMessage, MessageType, AgentType, 
     ExecutionResult, TaskMessage
 )
-from agents.utils.broker import broker
+from agents.utils.broker import broker, InFlightLimitError
+from agents.utils.blob_store import blob_store, is_ref
 from ThinkingStepManager import ThinkingStepManager
+from agents.coordinator_agent.scheduler import SessionScheduler, resource_pool, resource_class
+from agents.coordinator_agent.plan_dag import PlanGraph, input_sources, critical_path, plan_metrics, fresh_task_ids, renamed_task_id
+from agents.coordinator_agent.plan_stream import PLAN_STREAMING, PlanStream, TaskArrayParser, plan_streams, stream_stats
+from agents.coordinator_agent.plan_cache import plan_cache, normalize_request
+from agents.coordinator_agent.task_timeouts import task_timeouts
+from agents.coordinator_agent.checkpoint_writer import CheckpointWriter
+from agents.coordinator_agent.memory.preference_miner import preference_miner
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
 # --- Initialize Groq LLM ---
-from .config.settings import LLM_MODEL, GROQ_API_KEY, MONGODB_URI
-from langchain_groq import ChatGroq
+from .config.settings import LLM_MODEL, MONGODB_URI
+from agents.utils.llm_gateway import GatewayChatModel, llm_gateway
+from agents.utils.llm_cascade import model_cascade
+from agents.utils.prompt_registry import Section, prompt_registry
 
-llm = ChatGroq(
+llm = GatewayChatModel(
     model=LLM_MODEL,
     temperature=0.1,
     max_tokens=2048,
-    groq_api_key=GROQ_API_KEY
+    call_site="coordinator"
 )
 
 # Initialize MongoDB checkpointer
@@ -41,10 +51,15 @@ try:
         db_name="yusr_db",
         collection_name="langgraph_checkpoints"
     )
+    progress_collection = mongo_client["yusr_db"]["execution_progress"]
     logger.info("✅ Initialized MongoDB checkpointer for LangGraph")
 except Exception as e:
     logger.error(f"❌ Failed to initialize MongoDB checkpointer: {e}")
     checkpointer = None
+    progress_collection = None
+
+# Plan progress (resume points for retries), written behind to MongoDB
+checkpoint_writer = CheckpointWriter(progress_collection)
 
 # ============================================================================
 # FIX 1: IMPROVED Credential Extraction Function (GENERIC FOR ANY SITE)
@@ -169,6 +184,11 @@ class ActionTask(BaseModel):
     
     target_agent: Literal["action", "reasoning"] = "action"
     depends_on: Optional[str] = None
+
+    # Scheduling hints (same meaning as protocol.TaskMessage) - read by the
+    # execution intake's priority lanes
+    priority: str = "normal"  # critical | high | normal | low | background
+    timeout: int = 30  # only used when set explicitly - otherwise learned (see task_timeouts.py)
     
     class Config:
         use_enum_values = True
@@ -182,91 +202,114 @@ class TaskResult(BaseModel):
 
 # --- Queue Management (unchanged) ---
 class TaskQueue:
-    """Manages sequential task execution with interrupt controls"""
-    def __init__(self):
+    """Tracks a session's plan execution (waiting and running tasks) with interrupt controls"""
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id
         self.current_queue: deque = deque()
-        self.global_queue: deque = deque()
         self.execution_history: List[Dict] = []
         self.is_paused: bool = False
         self.is_stopped: bool = False
-        self.current_task_id: Optional[str] = None
+        self.stop_requested_at: Optional[float] = None
+        self.running: Dict[str, asyncio.Task] = {}  # task_id -> asyncio task executing it
+        self.planning: Optional[asyncio.Task] = None  # decomposition (or plan stream producer) in flight
+        self.changed = asyncio.Event()  # set on pause/resume/stop to wake the executor
+        self.last_active: float = time.monotonic()
         
     def add_to_current(self, tasks: List[ActionTask]):
         self.current_queue.extend(tasks)
         
-    def add_to_global(self, task_plan: Dict):
-        self.global_queue.append(task_plan)
+    def start_task(self, task: ActionTask, handle: asyncio.Task):
+        self.current_queue.remove(task)
+        self.running[task.task_id] = handle
         
-    def get_next_task(self) -> Optional[ActionTask]:
-        if self.current_queue and not self.is_paused and not self.is_stopped:
-            task = self.current_queue.popleft()
-            self.current_task_id = task.task_id
-            return task
-        return None
+    def skip_task(self, task: ActionTask):
+        self.current_queue.remove(task)
+    
+    def finish_task(self, task: ActionTask, result: "TaskResult", duration_ms: Optional[float] = None):
+        self.running.pop(task.task_id, None)
+        self.log_execution(task, result, duration_ms)
     
     def has_tasks(self) -> bool:
         return len(self.current_queue) > 0
     
     def pause(self):
         self.is_paused = True
+        self.changed.set()
         logger.info("⏸️ Task execution paused")
         
     def resume(self):
         self.is_paused = False
+        self.changed.set()
         logger.info("▶️ Task execution resumed")
         
     def stop(self):
+        """Cancel planning, drop waiting tasks and cancel running ones (their awaits end now, not at their timeout)"""
         self.is_stopped = True
+        self.stop_requested_at = time.perf_counter()
+        if self.planning and not self.planning.done():
+            self.planning.cancel()
         self.current_queue.clear()
+        for handle in self.running.values():
+            handle.cancel()
+        self.changed.set()
         logger.info("⏹️ Task execution stopped")
         
     def reset(self):
+        """Clear pause/stop for a newly accepted request - before planning, so a stop during planning holds"""
         self.is_paused = False
         self.is_stopped = False
-        self.current_task_id = None
+        self.stop_requested_at = None
+        self.planning = None
+        self.current_queue.clear()
+        self.running.clear()
+        self.changed.clear()
         
-    def log_execution(self, task: ActionTask, result: TaskResult):
+    def log_execution(self, task: ActionTask, result: TaskResult, duration_ms: Optional[float] = None):
         self.execution_history.append({
-            "task": task.model_dump(),
+            "task": task.model_dump(exclude_unset=True),
             "result": result.model_dump(),
+            "duration_ms": duration_ms,
             "timestamp": datetime.now().isoformat()
         })
+        # Successful runs teach the adaptive timeouts (timeouts are recorded by dispatch_task)
+        if duration_ms is not None and result.status == "success":
+            task_timeouts.record(task, duration_ms / 1000)
         
-    def get_failed_index(self) -> Optional[int]:
-        for idx, entry in enumerate(self.execution_history):
-            if entry["result"]["status"] == "failed":
-                return idx
-        return None
-    
-    def retry_from_failed(self) -> List[ActionTask]:
-        failed_idx = self.get_failed_index()
-        if failed_idx is not None:
-            retry_tasks = [
-                ActionTask(**entry["task"]) 
-                for entry in self.execution_history[failed_idx:]
-            ]
-            self.execution_history = self.execution_history[:failed_idx]
-            return retry_tasks
-        return []
-
-# Global task queue
-task_queue = TaskQueue()
-
-# Track pending results
-pending_results: Dict[str, asyncio.Future] = {}
-
-# Helper function for guarded futures
-def create_guarded_future(task_id: str) -> asyncio.Future:
+    def is_idle(self) -> bool:
+        return not self.current_queue and not self.running
+
+
+class TaskQueueRegistry:
     """
-    Create a future with built-in state tracking
-    
-    Returns:
-        asyncio.Future with task_id attached for debugging
+    One TaskQueue per session, so pause/stop/retry only touch their own
+    session. Idle queues are evicted after TASK_QUEUE_IDLE_SECONDS.
     """
-    future = asyncio.Future()
-    future._task_id = task_id  # Attach ID for debugging
-    future._created_at = datetime.now()
-    return future
+    def __init__(self, idle_seconds: float = float(os.getenv("TASK_QUEUE_IDLE_SECONDS", 1800))):
+        self.idle_seconds = idle_seconds
+        self.queues: Dict[str, TaskQueue] = {}
+        self.evicted = 0
+        self._last_sweep = 0.0
+
+    def get(self, session_id: str) -> TaskQueue:
+        self.evict_idle()
+        queue = self.queues.get(session_id)
+        if queue is None:
+            queue = self.queues[session_id] = TaskQueue(session_id)
+        queue.last_active = time.monotonic()
+        return queue
+
+    def evict_idle(self, min_interval: float = 60.0):
+        now = time.monotonic()
+        if now - self._last_sweep < min_interval:
+            return
+        self._last_sweep = now
+        for session_id, queue in list(self.queues.items()):
+            if queue.is_idle() and now - queue.last_active > self.idle_seconds:
+                del self.queues[session_id]
+                self.evicted += 1
+
+# Per-session task queues (worker-local; sessions are pinned to a worker by worker_router.py)
+task_queues = TaskQueueRegistry()
 
 # --- LangGraph State ---
 class CoordinatorState(BaseModel):
@@ -289,91 +332,13 @@ class CoordinatorState(BaseModel):
 # ENHANCED TASK DECOMPOSITION - NO HARDCODED URLs
 # ============================================================================
 
-async def decompose_task_to_actions(
-    user_request: Dict[str, Any],
-    preferences_context: str,
-    device_type: str = "desktop",
-    conversation_history: List[Dict] = None,  # ✅ FIX 3: Add history parameter
-    session_id: str = None,  # ✅ FIX 5: Add this
-    http_request_id: str = None  # ✅ FIX 5: Add this
-) -> Dict[str, Any]:
-    """Decompose user request into ActionTask queue - URLs resolved by execution layer"""
-    
-    # ✅ FIX 2: Extract credentials FIRST - FOR ANY LOGIN/SIGNUP TASK
-    login_keywords = ['login', 'sign in', 'sign up', 'register', 'create account', 'log in']
-    is_login_task = any(keyword in str(user_request).lower() for keyword in login_keywords)
-    
-    credentials = None
-    if is_login_task:
-        credentials = extract_credentials_from_request(user_request)
-        
-        if not credentials.get('email'):
-            logger.error("❌ No email found in request")
-            return {
-                'error': 'Please provide an email address in your request (e.g., "login with user@example.com and password mypass123")',
-                'tasks': []
-            }
-        
-        if not credentials.get('password'):
-            logger.error("❌ No password found in request")
-            return {
-                'error': 'Please provide a password in your request (e.g., "login with user@example.com and password mypass123")',
-                'tasks': []
-            }
-        
-        logger.info(f"📧 Extracted email: {credentials['email']}")
-        logger.info(f"🔑 Password extracted (length: {len(credentials['password'])})")
-    
-    # ✅ FIX 5: Update thinking step
-    if session_id and http_request_id:
-        await ThinkingStepManager.update_step(
-            session_id,
-            "⚙️ Preparing tasks...",
-            http_request_id
-        )
-    
-    device_hint = f"The user is on a {device_type} device. Tailor task recommendations accordingly.\n\n"
-    
-    # ✅ FIX 3: Build conversation history context
-    history_context = ""
-    if conversation_history:
-        history_context = "\n\n# CONVERSATION HISTORY (Last 3 interactions)\n"
-        for entry in conversation_history[-3:]:
-            history_context += f"User: {entry.get('user_message', '')}\n"
-            history_context += f"Action: {entry.get('action_taken', '')}\n"
-            history_context += f"Result: {entry.get('result', '')}\n\n"
-    
-    prompt = f"""{device_hint}You are the AURA Task Decomposition Agent. Convert user requests into low-level executable tasks.
-
-# USER REQUEST
-{json.dumps(user_request, indent=2)}
-
-# USER PREFERENCES
-{preferences_context}
-{history_context}"""
-    
-    # ✅ FIX 2: Add credentials section to prompt if applicable
-    if credentials:
-        prompt += f"""
-        
-# EXTRACTED CREDENTIALS (USE THESE EXACT VALUES):
-Email: {credentials['email']}
-Password: {credentials['password']}
-
-**CRITICAL**: When creating fill tasks for login/signup, use these EXACT values in web_params:
-- For email field: {{"action": "fill", "text": "{credentials['email']}"}}
-- For password field: {{"action": "fill", "text": "{credentials['password']}"}}
-
-DO NOT use placeholder values like "test_user_email" or "test_password".
-# OUTPUT RULES
-
-**FOR LOGIN TASKS**: When you see "Fill email field", you MUST use the actual email from above: "{credentials['email']}"
-**FOR PASSWORD TASKS**: When you see "Fill password field", you MUST use the actual password from above: "{credentials['password']}"
+# Static parts of the decomposition prompt, built once at import
+DECOMPOSE_INTRO = prompt_registry.static(
+    "decompose.intro",
+    "You are the AURA Task Decomposition Agent. Convert user requests into low-level executable tasks."
+)
 
-"""
-    
-    prompt += f"""
-============================
+DECOMPOSE_RULES = prompt_registry.static("decompose.rules", """============================
 CORE BEHAVIOR RULES
 ============================
 
@@ -432,20 +397,20 @@ Each task must have:
 The execution layer will use RAG to determine these from the ai_prompt.
 
 For navigation tasks:
-{{
+{
   "action": "navigate"
-}}
+}
 
 For interaction tasks (click, fill):
-{{
+{
   "action": "fill",
   "text": "search query"  // Only include text for fill actions
-}}
+}
 
 For extraction tasks:
-{{
+{
   "action": "extract"
-}}
+}
 
 ============================
 VALID EXAMPLES
@@ -457,16 +422,16 @@ User: "Open Notepad"
 
 Return:
 [
-  {{
+  {
     "task_id": "task_1",
     "ai_prompt": "Open Notepad application",
     "device": "desktop",
     "context": "local",
     "target_agent": "action",
-    "extra_params": {{"app_name": "notepad"}},
-    "web_params": {{}},
+    "extra_params": {"app_name": "notepad"},
+    "web_params": {},
     "depends_on": null
-  }}
+  }
 ]
 
 ## Example 2: Simple Web Navigation Task
@@ -475,18 +440,18 @@ User: "Go to Google"
 
 Return:
 [
-  {{
+  {
     "task_id": "task_1",
     "ai_prompt": "Navigate to Google homepage",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "navigate"
-    }},
+    },
     "depends_on": null
-  }}
+  }
 ]
 
 EXPLANATION: The ai_prompt "Navigate to Google homepage" will be sent to the web execution layer,
@@ -498,56 +463,56 @@ User: "Login to Gmail with user@example.com and password mypass123"
 
 Tasks:
 [
-  {{
+  {
     "task_id": "task_1",
     "ai_prompt": "Navigate to Gmail login page",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "navigate"
-    }},
+    },
     "depends_on": null
-  }},
-  {{
+  },
+  {
     "task_id": "task_2",
     "ai_prompt": "Fill email field with user@example.com",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "fill",
       "text": "user@example.com"
-    }},
+    },
     "depends_on": "task_1"
-  }},
-  {{
+  },
+  {
     "task_id": "task_3",
     "ai_prompt": "Fill password field with mypass123",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "fill",
       "text": "mypass123"
-    }},
+    },
     "depends_on": "task_2"
-  }},
-  {{
+  },
+  {
     "task_id": "task_4",
     "ai_prompt": "Click login button",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "click"
-    }},
+    },
     "depends_on": "task_3"
-  }}
+  }
 ]
 
 ## Example 4: Composite Web Task (E-commerce Search)
@@ -556,55 +521,55 @@ User: "Search Amazon for white socks and extract the first 5 product titles"
 
 Tasks:
 [
-  {{
+  {
     "task_id": "task_1",
     "ai_prompt": "Navigate to Amazon homepage",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "navigate"
-    }},
+    },
     "depends_on": null
-  }},
-  {{
+  },
+  {
     "task_id": "task_2",
     "ai_prompt": "Fill Amazon search box with 'white socks'",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "fill",
       "text": "white socks"
-    }},
+    },
     "depends_on": "task_1"
-  }},
-  {{
+  },
+  {
     "task_id": "task_3",
     "ai_prompt": "Click Amazon search button",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "click"
-    }},
+    },
     "depends_on": "task_2"
-  }},
-  {{
+  },
+  {
     "task_id": "task_4",
     "ai_prompt": "Extract first 5 product titles from Amazon search results",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "extract"
-    }},
+    },
     "depends_on": "task_3"
-  }}
+  }
 ]
 
 EXPLANATION: Each ai_prompt is descriptive enough for RAG to generate the correct
@@ -616,63 +581,63 @@ User: "Search Google for 'Playwright tutorial' and copy the first result title t
 
 Tasks:
 [
-  {{
+  {
     "task_id": "task_1",
     "ai_prompt": "Navigate to Google homepage",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "navigate"
-    }},
+    },
     "depends_on": null
-  }},
-  {{
+  },
+  {
     "task_id": "task_2",
     "ai_prompt": "Fill Google search box with 'Playwright tutorial'",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "fill",
       "text": "Playwright tutorial"
-    }},
+    },
     "depends_on": "task_1"
-  }},
-  {{
+  },
+  {
     "task_id": "task_3",
     "ai_prompt": "Extract the first search result title from Google",
     "device": "desktop",
     "context": "web",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{
+    "extra_params": {},
+    "web_params": {
       "action": "extract"
-    }},
+    },
     "depends_on": "task_2"
-  }},
-  {{
+  },
+  {
     "task_id": "task_4",
     "ai_prompt": "Open Notepad application",
     "device": "desktop",
     "context": "local",
     "target_agent": "action",
-    "extra_params": {{"app_name": "notepad"}},
-    "web_params": {{}},
+    "extra_params": {"app_name": "notepad"},
+    "web_params": {},
     "depends_on": "task_3"
-  }},
-  {{
+  },
+  {
     "task_id": "task_5",
     "ai_prompt": "Type the extracted search result title into Notepad",
     "device": "desktop",
     "context": "local",
     "target_agent": "action",
-    "extra_params": {{"input_from": "task_3"}},
-    "web_params": {{}},
+    "extra_params": {"input_from": "task_3"},
+    "web_params": {},
     "depends_on": "task_4"
-  }}
+  }
 ]
 
 ## Example 5: Mobile Configuration Task
@@ -681,36 +646,36 @@ User: "Set the alarm for 7 am"
 
 Tasks:
 [
-  {{
+  {
     "task_id": "task_1",
     "ai_prompt": "Open the Clock app on mobile device",
     "device": "mobile",
     "context": "local",
     "target_agent": "action",
-    "extra_params": {{"app_name": "clock"}},
-    "web_params": {{}},
+    "extra_params": {"app_name": "clock"},
+    "web_params": {},
     "depends_on": null
-  }},
-  {{
+  },
+  {
     "task_id": "task_2",
     "ai_prompt": "Set the alarm time to 7:00 AM",
     "device": "mobile",
     "context": "local",
     "target_agent": "action",
-    "extra_params": {{"time": "7:00"}},
-    "web_params": {{}},
+    "extra_params": {"time": "7:00"},
+    "web_params": {},
     "depends_on": "task_1"
-  }},
-  {{
+  },
+  {
     "task_id": "task_3",
     "ai_prompt": "Press OK or Save to confirm the alarm setting",
     "device": "mobile",
     "context": "local",
     "target_agent": "action",
-    "extra_params": {{}},
-    "web_params": {{}},
+    "extra_params": {},
+    "web_params": {},
     "depends_on": "task_2"
-  }}
+  }
 ]
 
 # CRITICAL RULES
@@ -722,8 +687,9 @@ Tasks:
 5. **Minimal web_params** - ONLY include action type and text (for fill), nothing else
 6. **NO URLs** - NEVER hardcode URLs, let RAG resolve them from ai_prompt
 7. **NO selectors** - NEVER hardcode selectors, let RAG find them from ai_prompt
-8. **Empty web_params** - For local tasks, set web_params: {{}}
+8. **Empty web_params** - For local tasks, set web_params: {}
 9. **Include confirmation steps** - For configuration tasks (alarms, forms, settings), always add a final task to confirm/save changes
+10. **Independent branches** - only set "depends_on" when a task really needs another one; tasks without dependencies run in parallel. Web tasks on different sites that can run side by side set extra_params "page" to a distinct name (e.g. "page": "weather")
 
 ============================
 OUTPUT RULES
@@ -731,7 +697,7 @@ OUTPUT RULES
 
 Return ONLY valid JSON array of tasks (no markdown, no explanations):
 [
-  {{
+  {
     "task_id": <string>,
     "ai_prompt": <string>,
     "device": <"desktop" | "mobile">,
@@ -740,39 +706,218 @@ Return ONLY valid JSON array of tasks (no markdown, no explanations):
     "extra_params": <object>,
     "web_params": <object>,
     "depends_on": <string | null>
-  }},
+  },
   ...
 ]
 
-Generate the task decomposition now:"""
+Generate the task decomposition now:""")
+
+async def decompose_task_to_actions(
+    user_request: Dict[str, Any],
+    preferences_context: str,
+    device_type: str = "desktop",
+    conversation_history: List[Dict] = None,  # ✅ FIX 3: Add history parameter
+    session_id: str = None,  # ✅ FIX 5: Add this
+    http_request_id: str = None,  # ✅ FIX 5: Add this
+    use_cache: bool = True,
+    stream: Optional[PlanStream] = None
+) -> Dict[str, Any]:
+    """
+    Decompose user request into ActionTask queue - URLs resolved by execution layer
+
+    Plans come from plan_cache when the same (or same-shaped) request already
+    ran successfully; otherwise the returned "plan_cache" entry lets
+    send_feedback cache this plan once it succeeds. With a stream, every task
+    is also handed to it as soon as it is parsed.
+    """
+    
+    # ✅ FIX 2: Extract credentials FIRST - FOR ANY LOGIN/SIGNUP TASK
+    login_keywords = ['login', 'sign in', 'sign up', 'register', 'create account', 'log in']
+    is_login_task = any(keyword in str(user_request).lower() for keyword in login_keywords)
+    
+    credentials = None
+    if is_login_task:
+        credentials = extract_credentials_from_request(user_request)
+        
+        if not credentials.get('email'):
+            logger.error("❌ No email found in request")
+            return {
+                'error': 'Please provide an email address in your request (e.g., "login with user@example.com and password mypass123")',
+                'tasks': []
+            }
+        
+        if not credentials.get('password'):
+            logger.error("❌ No password found in request")
+            return {
+                'error': 'Please provide a password in your request (e.g., "login with user@example.com and password mypass123")',
+                'tasks': []
+            }
+        
+        logger.info(f"📧 Extracted email: {credentials['email']}")
+        logger.info(f"🔑 Password extracted (length: {len(credentials['password'])})")
+    
+    # Login requests carry credentials and are never cached
+    cache_key = None
+    if use_cache and not credentials:
+        cache_key = plan_cache.cache_key(
+            user_request.get('confirmation') or user_request.get('action') or "",
+            device_type,
+            preferences_context,
+            has_history=bool(conversation_history)
+        )
+    if cache_key:
+        cached_plan = await plan_cache.lookup(cache_key)
+        if cached_plan:
+            action_tasks = [ActionTask(**task) for task in fresh_task_ids(cached_plan)]
+            logger.info(f"🗂️ Plan cache hit - {len(action_tasks)} tasks, skipping decomposition")
+            if stream:
+                for task in action_tasks:
+                    stream.put(task)
+            return {"tasks": action_tasks, "plan_cache": {"key": cache_key, "hit": True}}
+    
+    # ✅ FIX 5: Update thinking step
+    if session_id and http_request_id:
+        await ThinkingStepManager.update_step(
+            session_id,
+            "⚙️ Preparing tasks...",
+            http_request_id
+        )
+    
+    device_hint = f"The user is on a {device_type} device. Tailor task recommendations accordingly."
+    
+    # ✅ FIX 3: Conversation history (last 3 interactions) - oldest trimmed first
+    history = [
+        f"User: {entry.get('user_message', '')}\n"
+        f"Action: {entry.get('action_taken', '')}\n"
+        f"Result: {entry.get('result', '')}\n"
+        for entry in (conversation_history or [])[-3:]
+    ]
+    
+    # ✅ FIX 2: Add credentials section to prompt if applicable
+    credentials_context = ""
+    if credentials:
+        credentials_context = f"""# EXTRACTED CREDENTIALS (USE THESE EXACT VALUES):
+Email: {credentials['email']}
+Password: {credentials['password']}
+
+**CRITICAL**: When creating fill tasks for login/signup, use these EXACT values in web_params:
+- For email field: {{"action": "fill", "text": "{credentials['email']}"}}
+- For password field: {{"action": "fill", "text": "{credentials['password']}"}}
+
+DO NOT use placeholder values like "test_user_email" or "test_password".
+# OUTPUT RULES
+
+**FOR LOGIN TASKS**: When you see "Fill email field", you MUST use the actual email from above: "{credentials['email']}"
+**FOR PASSWORD TASKS**: When you see "Fill password field", you MUST use the actual password from above: "{credentials['password']}"
+"""
+    
+    prompt = prompt_registry.assemble("decompose", [
+        Section("device", device_hint, trim=False),
+        DECOMPOSE_INTRO,
+        Section("request", json.dumps(user_request, indent=2), header="# USER REQUEST\n", trim=False),
+        Section("preferences", (preferences_context or "").splitlines(), header="# USER PREFERENCES\n", priority=1),
+        Section("history", history, header="# CONVERSATION HISTORY (Last 3 interactions)\n", keep="last", priority=0),
+        Section("credentials", credentials_context, trim=False),
+        DECOMPOSE_RULES,
+    ], joiner="\n\n").text
 
     try:
-        response = await llm.ainvoke(prompt)
-        response_text = response.content if hasattr(response, 'content') else str(response)
-        response_text = response_text.strip()
-
-        if response_text.startswith("```"):
-            parts = response_text.split("```")
-            response_text = parts[1] if len(parts) > 1 else response_text
-            if response_text.strip().startswith("json"):
-                response_text = response_text.strip()[4:]
-
-        parsed = json.loads(response_text.strip())
-
-        if isinstance(parsed, list):
-            action_tasks = [ActionTask(**task) for task in parsed]
-        elif isinstance(parsed, dict) and "tasks" in parsed:
-            action_tasks = [ActionTask(**task) for task in parsed["tasks"]]
+        if stream:
+            parsed, action_tasks = await stream_decomposition(prompt, stream)
         else:
-            raise ValueError("Invalid task decomposition format")
+            response = await llm.ainvoke(prompt, call_site="decompose", hedge=True)
+            response_text = response.content if hasattr(response, 'content') else str(response)
+            response_text = response_text.strip()
+
+            if response_text.startswith("```"):
+                parts = response_text.split("```")
+                response_text = parts[1] if len(parts) > 1 else response_text
+                if response_text.strip().startswith("json"):
+                    response_text = response_text.strip()[4:]
+
+            parsed = json.loads(response_text.strip())
+
+            if isinstance(parsed, dict) and "tasks" in parsed:
+                parsed = parsed["tasks"]
+            if not isinstance(parsed, list):
+                raise ValueError("Invalid task decomposition format")
+            action_tasks = [ActionTask(**task) for task in fresh_task_ids(parsed)]
 
         logger.info(f"📋 Decomposed into {len(action_tasks)} tasks")
-        return {"tasks": action_tasks}
+        result = {"tasks": action_tasks}
+        if cache_key:
+            result["plan_cache"] = {"key": cache_key, "hit": False, "plan": parsed}
+        return result
 
     except Exception as e:
         logger.error(f"❌ Task decomposition failed: {e}")
         return {"error": str(e)}
 
+async def stream_decomposition(prompt: str, stream: PlanStream):
+    """Stream the planner's answer, handing each task to the executor as soon as it parses"""
+    parser = TaskArrayParser()
+    suffix = uuid.uuid4().hex[:8]
+    parsed, action_tasks = [], []
+
+    # Hedged on time to first chunk - the tasks are handed on as they stream in
+    async for chunk in llm.astream(prompt, call_site="decompose", hedge=True):
+        text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+        for task_dict in parser.feed(text):
+            try:
+                task = ActionTask(**fresh_task_ids([task_dict], suffix)[0])
+            except Exception as e:
+                logger.warning(f"⚠️ Skipping invalid streamed task {task_dict.get('task_id')}: {e}")
+                continue
+            parsed.append(task_dict)
+            action_tasks.append(task)
+            stream.put(task)
+
+    if not parsed:
+        raise ValueError("Invalid task decomposition format")
+    logger.info(f"📋 Streamed {len(parsed)} tasks (first after {stream.first_task_ms:.0f}ms)")
+    return parsed, action_tasks
+
+# ============================================================================
+# RESUME FROM CHECKPOINT
+# ============================================================================
+
+# Requests that mean "run the last plan again" rather than a new task
+RETRY_REQUEST = re.compile(
+    r"^(please\s+)?(retry|try (it |that )?again|resume|continue|keep going|do it again)(\s+please)?[.!]*$",
+    re.IGNORECASE
+)
+
+def request_text(raw_task: Dict) -> str:
+    return str(raw_task.get("confirmation") or raw_task.get("action") or "")
+
+def resume_plan(raw_task: Dict, execution_state: Optional[Dict]) -> Optional[Tuple[List[ActionTask], Dict[str, Optional[str]]]]:
+    """
+    The saved plan, renamed for a new run, when raw_task retries a failed plan
+    (a "retry" command or message, or the same request again): its tasks and
+    the outputs of the tasks that already succeeded. None means plan anew.
+    """
+    if not execution_state or not execution_state.get("failed_task_id") or not execution_state.get("plan"):
+        return None
+    saved_input = execution_state.get("input", {})
+    text = request_text(raw_task)
+    same_request = (
+        normalize_request(text) == normalize_request(request_text(saved_input))
+        and raw_task.get("device_type", "desktop") == saved_input.get("device_type", "desktop")
+    )
+    if not (raw_task.get("command") == "retry" or RETRY_REQUEST.match(text.strip()) or same_request):
+        return None
+
+    suffix = uuid.uuid4().hex[:8]
+    tasks = [ActionTask(**task) for task in fresh_task_ids(execution_state["plan"], suffix)]
+    outputs = execution_state.get("outputs", {})
+    completed = {}
+    for task_id in execution_state.get("completed_task_ids", []):
+        output = outputs.get(task_id)
+        if is_ref(output) and not blob_store.exists(output):
+            continue  # its output did not survive a restart - run it again
+        completed[renamed_task_id(task_id, suffix)] = output
+    return tasks, completed
+
 # --- REST OF THE CODE REMAINS THE SAME ---
 # (Orchestration graph, execution, broker integration, etc.)
 
@@ -787,25 +932,48 @@ def create_coordinator_graph():
         user_id = state.get("user_id", "default_user")
         original_message_id = state.get("original_message_id")
         device_type = raw_task.get("device_type", "desktop")
+        task_queue = task_queues.get(session_id)
+
+        # A retry resumes the saved plan at its failed task - no planning call
+        previous_execution_state = await checkpoint_writer.load(session_id) if session_id else None
+        resume = resume_plan(raw_task, previous_execution_state)
+        if resume:
+            tasks, completed = resume
+            # A bare "retry" command carries no user_id - the resumed run is the saved input's user's
+            user_id = previous_execution_state["input"].get("user_id", user_id)
+            logger.info(
+                f"🔄 Resuming previous plan at {previous_execution_state['failed_task_id']} "
+                f"({len(completed)}/{len(tasks)} tasks already done)"
+            )
+            return {
+                "input": previous_execution_state["input"],
+                "tasks": tasks,
+                "status": "ready",
+                "session_id": session_id,
+                "original_message_id": original_message_id,
+                "user_id": user_id,
+                "completed_outputs": completed,
+            }
+        if raw_task.get("command") == "retry":
+            logger.info("🔄 Nothing to retry - the last plan did not fail")
+            return {
+                "input": raw_task,
+                "tasks": [],
+                "status": "ready",
+                "session_id": session_id,
+                "original_message_id": original_message_id,
+                "user_id": user_id,
+            }
+        if previous_execution_state and previous_execution_state.get("failed_task_id"):
+            logger.info(f"🔄 Found previous execution state")
+        else:
+            previous_execution_state = None
 
         # Retrieve user preferences
-        previous_execution_state = None
-
         try:
             from agents.coordinator_agent.memory.mem0_manager import get_preference_manager
             pref_mgr = get_preference_manager(user_id)
             
-            if checkpointer and session_id:
-                try:
-                    checkpoint_data = await checkpointer.aget(
-                        config={"configurable": {"thread_id": session_id}}
-                    )
-                    if checkpoint_data and "execution_state" in checkpoint_data:
-                        previous_execution_state = checkpoint_data["execution_state"]
-                        logger.info(f"🔄 Found previous execution state")
-                except Exception as e:
-                    logger.debug(f"No previous execution state: {e}")
-            
             preferences_context = pref_mgr.get_relevant_preferences(
                 str(raw_task.get("confirmation", "")), limit=5
             )
@@ -817,22 +985,53 @@ def create_coordinator_graph():
             execution_context = f"\n\n# PREVIOUS EXECUTION STATE\n"
             execution_context += f"Failed at task: {previous_execution_state.get('failed_task_id')}\n"
             execution_context += f"Completed tasks: {previous_execution_state.get('completed_task_ids', [])}\n"
-            execution_context += f"User is asking to retry. Continue from where you left off"
+            execution_context += f"If the user refers to it, continue from where you left off"
             preferences_context = f"{preferences_context}{execution_context}"
 
+        if task_queue.is_stopped:
+            logger.info("⏹️ Stopped before planning")
+            return {
+                "input": raw_task,
+                "tasks": [],
+                "status": "ready",
+                "session_id": session_id,
+                "original_message_id": original_message_id,
+                "user_id": user_id,
+            }
+
         # Decompose task
         # ✅ FIX 3: Pass conversation history to decomposition
-        plan_result = await decompose_task_to_actions(
+        stream = PlanStream() if PLAN_STREAMING and session_id else None
+        decomposition = decompose_task_to_actions(
             raw_task, 
             preferences_context, 
             device_type,
             conversation_history=state.get("conversation_history", []),
             session_id=session_id,  # ✅ FIX 5: Pass these parameters
-            http_request_id=original_message_id  # ✅ FIX 5: Pass these parameters
+            http_request_id=original_message_id,  # ✅ FIX 5: Pass these parameters
+            use_cache=not previous_execution_state,
+            stream=stream
         )
+        if stream:
+            # execute_tasks consumes the tasks while the planner is still generating
+            stream.producer = asyncio.create_task(stream.run(decomposition))
+            task_queue.planning = stream.producer
+            plan_streams[session_id] = stream
+            plan_result = {"tasks": []}
+        else:
+            # A stop cancels the planning call itself, not just what runs after it
+            task_queue.planning = asyncio.ensure_future(decomposition)
+            try:
+                plan_result = await task_queue.planning
+            except asyncio.CancelledError:
+                if not task_queue.is_stopped:
+                    raise
+                plan_result = {"error": "Stopped by user"}
         
         # Surface decomposition errors when present
-        if isinstance(plan_result, dict) and "error" in plan_result:
+        if stream:
+            tasks = []
+        elif isinstance(plan_result, dict) and "error" in plan_result:
             logger.error(f"❌ Decomposition returned error: {plan_result['error']}")
             tasks = []
         else:
@@ -856,100 +1055,209 @@ def create_coordinator_graph():
             "original_message_id": original_message_id,
             "user_id": user_id,
             "preferences_context": preferences_context,
+            "plan_cache": plan_result.get("plan_cache"),
+            "plan_streaming": stream is not None,
         }
 
     async def execute_tasks(state: Dict) -> Dict:
-        """STEP 2: Execute tasks sequentially"""
+        """STEP 2: Execute tasks as a dependency graph (see plan_dag.py)"""
         tasks = state["tasks"]
         session_id = state.get("session_id")
         original_message_id = state.get("original_message_id")
+        # Streamed plan: tasks keep arriving while the first ones already run
+        stream = plan_streams.pop(session_id, None) if state.get("plan_streaming") else None
+        plan_cache_entry = state.get("plan_cache")
         
-        task_queue.reset()
-        task_queue.add_to_current(tasks)
+        # Resumed plan: tasks that succeeded last time keep their results
+        completed = state.get("completed_outputs") or {}
         
-        results = {}
-        task_outputs = {}
-
-        if checkpointer and session_id:
-            try:
-                execution_state={
-                    "completed_task_ids": list(results.keys()),
-                    "failed_task_ids":task_queue.get_failed_index(),
-                    "remaining_tasks": [t.task_id for t in list(task_queue.current_queue)],
-                    "timestamp": datetime.now().isoformat()
-                }
-                await checkpointer.aput(
-                    config={"configurable": {"thread_id": session_id}},
-                    checkpoint={"execution_state": execution_state},
-                    metadata = {"type": "task_progress"}
-                )
-                logger.info(f"💾 Saved task progress")
-            except Exception as e:
-                logger.error(f"❌ Failed to save task progress: {e}") 
+        # Pause/stop state was reset when the request was accepted (run_plan)
+        task_queue = task_queues.get(session_id)
+        if not task_queue.is_stopped:
+            task_queue.add_to_current([t for t in tasks if t.task_id not in completed])
         
-        while task_queue.has_tasks():
-            if task_queue.is_stopped:
-                logger.warning("⏹️ Execution stopped by user")
-                break
-                
-            while task_queue.is_paused:
-                await asyncio.sleep(0.5)
-            
-            current_task = task_queue.get_next_task()
-            if not current_task:
-                break
-            
-            # Check dependencies
-            if current_task.depends_on:
-                dep_ids = current_task.depends_on.split(",")
-                dependencies_met = all(
-                   results.get(dep_id.strip()) 
-                   and results.get(dep_id.strip()).status == "success"
-                   for dep_id in dep_ids
+        results = {
+            task_id: TaskResult(task_id=task_id, status="success", content=output)
+            for task_id, output in completed.items()
+        }
+        task_outputs = {task_id: output for task_id, output in completed.items() if output}
+        
+        # Progress is checkpointed as small deltas, written behind (see checkpoint_writer.py)
+        if session_id:
+            checkpoint_writer.begin(session_id, state["input"], [t.model_dump(exclude_unset=True) for t in tasks], completed)
+        
+        graph = PlanGraph()
+        for task in tasks:
+            graph.add(task)
+        if not stream:
+            graph.close()
+        deps = graph.deps
+        next_task = asyncio.ensure_future(stream.get()) if stream else None
+        running: Dict[asyncio.Task, ActionTask] = {}
+        durations: Dict[str, float] = {}
+        max_parallel = 0
+        plan_started = time.perf_counter()
+
+        async def run_task(task: ActionTask) -> TaskResult:
+            await ThinkingStepManager.task_progress(session_id, task.task_id, "running", task.ai_prompt)
+            result = None
+            try:
+                result = await execute_single_task(task, session_id, original_message_id, durations)
+                return result
+            finally:
+                await ThinkingStepManager.task_progress(
+                    session_id, task.task_id, result.status if result else "failed", task.ai_prompt,
+                    error=result.error if result else "Task did not return a result"
                 )
-                
-                if not dependencies_met:
-                    logger.warning(f"⏭️ Skipping {current_task.task_id} - dependencies not met")
-                    results[current_task.task_id] = TaskResult(
-                        task_id=current_task.task_id,
+
+        async def start_ready_tasks() -> bool:
+            """Start (or skip) every waiting task whose dependencies have finished"""
+            progressed = False
+            for task in list(task_queue.current_queue):
+                if not graph.closed and any(d not in deps for d in deps[task.task_id]):
+                    continue  # waits for a task the planner has not produced yet
+                dep_results = [results.get(dep_id) for dep_id in deps[task.task_id]]
+                if any(r is None for r in dep_results):
+                    continue
+                progressed = True
+
+                if any(r.status != "success" for r in dep_results):
+                    logger.warning(f"⏭️ Skipping {task.task_id} - dependencies not met")
+                    task_queue.skip_task(task)
+                    asyncio.create_task(ThinkingStepManager.task_progress(
+                        session_id, task.task_id, "skipped", task.ai_prompt, error="Dependency failed"
+                    ))
+                    results[task.task_id] = TaskResult(
+                        task_id=task.task_id,
                         status="failed",
                         error="Dependency failed"
                     )
                     continue
-            
-            # Inject dependent task outputs
-            if current_task.extra_params.get("input_from"):
-                input_task_id = current_task.extra_params["input_from"]
-                if input_task_id in task_outputs:
-                    current_task.extra_params["input_content"] = task_outputs[input_task_id]
-            
-            # Execute task
-            logger.info(f"🔄 Executing {current_task.task_id}: {current_task.ai_prompt[:50]}...")
-            result = await execute_single_task(current_task, session_id, original_message_id)
-            
-            results[current_task.task_id] = result
-            task_queue.log_execution(current_task, result)
-            
-            if result.content:
-                cleaned_content = result.content.replace("EXECUTION_SUCCESS", "").replace("FAILED:", "").strip()
-                # task_outputs[current_task.task_id] = result.content
-                            # Only store if there's actual content
-                if cleaned_content:
-                    task_outputs[current_task.task_id] = cleaned_content
-                    logger.info(f"💾 Stored output for {current_task.task_id}")
-                    logger.info(f"   Length: {len(cleaned_content)} chars")
-                    logger.info(f"   Preview: {cleaned_content[:200]}...")
-                else:
-                    logger.warning(f"⚠️ Task {current_task.task_id} produced empty output after cleaning")
-
-                
-            if result.status == "failed":
-                logger.error(f"❌ Task {current_task.task_id} failed: {result.error}")
+
+                # Inject dependent task outputs (references to large ones, see blob_store.py)
+                sources = [task_outputs[i] for i in input_sources(task) if i in task_outputs]
+                if len(sources) == 1:
+                    task.extra_params["input_content"] = sources[0]
+                elif sources:
+                    task.extra_params["input_content"] = await blob_store.aref_for(
+                        "\n\n".join(blob_store.resolve(source) or "" for source in sources)
+                    )
+                    if task not in task_queue.current_queue:
+                        continue  # stopped while the merged input was being written
+
+                logger.info(f"🔄 Executing {task.task_id}: {task.ai_prompt[:50]}...")
+                handle = asyncio.create_task(run_task(task))
+                task_queue.start_task(task, handle)
+                running[handle] = task
+            return progressed
+
+        # Ready tasks run concurrently; resource_pool serializes those sharing a device.
+        # Pause/resume/stop wake the loop through task_queue.changed - no polling.
+        while task_queue.has_tasks() or running or next_task:
+            if task_queue.is_stopped and not running:
+                break
+
+            if not task_queue.is_stopped and not task_queue.is_paused:
+                while await start_ready_tasks():
+                    pass
+            max_parallel = max(max_parallel, len(running))
+
+            if not running and not next_task and not task_queue.is_paused:
                 break
+
+            task_queue.changed.clear()
+            control = asyncio.ensure_future(task_queue.changed.wait())
+            waiting = [*running, control] + ([next_task] if next_task else [])
+            try:
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                control.cancel()
+            for finished in done:
+                if finished is control:
+                    continue
+                if finished is next_task:
+                    streamed = next_task.result()
+                    if streamed is None:
+                        graph.close()
+                        deps = graph.deps
+                        next_task = None
+                        plan_cache_entry = stream.result.get("plan_cache")
+                        if "error" in stream.result:
+                            logger.error(f"❌ Decomposition returned error: {stream.result['error']}")
+                        logger.info(f"📋 Plan complete: {len(graph.tasks)} tasks streamed")
+                    else:
+                        graph.add(streamed)
+                        task_queue.add_to_current([streamed])
+                        if session_id:
+                            checkpoint_writer.add_task(session_id, streamed.model_dump(exclude_unset=True))
+                        logger.info(f"📥 Streamed {streamed.task_id}: {streamed.ai_prompt[:50]}...")
+                        next_task = asyncio.ensure_future(stream.get())
+                    continue
+                current_task = running.pop(finished)
+                try:
+                    result = finished.result()
+                except asyncio.CancelledError:
+                    result = TaskResult(task_id=current_task.task_id, status="failed", error="Stopped by user")
+                except Exception as e:
+                    logger.error(f"❌ Task {current_task.task_id} raised: {e}", exc_info=True)
+                    result = TaskResult(task_id=current_task.task_id, status="failed", error=str(e))
+
+                results[current_task.task_id] = result
+                task_queue.finish_task(current_task, result, durations.get(current_task.task_id))
+
+                if result.content:
+                    content = blob_store.resolve(result.content) or ""
+                    cleaned_content = content.replace("EXECUTION_SUCCESS", "").replace("FAILED:", "").strip()
+                    # Only store if there's actual content
+                    if cleaned_content:
+                        task_outputs[current_task.task_id] = await blob_store.aref_for(cleaned_content)
+                        logger.info(f"💾 Stored output for {current_task.task_id}")
+                        logger.info(f"   Length: {len(cleaned_content)} chars")
+                        logger.info(f"   Preview: {cleaned_content[:200]}...")
+                    else:
+                        logger.warning(f"⚠️ Task {current_task.task_id} produced empty output after cleaning")
+
+                if result.status == "failed":
+                    logger.error(f"❌ Task {current_task.task_id} failed: {result.error}")
+                if session_id:
+                    checkpoint_writer.task_finished(
+                        session_id, current_task.task_id, result.status, task_outputs.get(current_task.task_id)
+                    )
+
+        if next_task:
+            next_task.cancel()
+        if stream:
+            stream.cancel()
+
+        if task_queue.is_stopped:
+            quiesce_ms = (time.perf_counter() - task_queue.stop_requested_at) * 1000
+            logger.warning(f"⏹️ Execution stopped by user ({quiesce_ms:.0f}ms to quiescence)")
+
+        if session_id:
+            checkpoint_writer.finish(session_id)
+
+        if durations:
+            wall_ms = (time.perf_counter() - plan_started) * 1000
+            path_ms, path = critical_path(graph.tasks, deps, lambda task_id: durations.get(task_id, 0.0))
+            plan_metrics.record(
+                tasks=len(durations),
+                wall_ms=wall_ms,
+                busy_ms=sum(durations.values()),
+                critical_path_ms=path_ms,
+                critical_path_tasks=len(path),
+                max_parallel=max_parallel
+            )
+            logger.info(
+                f"📈 Plan finished in {wall_ms:.0f}ms "
+                f"(critical path {path_ms:.0f}ms over {len(path)} tasks, up to {max_parallel} in parallel)"
+            )
         
         return {
             **state,
+            "tasks": graph.tasks,
+            "plan_cache": plan_cache_entry,
             "results": results,
+            "stopped": task_queue.is_stopped,
             "status": "completed",
             "session_id": session_id,
             "original_message_id": original_message_id
@@ -964,6 +1272,10 @@ def create_coordinator_graph():
         
         success_count = sum(1 for r in results.values() if r.status == "success")
         total_count = len(results)
+        # A stop drops tasks that never started, so they have no result at all
+        stopped = state.get("stopped", False)
+        planned_count = max(len(state.get("tasks") or []), total_count)
+        all_succeeded = not stopped and total_count > 0 and success_count == total_count == planned_count
         
         # ✅ FIX 3: Update conversation history
         if success_count > 0:
@@ -974,7 +1286,7 @@ def create_coordinator_graph():
                 # Prefer the 'confirmation' payload from the Language Agent; fall back to 'action' for compatibility
                 "user_message": state['input'].get('confirmation', state['input'].get('action', '')),
                 "action_taken": f"Executed {success_count} tasks",
-                "result": "success" if success_count == total_count else "partial",
+                "result": "success" if all_succeeded else "partial",
                 "timestamp": datetime.now().isoformat()
             })
             
@@ -982,14 +1294,16 @@ def create_coordinator_graph():
             if len(state["conversation_history"]) > 10:
                 state["conversation_history"] = state["conversation_history"][-10:]
         
-        if success_count == total_count and total_count > 0:
+        if all_succeeded:
             response_text = f"Task completed successfully! Executed {success_count} steps."
+        elif stopped:
+            response_text = f"Stopped: {success_count}/{planned_count} steps completed."
         elif success_count > 0:
-            response_text = f"Partially completed: {success_count}/{total_count} steps succeeded."
+            response_text = f"Partially completed: {success_count}/{planned_count} steps succeeded."
         else:
             response_text = "Task could not be completed. Please try again."
         
-        response_msg = AgentMessage(
+        response_msg = InternalMessage(
             message_type=MessageType.TASK_RESPONSE,
             sender=AgentType.COORDINATOR,
             receiver=AgentType.LANGUAGE,
@@ -1000,7 +1314,9 @@ def create_coordinator_graph():
                 "response": response_text,
                 "result": {
                     "completed_tasks": {k: v.status for k, v in results.items()},
-                    "details": [v.model_dump() for v in results.values()]
+                    "details": [
+                        {**v.model_dump(), "content": blob_store.resolve(v.content)} for v in results.values()
+                    ]
                 }
             }
         )
@@ -1008,82 +1324,26 @@ def create_coordinator_graph():
         logger.info(f"📤 Sending feedback: {response_text}")
         await broker.publish(Channels.COORDINATOR_TO_LANGUAGE, response_msg)
         
-        if success_count == total_count and total_count > 0:
-            try:
-                from agents.coordinator_agent.memory.mem0_manager import get_preference_manager
-                pref_mgr = get_preference_manager(user_id)
-                
-                task_summary = {
-                    # Prefer confirmation from Language Agent for a faithful representation of the user's intent
-                    "original_request": state['input'].get('confirmation', state['input'].get('action', '')),
-                    "completed_steps": [t.ai_prompt for t in state['tasks']],
-                    "total_steps": total_count
-                }
-                
-                extraction_prompt = f"""Based on this completed task, extract user preferences for future tasks.
-
-COMPLETED TASK:
-{json.dumps(task_summary, indent=2)}
-
-RULES:
-- Only extract repeatable preferences (app choices, workflows, patterns)
-- Ignore one-time actions
-- Format as clear statements
-
-OUTPUT FORMAT (JSON array):
-[
-  {{
-    "preference": "User prefers Chrome for web browsing",
-    "category": "app_usage",
-    "confidence": "high"
-  }}
-]
-
-If NO preferences, return: []
-
-Extract now:"""
-                
-                extraction_response = await llm.ainvoke(extraction_prompt)
-                extraction_text = extraction_response.content if hasattr(extraction_response, 'content') else str(extraction_response)
-
-                extraction_text = extraction_text.strip()
-                if extraction_text.startswith("```"):
-                    extraction_text = extraction_text.split("```")[1]
-                    if extraction_text.startswith("json"):
-                        extraction_text = extraction_text[4:]
-
-                preferences_to_store = json.loads(extraction_text.strip())
-                
-                if preferences_to_store and isinstance(preferences_to_store, list):
-                    for pref_obj in preferences_to_store:
-                        if pref_obj.get("confidence") in ["high", "medium"]:
-                            pref_mgr.add_preference(
-                                pref_obj["preference"],
-                                metadata={
-                                    "category": pref_obj.get("category", "general"),
-                                    "confidence": pref_obj.get("confidence", "medium"),
-                                    "extracted_from": task_summary["original_request"]
-                                }
-                            )
-                            logger.info(f"💾 Stored preference: {pref_obj['preference']}")
-                
-                conversation_context = f"User requested: {task_summary['original_request']}. "
-                conversation_context += f"Successfully completed {success_count} steps."
-                
-                pref_mgr.add_preference(
-                    conversation_context,
-                    metadata={
-                        "category": "conversation_history",
-                        "session_id": session_id,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                )
-                
-            except Exception as e:
-                logger.error(f"❌ Failed to store preferences: {e}")
+        # Only plans that fully ran and succeeded are reused; a failing cached
+        # plan is dropped (a stopped one proved nothing either way)
+        cache_info = state.get("plan_cache")
+        if cache_info:
+            if all_succeeded:
+                if not cache_info["hit"]:
+                    await plan_cache.store(cache_info["key"], cache_info["plan"])
+            elif cache_info["hit"] and not stopped:
+                plan_cache.invalidate(cache_info["key"])
         
-        if task_queue.global_queue:
-            logger.info(f"📋 Processing next task from global queue")
+        # Preferences are mined in the background, batched with other turns -
+        # only from plans that ran to the end, never from stopped or partial ones
+        if all_succeeded:
+            preference_miner.submit_plan(
+                user_id,
+                session_id,
+                # Prefer confirmation from Language Agent for a faithful representation of the user's intent
+                request=state['input'].get('confirmation', state['input'].get('action', '')),
+                steps=[t.ai_prompt for t in state['tasks']]
+            )
         
         return {"status": "completed"}
 
@@ -1104,6 +1364,39 @@ Extract now:"""
     return graph.compile(checkpointer=checkpointer)
 
 async def execute_single_task(
+    task: ActionTask,
+    session_id: str,
+    original_message_id: str,
+    durations: Optional[Dict[str, float]] = None
+) -> TaskResult:
+    """
+    Execute a single task once its shared resource (desktop, browser, phone) is free
+
+    durations gets the task's run time in ms, measured from slot acquisition
+    so time spent queued behind other tasks never reaches the learned timeouts.
+    """
+    async with resource_pool.slot(resource_class(task)):
+        started = time.perf_counter()
+        try:
+            return await dispatch_task(task, session_id, original_message_id)
+        finally:
+            if durations is not None:
+                durations[task.task_id] = (time.perf_counter() - started) * 1000
+
+async def cancel_remote_task(task: ActionTask, session_id: str, reason: str):
+    """Tell the execution agent to drop or kill a task nobody waits for anymore"""
+    if task.target_agent != "action":
+        return
+    await broker.publish(Channels.INTERRUPT_CONTROL, InternalMessage(
+        message_type=MessageType.STATUS_UPDATE,
+        sender=AgentType.COORDINATOR,
+        receiver=AgentType.EXECUTION,
+        session_id=session_id,
+        task_id=task.task_id,
+        payload={"command": "cancel_task", "task_id": task.task_id, "reason": reason}
+    ))
+
+async def dispatch_task(
     task: ActionTask,
     session_id: str,
     original_message_id: str
@@ -1172,51 +1465,79 @@ async def execute_single_task(
         channel = Channels.COORDINATOR_TO_REASONING
         receiver = AgentType.REASONING
     
+    # Explicit task timeout, else learned from past runs of this kind of task
+    timeout = task_timeouts.timeout_for(task)
+
     # Create message
-    task_msg = AgentMessage(
+    payload = task.model_dump()  # ← Also fix deprecated .dict() to .model_dump()
+    payload["timeout"] = math.ceil(timeout)
+    task_msg = InternalMessage(
         message_type=MessageType.EXECUTION_REQUEST,
         sender=AgentType.COORDINATOR,
         receiver=receiver,
         session_id=session_id,
         task_id=task.task_id,
         response_to=original_message_id,
-        payload=task.model_dump()  # ← Also fix deprecated .dict() to .model_dump()
+        payload=payload
     )
     
-    # Create future for response
-    future = create_guarded_future(task.task_id)
-    pending_results[task.task_id] = future
-    
-    # Publish
-    logger.info(f"📤 Publishing task {task.task_id} to {receiver}")
-    await broker.publish(channel, task_msg)
-    
-    # Wait for result
+    # Publish and wait for the result correlated on task_id
+    logger.info(f"📤 Publishing task {task.task_id} to {receiver} (timeout {timeout:.0f}s)")
     try:
-        result_payload = await asyncio.wait_for(future, timeout=60)
+        result_payload = await broker.request(channel, task_msg, timeout=timeout, correlation_id=task.task_id)
         return TaskResult(**result_payload)
     except asyncio.TimeoutError:
-        logger.error(f"⏰ Task {task.task_id} timeout after 60 seconds")
+        logger.error(f"⏰ Task {task.task_id} timeout after {timeout:.0f} seconds")
+        task_timeouts.record_timeout(task, timeout)
+        await cancel_remote_task(task, session_id, "Task timeout")
         return TaskResult(
             task_id=task.task_id,
             status="failed",
             error="Task timeout"
         )
-    finally:
-        pending_results.pop(task.task_id, None)
+    except InFlightLimitError as e:
+        logger.error(f"❌ Could not dispatch task {task.task_id}: {e}")
+        return TaskResult(
+            task_id=task.task_id,
+            status="failed",
+            error="Too many tasks in flight"
+        )
 
 # Initialize graph
 coordinator_graph = create_coordinator_graph()
 
+# Runs sessions' plans concurrently (created by start_coordinator_agent)
+session_scheduler: Optional[SessionScheduler] = None
+
+def get_task_latency_stats() -> Dict[str, Any]:
+    return task_timeouts.get_stats()
+
+def get_scheduler_stats() -> Dict[str, Any]:
+    return {
+        "sessions": session_scheduler.get_stats() if session_scheduler else None,
+        "resources": resource_pool.get_stats(),
+        "task_queues": len(task_queues.queues),
+        "task_queues_evicted": task_queues.evicted,
+        "plans": plan_metrics.get_stats(),
+        "plan_stream": stream_stats.get_stats(),
+        "plan_cache": plan_cache.get_stats(),
+        "checkpoints": checkpoint_writer.get_stats(),
+        "preference_miner": preference_miner.get_stats(),
+        "blobs": blob_store.get_stats(),
+        "llm": llm_gateway.get_stats(),
+        "llm_cascade": model_cascade.get_stats(),
+        "prompts": prompt_registry.get_stats(),
+    }
+
 # --- Broker Integration ---
 async def start_coordinator_agent(broker_instance):
     """Start Coordinator Agent with broker"""
+    global session_scheduler
     
     async def handle_task_from_language(message: AgentMessage):
-        """Handle task from Language Agent"""
+        """Handle task from Language Agent - queue it behind the session's running plan"""
         
         http_request_id = message.response_to if message.response_to else message.message_id
-        user_id = message.payload.get("user_id", "default_user")
         session_id = message.session_id
 
         # ✅ FIX 5: STEP 1
@@ -1234,10 +1555,17 @@ async def start_coordinator_agent(broker_instance):
             payload_json = str(message.payload)
         logger.info(f"📨 Coordinator received confirmation: {payload_summary} | full_payload: {payload_json}")
 
-        if task_queue.has_tasks() and not task_queue.is_stopped:
-            logger.info("📥 Adding task to global queue (currently executing)")
-            task_queue.add_to_global(message.payload)
-            return
+        ahead = session_scheduler.submit(session_id, message)
+        if ahead:
+            logger.info(f"📥 Queued request for session {session_id} ({ahead} plan(s) ahead)")
+    
+    async def run_plan(message: AgentMessage):
+        """Plan and execute one request (called by the session scheduler)"""
+        http_request_id = message.response_to if message.response_to else message.message_id
+        user_id = message.payload.get("user_id", "default_user")
+        session_id = message.session_id
+        # A new request clears the last plan's pause/stop; one sent from here on holds
+        task_queues.get(session_id).reset()
         
         state_input = {
             "input": message.payload,
@@ -1272,66 +1600,50 @@ async def start_coordinator_agent(broker_instance):
     
     async def handle_action_result(message: AgentMessage):
         """
-        Handle result from Action/Reasoning layer (ASYNC-SAFE VERSION)
+        Handle result from Action/Reasoning layer
         
-        ✅ FIXES:
-        - InvalidStateError from duplicate set_result() calls
-        - Race conditions in future handling
-        - Silent failures when results arrive out of order
+        Results are routed through the broker's reply table keyed on task_id;
+        late, unknown and duplicate results are counted there and ignored.
         """
         task_id = message.task_id
         result_status = message.payload.get('status', 'unknown')
         
         logger.info(f"📬 Result for {task_id}: {result_status}")
         
-        # Check if we're expecting this result
-        if task_id not in pending_results:
-            logger.warning(f"⚠️ Received result for unknown task {task_id} (may have timed out)")
-            return
-        
-        future = pending_results[task_id]
-        
-        # ✅ CRITICAL FIX: Guard against duplicate results
-        if future.done():
-            logger.warning(
-                f"⚠️ Task {task_id} already resolved - "
-                f"ignoring duplicate result with status '{result_status}'"
-            )
-            return
-        
-        # ✅ Safe to set result now
-        try:
-            future.set_result(message.payload)
+        if broker_instance.resolve(task_id, message.payload):
             logger.debug(f"✅ Successfully set result for task {task_id}")
-        except asyncio.InvalidStateError as e:
-            # This should never happen now, but log if it does
-            logger.error(
-                f"❌ Unexpected InvalidStateError for {task_id}: {e}\n"
-                f"Future state: done={future.done()}, cancelled={future.cancelled()}"
+        else:
+            logger.warning(
+                f"⚠️ Ignoring result for task {task_id} with status '{result_status}' "
+                f"(unknown, timed out or already resolved)"
             )
-        except Exception as e:
-            logger.error(f"❌ Unexpected error setting result for {task_id}: {e}")
     
     async def handle_interrupt_command(message: AgentMessage):
-        """Handle pause/stop/resume commands"""
+        """Handle pause/stop/resume commands for the message's session only"""
         command = message.payload.get("command")
+        if command == "cancel_task":
+            return  # addressed to the execution agent
+        task_queue = task_queues.get(message.session_id)
         
         if command == "pause":
             task_queue.pause()
         elif command == "resume":
             task_queue.resume()
         elif command == "stop":
+            # Cancels the planning call (or plan stream) and the running tasks'
+            # awaits; the execution agent sees the same stop on INTERRUPT_CONTROL
+            # and kills its side of the work
             task_queue.stop()
+            dropped = session_scheduler.cancel_pending(message.session_id)
+            if dropped:
+                logger.info(f"⏹️ Dropped {dropped} queued request(s) for session {message.session_id}")
         elif command == "retry":
-            # Retry from last failed task
-            retry_tasks = task_queue.retry_from_failed()
-            if retry_tasks:
-                task_queue.add_to_current(retry_tasks)
-                task_queue.resume()
-                logger.info(f"🔄 Retrying from failed task ({len(retry_tasks)} tasks)")
+            # Re-run the session's last plan from its failed task (see resume_plan)
+            session_scheduler.submit(message.session_id, message)
+            logger.info(f"🔄 Retrying last plan of session {message.session_id}")
         
         # Send acknowledgment
-        ack_msg = AgentMessage(
+        ack_msg = InternalMessage(
             message_type=MessageType.TASK_RESPONSE,
             sender=AgentType.COORDINATOR,
             receiver=AgentType.LANGUAGE,
@@ -1347,6 +1659,7 @@ async def start_coordinator_agent(broker_instance):
         session_id = message.session_id
         
         if command == "start_new_chat":
+            checkpoint_writer.clear(session_id)
             try:
                 await checkpointer.aput(
                     config={"configurable": {"thread_id": session_id}},
@@ -1357,7 +1670,7 @@ async def start_coordinator_agent(broker_instance):
             except Exception as e:
                 logger.error(f"❌ Failed to clear session: {e}")
 
-            confirm_msg = AgentMessage(
+            confirm_msg = InternalMessage(
                 message_type=MessageType.TASK_RESPONSE,
                 sender=AgentType.COORDINATOR,
                 receiver=AgentType.LANGUAGE,
@@ -1370,6 +1683,10 @@ async def start_coordinator_agent(broker_instance):
             )
             await broker_instance.publish(Channels.COORDINATOR_TO_LANGUAGE, confirm_msg)
     
+    session_scheduler = SessionScheduler(run_plan)
+    llm_gateway.bind_loop()
+    preference_miner.start()
+
     # Subscribe to channels
     broker_instance.subscribe(Channels.LANGUAGE_TO_COORDINATOR, handle_task_from_language)
     broker_instance.subscribe(Channels.EXECUTION_TO_COORDINATOR, handle_action_result)
@@ -1379,5 +1696,12 @@ async def start_coordinator_agent(broker_instance):
     
     logger.info("✅ Coordinator Agent started with RAG action layer support")
     
-    while True:
-        await asyncio.sleep(1)
\ No newline at end of file
+    try:
+        while True:
+            await asyncio.sleep(1)
+    finally:
+        stop_coordinator_agent()
+
+def stop_coordinator_agent():
+    """Persist what the coordinator learned (task latencies) before the process exits"""
+    task_timeouts.maybe_save(force=True)
\ No newline at end of file
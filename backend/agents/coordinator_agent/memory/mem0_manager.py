@@ -4,7 +4,7 @@ FIXED: Lowered threshold, added query expansion, improved retrieval, UPDATE supp
 """
 
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from mem0 import Memory
 from dotenv import load_dotenv
 import logging
@@ -71,6 +71,38 @@ class Mem0PreferenceManager:
             logger.error(f"❌ Failed to store preference: {e}")
             return None
 
+    def add_preferences(self, preferences: List[str], metadata: Optional[Dict] = None) -> Optional[Dict]:
+        """Store already-extracted preferences in one write, without Mem0's own LLM inference"""
+        try:
+            result = self.memory.add(
+                messages=[{"role": "user", "content": p} for p in preferences],
+                user_id=self.user_id,
+                metadata=metadata or {},
+                infer=False
+            )
+            logger.info(f"✅ Stored {len(preferences)} preferences for {self.user_id}")
+            return result
+        except Exception as e:
+            logger.error(f"❌ Failed to store preferences: {e}")
+            return None
+
+    def add_preference_records(self, records: List[Tuple[str, Dict]]) -> int:
+        """
+        Store already-extracted preferences, each with its own metadata.
+        Memory.add takes one metadata per call, so records sharing metadata
+        go in one add_preferences write. Returns the number stored.
+        """
+        groups: Dict[str, Tuple[Dict, List[str]]] = {}
+        for text, metadata in records:
+            key = repr(sorted((metadata or {}).items()))
+            groups.setdefault(key, (metadata or {}, []))[1].append(text)
+
+        stored = 0
+        for metadata, texts in groups.values():
+            if self.add_preferences(texts, metadata) is not None:
+                stored += len(texts)
+        return stored
+
     def add_preference_safe(self, preference: str, metadata: Optional[Dict] = None, 
                         similarity_threshold: float = 0.85) -> Optional[str]:
         """
@@ -0,0 +1,230 @@
+"""
+Background preference mining
+
+Completed plans (coordinator) and user turns (language agent) are queued
+here instead of being mined inline. The worker takes up to
+PREFERENCE_BATCH_SIZE items (waiting at most PREFERENCE_BATCH_WAIT_SECONDS
+for a batch to fill), makes ONE extraction call per user for the whole
+batch, drops preferences that duplicate each other or what Mem0 already
+holds, and stores the rest - with the batch's conversation history - in
+one Mem0 write per category. The worker starts with the coordinator, or on the first
+submit in processes that never start it (e.g. a language agent worker).
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel
+
+from agents.utils.llm_cascade import model_cascade
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("PREFERENCE_BATCH_SIZE", "8"))
+BATCH_WAIT_SECONDS = float(os.getenv("PREFERENCE_BATCH_WAIT_SECONDS", "5"))
+QUEUE_SIZE = int(os.getenv("PREFERENCE_QUEUE_SIZE", "1000"))
+DEDUP_SIMILARITY = float(os.getenv("PREFERENCE_DEDUP_SIMILARITY", "0.8"))
+KNOWN_IN_PROMPT = 50  # existing preferences shown to the extractor
+
+
+def preference_tokens(text: str) -> set:
+    return set(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def is_duplicate(preference: str, known: List[str], threshold: float = DEDUP_SIMILARITY) -> bool:
+    """Same wording, or token overlap (Jaccard) of at least threshold with a known preference"""
+    tokens = preference_tokens(preference)
+    if not tokens:
+        return True
+    for other in known:
+        other_tokens = preference_tokens(other)
+        if other_tokens and len(tokens & other_tokens) / len(tokens | other_tokens) >= threshold:
+            return True
+    return False
+
+
+def build_extraction_prompt(items: List[Dict[str, Any]], known: List[str]) -> str:
+    interactions = []
+    for i, item in enumerate(items, 1):
+        if item["kind"] == "plan":
+            interactions.append(
+                f"{i}. [completed task] request: {item['request']}\n"
+                f"   steps: {json.dumps(item['steps'])}"
+            )
+        else:
+            interactions.append(f"{i}. [user message] {item['message']}")
+    known_text = "\n".join(f"- {k}" for k in known[-KNOWN_IN_PROMPT:]) or "(none)"
+
+    return f"""Extract user preferences and personal facts from these recent interactions.
+
+INTERACTIONS:
+{chr(10).join(interactions)}
+
+ALREADY KNOWN (do not repeat):
+{known_text}
+
+RULES:
+- Only extract repeatable preferences (app choices, workflows, patterns) or facts about the user (name, age, location, job, hobbies)
+- Ignore one-time actions and anything already known
+- Format as clear statements
+
+OUTPUT FORMAT (JSON array):
+[
+  {{
+    "preference": "User prefers Chrome for web browsing",
+    "category": "app_usage",
+    "confidence": "high"
+  }}
+]
+
+If NO preferences, return: []
+
+Extract now:"""
+
+
+def strip_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return text.strip()
+
+
+def parse_preferences(text: str) -> List[Dict[str, Any]]:
+    """Lenient: keeps whatever items look like preferences"""
+    parsed = json.loads(strip_fences(text))
+    return [p for p in parsed if isinstance(p, dict) and p.get("preference")] if isinstance(parsed, list) else []
+
+
+class ExtractedPreference(BaseModel):
+    preference: str
+    category: str = "general"
+    confidence: Literal["high", "medium", "low"]
+
+
+def validate_preferences(text: str) -> List[Dict[str, Any]]:
+    """Strict: the reply must be a JSON array of well-formed preferences, else ValueError"""
+    parsed = json.loads(strip_fences(text))
+    if not isinstance(parsed, list):
+        raise ValueError("expected a JSON array")
+    return [ExtractedPreference.model_validate(p).model_dump() for p in parsed]
+
+
+class PreferenceMiner:
+    """Queue + worker that mines preferences in batches, off the request path"""
+
+    def __init__(self, batch_size: int = BATCH_SIZE, batch_wait: float = BATCH_WAIT_SECONDS):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {
+            "submitted": 0, "dropped": 0, "batches": 0, "extraction_calls": 0,
+            "extracted": 0, "duplicates": 0, "stored": 0, "store_failures": 0, "failures": 0,
+        }
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+            logger.info("✅ Preference miner started")
+
+    def submit_turn(self, user_id: str, session_id: str, message: str):
+        self._submit({"kind": "turn", "user_id": user_id, "session_id": session_id, "message": message})
+
+    def submit_plan(self, user_id: str, session_id: str, request: str, steps: List[str]):
+        self._submit({"kind": "plan", "user_id": user_id, "session_id": session_id, "request": request, "steps": steps})
+
+    def _submit(self, item: Dict[str, Any]):
+        self.start()
+        try:
+            self.queue.put_nowait(item)
+            self.stats["submitted"] += 1
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning("⚠️ Preference miner queue full - dropping item")
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            self.stats["batches"] += 1
+            by_user: Dict[str, List[Dict[str, Any]]] = {}
+            for item in batch:
+                by_user.setdefault(item["user_id"], []).append(item)
+            for user_id, items in by_user.items():
+                try:
+                    await self.mine(user_id, items)
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    logger.error(f"❌ Failed to mine preferences for {user_id}: {e}")
+
+    async def mine(self, user_id: str, items: List[Dict[str, Any]]):
+        from agents.coordinator_agent.memory.mem0_manager import get_preference_manager
+        pref_mgr = await asyncio.to_thread(get_preference_manager, user_id)
+        known = [m["memory"] for m in await asyncio.to_thread(pref_mgr.get_all_preferences) if m.get("memory")]
+
+        self.stats["extraction_calls"] += 1
+        response = await model_cascade.chat(
+            build_extraction_prompt(items, known), "preference_extraction", validate_preferences,
+            temperature=0.1, max_tokens=1024, cache=True,
+        )
+        extracted = response.parsed if response.parsed is not None else parse_preferences(response.content)
+        self.stats["extracted"] += len(extracted)
+
+        timestamp = datetime.now().isoformat()
+        records: List[Tuple[str, Dict[str, Any]]] = []
+        for pref_obj in extracted:
+            if pref_obj.get("confidence") not in ["high", "medium"]:
+                continue
+            preference = str(pref_obj["preference"]).strip()
+            if is_duplicate(preference, known):
+                self.stats["duplicates"] += 1
+                continue
+            known.append(preference)
+            records.append((preference, {
+                "category": pref_obj.get("category", "general"),
+                "source": "preference_miner",
+                "timestamp": timestamp
+            }))
+        preferences = len(records)
+
+        # Completed plans are also remembered as conversation history
+        for item in items:
+            if item["kind"] == "plan":
+                records.append((
+                    f"User requested: {item['request']}. Successfully completed {len(item['steps'])} steps.",
+                    {"category": "conversation_history", "session_id": item["session_id"], "timestamp": timestamp}
+                ))
+
+        if records:
+            stored = await asyncio.to_thread(pref_mgr.add_preference_records, records)
+            self.stats["stored"] += stored
+            self.stats["store_failures"] += len(records) - stored
+            logger.info(
+                f"💾 Stored {stored}/{len(records)} item(s) for {user_id} "
+                f"({preferences} preference(s), {len(records) - preferences} history item(s))"
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"running": self._worker is not None and not self._worker.done(), "queued": self.queue.qsize(), **self.stats}
+
+
+preference_miner = PreferenceMiner()
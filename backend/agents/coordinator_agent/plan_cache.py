@@ -0,0 +1,351 @@
+"""
+Plan cache for decompose_task_to_actions
+
+Repeated commands ("open calculator", "play the next video on YouTube")
+reuse a plan that already executed successfully instead of paying the
+planning LLM call again. Entries are keyed on the normalized request, the
+device type and a fingerprint of the preferences the planner was given, and
+are looked up in three tiers:
+
+    exact       same normalized request
+    template    same request shape with different literals - app names,
+                search terms, typed/quoted text are slots that are
+                substituted into the cached plan ("open notepad" reuses the
+                plan of "open calculator")
+    similar     embedding similarity of the templated request above
+                PLAN_CACHE_SIMILARITY (sentence-transformers, optional),
+                only between templates with the same action and target
+                words - "open {app}" never reuses "close {app}", nor
+                "search {query} on youtube" the amazon one; only filler
+                ("please", "can you", "for me") may differ
+
+Bounded by PLAN_CACHE_SIZE (LRU) and PLAN_CACHE_TTL_SECONDS.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import operator
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", 512))
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLAN_CACHE_TTL_SECONDS", 86400))
+PLAN_CACHE_SIMILARITY = float(os.getenv("PLAN_CACHE_SIMILARITY", 0.92))
+PLAN_CACHE_EMBEDDING_MODEL = os.getenv("PLAN_CACHE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Literals that vary between otherwise identical commands: (slot kind, pattern)
+SLOT_PATTERNS = [
+    ("text", re.compile(r'"([^"]{2,})"|\'([^\']{2,})\'')),
+    ("query", re.compile(r"\b(?:search for|search|look up|google)\s+(.+?)(?=\s+(?:on|in|at|using|with)\b|$)")),
+    ("text", re.compile(r"\b(?:type|write)\s+(.+?)(?=\s+(?:in|into|on)\b|$)")),
+    ("app", re.compile(r"\b(?:open|launch|start|close)\s+(?:the\s+)?(.+?)(?=\s+(?:app|application|and|then|on|in)\b|$)")),
+]
+# Slot values that name a website get their own kind - opening a site and an app plan differently
+KNOWN_SITES = {
+    "youtube", "google", "gmail", "facebook", "amazon", "netflix", "twitter", "x", "instagram",
+    "linkedin", "github", "reddit", "wikipedia", "spotify", "tiktok", "outlook", "chatgpt",
+}
+# Words that never change what a request does - the only ones similar templates may differ in
+FILLER_WORDS = {
+    "please", "can", "could", "would", "will", "you", "u", "for", "me", "my", "the", "a", "an",
+    "to", "now", "just", "i", "i'd", "want", "need", "like", "kindly", "hey", "hi", "quickly", "go", "ahead",
+}
+# Requests that lean on earlier turns ("do it again") depend on history, not only on their text
+CONTEXTUAL_WORDS = {"it", "that", "this", "again", "same", "previous", "those", "them", "above", "earlier", "last"}
+
+
+def normalize_request(text: str) -> str:
+    text = text.lower().strip()
+    text = re.sub(r"[^\w\s'\"@.:/-]", " ", text)
+    text = re.sub(r"\s+", " ", text).strip(" .")
+    return text
+
+
+def preferences_fingerprint(preferences_context: str) -> str:
+    return hashlib.sha1((preferences_context or "").strip().encode("utf-8")).hexdigest()[:16]
+
+
+def is_contextual(normalized: str) -> bool:
+    return bool(CONTEXTUAL_WORDS.intersection(normalized.split()))
+
+
+def template_terms(template: str) -> frozenset:
+    """Action and target words of a templated request (slots and filler removed)"""
+    return frozenset(
+        word for word in re.sub(r"\{\w+\}", " ", template).split()
+        if word not in FILLER_WORDS
+    )
+
+
+def extract_slots(normalized: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Templated request and its (kind, value) slots, in order of appearance"""
+    found: List[Tuple[int, int, str, str]] = []
+    for kind, pattern in SLOT_PATTERNS:
+        for match in pattern.finditer(normalized):
+            group = next(i for i in range(1, len(match.groups()) + 1) if match.group(i))
+            start, end = match.span(group)
+            if any(start < e and s < end for s, e, _, _ in found):
+                continue
+            value = match.group(group).strip()
+            if kind == "app" and (value in KNOWN_SITES or "." in value):
+                kind = "site"
+            found.append((start, end, kind, value))
+
+    found.sort()
+    template, cursor, slots = "", 0, []
+    for start, end, kind, value in found:
+        template += normalized[cursor:start] + "{" + kind + "}"
+        cursor = end
+        slots.append((kind, value))
+    return template + normalized[cursor:], slots
+
+
+def _slot_pattern(value: str) -> re.Pattern:
+    return re.compile(r"(?<!\w)" + re.escape(value) + r"(?!\w)", re.IGNORECASE)
+
+
+# Structural parameters are never templated, only free text
+STRUCTURAL_PARAMS = {"action", "input_from", "page", "device_id"}
+
+
+def map_free_text(plan: List[Dict[str, Any]], fn) -> List[Dict[str, Any]]:
+    """Copy of plan with fn applied to its free-text fields (prompts, typed text, app names)"""
+    mapped = []
+    for task in plan:
+        task = dict(task)
+        if isinstance(task.get("ai_prompt"), str):
+            task["ai_prompt"] = fn(task["ai_prompt"])
+        for field in ("web_params", "extra_params"):
+            params = task.get(field)
+            if isinstance(params, dict):
+                task[field] = {
+                    k: fn(v) if isinstance(v, str) and k not in STRUCTURAL_PARAMS else v
+                    for k, v in params.items()
+                }
+        mapped.append(task)
+    return mapped
+
+
+def _marker(index: int) -> str:
+    return f"<<slot{index}>>"
+
+
+class PlanEntry:
+    __slots__ = ("plan", "slot_kinds", "template", "embedding", "created", "hits")
+
+    def __init__(self, plan: List[Dict[str, Any]], slot_kinds: Tuple[str, ...], template: str, embedding=None):
+        self.plan = plan                # task list with <<slotN>> markers in its free text
+        self.slot_kinds = slot_kinds
+        self.template = template
+        self.embedding = embedding
+        self.created = time.monotonic()
+        self.hits = 0
+
+
+class PlanCache:
+    """LRU/TTL cache of successful plans with exact, template and embedding tiers"""
+
+    def __init__(
+        self,
+        max_entries: int = PLAN_CACHE_SIZE,
+        ttl_seconds: float = PLAN_CACHE_TTL_SECONDS,
+        similarity: float = PLAN_CACHE_SIMILARITY,
+        embedding_model: Optional[str] = PLAN_CACHE_EMBEDDING_MODEL
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.embedding_model = embedding_model
+        self.entries: "OrderedDict[Tuple[str, str, str], PlanEntry]" = OrderedDict()
+        self._encoder = None
+        self._encoder_failed = not embedding_model
+
+        # Metrics
+        self.lookups = 0
+        self.exact_hits = 0
+        self.template_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    def cache_key(self, request_text: str, device_type: str, preferences_context: str,
+                  has_history: bool = False) -> Optional[Dict[str, Any]]:
+        """Lookup/store descriptor for a request, or None when it must not be cached"""
+        normalized = normalize_request(request_text or "")
+        if not PLAN_CACHE_ENABLED or not normalized or (has_history and is_contextual(normalized)):
+            self.bypassed += 1
+            return None
+        template, slots = extract_slots(normalized)
+        return {
+            "normalized": normalized,
+            "template": template,
+            "slots": [list(s) for s in slots],
+            "device_type": device_type,
+            "fingerprint": preferences_fingerprint(preferences_context),
+        }
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+
+    async def lookup(self, key: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Cached task list (as dicts, slots filled in) for key, or None"""
+        self.lookups += 1
+        device, fingerprint = key["device_type"], key["fingerprint"]
+        values = [value for _, value in key["slots"]]
+
+        entry = self._get(("exact", key["normalized"], device, fingerprint))
+        if entry:
+            self.exact_hits += 1
+            return self._instantiate(entry, [])
+
+        entry = self._get(("template", key["template"], device, fingerprint))
+        if entry:
+            self.template_hits += 1
+            return self._instantiate(entry, values)
+
+        kinds = tuple(kind for kind, _ in key["slots"])
+        terms = template_terms(key["template"])
+        embedding = await self._embed(key["template"])
+        if embedding is not None:
+            best, best_score = None, self.similarity
+            for cache_key, candidate in list(self.entries.items()):
+                if (cache_key[0] != "template" or cache_key[2:] != (device, fingerprint)
+                        or candidate.slot_kinds != kinds or candidate.embedding is None):
+                    continue
+                # A different verb or site is a different action, however close the embedding
+                if template_terms(candidate.template) != terms:
+                    continue
+                score = sum(map(operator.mul, embedding, candidate.embedding))
+                if score >= best_score and self._fresh(cache_key, candidate):
+                    best, best_score = cache_key, score
+            if best:
+                entry = self._get(best)
+                self.similar_hits += 1
+                logger.info(f"🗂️ Plan cache similar hit ({best_score:.3f}): '{entry.template}'")
+                return self._instantiate(entry, values)
+
+        self.misses += 1
+        return None
+
+    async def store(self, key: Dict[str, Any], plan: List[Dict[str, Any]]):
+        """Cache a plan that executed successfully for key"""
+        device, fingerprint = key["device_type"], key["fingerprint"]
+        plan = json.loads(json.dumps(plan))
+        self._put(("exact", key["normalized"], device, fingerprint), PlanEntry(plan, (), key["normalized"]))
+
+        # Generalize over the literals only if every one of them shows up in
+        # the plan's free text - otherwise substituting new values would not change it
+        templated = plan
+        for index, (_, value) in enumerate(key["slots"]):
+            pattern, marker = _slot_pattern(value), _marker(index)
+            substitutions = 0
+
+            def mark(text: str) -> str:
+                nonlocal substitutions
+                text, count = pattern.subn(marker, text)
+                substitutions += count
+                return text
+
+            templated = map_free_text(templated, mark)
+            if not substitutions:
+                break
+        else:
+            if key["slots"]:
+                kinds = tuple(kind for kind, _ in key["slots"])
+                entry = PlanEntry(templated, kinds, key["template"], await self._embed(key["template"]))
+                self._put(("template", key["template"], device, fingerprint), entry)
+        self.stores += 1
+
+    def invalidate(self, key: Dict[str, Any]):
+        """Forget the entries a failed cached plan came from"""
+        device, fingerprint = key["device_type"], key["fingerprint"]
+        for cache_key in (("exact", key["normalized"], device, fingerprint),
+                          ("template", key["template"], device, fingerprint)):
+            if self.entries.pop(cache_key, None):
+                self.invalidations += 1
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _fresh(self, cache_key, entry: PlanEntry) -> bool:
+        if time.monotonic() - entry.created <= self.ttl_seconds:
+            return True
+        self.entries.pop(cache_key, None)
+        self.expirations += 1
+        return False
+
+    def _get(self, cache_key) -> Optional[PlanEntry]:
+        entry = self.entries.get(cache_key)
+        if entry is None or not self._fresh(cache_key, entry):
+            return None
+        self.entries.move_to_end(cache_key)
+        entry.hits += 1
+        return entry
+
+    def _put(self, cache_key, entry: PlanEntry):
+        self.entries[cache_key] = entry
+        self.entries.move_to_end(cache_key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def _instantiate(self, entry: PlanEntry, values: List[str]) -> List[Dict[str, Any]]:
+        def fill(text: str) -> str:
+            for index, value in enumerate(values):
+                text = text.replace(_marker(index), value)
+            return text
+        return json.loads(json.dumps(map_free_text(entry.plan, fill)))
+
+    async def _embed(self, text: str) -> Optional[Tuple[float, ...]]:
+        """Normalized sentence embedding, or None when no encoder is available"""
+        if self._encoder_failed:
+            return None
+        try:
+            if self._encoder is None:
+                from sentence_transformers import SentenceTransformer
+                self._encoder = await asyncio.to_thread(SentenceTransformer, self.embedding_model)
+            vector = await asyncio.to_thread(self._encoder.encode, text, normalize_embeddings=True)
+            return tuple(float(x) for x in vector)
+        except Exception as e:
+            self._encoder_failed = True
+            logger.warning(f"⚠️ Plan cache similarity tier disabled: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.template_hits + self.similar_hits
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "template_hits": self.template_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / self.lookups, 3) if self.lookups else None,
+            "bypassed": self.bypassed,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "similarity_tier": not self._encoder_failed,
+        }
+
+
+plan_cache = PlanCache()
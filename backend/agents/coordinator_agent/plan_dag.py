@@ -0,0 +1,200 @@
+"""
+Dependency graph for a decomposed plan
+
+A task waits for:
+    - depends_on                "task_1" or "task_1,task_2"
+    - extra_params.input_from   the task(s) whose output it consumes
+    - its lane                  the previous task on the same exclusive
+                                surface - the desktop's mouse/keyboard, one
+                                browser page (extra_params.page), one phone
+
+Reasoning tasks have no lane, so independent branches (say two web
+extractions on separate pages feeding one reasoning step) run side by side
+and a plan takes as long as its longest branch - the critical path.
+"""
+import logging
+import re
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RUN_SUFFIX = re.compile(r"_[0-9a-f]{8}$")  # appended by fresh_task_ids
+
+
+def task_lane(task: Any) -> Optional[str]:
+    """Exclusive surface a task drives, or None when it can overlap anything"""
+    if task.target_agent == "reasoning":
+        return None
+    extra = task.extra_params or {}
+    if task.device == "mobile":
+        return f"mobile:{extra.get('device_id', 'android_device_1')}"
+    if task.context == "web":
+        return f"page:{extra.get('page', 'main')}"
+    return "desktop"
+
+
+def input_sources(task: Any) -> List[str]:
+    """Task ids named by extra_params.input_from (a string or a list)"""
+    input_from = (task.extra_params or {}).get("input_from")
+    if not input_from:
+        return []
+    if isinstance(input_from, (list, tuple)):
+        return [str(i) for i in input_from]
+    return [str(input_from)]
+
+
+class PlanGraph:
+    """
+    Dependencies of a plan whose tasks may still be arriving (streamed
+    decomposition). A dependency on a task that has not arrived yet blocks
+    until it does; close() drops the ones that never did.
+    """
+
+    def __init__(self):
+        self.tasks: List[Any] = []
+        self.deps: Dict[str, List[str]] = {}
+        self.closed = False
+        self._last_in_lane: Dict[str, str] = {}
+
+    def add(self, task: Any):
+        wanted = [d.strip() for d in str(task.depends_on or "").split(",") if d.strip()]
+        wanted += input_sources(task)
+        lane = task_lane(task)
+        if lane:
+            if lane in self._last_in_lane:
+                wanted.append(self._last_in_lane[lane])
+            self._last_in_lane[lane] = task.task_id
+
+        deps: List[str] = []
+        for dep in wanted:
+            if dep != task.task_id and dep not in deps:
+                deps.append(dep)
+        self.tasks.append(task)
+        self.deps[task.task_id] = deps
+
+    def close(self):
+        """No more tasks: ignore unknown dependencies and break cycles by plan order"""
+        self.closed = True
+        for task in self.tasks:
+            for dep in [d for d in self.deps[task.task_id] if d not in self.deps]:
+                logger.warning(f"⚠️ {task.task_id} depends on unknown task {dep} - ignoring")
+                self.deps[task.task_id].remove(dep)
+
+        if topological_order(self.tasks, self.deps) is None:
+            logger.warning("⚠️ Plan dependencies form a cycle - running tasks in plan order")
+            self.deps = {t.task_id: ([self.tasks[i - 1].task_id] if i else []) for i, t in enumerate(self.tasks)}
+
+
+def fresh_task_ids(plan: List[Dict[str, Any]], suffix: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Copy of a plan (task dicts) with run-unique task ids. Planner ids like
+    "task_1" repeat across plans, and task ids correlate execution replies.
+    Tasks renamed with the same suffix keep referring to each other, so a
+    streamed plan can be renamed one task at a time.
+    """
+    suffix = suffix or uuid.uuid4().hex[:8]
+
+    def rename(task_id: Any) -> str:
+        return renamed_task_id(task_id, suffix)
+
+    renamed = []
+    for task in plan:
+        task = dict(task)
+        if task.get("task_id"):
+            task["task_id"] = rename(task["task_id"])
+        if task.get("depends_on"):
+            task["depends_on"] = ",".join(rename(d) for d in str(task["depends_on"]).split(",") if d.strip())
+        extra = task.get("extra_params")
+        if isinstance(extra, dict) and extra.get("input_from"):
+            extra = dict(extra)
+            sources = extra["input_from"]
+            extra["input_from"] = [rename(i) for i in sources] if isinstance(sources, (list, tuple)) else rename(sources)
+            task["extra_params"] = extra
+        renamed.append(task)
+    return renamed
+
+
+def renamed_task_id(task_id: Any, suffix: str) -> str:
+    """The id fresh_task_ids gives task_id, with planner ids stripped of an earlier run's suffix"""
+    return f"{RUN_SUFFIX.sub('', str(task_id).strip())}_{suffix}"
+
+
+def topological_order(tasks: List[Any], deps: Dict[str, List[str]]) -> Optional[List[str]]:
+    """Task ids with every task after its dependencies, or None on a cycle"""
+    remaining = {t.task_id: len(deps[t.task_id]) for t in tasks}
+    dependents: Dict[str, List[str]] = {t.task_id: [] for t in tasks}
+    for task_id, task_deps in deps.items():
+        for dep in task_deps:
+            dependents[dep].append(task_id)
+
+    order = [t.task_id for t in tasks if remaining[t.task_id] == 0]
+    for task_id in order:
+        for child in dependents[task_id]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                order.append(child)
+    return order if len(order) == len(tasks) else None
+
+
+def critical_path(
+    tasks: List[Any],
+    deps: Dict[str, List[str]],
+    cost: Callable[[str], float] = lambda task_id: 1.0
+) -> Tuple[float, List[str]]:
+    """Longest chain through the graph: (total cost, task ids along it)"""
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for task_id in topological_order(tasks, deps) or []:
+        before = max(deps[task_id], key=lambda d: finish[d], default=None)
+        finish[task_id] = (finish[before] if before else 0.0) + cost(task_id)
+        previous[task_id] = before
+
+    if not finish:
+        return 0.0, []
+    last = max(finish, key=finish.get)
+    path = [last]
+    while previous[path[-1]]:
+        path.append(previous[path[-1]])
+    return finish[last], path[::-1]
+
+
+class PlanMetrics:
+    """Aggregate parallelism numbers across executed plans"""
+
+    def __init__(self):
+        self.plans = 0
+        self.tasks = 0
+        self.max_parallel = 0
+        self.wall_ms = 0.0
+        self.busy_ms = 0.0
+        self.last: Dict[str, Any] = {}
+
+    def record(self, tasks: int, wall_ms: float, busy_ms: float, critical_path_ms: float,
+               critical_path_tasks: int, max_parallel: int):
+        self.plans += 1
+        self.tasks += tasks
+        self.wall_ms += wall_ms
+        self.busy_ms += busy_ms
+        self.max_parallel = max(self.max_parallel, max_parallel)
+        self.last = {
+            "tasks": tasks,
+            "wall_ms": round(wall_ms, 1),
+            "busy_ms": round(busy_ms, 1),
+            "critical_path_ms": round(critical_path_ms, 1),
+            "critical_path_tasks": critical_path_tasks,
+            "max_parallel": max_parallel,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "plans": self.plans,
+            "tasks": self.tasks,
+            "max_parallel": self.max_parallel,
+            # > 1 means plans finished faster than running their tasks back to back
+            "speedup": round(self.busy_ms / self.wall_ms, 2) if self.wall_ms else None,
+            "last": self.last,
+        }
+
+
+plan_metrics = PlanMetrics()
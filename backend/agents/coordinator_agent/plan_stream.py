@@ -0,0 +1,148 @@
+"""
+Streaming decomposition
+
+The planner answers with a JSON array of tasks. Instead of waiting for the
+last token, TaskArrayParser picks each task object out of the token stream
+as soon as its closing brace arrives, and PlanStream hands it to the plan
+executor, which starts every task whose dependencies are met while the rest
+of the plan is still being generated.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PLAN_STREAMING = os.getenv("PLAN_STREAMING", "true").lower() == "true"
+
+
+class TaskArrayParser:
+    """
+    Incremental parser for a JSON array of objects (optionally inside a
+    ```json fence or a {"tasks": [...]} wrapper): feed() text chunks and get
+    back the objects completed so far.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0          # nesting depth inside the task array
+        self.in_array = False
+        self.in_string = False
+        self.escaped = False
+        self.object_start: Optional[int] = None
+        self.invalid = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.buffer += chunk
+        completed = []
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif not self.in_array:
+                if char == "[":
+                    self.in_array = True
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 0 and char == "{":
+                    self.object_start = self.pos
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 0:
+                    self.in_array = False  # end of the task array
+                else:
+                    self.depth -= 1
+                    if self.depth == 0 and self.object_start is not None:
+                        text = self.buffer[self.object_start:self.pos + 1]
+                        self.object_start = None
+                        try:
+                            completed.append(json.loads(text))
+                        except ValueError as e:
+                            self.invalid += 1
+                            logger.warning(f"⚠️ Skipping unparseable streamed task: {e}")
+            self.pos += 1
+        return completed
+
+
+class PlanStream:
+    """Tasks of a plan as the planner produces them; finish() ends the stream"""
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.producer: Optional[asyncio.Task] = None
+        self.result: Dict[str, Any] = {}
+        self.done = False
+        self.started = time.perf_counter()
+        self.first_task_ms: Optional[float] = None
+        self.count = 0
+
+    def put(self, task: Any):
+        if self.first_task_ms is None:
+            self.first_task_ms = (time.perf_counter() - self.started) * 1000
+        self.count += 1
+        self.queue.put_nowait(task)
+
+    def finish(self, result: Dict[str, Any]):
+        self.result = result
+        self.done = True
+        self.queue.put_nowait(None)
+        stream_stats.record(self)
+
+    async def run(self, decomposition: Awaitable[Dict[str, Any]]):
+        """Await the decomposition that feeds this stream, then end the stream with its result"""
+        result: Dict[str, Any] = {"error": "Decomposition cancelled"}
+        try:
+            result = await decomposition
+        except Exception as e:
+            logger.error(f"❌ Streamed decomposition failed: {e}")
+            result = {"error": str(e)}
+        finally:
+            self.finish(result)
+
+    async def get(self) -> Optional[Any]:
+        """Next task, or None once the plan is complete"""
+        return await self.queue.get()
+
+    def cancel(self):
+        if self.producer and not self.producer.done():
+            self.producer.cancel()
+
+
+class PlanStreamStats:
+    """Time to first task vs. time to the whole plan, across streamed plans"""
+
+    def __init__(self):
+        self.plans = 0
+        self.first_task_ms_total = 0.0
+        self.complete_ms_total = 0.0
+
+    def record(self, stream: PlanStream):
+        if stream.first_task_ms is None:
+            return
+        self.plans += 1
+        self.first_task_ms_total += stream.first_task_ms
+        self.complete_ms_total += (time.perf_counter() - stream.started) * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": PLAN_STREAMING,
+            "plans": self.plans,
+            "avg_first_task_ms": round(self.first_task_ms_total / self.plans, 1) if self.plans else None,
+            "avg_complete_ms": round(self.complete_ms_total / self.plans, 1) if self.plans else None,
+        }
+
+
+stream_stats = PlanStreamStats()
+
+# Plans being streamed, by session (handed from the analyze step to the execute step)
+plan_streams: Dict[str, PlanStream] = {}
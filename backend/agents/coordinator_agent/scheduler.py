@@ -0,0 +1,163 @@
+"""
+Session scheduling for the Coordinator Agent
+
+- SessionScheduler runs each session's plans in order, and independent
+  sessions concurrently (up to MAX_CONCURRENT_SESSIONS).
+- ResourcePool bounds how many tasks may use a shared resource at once -
+  one physical desktop, a few browser contexts, one task per phone.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_SESSIONS = int(os.getenv("MAX_CONCURRENT_SESSIONS", 8))
+
+# Concurrent tasks per resource class (mobile limits apply per device)
+RESOURCE_LIMITS = {
+    "desktop": int(os.getenv("RESOURCE_LIMIT_DESKTOP", 1)),
+    "browser": int(os.getenv("RESOURCE_LIMIT_BROWSER", 4)),
+    "reasoning": int(os.getenv("RESOURCE_LIMIT_REASONING", 8)),
+    "mobile": int(os.getenv("RESOURCE_LIMIT_MOBILE", 1)),
+}
+
+
+def resource_class(task: Any) -> str:
+    """Shared resource an ActionTask occupies while it runs"""
+    if task.target_agent == "reasoning":
+        return "reasoning"
+    if task.device == "mobile":
+        return f"mobile:{(task.extra_params or {}).get('device_id', 'android_device_1')}"
+    if task.context == "web":
+        return "browser"
+    return "desktop"
+
+
+class ResourcePool:
+    """Named semaphores, created on first use from RESOURCE_LIMITS"""
+
+    def __init__(self, limits: Dict[str, int] = RESOURCE_LIMITS):
+        self.limits = limits
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.in_use: Dict[str, int] = {}
+        self.waiting: Dict[str, int] = {}
+        self.max_wait_ms: Dict[str, float] = {}
+
+    def _limit(self, name: str) -> int:
+        return self.limits.get(name.split(":", 1)[0], 1)
+
+    @asynccontextmanager
+    async def slot(self, name: str):
+        semaphore = self.semaphores.get(name)
+        if semaphore is None:
+            semaphore = self.semaphores[name] = asyncio.Semaphore(self._limit(name))
+
+        started = time.perf_counter()
+        self.waiting[name] = self.waiting.get(name, 0) + 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting[name] -= 1
+        waited_ms = (time.perf_counter() - started) * 1000
+        if waited_ms > self.max_wait_ms.get(name, 0.0):
+            self.max_wait_ms[name] = waited_ms
+
+        self.in_use[name] = self.in_use.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            self.in_use[name] -= 1
+            semaphore.release()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "limit": self._limit(name),
+                "in_use": self.in_use.get(name, 0),
+                "waiting": self.waiting.get(name, 0),
+                "max_wait_ms": round(self.max_wait_ms.get(name, 0.0), 1),
+            }
+            for name in self.semaphores
+        }
+
+
+class SessionScheduler:
+    """
+    Per-session FIFO of submitted plans with one runner task per busy session.
+
+    A session's plans never overlap; different sessions run side by side,
+    bounded by max_sessions. Shared resources are arbitrated per task by
+    ResourcePool, not here.
+    """
+
+    def __init__(self, run_plan: Callable[[Any], Awaitable[Any]], max_sessions: int = MAX_CONCURRENT_SESSIONS):
+        self.run_plan = run_plan
+        self.max_sessions = max_sessions
+        self.pending: Dict[str, Deque[Any]] = {}
+        self.runners: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def submit(self, session_id: str, item: Any) -> int:
+        """Queue a plan for session_id; returns how many plans are ahead of it"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_sessions)
+        queue = self.pending.setdefault(session_id, deque())
+        ahead = len(queue) + (1 if session_id in self.runners else 0)
+        queue.append(item)
+        self.submitted += 1
+        if session_id not in self.runners:
+            self.runners[session_id] = asyncio.create_task(self._drain(session_id))
+        return ahead
+
+    def cancel_pending(self, session_id: str) -> int:
+        """Drop plans queued behind the running one (e.g. on stop)"""
+        queue = self.pending.get(session_id)
+        dropped = len(queue) if queue else 0
+        if queue:
+            queue.clear()
+        self.cancelled += dropped
+        return dropped
+
+    async def _drain(self, session_id: str):
+        try:
+            while self.pending.get(session_id):
+                item = self.pending[session_id].popleft()
+                async with self._slots:
+                    try:
+                        await self.run_plan(item)
+                        self.completed += 1
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self.failed += 1
+                        logger.error(f"❌ Plan for session {session_id} failed: {e}", exc_info=True)
+        finally:
+            self.runners.pop(session_id, None)
+            if not self.pending.get(session_id):
+                self.pending.pop(session_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active_sessions": len(self.runners),
+            "queued_plans": sum(len(q) for q in self.pending.values()),
+            "max_sessions": self.max_sessions,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
+
+
+# Shared by every session in this process
+resource_pool = ResourcePool()
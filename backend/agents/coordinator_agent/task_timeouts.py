@@ -0,0 +1,221 @@
+"""
+Adaptive per-task timeouts
+
+Every finished task feeds its latency into a t-digest keyed by
+(context, target_agent, action). A task's timeout is then
+
+    explicit ActionTask.timeout, when the planner set one
+    else  percentile (TASK_TIMEOUT_PERCENTILE) x margin, clamped
+    else  TASK_TIMEOUT_DEFAULT_SECONDS until a key has enough samples
+
+A timed-out task counts as a sample at its timeout (it took at least that
+long), so a key whose timeout is too tight grows it by the margin on every
+timeout instead of staying stuck. Digests are saved to TASK_LATENCY_PATH
+at most every TASK_LATENCY_SAVE_SECONDS, once more on shutdown, and
+reloaded on start.
+"""
+import json
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ADAPTIVE_TIMEOUTS = os.getenv("ADAPTIVE_TIMEOUTS", "true").lower() == "true"
+TIMEOUT_PERCENTILE = float(os.getenv("TASK_TIMEOUT_PERCENTILE", "0.99"))
+TIMEOUT_MARGIN = float(os.getenv("TASK_TIMEOUT_MARGIN", "1.5"))
+TIMEOUT_MIN_SECONDS = float(os.getenv("TASK_TIMEOUT_MIN_SECONDS", "5"))
+TIMEOUT_MAX_SECONDS = float(os.getenv("TASK_TIMEOUT_MAX_SECONDS", "300"))
+TIMEOUT_DEFAULT_SECONDS = float(os.getenv("TASK_TIMEOUT_DEFAULT_SECONDS", "60"))
+TIMEOUT_MIN_SAMPLES = int(os.getenv("TASK_TIMEOUT_MIN_SAMPLES", "20"))
+LATENCY_PATH = os.getenv("TASK_LATENCY_PATH", "task_latency.json")
+LATENCY_SAVE_SECONDS = float(os.getenv("TASK_LATENCY_SAVE_SECONDS", "30"))
+
+
+class TDigest:
+    """
+    Merging t-digest: weighted centroids that keep tail quantiles accurate
+    (centroids near q=0 and q=1 stay small) in bounded memory, however many
+    samples are added. With the default compression of 100 that is a few
+    hundred centroids - about 300 at 1k samples, 550 at 50k - growing only
+    with the log of the sample count.
+    """
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.centroids: List[List[float]] = []  # [mean, weight], sorted by mean
+        self.buffer: List[float] = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        self.buffer.append(value)
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= self.compression:
+            self.compress()
+
+    def compress(self):
+        if not self.buffer:
+            return
+        points = sorted(self.centroids + [[v, 1.0] for v in self.buffer])
+        self.buffer = []
+        total = sum(w for _, w in points)
+
+        merged: List[List[float]] = []
+        before = 0.0  # weight of the centroids before the last merged one
+        for mean, weight in points:
+            if merged:
+                last = merged[-1]
+                q = (before + (last[1] + weight) / 2) / total
+                if last[1] + weight <= 4 * total * q * (1 - q) / self.compression:
+                    last[0] += (mean - last[0]) * weight / (last[1] + weight)
+                    last[1] += weight
+                    continue
+                before += last[1]
+            merged.append([mean, weight])
+        self.centroids = merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        self.compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+
+        target = q * self.count
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                return previous_mean + (mean - previous_mean) * ((target - previous_center) / span if span else 0)
+            cumulative += weight
+            previous_center, previous_mean = center, mean
+        span = self.count - previous_center
+        return previous_mean + (self.max - previous_mean) * ((target - previous_center) / span if span else 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        self.compress()
+        return {"centroids": self.centroids, "count": self.count, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], compression: int = 100) -> "TDigest":
+        digest = cls(compression)
+        digest.centroids = [list(c) for c in data.get("centroids", [])]
+        digest.count = data.get("count", 0)
+        digest.min = data.get("min", math.inf)
+        digest.max = data.get("max", -math.inf)
+        return digest
+
+
+def latency_key(task: Any) -> str:
+    """(context, target_agent, action) bucket a task's latency is tracked in"""
+    action = (task.web_params or {}).get("action") or (task.extra_params or {}).get("action") or "any"
+    return f"{task.context}:{task.target_agent}:{action}"
+
+
+class AdaptiveTimeouts:
+    """Latency digests per task kind and the timeouts derived from them"""
+
+    def __init__(self, path: str = LATENCY_PATH):
+        self.path = path
+        self.digests: Dict[str, TDigest] = {}
+        self.timed_out: Dict[str, int] = {}
+        self.sources = {"explicit": 0, "learned": 0, "default": 0}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self.load()
+
+    def timeout_for(self, task: Any) -> float:
+        """Seconds to wait for task's reply"""
+        if "timeout" in task.model_fields_set and task.timeout:
+            self.sources["explicit"] += 1
+            return float(task.timeout)
+
+        learned = self.learned_timeout(latency_key(task))
+        if learned is None:
+            self.sources["default"] += 1
+            return TIMEOUT_DEFAULT_SECONDS
+        self.sources["learned"] += 1
+        return learned
+
+    def learned_timeout(self, key: str) -> Optional[float]:
+        digest = self.digests.get(key)
+        if not ADAPTIVE_TIMEOUTS or digest is None or digest.count < TIMEOUT_MIN_SAMPLES:
+            return None
+        timeout = digest.quantile(TIMEOUT_PERCENTILE) * TIMEOUT_MARGIN
+        return round(min(max(timeout, TIMEOUT_MIN_SECONDS), TIMEOUT_MAX_SECONDS), 1)
+
+    def record(self, task: Any, seconds: float):
+        """A task finished (successfully) after seconds"""
+        key = latency_key(task)
+        self.digests.setdefault(key, TDigest()).add(seconds)
+        self._dirty = True
+        self.maybe_save()
+
+    def record_timeout(self, task: Any, timeout: float):
+        """A task was given up on after timeout seconds - it took at least that long"""
+        key = latency_key(task)
+        self.timed_out[key] = self.timed_out.get(key, 0) + 1
+        self.record(task, timeout)
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Could not load task latency stats from {self.path}: {e}")
+            return
+        self.digests = {key: TDigest.from_dict(d) for key, d in data.get("digests", {}).items()}
+        self.timed_out = data.get("timed_out", {})
+        logger.info(f"⏱️ Loaded task latency stats for {len(self.digests)} task kinds")
+
+    def maybe_save(self, force: bool = False):
+        if not self._dirty or (not force and time.monotonic() - self._last_save < LATENCY_SAVE_SECONDS):
+            return
+        data = {
+            "digests": {key: digest.to_dict() for key, digest in self.digests.items()},
+            "timed_out": self.timed_out,
+        }
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"⚠️ Could not save task latency stats: {e}")
+        self._last_save = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        kinds = {}
+        for key, digest in sorted(self.digests.items()):
+            kinds[key] = {
+                "samples": digest.count,
+                "p50_s": round(digest.quantile(0.5), 2),
+                "p90_s": round(digest.quantile(0.9), 2),
+                "p99_s": round(digest.quantile(0.99), 2),
+                "max_s": round(digest.max, 2),
+                "timeouts": self.timed_out.get(key, 0),
+                "timeout_s": self.learned_timeout(key) or TIMEOUT_DEFAULT_SECONDS,
+            }
+        return {
+            "enabled": ADAPTIVE_TIMEOUTS,
+            "percentile": TIMEOUT_PERCENTILE,
+            "margin": TIMEOUT_MARGIN,
+            "min_samples": TIMEOUT_MIN_SAMPLES,
+            "default_s": TIMEOUT_DEFAULT_SECONDS,
+            "timeout_sources": self.sources,
+            "kinds": kinds,
+        }
+
+
+task_timeouts = AdaptiveTimeouts()
@@ -5,6 +5,9 @@ import os
 import sys
 from typing import Dict, Any, Optional
 
+from agents.utils.blob_store import blob_store
+from agents.utils.shared_state import process_lock
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -89,7 +92,7 @@ class RAGTaskAdapter:
             if 'text_to_type' in task.extra_params:
                 query_parts.append(f"Text to type: {task.extra_params['text_to_type']}")
             if 'input_content' in task.extra_params:
-                query_parts.append(f"Input data: {task.extra_params['input_content'][:200]}...")
+                query_parts.append(f"Input data: {blob_store.read(task.extra_params['input_content'], 0, 200)}...")
         
         if task.context == "local":
             query_parts.append("(desktop automation)")
@@ -500,7 +503,9 @@ class CoordinatorRAGBridge:
             try:
                 # Step 1: Generate code using RAG
                 logger.info(f"🤖 Generating code with RAG...")
-                rag_result = self.rag.generate_code(
+                # Blocking work runs in threads so the loop stays free to handle a stop
+                rag_result = await asyncio.to_thread(
+                    self.rag.generate_code,
                     enhanced_query,
                     cache_key=task.ai_prompt,  # Use original prompt for cache key
                     start_context_index=start_context_index,
@@ -524,7 +529,8 @@ class CoordinatorRAGBridge:
                 
                 # Step 2: Execute in LOCAL sandbox
                 logger.info(f"🔧 Executing code in local sandbox...")
-                exec_result = self.sandbox.execute_code(
+                exec_result = await asyncio.to_thread(
+                    self.sandbox.execute_code,
                     code=generated_code,
                     use_docker=False,
                     retry_on_failure=False
@@ -600,7 +606,8 @@ class CoordinatorRAGBridge:
                             logger.info("🔄 Executing OmniParser-assisted code...")
                             logger.debug(f"Generated code:\n{new_code}")  # Use debug level, not info
                             
-                            exec_result = self.sandbox.execute_code(
+                            exec_result = await asyncio.to_thread(
+                                self.sandbox.execute_code,
                                 code=new_code,
                                 use_docker=False,
                                 retry_on_failure=False
@@ -672,6 +679,7 @@ class CoordinatorWebRAGBridge:
                     'task_id': task.task_id,
                     'ai_prompt': enhanced_query,
                     'web_params': task.web_params,
+                    'page': task.extra_params.get('page'),
                 }
                 
                 exec_result = await self.web.execute_web_task(task_dict, session_id)
@@ -701,6 +709,79 @@ class CoordinatorWebRAGBridge:
             error=f"Failed after {max_retries} attempts: {error_context}"
         )
 
+# ============================================================================
+# Execution Intake
+# ============================================================================
+
+# Parallel executions pulled from the intake. Desktop tasks are serialized
+# here by process_lock("desktop") - across every process, unlike the
+# coordinator's per-process resource pool - so only browser tasks overlap.
+EXECUTION_INTAKE_CONCURRENCY = int(os.getenv("EXECUTION_INTAKE_CONCURRENCY", 4))
+
+def subscribe_execution_intake(broker_instance, handle_execution_request):
+    """
+    Queue execution requests by priority lane instead of FIFO.
+
+    Short/high-priority tasks run ahead of long background ones (with aging
+    so those still run). Each request runs in a cancel scope: a "stop" for
+    its session (or a "cancel_task" for its task_id) drops still-queued
+    tasks and cancels running ones - killing the sandbox subprocess or
+    aborting the awaited Playwright call - answering their requesters.
+    """
+    from agents.utils.protocol import InternalMessage, MessageType, AgentType, Channels
+    from agents.utils.cancellation import execution_scopes, TaskCancelled
+
+    async def reply_cancelled(task_msg, reason: str):
+        await broker_instance.publish(Channels.EXECUTION_TO_COORDINATOR, InternalMessage(
+            message_type=MessageType.EXECUTION_RESPONSE,
+            sender=AgentType.EXECUTION,
+            receiver=AgentType.COORDINATOR,
+            session_id=task_msg.session_id,
+            task_id=task_msg.task_id,
+            response_to=task_msg.message_id,
+            payload={"task_id": task_msg.task_id, "status": "failed", "error": reason}
+        ))
+
+    async def handle_cancellable_request(message):
+        task_id = message.task_id or message.payload.get("task_id") or message.message_id
+        with execution_scopes.open(task_id, message.session_id) as scope:
+            try:
+                await scope.run(handle_execution_request(message))
+            except TaskCancelled as e:
+                logger.info(f"⏹️ Cancelled task {task_id}: {e}")
+                await reply_cancelled(message, str(e))
+
+    broker_instance.subscribe(
+        Channels.COORDINATOR_TO_EXECUTION,
+        handle_cancellable_request,
+        queued=True,
+        prioritized=True,
+        concurrency=EXECUTION_INTAKE_CONCURRENCY
+    )
+
+    async def handle_interrupt(message):
+        command = message.payload.get("command")
+        if command == "stop":
+            session_id = message.session_id
+            reason = "Stopped by user"
+            matches = lambda queued: queued.session_id == session_id
+            cancelled = execution_scopes.cancel_session(session_id, reason)
+        elif command == "cancel_task":
+            task_id = message.payload.get("task_id")
+            reason = message.payload.get("reason", "Cancelled")
+            matches = lambda queued: queued.task_id == task_id
+            cancelled = int(execution_scopes.cancel(task_id, reason))
+        else:
+            return
+
+        dropped = broker_instance.purge(Channels.COORDINATOR_TO_EXECUTION, matches)
+        for task_msg in dropped:
+            await reply_cancelled(task_msg, reason)
+        if dropped or cancelled:
+            logger.info(f"⏹️ {command}: dropped {len(dropped)} queued and cancelled {cancelled} running task(s)")
+
+    broker_instance.subscribe(Channels.INTERRUPT_CONTROL, handle_interrupt)
+
 # ============================================================================
 # Unified Execution Agent
 # ============================================================================
@@ -726,18 +807,20 @@ async def start_execution_agent_with_rag(broker_instance, desktop_rag, sandbox_p
                 result = await web_bridge.execute_web_action_task(task, session_id)
             else:
                 logger.info(f"🖥️ DESKTOP TASK - Using RAG + pyautogui pipeline")
-                result = await desktop_bridge.execute_action_task(task)
+                # One physical desktop: serialized across every worker/agent process
+                async with process_lock("desktop"):
+                    result = await desktop_bridge.execute_action_task(task)
             
-            from agents.utils.protocol import AgentMessage, MessageType, AgentType, Channels
+            from agents.utils.protocol import InternalMessage, MessageType, AgentType, Channels
             
-            response_msg = AgentMessage(
+            response_msg = InternalMessage(
                 message_type=MessageType.EXECUTION_RESPONSE,
                 sender=AgentType.EXECUTION,
                 receiver=AgentType.COORDINATOR,
                 session_id=session_id,
                 task_id=task_id,
                 response_to=message.message_id,
-                payload=result.dict()
+                payload=await blob_store.aexternalize(result.dict())
             )
             
             await broker_instance.publish(Channels.EXECUTION_TO_COORDINATOR, response_msg)
@@ -756,9 +839,9 @@ async def start_execution_agent_with_rag(broker_instance, desktop_rag, sandbox_p
                 error=str(e)
             )
             
-            from agents.utils.protocol import AgentMessage, MessageType, AgentType, Channels
+            from agents.utils.protocol import InternalMessage, MessageType, AgentType, Channels
             
-            error_msg = AgentMessage(
+            error_msg = InternalMessage(
                 message_type=MessageType.EXECUTION_RESPONSE,
                 sender=AgentType.EXECUTION,
                 receiver=AgentType.COORDINATOR,
@@ -770,8 +853,7 @@ async def start_execution_agent_with_rag(broker_instance, desktop_rag, sandbox_p
             
             await broker_instance.publish(Channels.EXECUTION_TO_COORDINATOR, error_msg)
     
-    from agents.utils.protocol import Channels
-    broker_instance.subscribe(Channels.COORDINATOR_TO_EXECUTION, handle_execution_request)
+    subscribe_execution_intake(broker_instance, handle_execution_request)
     
     logger.info("✅ Unified Execution Agent started:")
     logger.info("   🌐 Web tasks → Playwright pipeline")
@@ -927,18 +1009,19 @@ async def start_desktop_only_execution_agent(broker_instance, rag_system, sandbo
                     error="Web automation not available"
                 )
             else:
-                result = await bridge.execute_action_task(task)
+                async with process_lock("desktop"):
+                    result = await bridge.execute_action_task(task)
             
-            from agents.utils.protocol import AgentMessage, MessageType, AgentType, Channels
+            from agents.utils.protocol import InternalMessage, MessageType, AgentType, Channels
             
-            response_msg = AgentMessage(
+            response_msg = InternalMessage(
                 message_type=MessageType.EXECUTION_RESPONSE,
                 sender=AgentType.EXECUTION,
                 receiver=AgentType.COORDINATOR,
                 session_id=message.session_id,
                 task_id=task.task_id,
                 response_to=message.message_id,
-                payload=result.dict()
+                payload=await blob_store.aexternalize(result.dict())
             )
             
             await broker_instance.publish(Channels.EXECUTION_TO_COORDINATOR, response_msg)
@@ -946,8 +1029,7 @@ async def start_desktop_only_execution_agent(broker_instance, rag_system, sandbo
         except Exception as e:
             logger.error(f"❌ Error in desktop execution: {e}")
     
-    from agents.utils.protocol import Channels
-    broker_instance.subscribe(Channels.COORDINATOR_TO_EXECUTION, handle_execution_request)
+    subscribe_execution_intake(broker_instance, handle_execution_request)
     
     logger.info("✅ Desktop-Only Execution Agent started")
     
@@ -959,7 +1041,7 @@ async def start_desktop_only_execution_agent(broker_instance, rag_system, sandbo
 # ============================================================================
 
 async def start_simple_execution_agent(broker_instance):
-    from agents.utils.protocol import AgentMessage, MessageType, AgentType, Channels
+    from agents.utils.protocol import InternalMessage, MessageType, AgentType, Channels
     
     async def handle_execution_request(message):
         try:
@@ -976,7 +1058,7 @@ async def start_simple_execution_agent(broker_instance):
                 'error': None
             }
             
-            response_msg = AgentMessage(
+            response_msg = InternalMessage(
                 message_type=MessageType.EXECUTION_RESPONSE,
                 sender=AgentType.EXECUTION,
                 receiver=AgentType.COORDINATOR,
@@ -992,7 +1074,7 @@ async def start_simple_execution_agent(broker_instance):
         except Exception as e:
             logger.error(f"❌ Error in fallback execution: {e}")
     
-    broker_instance.subscribe(Channels.COORDINATOR_TO_EXECUTION, handle_execution_request)
+    subscribe_execution_intake(broker_instance, handle_execution_request)
     logger.info("✅ Fallback Execution Agent started")
     
     while True:
@@ -26,7 +26,6 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 import chromadb
 from sentence_transformers import SentenceTransformer
-import openai  # Can also use: anthropic, huggingface, ollama
 from anthropic import Anthropic
 import torch
 from dataclasses import dataclass
@@ -34,6 +33,8 @@ from datetime import datetime
 
 from enum import Enum
 import requests
+from agents.utils.llm_gateway import llm_gateway
+from agents.utils.prompt_registry import Section, prompt_registry
 
 class RetrievalMode(Enum):
     API = "api"
@@ -231,12 +232,11 @@ class LLMInterface:
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 print("⚠️  Warning: OPENAI_API_KEY not found in environment")
-            openai.api_key = api_key
-            self.client = "openai"  # Use openai module directly
+            self.client = llm_gateway if api_key else None
             
         elif self.config.llm_provider == "ollama":
-            # For local Ollama instance
-            self.client = "ollama"
+            # For local Ollama instance (OpenAI-compatible endpoint)
+            self.client = llm_gateway
             print("Using local Ollama instance")
             
         elif self.config.llm_provider == "gemini":
@@ -255,8 +255,7 @@ class LLMInterface:
                  print("⚠️  Warning: GROQ_API_KEY not found in environment")
                  self.client = None
             else:
-                from groq import Groq
-                self.client = Groq(api_key=api_key)
+                self.client = llm_gateway
         else:
             raise ValueError(f"Unsupported LLM provider: {self.config.llm_provider}")
     
@@ -265,14 +264,10 @@ class LLMInterface:
         
         if self.config.llm_provider == "anthropic":
             return self._generate_anthropic(prompt, system_prompt)
-        elif self.config.llm_provider == "openai":
-            return self._generate_openai(prompt, system_prompt)
-        elif self.config.llm_provider == "ollama":
-            return self._generate_ollama(prompt, system_prompt)
         elif self.config.llm_provider == "gemini":
             return self._generate_gemini(prompt, system_prompt)
-        elif self.config.llm_provider == "groq":
-            return self._generate_groq(prompt, system_prompt)
+        elif self.config.llm_provider in ("openai", "ollama", "groq"):
+            return self._generate_gateway(prompt, system_prompt)
 
     
     def _generate_anthropic(self, prompt: str, system_prompt: str = None) -> str:
@@ -292,43 +287,6 @@ class LLMInterface:
         
         return response.content[0].text
     
-    def _generate_openai(self, prompt: str, system_prompt: str = None) -> str:
-        """Generate using OpenAI GPT"""
-        messages = []
-        
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        messages.append({"role": "user", "content": prompt})
-        
-        response = openai.ChatCompletion.create(
-            model=self.config.llm_model,
-            messages=messages,
-            temperature=self.config.temperature,
-            max_tokens=self.config.max_tokens
-        )
-        
-        return response.choices[0].message.content
-    
-    def _generate_ollama(self, prompt: str, system_prompt: str = None) -> str:
-        """Generate using local Ollama"""
-        import requests
-        
-        url = "http://localhost:11434/api/generate"
-        
-        full_prompt = prompt
-        if system_prompt:
-            full_prompt = f"{system_prompt}\n\n{prompt}"
-        
-        data = {
-            "model": self.config.llm_model,  # e.g., "codellama", "llama2"
-            "prompt": full_prompt,
-            "stream": False
-        }
-        
-        response = requests.post(url, json=data)
-        return response.json()['response']
-    
     def _generate_gemini(self, prompt: str, system_prompt: str = None) -> str:
         """Generate using Google Gemini 1.5 Flash"""
         if not self.client:
@@ -351,10 +309,10 @@ class LLMInterface:
         
         return response.text
     
-    def _generate_groq(self, prompt: str, system_prompt: str = None) -> str:
-        
+    def _generate_gateway(self, prompt: str, system_prompt: str = None) -> str:
+        """Generate through the shared LLM gateway (groq, openai, ollama)"""
         if not self.client:
-            return "Error: Groq client not initialized. Please set GROQ_API_KEY."
+            return f"Error: {self.config.llm_provider} client not initialized. Please set its API key."
 
         messages = []
 
@@ -363,14 +321,17 @@ class LLMInterface:
 
         messages.append({"role": "user", "content": prompt})
 
-        response = self.client.chat.completions.create(
+        # Runs in a worker thread (RAGSystem.generate_code is called via to_thread)
+        response = self.client.chat_sync(
+            messages,
             model=self.config.llm_model,
-            messages=messages,
+            provider=self.config.llm_provider,
             temperature=self.config.temperature,
             max_tokens=self.config.max_tokens,
+            call_site="desktop_codegen",
         )
 
-        return response.choices[0].message.content
+        return response.content
 
 
 
@@ -382,254 +343,8 @@ class LLMInterface:
 # CELL 4: RAG System - Core
 # ============================================================================
 
-class RAGSystem:
-    """Complete RAG system for code generation"""
-    
-    def __init__(self, config: RAGConfig, mode: RetrievalMode = RetrievalMode.API):
-        self.config = config
-        self.vectordb = None
-        self.mode = mode  # ← ADD THIS LINE
-        self.llm = LLMInterface(config)
-        self.conversation_history = []
-        
-    def initialize(self):
-        """Initialize RAG system"""
-        print("Initializing RAG System...")
-                # ✅ Step 2: Initialize Vector Database Interface
-        # YOU ALREADY HAVE VectorDBInterface - just use it!
-        self.vectordb = VectorDBInterface(self.config,mode=self.mode)
-        if self.mode == RetrievalMode.LOCAL:  # ← ADD THIS CHECK
-            self.vectordb._initialize_local()
-        print("RAG System ready!")
-
-    def generate_code(self, user_query: str, cache_key: str = None,
-                    include_explanation: bool = True,
-                    conversation_context: List[Dict] = None,
-                    start_context_index: int = 0,
-                    num_contexts: int = None,
-                    use_rag: bool = None) -> Dict:  # ← ADD use_rag parameter
-        """
-        Generate code based on user query using RAG
-        
-        Args:
-            user_query: The user's request/question
-            cache_key: Unique identifier for the query (used for caching)
-            include_explanation: Whether to include explanation
-            conversation_context: Previous conversation for context
-            start_context_index: Which context to start from (for retries)
-            num_contexts: How many contexts to use (default: top_k)
-            use_rag: Override to enable/disable RAG (None = use config default)
-        """
-        if num_contexts is None:
-            num_contexts = self.config.top_k
-        
-        # Determine if RAG should be used
-        if use_rag is None:
-            use_rag = self.config.use_rag  # Use config default
-        
-        print(f"\n{'='*80}")
-        print(f"Query: {user_query}")
-        print(f"Cache Key: {cache_key}")
-        print(f"RAG Enabled: {use_rag}")
-        print(f"{'='*80}")
-        
-        # ============================================================================
-        # STEP 1: Retrieve contexts (ONLY if RAG is enabled)
-        # ============================================================================
-        contexts = []
-        start_context_index = 0
-        end_index = 0
-        
-        if use_rag:
-            print(f"\n[1/3] 🔍 RAG ENABLED - Retrieving contexts...")
-            
-            cache_exists = hasattr(self, '_cached_contexts') and hasattr(self, '_cached_query')
-            
-            if not cache_exists or self._cached_query != cache_key:
-                print(f"       Requesting max_retrieval={self.config.max_retrieval} contexts")
-                
-                self._cached_contexts = self.vectordb.get_relevant_context(
-                    cache_key, 
-                    max_results=self.config.max_retrieval
-                ) or []
-                
-                self._cached_query = cache_key
-                self._last_context_index = None
-                
-                print(f"       ✅ Retrieved {len(self._cached_contexts)} contexts from DB")
-                
-                if self._cached_contexts:
-                    print(f"\n       📊 All Retrieved Contexts:")
-                    for idx, ctx in enumerate(self._cached_contexts):
-                        print(f"          [{idx}] Similarity: {ctx['similarity']:.2%} | {ctx['content'][:60]}...")
-            else:
-                print(f"       ♻️  Using CACHED contexts ({len(self._cached_contexts)} total)")
-            
-            # Select context window
-            print(f"\n[2/3] 🎯 Selecting context window...")
-            print(f"       start_index={start_context_index}, num_contexts={num_contexts}")
-            
-            if len(self._cached_contexts) == 0:
-                print(f"       ⚠️  No relevant contexts found")
-                contexts = []
-            else:
-                if start_context_index >= len(self._cached_contexts):
-                    print(f"       ⚠️  Adjusting to last available window")
-                    start_context_index = max(0, len(self._cached_contexts) - num_contexts)
-                
-                end_index = min(start_context_index + num_contexts, len(self._cached_contexts))
-                contexts = self._cached_contexts[start_context_index:end_index]
-                
-                print(f"       📌 Selected Window: [{start_context_index}:{end_index}]")
-                print(f"       🔍 Contexts for THIS attempt:")
-                
-                for i, ctx in enumerate(contexts):
-                    global_idx = start_context_index + i
-                    print(f"          [{global_idx}] Similarity: {ctx['similarity']:.2%} | {ctx['content'][:60]}...")
-        else:
-            print(f"\n[1/3] 🚫 RAG DISABLED - Skipping context retrieval")
-            print(f"       Will generate code using LLM's general knowledge only")
-            contexts = []
-        
-        # ============================================================================
-        # STEP 2: Build prompt (with or without contexts)
-        # ============================================================================
-        print(f"\n[{'3/3' if use_rag else '2/3'}] 🏗️  Building prompt...")
-        if use_rag:
-            print(f"       Including {len(contexts)} RAG contexts in prompt")
-        else:
-            print(f"       Using zero-shot prompt (no RAG contexts)")
-        
-        prompt = self._build_prompt(user_query, contexts, conversation_context)
-        
-        print("-" * 80)
-        print("📝 PROMPT PREVIEW:")
-        print(prompt[:500] + "..." if len(prompt) > 500 else prompt)
-        print("-" * 80)
-
-        # ============================================================================
-        # STEP 3: Generate code
-        # ============================================================================
-        print(f"\n[{'4/3' if use_rag else '3/3'}] 🤖 Generating code with LLM...")
-        response = self.llm.generate(
-            prompt=prompt,
-            system_prompt=self._get_system_prompt()
-        )
-        
-        # Parse response
-        result = self._parse_response(response, contexts)
-        
-        print(f"\n[{'5/3' if use_rag else '4/3'}] ✅ Code generation complete")
-        print(f"       Generated {len(result['code'])} characters of code")
-        print("THE CODE BLOCK ", result['code'])
-        print(f"       RAG contexts used: {result['contexts_used']}")
-        if result['contexts_used'] > 0:
-            print(f"       Top similarity: {result['top_similarity']:.2%}")
-        print("-" * 80)
-        
-        # Store in conversation history
-        self.conversation_history.append({
-            'query': user_query,
-            'cache_key': cache_key,
-            'response': result,
-            'context_indices': (start_context_index, end_index),
-            'contexts_used': len(contexts),
-            'rag_enabled': use_rag,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        return result   
-    
-    def _build_prompt(self, query: str, contexts: List[Dict], 
-                     conversation_context: List[Dict] = None) -> str:
-        """Build the prompt for the LLM"""
-        
-        prompt_parts = []
-        
-        # # Add conversation context if available
-        if conversation_context:
-            prompt_parts.append("## Previous Conversation:")
-            for msg in conversation_context[-3:]:  # Last 3 messages
-                prompt_parts.append(f"User: {msg.get('query', '')}")
-                if 'code' in msg.get('response', {}):
-                    prompt_parts.append(f"Assistant: {msg['response']['code'][:200]}...")
-            prompt_parts.append("")
-        
-        if contexts: 
-        # Add retrieved context
-            prompt_parts.append(f"## Relevant {self.config.library_name} Documentation and Examples:")
-            prompt_parts.append("")
-            
-            total_length = 0
-            for i, ctx in enumerate(contexts):
-                content = ctx['content']
-                
-                # Truncate if needed
-                if total_length + len(content) > self.config.max_context_length:
-                    content = content[:self.config.max_context_length - total_length]
-                
-                prompt_parts.append(f"### Reference {i+1} (Relevance: {ctx['similarity']:.0%}):")
-                prompt_parts.append(content)
-                prompt_parts.append("")
-                
-                total_length += len(content)
-                
-                if total_length >= self.config.max_context_length:
-                    break
-        else:
-            prompt_parts.append("## Note: No similar examples found, using general knowledge")
-        
-        # Add user query
-        # prompt_parts.append("## User Request:")
-        # prompt_parts.append(query)
-        # prompt_parts.append("")
-        
-        # # Add instructions
-        # prompt_parts.append("## Instructions:")
-        # prompt_parts.append(f"Based on the above {self.config.library_name} documentation and examples, generate:")
-        # prompt_parts.append("1. Complete, working Python code that addresses the user's request")
-        # prompt_parts.append("2. Include necessary imports")
-        # prompt_parts.append("3. Add helpful comments")
-        # prompt_parts.append("4. Follow best practices and patterns shown in the examples")
-        # prompt_parts.append("")
-        # prompt_parts.append("IMPORTANT - Success/Failure Indicators:")  # ← ADD THIS
-        # prompt_parts.append("- Your code MUST print success indicators when it completes successfully")
-        # prompt_parts.append("- Use keywords: EXECUTION_SUCCESS, SUCCESS, COMPLETED, or DONE")
-        # prompt_parts.append("- Example: print('SUCCESS: Window opened and visible')")
-        # prompt_parts.append("- For errors, print 'FAILED:' or 'ERROR:' with details")
-        # prompt_parts.append("- Always use try-except blocks for risky operations")
-        # prompt_parts.append("")
-        # prompt_parts.append("Format your response as:")
-        # prompt_parts.append("```python")
-        # prompt_parts.append("# Your code here")
-        # prompt_parts.append("```")
-        prompt_parts.append("""Generate automation code to perform the following task:
-
-Task Description:""")
-        prompt_parts.append(query)
-        prompt_parts.append("""
-
-
-Requirements
-
-Execute the task exactly as described, without adding extra steps.
-Prefer the simplest and most reliable execution method.
-If the primary method fails, automatically adapt and try alternative approaches.
-Do not assume success—ensure the task is actually performed.
-The code must be suitable for use within a multi-agent automation system.
-Return only the generated code and necessary explanations, with no assumptions beyond the task description.
-Implementation guidance:
-- Prefer approaches similar to pyautogui-style interaction
-  (keyboard and mouse simulation) when applicable.
-- Do not assume the availability of libraries beyond standard Python
-  or those implied by the retrieved context.
-""")
-        
-        return "\n".join(prompt_parts)
-    
-    def _get_system_prompt(self) -> str:
-        """Get system prompt for the LLM"""
-        return f"""You are an expert Python automation engineer operating inside a multi-agent
+# Built once at import; versioned and token-counted by the prompt registry
+SYSTEM_PROMPT = prompt_registry.static("desktop_codegen.system", """You are an expert Python automation engineer operating inside a multi-agent
 RAG + Execution + Validation system.
 
 Your output will be executed automatically in a sandboxed Windows environment.
@@ -758,7 +473,7 @@ try:
     # THEN indicate success
     print("EXECUTION_SUCCESS")
 except Exception as e:
-    print(f"FAILED: {{e}}")
+    print(f"FAILED: {e}")
 ```
 
 READING A FILE:
@@ -769,7 +484,7 @@ try:
     filepath = "D:/Downloads/file.txt"
     
     if not os.path.exists(filepath):
-        raise FileNotFoundError(f"File not found: {{filepath}}")
+        raise FileNotFoundError(f"File not found: {filepath}")
     
     with open(filepath, 'r', encoding='utf-8') as f:
         content = f.read()
@@ -780,7 +495,7 @@ try:
     # THEN indicate success
     print("EXECUTION_SUCCESS")
 except Exception as e:
-    print(f"FAILED: {{e}}")
+    print(f"FAILED: {e}")
 ```
 
 EXTRACTING TEXT FROM UI:
@@ -807,7 +522,7 @@ try:
     # THEN indicate success
     print("EXECUTION_SUCCESS")
 except Exception as e:
-    print(f"FAILED: "{{e}}")
+    print(f"FAILED: "{e}")
 ```
 
 WEB SCRAPING / DATA EXTRACTION:
@@ -906,9 +621,224 @@ OUTPUT FORMAT (STRICT)
 - No markdown.
 - No extra text.
 
-"""
+""")
+
+REQUIREMENTS = prompt_registry.static("desktop_codegen.requirements", """Requirements
+
+Execute the task exactly as described, without adding extra steps.
+Prefer the simplest and most reliable execution method.
+If the primary method fails, automatically adapt and try alternative approaches.
+Do not assume success—ensure the task is actually performed.
+The code must be suitable for use within a multi-agent automation system.
+Return only the generated code and necessary explanations, with no assumptions beyond the task description.
+Implementation guidance:
+- Prefer approaches similar to pyautogui-style interaction
+  (keyboard and mouse simulation) when applicable.
+- Do not assume the availability of libraries beyond standard Python
+  or those implied by the retrieved context.
+""")
+
+NO_CONTEXT_NOTE = prompt_registry.static("desktop_codegen.no_context", "## Note: No similar examples found, using general knowledge")
+
+class RAGSystem:
+    """Complete RAG system for code generation"""
+    
+    def __init__(self, config: RAGConfig, mode: RetrievalMode = RetrievalMode.API):
+        self.config = config
+        self.vectordb = None
+        self.mode = mode  # ← ADD THIS LINE
+        self.llm = LLMInterface(config)
+        self.conversation_history = []
+        
+    def initialize(self):
+        """Initialize RAG system"""
+        print("Initializing RAG System...")
+                # ✅ Step 2: Initialize Vector Database Interface
+        # YOU ALREADY HAVE VectorDBInterface - just use it!
+        self.vectordb = VectorDBInterface(self.config,mode=self.mode)
+        if self.mode == RetrievalMode.LOCAL:  # ← ADD THIS CHECK
+            self.vectordb._initialize_local()
+        print("RAG System ready!")
+
+    def generate_code(self, user_query: str, cache_key: str = None,
+                    include_explanation: bool = True,
+                    conversation_context: List[Dict] = None,
+                    start_context_index: int = 0,
+                    num_contexts: int = None,
+                    use_rag: bool = None) -> Dict:  # ← ADD use_rag parameter
+        """
+        Generate code based on user query using RAG
+        
+        Args:
+            user_query: The user's request/question
+            cache_key: Unique identifier for the query (used for caching)
+            include_explanation: Whether to include explanation
+            conversation_context: Previous conversation for context
+            start_context_index: Which context to start from (for retries)
+            num_contexts: How many contexts to use (default: top_k)
+            use_rag: Override to enable/disable RAG (None = use config default)
+        """
+        if num_contexts is None:
+            num_contexts = self.config.top_k
+        
+        # Determine if RAG should be used
+        if use_rag is None:
+            use_rag = self.config.use_rag  # Use config default
+        
+        print(f"\n{'='*80}")
+        print(f"Query: {user_query}")
+        print(f"Cache Key: {cache_key}")
+        print(f"RAG Enabled: {use_rag}")
+        print(f"{'='*80}")
+        
+        # ============================================================================
+        # STEP 1: Retrieve contexts (ONLY if RAG is enabled)
+        # ============================================================================
+        contexts = []
+        start_context_index = 0
+        end_index = 0
+        
+        if use_rag:
+            print(f"\n[1/3] 🔍 RAG ENABLED - Retrieving contexts...")
+            
+            cache_exists = hasattr(self, '_cached_contexts') and hasattr(self, '_cached_query')
+            
+            if not cache_exists or self._cached_query != cache_key:
+                print(f"       Requesting max_retrieval={self.config.max_retrieval} contexts")
+                
+                self._cached_contexts = self.vectordb.get_relevant_context(
+                    cache_key, 
+                    max_results=self.config.max_retrieval
+                ) or []
+                
+                self._cached_query = cache_key
+                self._last_context_index = None
+                
+                print(f"       ✅ Retrieved {len(self._cached_contexts)} contexts from DB")
+                
+                if self._cached_contexts:
+                    print(f"\n       📊 All Retrieved Contexts:")
+                    for idx, ctx in enumerate(self._cached_contexts):
+                        print(f"          [{idx}] Similarity: {ctx['similarity']:.2%} | {ctx['content'][:60]}...")
+            else:
+                print(f"       ♻️  Using CACHED contexts ({len(self._cached_contexts)} total)")
+            
+            # Select context window
+            print(f"\n[2/3] 🎯 Selecting context window...")
+            print(f"       start_index={start_context_index}, num_contexts={num_contexts}")
+            
+            if len(self._cached_contexts) == 0:
+                print(f"       ⚠️  No relevant contexts found")
+                contexts = []
+            else:
+                if start_context_index >= len(self._cached_contexts):
+                    print(f"       ⚠️  Adjusting to last available window")
+                    start_context_index = max(0, len(self._cached_contexts) - num_contexts)
+                
+                end_index = min(start_context_index + num_contexts, len(self._cached_contexts))
+                contexts = self._cached_contexts[start_context_index:end_index]
+                
+                print(f"       📌 Selected Window: [{start_context_index}:{end_index}]")
+                print(f"       🔍 Contexts for THIS attempt:")
+                
+                for i, ctx in enumerate(contexts):
+                    global_idx = start_context_index + i
+                    print(f"          [{global_idx}] Similarity: {ctx['similarity']:.2%} | {ctx['content'][:60]}...")
+        else:
+            print(f"\n[1/3] 🚫 RAG DISABLED - Skipping context retrieval")
+            print(f"       Will generate code using LLM's general knowledge only")
+            contexts = []
+        
+        # ============================================================================
+        # STEP 2: Build prompt (with or without contexts)
+        # ============================================================================
+        print(f"\n[{'3/3' if use_rag else '2/3'}] 🏗️  Building prompt...")
+        if use_rag:
+            print(f"       Including {len(contexts)} RAG contexts in prompt")
+        else:
+            print(f"       Using zero-shot prompt (no RAG contexts)")
+        
+        prompt = self._build_prompt(user_query, contexts, conversation_context)
+        
+        print("-" * 80)
+        print("📝 PROMPT PREVIEW:")
+        print(prompt[:500] + "..." if len(prompt) > 500 else prompt)
+        print("-" * 80)
 
+        # ============================================================================
+        # STEP 3: Generate code
+        # ============================================================================
+        print(f"\n[{'4/3' if use_rag else '3/3'}] 🤖 Generating code with LLM...")
+        response = self.llm.generate(
+            prompt=prompt,
+            system_prompt=self._get_system_prompt()
+        )
+        
+        # Parse response
+        result = self._parse_response(response, contexts)
+        
+        print(f"\n[{'5/3' if use_rag else '4/3'}] ✅ Code generation complete")
+        print(f"       Generated {len(result['code'])} characters of code")
+        print("THE CODE BLOCK ", result['code'])
+        print(f"       RAG contexts used: {result['contexts_used']}")
+        if result['contexts_used'] > 0:
+            print(f"       Top similarity: {result['top_similarity']:.2%}")
+        print("-" * 80)
+        
+        # Store in conversation history
+        self.conversation_history.append({
+            'query': user_query,
+            'cache_key': cache_key,
+            'response': result,
+            'context_indices': (start_context_index, end_index),
+            'contexts_used': len(contexts),
+            'rag_enabled': use_rag,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+        return result   
+    
+    def _build_prompt(self, query: str, contexts: List[Dict], 
+                     conversation_context: List[Dict] = None) -> str:
+        """Build the prompt for the LLM, trimmed to the desktop_codegen token budget"""
+        
+        # Previous conversation: the oldest turn is trimmed first
+        history = []
+        for msg in (conversation_context or [])[-3:]:  # Last 3 messages
+            turn = f"User: {msg.get('query', '')}"
+            if 'code' in msg.get('response', {}):
+                turn += f"\nAssistant: {msg['response']['code'][:200]}..."
+            history.append(turn)
+        
+        # Retrieved context, most relevant first: the least relevant is trimmed first
+        references = []
+        total_length = 0
+        for i, ctx in enumerate(contexts):
+            content = ctx['content']
+            
+            # Truncate if needed
+            if total_length + len(content) > self.config.max_context_length:
+                content = content[:self.config.max_context_length - total_length]
+            
+            references.append(f"### Reference {i+1} (Relevance: {ctx['similarity']:.0%}):\n{content}")
+            total_length += len(content)
+            
+            if total_length >= self.config.max_context_length:
+                break
+        
+        parts = [
+            Section("history", history, header="## Previous Conversation:\n", keep="last", priority=0),
+            Section("contexts", references, header=f"## Relevant {self.config.library_name} Documentation and Examples:\n\n",
+                    separator="\n\n", keep="first", priority=1) if references else NO_CONTEXT_NOTE,
+            Section("task", query, header="Generate automation code to perform the following task:\n\nTask Description:\n", trim=False),
+            REQUIREMENTS,
+        ]
+        return prompt_registry.assemble("desktop_codegen", parts, reserved=SYSTEM_PROMPT.tokens, joiner="\n\n").text
     
+    def _get_system_prompt(self) -> str:
+        """Get system prompt for the LLM"""
+        return SYSTEM_PROMPT.text
+
     def _parse_response(self, response: str, contexts: List[Dict]) -> Dict:
         """Parse LLM response into structured format"""
         
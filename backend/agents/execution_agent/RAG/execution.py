@@ -23,6 +23,8 @@ import sys
 from enum import Enum
 import logging
 
+from agents.utils.cancellation import run_process
+
 logger = logging.getLogger(__name__)
 
 
@@ -451,11 +453,9 @@ class LocalSandbox:
             temp_file = f.name
         
         try:
-            # Execute in subprocess
-            result = subprocess.run(
+            # Execute in subprocess (killed right away if the task is cancelled)
+            result = run_process(
                 [sys.executable, temp_file],
-                capture_output=True,
-                text=True,
                 timeout=timeout
             )
             
@@ -11,6 +11,8 @@ import chromadb
 from sentence_transformers import SentenceTransformer
 from dataclasses import dataclass
 from datetime import datetime
+from agents.utils.llm_gateway import llm_gateway
+from agents.utils.prompt_registry import Section, prompt_registry
 
 # ============================================================================
 # CONFIGURATION (FIXED)
@@ -220,36 +222,22 @@ class PlaywrightLLM:
             masked_key = api_key[:8] + "..." + api_key[-4:] if len(api_key) > 12 else "***"
             print(f"✅ Groq API key loaded: {masked_key}")
             
-            try:
-                from groq import Groq
-                self.client = Groq(api_key=api_key)
-                print(f"✅ Groq client initialized: {self.config.llm_model}")
-            except Exception as e:
-                print(f"❌ Failed to initialize Groq client: {e}")
-                raise
+            self.client = llm_gateway
+            print(f"✅ Groq via LLM gateway: {self.config.llm_model}")
         
         elif self.config.llm_provider == "openai":
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("❌ OPENAI_API_KEY not found")
             
-            import openai
-            openai.api_key = api_key
-            self.client = "openai"
-            print(f"✅ OpenAI client initialized")
+            self.client = llm_gateway
+            print(f"✅ OpenAI via LLM gateway: {self.config.llm_model}")
         
         else:
             raise ValueError(f"Unsupported LLM provider: {self.config.llm_provider}")
     
     def generate(self, prompt: str, system_prompt: str = None) -> str:
-        """Generate response from LLM"""
-        if self.config.llm_provider == "groq":
-            return self._generate_groq(prompt, system_prompt)
-        elif self.config.llm_provider == "openai":
-            return self._generate_openai(prompt, system_prompt)
-    
-    def _generate_groq(self, prompt: str, system_prompt: str = None) -> str:
-        """Generate using Groq"""
+        """Generate response from LLM (called from a worker thread)"""
         messages = []
         
         if system_prompt:
@@ -258,51 +246,106 @@ class PlaywrightLLM:
         messages.append({"role": "user", "content": prompt})
         
         try:
-            response = self.client.chat.completions.create(
+            response = self.client.chat_sync(
+                messages,
                 model=self.config.llm_model,
-                messages=messages,
+                provider=self.config.llm_provider,
                 temperature=self.config.temperature,
                 max_tokens=self.config.max_tokens,
+                call_site="web_codegen",
             )
-            return response.choices[0].message.content
+            return response.content
         except Exception as e:
-            print(f"❌ Groq API call failed: {e}")
-            if "401" in str(e) or "Unauthorized" in str(e):
-                print("⚠️  API key issue, reinitializing...")
-                self._initialize_client()
-                response = self.client.chat.completions.create(
-                    model=self.config.llm_model,
-                    messages=messages,
-                    temperature=self.config.temperature,
-                    max_tokens=self.config.max_tokens,
-                )
-                return response.choices[0].message.content
+            print(f"❌ {self.config.llm_provider} API call failed: {e}")
             raise
-    
-    def _generate_openai(self, prompt: str, system_prompt: str = None) -> str:
-        """Generate using OpenAI"""
-        import openai
-        
-        messages = []
-        
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        
-        messages.append({"role": "user", "content": prompt})
-        
-        response = openai.ChatCompletion.create(
-            model=self.config.llm_model,
-            messages=messages,
-            temperature=self.config.temperature,
-            max_tokens=self.config.max_tokens
-        )
-        
-        return response.choices[0].message.content
 
 # ============================================================================
 # PLAYWRIGHT RAG SYSTEM (ENHANCED)
 # ============================================================================
 
+# Built once at import; versioned and token-counted by the prompt registry
+SYSTEM_PROMPT = prompt_registry.static("web_codegen.system", """You are an expert Playwright Python automation engineer.
+
+⚠️ CRITICAL CONTEXT AWARENESS:
+You are generating code for a MULTI-AGENT SYSTEM where:
+- Tasks are executed SEQUENTIALLY in the SAME browser session
+- The browser and page are ALREADY initialized
+- You generate code for ONE STEP at a time
+- Your code will be executed in an environment where 'page' already exists
+
+🚫 FORBIDDEN (DO NOT GENERATE):
+- from playwright.async_api import async_playwright
+- async with async_playwright() as p:
+- browser = await p.chromium.launch()
+- page = await browser.new_page()
+- await browser.close()
+- async def main():
+- asyncio.run()
+
+✅ ALLOWED (GENERATE THIS):
+- await page.goto(url)
+- await page.fill(selector, text)
+- await page.click(selector)
+- await page.wait_for_load_state()
+- await page.press(selector, key)
+- text = await page.text_content(selector)
+- print("EXECUTION_SUCCESS")
+
+OUTPUT FORMAT:
+Return ONLY the Playwright actions needed for the specific task.
+Assume 'page' is already available in scope.
+
+EXAMPLE 1 - Navigate to Google:
+```python
+await page.goto("https://www.google.com")
+await page.wait_for_load_state('networkidle')
+print("EXECUTION_SUCCESS")
+```
+
+EXAMPLE 2 - Fill search box:
+```python
+await page.fill('textarea[name="q"]', 'search term')
+print("EXECUTION_SUCCESS")
+```
+
+EXAMPLE 3 - Submit search:
+```python
+await page.press('textarea[name="q"]', 'Enter')
+await page.wait_for_load_state('networkidle')
+print("EXECUTION_SUCCESS")
+```
+
+MULTI-STEP PATTERN (Search Google):
+Task 1: await page.goto("https://www.google.com")
+Task 2: await page.fill('textarea[name="q"]', 'search term')
+Task 3: await page.press('textarea[name="q"]', 'Enter')
+
+Each task runs on the SAME page. DO NOT close or recreate browser.
+
+CRITICAL RULES:
+1. Generate ONLY the action for THIS step
+2. NEVER import playwright
+3. NEVER create browser/page
+4. NEVER close browser/page
+5. ALWAYS use existing 'page' variable
+6. Print "EXECUTION_SUCCESS" when done
+7. Print "FAILED: {error}" on errors
+""")
+
+REQUIREMENTS = prompt_registry.static("web_codegen.requirements", """## Requirements:
+Generate complete Playwright Python code that:
+1. Uses async/await pattern (async def main, await page.goto, etc.)
+2. Launches browser with headless=False
+3. Handles errors with try/except
+4. Prints 'EXECUTION_SUCCESS' on success
+5. Prints 'FAILED: {error}' on failure
+6. Always closes browser in finally block
+
+Format:
+```python
+# Complete code here
+```""")
+
 class PlaywrightRAGSystem:
     """Complete RAG system for Playwright code generation"""
     
@@ -400,14 +443,10 @@ class PlaywrightRAGSystem:
         return result
     
     def _build_prompt(self, query: str, contexts: List[Dict]) -> str:
-        """Build the prompt for code generation"""
-        
-        prompt_parts = []
-        
-        # Add retrieved context
-        prompt_parts.append(f"## Relevant Playwright Python Examples:")
-        prompt_parts.append("")
+        """Build the prompt for code generation, trimmed to the web_codegen token budget"""
         
+        # Retrieved context, most relevant first: the least relevant is trimmed first
+        examples = []
         total_length = 0
         for i, ctx in enumerate(contexts):
             content = ctx['content']
@@ -416,106 +455,22 @@ class PlaywrightRAGSystem:
             if total_length + len(content) > self.config.max_context_length:
                 content = content[:self.config.max_context_length - total_length]
             
-            prompt_parts.append(f"### Example {i+1} (Relevance: {ctx['similarity']:.0%}):")
-            prompt_parts.append(content)
-            prompt_parts.append("")
-            
+            examples.append(f"### Example {i+1} (Relevance: {ctx['similarity']:.0%}):\n{content}")
             total_length += len(content)
             
             if total_length >= self.config.max_context_length:
                 break
         
-        # Add user query
-        prompt_parts.append("## Task:")
-        prompt_parts.append(query)
-        prompt_parts.append("")
-        
-        # Add instructions
-        prompt_parts.append("## Requirements:")
-        prompt_parts.append("Generate complete Playwright Python code that:")
-        prompt_parts.append("1. Uses async/await pattern (async def main, await page.goto, etc.)")
-        prompt_parts.append("2. Launches browser with headless=False")
-        prompt_parts.append("3. Handles errors with try/except")
-        prompt_parts.append("4. Prints 'EXECUTION_SUCCESS' on success")
-        prompt_parts.append("5. Prints 'FAILED: {error}' on failure")
-        prompt_parts.append("6. Always closes browser in finally block")
-        prompt_parts.append("")
-        prompt_parts.append("Format:")
-        prompt_parts.append("```python")
-        prompt_parts.append("# Complete code here")
-        prompt_parts.append("```")
-        
-        return "\n".join(prompt_parts)
+        parts = [
+            Section("contexts", examples, header="## Relevant Playwright Python Examples:\n\n", separator="\n\n"),
+            Section("task", query, header="## Task:\n", trim=False),
+            REQUIREMENTS,
+        ]
+        return prompt_registry.assemble("web_codegen", parts, reserved=SYSTEM_PROMPT.tokens, joiner="\n\n").text
     
     def _get_system_prompt(self) -> str:
         """Get ENHANCED system prompt for web automation (MULTI-STEP AWARE)"""
-        return """You are an expert Playwright Python automation engineer.
-
-⚠️ CRITICAL CONTEXT AWARENESS:
-You are generating code for a MULTI-AGENT SYSTEM where:
-- Tasks are executed SEQUENTIALLY in the SAME browser session
-- The browser and page are ALREADY initialized
-- You generate code for ONE STEP at a time
-- Your code will be executed in an environment where 'page' already exists
-
-🚫 FORBIDDEN (DO NOT GENERATE):
-- from playwright.async_api import async_playwright
-- async with async_playwright() as p:
-- browser = await p.chromium.launch()
-- page = await browser.new_page()
-- await browser.close()
-- async def main():
-- asyncio.run()
-
-✅ ALLOWED (GENERATE THIS):
-- await page.goto(url)
-- await page.fill(selector, text)
-- await page.click(selector)
-- await page.wait_for_load_state()
-- await page.press(selector, key)
-- text = await page.text_content(selector)
-- print("EXECUTION_SUCCESS")
-
-OUTPUT FORMAT:
-Return ONLY the Playwright actions needed for the specific task.
-Assume 'page' is already available in scope.
-
-EXAMPLE 1 - Navigate to Google:
-```python
-await page.goto("https://www.google.com")
-await page.wait_for_load_state('networkidle')
-print("EXECUTION_SUCCESS")
-```
-
-EXAMPLE 2 - Fill search box:
-```python
-await page.fill('textarea[name="q"]', 'search term')
-print("EXECUTION_SUCCESS")
-```
-
-EXAMPLE 3 - Submit search:
-```python
-await page.press('textarea[name="q"]', 'Enter')
-await page.wait_for_load_state('networkidle')
-print("EXECUTION_SUCCESS")
-```
-
-MULTI-STEP PATTERN (Search Google):
-Task 1: await page.goto("https://www.google.com")
-Task 2: await page.fill('textarea[name="q"]', 'search term')
-Task 3: await page.press('textarea[name="q"]', 'Enter')
-
-Each task runs on the SAME page. DO NOT close or recreate browser.
-
-CRITICAL RULES:
-1. Generate ONLY the action for THIS step
-2. NEVER import playwright
-3. NEVER create browser/page
-4. NEVER close browser/page
-5. ALWAYS use existing 'page' variable
-6. Print "EXECUTION_SUCCESS" when done
-7. Print "FAILED: {error}" on errors
-"""
+        return SYSTEM_PROMPT.text
     
     def _parse_response(self, response: str, contexts: List[Dict]) -> Dict:
         """Parse LLM response into structured format"""
@@ -22,6 +22,8 @@ from enum import Enum
 from pathlib import Path
 import hashlib
 
+from agents.utils.blob_store import blob_store
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -947,6 +949,11 @@ class WebExecutionPipeline:
         logger.info(f"⚡ Executing web task {task_id}")
         
         try:
+            # Parallel plan branches name their own page (extra_params.page);
+            # the page key also scopes the page context cache
+            page_name = task.get('page')
+            if page_name and page_name != 'main':
+                session_id = f"{session_id}:{page_name}"
             page = await self.get_or_create_page(session_id)
             ai_prompt = task.get('ai_prompt', '')
             
@@ -1196,7 +1203,9 @@ class WebExecutionPipeline:
         logger.info(f"🧠 RAG Query with platform-aware smart intent")
         
         try:
-            rag_result = self._rag_system.generate_code(
+            # Retrieval + generation block; keep them off the event loop
+            rag_result = await asyncio.to_thread(
+                self._rag_system.generate_code,
                 enhanced_prompt,
                 include_explanation=False
             )
@@ -1535,7 +1544,8 @@ class CoordinatorWebBridge:
                 task_dict = {
                     'task_id': task.task_id,
                     'ai_prompt': task.ai_prompt,
-                    'web_params': task.web_params
+                    'web_params': task.web_params,
+                    'page': task.extra_params.get('page')
                 }
                 
                 exec_result = await self.web.execute_web_task(task_dict, session_id)
@@ -1580,16 +1590,16 @@ async def start_web_execution_agent_with_rag(broker_instance, rag_system, web_pi
                 max_retries=2
             )
             
-            from agents.utils.protocol import AgentMessage, MessageType, AgentType, Channels
+            from agents.utils.protocol import InternalMessage, MessageType, AgentType, Channels
             
-            response_msg = AgentMessage(
+            response_msg = InternalMessage(
                 message_type=MessageType.EXECUTION_RESPONSE,
                 sender=AgentType.EXECUTION,
                 receiver=AgentType.COORDINATOR,
                 session_id=message.session_id,
                 task_id=task.task_id,
                 response_to=message.message_id,
-                payload=result.dict()
+                payload=await blob_store.aexternalize(result.dict())
             )
             
             await broker_instance.publish(Channels.EXECUTION_TO_COORDINATOR, response_msg)
@@ -1604,9 +1614,9 @@ async def start_web_execution_agent_with_rag(broker_instance, rag_system, web_pi
                 error=str(e)
             )
             
-            from agents.utils.protocol import AgentMessage, MessageType, AgentType, Channels
+            from agents.utils.protocol import InternalMessage, MessageType, AgentType, Channels
             
-            error_msg = AgentMessage(
+            error_msg = InternalMessage(
                 message_type=MessageType.EXECUTION_RESPONSE,
                 sender=AgentType.EXECUTION,
                 receiver=AgentType.COORDINATOR,
@@ -22,18 +22,135 @@ CRITICAL CHANGES:
 import logging
 import asyncio
 import json
+import os
 import re
 import httpx
 from typing import Optional, List, Dict, Any, Set
 
+from agents.utils.llm_gateway import GatewayChatModel
+from agents.utils.prompt_registry import Section, prompt_registry
+from agents.utils.broker import broker
+from agents.utils.protocol import Channels
 from agents.utils.device_protocol import (
     MobileTaskRequest, MobileTaskResult, UIAction, ActionResult,
-    SemanticUITree
+    SemanticUITree, action_correlation_id, ACTION_OUTCOMES
 )
 from agents.execution_agent.core.exec_agent_models import ExecutionResult
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the device to report an action's result before assuming it ran
+MOBILE_ACTION_RESULT_TIMEOUT = float(os.getenv("MOBILE_ACTION_RESULT_TIMEOUT", "5"))
+# How often to look for a result that reached another worker (see ACTION_OUTCOMES)
+MOBILE_ACTION_RESULT_POLL = float(os.getenv("MOBILE_ACTION_RESULT_POLL", "0.1"))
+
+_action_results = None
+
+
+def subscribe_to_action_results():
+    """Route device action results (POST /device/{id}/action-result) into the broker's reply table, once per process"""
+    global _action_results
+    if _action_results is None:
+        async def on_action_result(message):
+            broker.resolve(message.get("correlation_id"), message.get("result"))
+        _action_results = broker.subscribe(Channels.DEVICE_ACTION_RESULT, on_action_result)
+
+
+async def poll_shared_action_result(correlation_id: str):
+    """Resolve correlation_id from shared state - for results POSTed to another worker"""
+    while True:
+        await asyncio.sleep(MOBILE_ACTION_RESULT_POLL)
+        outcome = ACTION_OUTCOMES.get(correlation_id)
+        if outcome is not None:
+            broker.resolve(correlation_id, outcome["result"])
+            return
+
+# Static parts of the ReAct prompt, built once at import
+MOBILE_SYSTEM = prompt_registry.static(
+    "mobile_react.system",
+    "You are a mobile automation expert. Respond ONLY with valid JSON. Never use markdown."
+)
+MOBILE_INTRO = prompt_registry.static(
+    "mobile_react.intro",
+    "You are a mobile automation agent analyzing an Android screen."
+)
+MOBILE_RULES = prompt_registry.static("mobile_react.rules", """RULES (Priority order):
+
+1. **🚨 OK BUTTON DETECTION 🚨**:
+   ```
+   Look at the current screen:
+   - Do you see [2] ELEMENT "07" and [3] ELEMENT "30"? (time is set)
+   - Do you see [22] BUTTON "OK"? (OK button exists)
+   
+   IF BOTH ARE TRUE:
+   Your thought MUST be: "click OK"
+   Your action MUST be: {"action_type": "click", "element_id": 22}
+   
+   DO NOT say "click PM and then OK"
+   DO NOT say "click PM first"
+   
+   The time is ALREADY set! Just click OK!
+   ```
+
+2. **AURA EXIT**: In "Aura App Screen"? → Use BACK immediately!
+
+3. **🎯 GOAL COMPLETION CHECK** (CRITICAL - Check FIRST!):
+   ```
+   Ask yourself: "Is my goal already achieved?"
+   for example:
+   Goal: "Set alarm to 7:30 PM"
+   Screen shows: TEXT "7:30 PM" alarm exists
+   → GOAL ACHIEVED! Return: {"thought": "goal achieved", "action_type": "complete"}
+   
+   Goal: "Open Gmail"
+   Screen shows: TEXT "Gmail" app visible
+   → GOAL ACHIEVED! Return: {"thought": "goal achieved", "action_type": "complete"}
+   
+   If you see your goal is ALREADY completed → STOP! Use action_type: "complete"
+   ```
+
+4. **GOAL CHECK**:
+   - Goal = "Open X"? → See X app? → DONE ✅
+   - Goal = "Set alarm to 7:30 PM"? → See TEXT "7:30 PM" alarm? → DONE ✅
+   - Goal = "Click/Type/Set Y"? → Must DO Y first! ❌
+
+4. **⏰ TIME PICKER SEQUENCE**:
+   ```
+   Step 1: Click hour (e.g., "7")
+   Step 2: Click minute (e.g., "30") 
+   Step 3: Click AM or PM ONCE
+   Step 4: IMMEDIATELY click OK button!
+   
+   🚨 CRITICAL: After clicking AM/PM ONCE, the NEXT action is ALWAYS clicking OK!
+   NEVER click AM/PM twice!
+   
+   Example:
+   [2] ELEMENT "07" ← Hour set
+   [3] ELEMENT "30" ← Minute set
+   [6] BUTTON "PM"
+   [22] BUTTON "OK" ← CLICK THIS NOW!
+   
+   If you see time is correct (07:30) AND OK button exists → CLICK OK!
+   ```
+
+5. **BLACKLIST**: Never click the BLACKLISTED ELEMENTS listed in the state above
+
+6. **EXACT VALUES**: See "📝 KEY: value"? → Use EXACT value!
+
+7. **NO DUPLICATES**: Typing skipped? → Field done, next action!
+
+8. **APP DRAWER**: App not visible? → Scroll UP!
+
+RESPONSE EXAMPLES (copy format exactly):
+- Exit AURA: {"thought": "exit aura", "action_type": "global_action", "global_action": "BACK"}
+- Click element: {"thought": "click gmail", "action_type": "click", "element_id": 7}
+- Type text: {"thought": "type email", "action_type": "type", "element_id": 10, "text": "test@example.com"}
+- Task done: {"thought": "goal achieved", "action_type": "complete"}
+
+CRITICAL: For global_action, MUST include "global_action": "BACK" or "HOME" in JSON!
+
+Respond with ONLY valid JSON, no markdown.""")
+
 
 class MobileReActStrategy:
     """
@@ -57,12 +174,9 @@ class MobileReActStrategy:
         self.device_id = device_id
         self.backend_url = "http://localhost:8000"
         
-        # Initialize Groq LLM
-        from groq import AsyncGroq
-        
-        api_key = " " 
-        self.llm_client = AsyncGroq(api_key=api_key)
+        # Groq LLM, through the shared gateway
         self.model = "llama-3.3-70b-versatile"
+        self.llm = GatewayChatModel(self.model, temperature=0.2, max_tokens=500, call_site="mobile_react")
         
         # Device state tracking
         self.current_ui_tree: Optional[SemanticUITree] = None
@@ -716,11 +830,8 @@ class MobileReActStrategy:
     ) -> tuple[str, Optional[Dict]]:
         """Enhanced LLM prompt with blacklist awareness"""
         
-        history_context = ""
-        if thought_history:
-            history_context = "Previous thoughts:\n" + "\n".join(
-                f"{i+1}. {t}" for i, t in enumerate(thought_history[-3:])
-            )
+        # Oldest thought trimmed first, then the bottom of the UI tree
+        history = [f"{i+1}. {t}" for i, t in enumerate((thought_history or [])[-3:])]
         
         # Build blacklist context
         blacklist_context = ""
@@ -738,112 +849,28 @@ PREVIOUS ACTIONS: {[h["action"]["action_type"] for h in self.action_history[-3:]
 {exact_content_context}
 """
         
-        prompt = f"""You are a mobile automation agent analyzing an Android screen.
-
-GOAL: {goal}
-
-{state_context}
-
-CURRENT SCREEN:
-{observation}
-
-{history_context}
-
-RULES (Priority order):
-
-1. **🚨 OK BUTTON DETECTION 🚨**:
-   ```
-   Look at the current screen:
-   - Do you see [2] ELEMENT "07" and [3] ELEMENT "30"? (time is set)
-   - Do you see [22] BUTTON "OK"? (OK button exists)
-   
-   IF BOTH ARE TRUE:
-   Your thought MUST be: "click OK"
-   Your action MUST be: {{"action_type": "click", "element_id": 22}}
-   
-   DO NOT say "click PM and then OK"
-   DO NOT say "click PM first"
-   
-   The time is ALREADY set! Just click OK!
-   ```
-
-2. **AURA EXIT**: In "Aura App Screen"? → Use BACK immediately!
-
-3. **🎯 GOAL COMPLETION CHECK** (CRITICAL - Check FIRST!):
-   ```
-   Ask yourself: "Is my goal already achieved?"
-   for example:
-   Goal: "Set alarm to 7:30 PM"
-   Screen shows: TEXT "7:30 PM" alarm exists
-   → GOAL ACHIEVED! Return: {{"thought": "goal achieved", "action_type": "complete"}}
-   
-   Goal: "Open Gmail"
-   Screen shows: TEXT "Gmail" app visible
-   → GOAL ACHIEVED! Return: {{"thought": "goal achieved", "action_type": "complete"}}
-   
-   If you see your goal is ALREADY completed → STOP! Use action_type: "complete"
-   ```
-
-4. **GOAL CHECK**:
-   - Goal = "Open X"? → See X app? → DONE ✅
-   - Goal = "Set alarm to 7:30 PM"? → See TEXT "7:30 PM" alarm? → DONE ✅
-   - Goal = "Click/Type/Set Y"? → Must DO Y first! ❌
-
-4. **⏰ TIME PICKER SEQUENCE**:
-   ```
-   Step 1: Click hour (e.g., "7")
-   Step 2: Click minute (e.g., "30") 
-   Step 3: Click AM or PM ONCE
-   Step 4: IMMEDIATELY click OK button!
-   
-   🚨 CRITICAL: After clicking AM/PM ONCE, the NEXT action is ALWAYS clicking OK!
-   NEVER click AM/PM twice!
-   
-   Example:
-   [2] ELEMENT "07" ← Hour set
-   [3] ELEMENT "30" ← Minute set
-   [6] BUTTON "PM"
-   [22] BUTTON "OK" ← CLICK THIS NOW!
-   
-   If you see time is correct (07:30) AND OK button exists → CLICK OK!
-   ```
-
-5. **BLACKLIST**: Never click {sorted(list(self.failed_elements))}
-
-6. **EXACT VALUES**: See "📝 KEY: value"? → Use EXACT value!
-
-7. **NO DUPLICATES**: Typing skipped? → Field done, next action!
-
-8. **APP DRAWER**: App not visible? → Scroll UP!
-
-RESPONSE EXAMPLES (copy format exactly):
-- Exit AURA: {{"thought": "exit aura", "action_type": "global_action", "global_action": "BACK"}}
-- Click element: {{"thought": "click gmail", "action_type": "click", "element_id": 7}}
-- Type text: {{"thought": "type email", "action_type": "type", "element_id": 10, "text": "test@example.com"}}
-- Task done: {{"thought": "goal achieved", "action_type": "complete"}}
-
-CRITICAL: For global_action, MUST include "global_action": "BACK" or "HOME" in JSON!
-
-Respond with ONLY valid JSON, no markdown."""
+        prompt = prompt_registry.assemble("mobile_react", [
+            MOBILE_INTRO,
+            Section("goal", goal, header="GOAL: ", trim=False),
+            Section("state", state_context, trim=False),
+            Section("screen", observation.splitlines(), header="CURRENT SCREEN:\n", keep="first", priority=1),
+            Section("history", history, header="Previous thoughts:\n", keep="last", priority=0),
+            MOBILE_RULES,
+        ], reserved=MOBILE_SYSTEM.tokens, joiner="\n\n").text
         
         try:
-            response = await self.llm_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a mobile automation expert. Respond ONLY with valid JSON. Never use markdown."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.2,
-                max_tokens=500
-            )
+            response = await self.llm.ainvoke([
+                {
+                    "role": "system",
+                    "content": MOBILE_SYSTEM.text
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ])
             
-            response_text = response.choices[0].message.content.strip()
+            response_text = response.content.strip()
             logger.debug(f"🤖 Raw LLM response:\n{response_text}")
             
             json_str = self._extract_json_from_response(response_text)
@@ -997,7 +1024,11 @@ Respond with ONLY valid JSON, no markdown."""
         return None
     
     async def _execute_action_on_device(self, action: UIAction) -> ActionResult:
-        """Execute action on device"""
+        """Queue action on device and wait for the device to report its result"""
+        subscribe_to_action_results()
+        correlation_id = action_correlation_id(self.device_id, action.action_id)
+        # Register before queueing so a fast device can't report before we wait
+        broker.replies.expect(correlation_id)
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(
@@ -1005,19 +1036,40 @@ Respond with ONLY valid JSON, no markdown."""
                     json=action.model_dump(),
                     timeout=10.0
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return ActionResult(**data)
-                else:
-                    return ActionResult(
-                        action_id=action.action_id,
-                        success=False,
-                        error=f"HTTP {response.status_code}",
-                        execution_time_ms=0
-                    )
+            
+            if response.status_code != 200:
+                broker.replies.discard(correlation_id)
+                return ActionResult(
+                    action_id=action.action_id,
+                    success=False,
+                    error=f"HTTP {response.status_code}",
+                    execution_time_ms=0
+                )
+            
+            queued = ActionResult(**response.json())
+            if not queued.success:
+                # Not queued (e.g. device offline) - nothing will report back
+                broker.replies.discard(correlation_id)
+                return queued
+            
+            poller = asyncio.create_task(poll_shared_action_result(correlation_id))
+            try:
+                result = await broker.replies.wait(correlation_id, timeout=MOBILE_ACTION_RESULT_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ No result from device for {action.action_id} after {MOBILE_ACTION_RESULT_TIMEOUT}s - assuming it ran")
+                return queued
+            finally:
+                poller.cancel()
+                ACTION_OUTCOMES.pop(correlation_id, None)
+            return ActionResult(
+                action_id=action.action_id,
+                success=bool(result.get("success")),
+                error=result.get("error"),
+                execution_time_ms=int(result.get("execution_time_ms") or 0)
+            )
         
         except Exception as e:
+            broker.replies.discard(correlation_id)
             logger.error(f"❌ Error executing action: {e}")
             return ActionResult(
                 action_id=action.action_id,
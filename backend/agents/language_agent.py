@@ -7,11 +7,13 @@ import os, re, json, uuid, time, sys
 from typing import List, Dict
 import asyncio
 import logging
-from groq import Groq
-from typing import List, Dict
+from typing import List, Dict, Optional
+from pydantic import BaseModel
 from agents.utils.protocol import Channels
 from agents.utils.broker import broker
-from agents.utils.protocol import AgentMessage, MessageType, AgentType, ClarificationMessage
+from agents.utils.protocol import InternalMessage, MessageType, AgentType, ClarificationMessage
+from agents.coordinator_agent.memory.preference_miner import preference_miner
+from agents.utils.llm_cascade import model_cascade
 from dotenv import load_dotenv
 from ThinkingStepManager import ThinkingStepManager
 
@@ -22,8 +24,6 @@ logger = logging.getLogger(__name__)
 # CONFIG - GROQ API
 # -----------------------
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY") 
-MODEL_NAME = "llama-3.3-70b-versatile"
-client = Groq(api_key=GROQ_API_KEY)
 
 CONV_SAVE_PATH = "conversations.jsonl"
 TASKS_SAVE_PATH = "tasks.jsonl"
@@ -45,21 +45,32 @@ def append_jsonl(path: str, obj: dict):
 # -----------------------
 # Groq API Call
 # -----------------------
-def call_groq_api(messages: List[Dict[str, str]], max_tokens=MAX_TOKENS) -> str:
+class ClarityReply(BaseModel):
+    """Expected shape of the clarity agent's reply (see OUTPUT SCHEMA below)"""
+    is_complete: bool
+    response_text: str
+    original_task: Optional[str] = None
+
+def validate_clarity_reply(text: str) -> ClarityReply:
+    """Parse a reply the way LanguageAgent.parse_response does; raises ValueError if it does not fit"""
+    return ClarityReply.model_validate_json(text.replace("\\\\", "/").replace("\\", "/"))
+
+async def call_groq_api(messages: List[Dict[str, str]], max_tokens=MAX_TOKENS) -> str:
     if not GROQ_API_KEY:
         raise ValueError("⚠️  GROQ_API_KEY not set in .env!")
     
     try:
-        completion = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=messages,
+        # Small model first; escalates to the large one if the JSON does not validate
+        completion = await model_cascade.chat(
+            messages,
+            call_site="language_clarity",
+            validate=validate_clarity_reply,
             max_tokens=max_tokens,
             temperature=0.1,
             top_p=0.9,
-            stream=False
+            hedge=True
         )
-        text = completion.choices[0].message.content
-        return sanitize_text(text)
+        return sanitize_text(completion.content)
             
     except Exception as e:
         print(f"⚠️  Groq API Error: {e}")
@@ -276,7 +287,7 @@ class LanguageAgent:
             logger.warning(f"⚠️ Failed to parse response: {e}")
             return "I'm sorry, I didn't quite understand. Could you clarify?", False
 
-    def user_turn(self, user_text: str) -> tuple:
+    async def user_turn(self, user_text: str) -> tuple:
         """Process user input and return response"""
         user_text = sanitize_text(user_text)
         self.memory.append({"role": "user", "content": user_text})
@@ -295,7 +306,7 @@ class LanguageAgent:
                     self.memory = preserved
         
         print("   🤔 Thinking...", end=" ", flush=True)
-        response = call_groq_api(self.memory, max_tokens=200)
+        response = await call_groq_api(self.memory, max_tokens=200)
         print("✓")
         
         if not response:
@@ -315,7 +326,8 @@ class LanguageAgent:
         self._save_conversation()
         logger.info(f"🔄 Cleared conversation for session {self.session_id}")
 
-# Store active agents by session_id
+# Store active agents by session_id (worker-local: worker_router.py pins each
+# session to one worker, so these never need to be shared between processes)
 active_agents: Dict[str, LanguageAgent] = {}
 
 async def start_language_agent(broker):
@@ -439,50 +451,16 @@ async def start_language_agent(broker):
         # NEW: Send thinking update before calling agent
         await ThinkingStepManager.update_step(session_id, "Processing your request...", http_request_id)
 
-        response, is_complete = agent.user_turn(input_text)
+        response, is_complete = await agent.user_turn(input_text)
         print(f"🤖 Agent: {response}\n")
-        try:
-            _extraction_prompt = (
-                'You are a personal-info extractor. Read the user message below.\n'
-                'If it contains personal information (name, age, location, job, hobby,\n'
-                'preference, or any fact about the user), extract it.\n'
-                'If it does NOT contain personal info, return exactly: {"personal_info": null}\n\n'
-                f'USER MESSAGE: "{input_text}"\n\n'
-                'Return ONLY valid JSON, no markdown, no explanation:\n'
-                '{"personal_info": "one-sentence summary of what the user revealed, or null"}'
-            )
-            _ext_response = call_groq_api(
-                [{"role": "system", "content": _extraction_prompt}],
-                max_tokens=100
-            )
-            if _ext_response:
-                _clean = _ext_response.strip()
-                if _clean.startswith("```"):
-                    _clean = _clean.split("```")[1]
-                    if _clean.startswith("json"):
-                        _clean = _clean[4:]
-                _extracted = json.loads(_clean.strip())
-                _pi = _extracted.get("personal_info")
-                if _pi and str(_pi).lower() != "null":
-                    from agents.coordinator_agent.memory.mem0_manager import get_preference_manager
-                    _pmgr = get_preference_manager(user_id)
-                    _pmgr.add_preference(
-                        str(_pi),
-                        metadata={
-                            "category": "personal_info",
-                            "source": "language_agent",
-                            "session_id": session_id
-                        }
-                    )
-                    print(f"💾 Stored personal info: {_pi}")
-        except Exception as _ext_err:
-            logger.warning(f"⚠️ Personal info extraction (non-fatal): {_ext_err}")
+        # Personal info is mined in the background, batched with other turns
+        preference_miner.submit_turn(user_id, session_id, input_text)
         
         if is_complete:
             # NEW: Send thinking update
             await ThinkingStepManager.update_step(session_id, "Preparing for coordinator...", http_request_id)
             
-            task_msg = AgentMessage(
+            task_msg = InternalMessage(
                 message_type=MessageType.TASK_REQUEST,
                 sender=AgentType.LANGUAGE,
                 receiver=AgentType.COORDINATOR,
@@ -497,7 +475,7 @@ async def start_language_agent(broker):
             await broker.publish(Channels.LANGUAGE_TO_COORDINATOR, task_msg)
 
         else:
-            clarification_msg = AgentMessage(
+            clarification_msg = InternalMessage(
                 message_type=MessageType.CLARIFICATION_REQUEST,
                 sender=AgentType.LANGUAGE,
                 receiver=AgentType.LANGUAGE,
@@ -17,6 +17,7 @@ import json
 import re
 import httpx
 from typing import Optional, List, Dict, Any
+from agents.utils.llm_gateway import GatewayChatModel
 from agents.utils.device_protocol import (
     MobileTaskRequest, MobileTaskResult, UIAction, ActionResult,
     SemanticUITree
@@ -35,11 +36,9 @@ class MobileReActStrategy:
         self.device_id = device_id
         self.backend_url = "http://localhost:8000"
         
-        # Initialize Groq LLM
-        from groq import AsyncGroq
-        import os
-        self.llm_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+        # Groq LLM, through the shared gateway
         self.model = "llama-3.3-70b-versatile"
+        self.llm = GatewayChatModel(self.model, temperature=0.2, max_tokens=500, call_site="mobile_react")
         
         # Device state cache
         self.current_ui_tree: Optional[SemanticUITree] = None
@@ -257,23 +256,18 @@ OUTPUT FORMAT (JSON only, no other text):
 RESPOND WITH VALID JSON ONLY:"""
         
         try:
-            response = await self.llm_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a mobile automation expert. Always respond with ONLY valid JSON, no markdown, no extra text."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.2,
-                max_tokens=500
-            )
+            response = await self.llm.ainvoke([
+                {
+                    "role": "system",
+                    "content": "You are a mobile automation expert. Always respond with ONLY valid JSON, no markdown, no extra text."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ])
             
-            response_text = response.choices[0].message.content.strip()
+            response_text = response.content.strip()
             logger.debug(f"🤖 Raw LLM response:\n{response_text}")
             
             # Extract JSON
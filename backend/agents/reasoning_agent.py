@@ -1,30 +1,29 @@
-import os
 import asyncio
 import logging
 import json
 from typing import Dict, Any
 from dotenv import load_dotenv
 
-# Groq & LangChain Imports
-from langchain_groq import ChatGroq
+# LLM Gateway
+from agents.utils.llm_gateway import GatewayChatModel
 
 # Project Utilities
-from agents.utils.protocol import Channels, AgentMessage, MessageType, AgentType
+from agents.utils.protocol import Channels, AgentMessage, InternalMessage, MessageType, AgentType
 from agents.utils.broker import broker
+from agents.utils.blob_store import blob_store
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 # --- Configuration ---
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 REASONING_MODEL = "llama-3.3-70b-versatile"
 
 class ReasoningAgent:
     def __init__(self):
-        self.llm = ChatGroq(
+        self.llm = GatewayChatModel(
             model=REASONING_MODEL,
             temperature=0.2,
-            groq_api_key=GROQ_API_KEY
+            call_site="reasoning"
         )
         
         self.system_prompt = """You are the REASONING AGENT – the cognitive brain of the AURA multi-agent system.
@@ -68,7 +67,9 @@ Your goal is correctness, clarity, and usefulness to the system."""
         
         # ✅ FIX 1: Extract input_content from multiple sources
         if "input_content" in extra_params:
-            content = extra_params["input_content"]
+            # Large inputs arrive as blob references (see blob_store.py)
+            content = blob_store.resolve(extra_params["input_content"]) or ""
+            extra_params = {k: v for k, v in extra_params.items() if k != "input_content"}
             logger.info(f"📥 Using input_content from extra_params ({len(content)} chars)")
         
         # ✅ FIX 2: Clean success/failure markers from content
@@ -103,7 +104,7 @@ Your goal is correctness, clarity, and usefulness to the system."""
 
     Please respond with valid JSON only."""
 
-            response = await self.llm.ainvoke(full_prompt)
+            response = await self.llm.ainvoke(full_prompt, cache=True)
             response_text = response.content if hasattr(response, 'content') else str(response)
             logger.info(f"🤖 REASONING RESPONSE ({len(response_text)} chars): {response_text[:200]}...")
             
@@ -154,9 +155,10 @@ async def start_reasoning_agent():
         
         # FIX: Add task_id to result payload
         result["task_id"] = task_id
+        await blob_store.aexternalize(result)
 
         # Send response back to Coordinator
-        response_msg = AgentMessage(
+        response_msg = InternalMessage(
             message_type=MessageType.EXECUTION_RESPONSE,
             sender=AgentType.REASONING,
             receiver=AgentType.COORDINATOR,
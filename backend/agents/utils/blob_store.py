@@ -0,0 +1,275 @@
+"""
+Content-addressed store for large task outputs
+
+A scraped page or a reasoning result can be megabytes. Instead of riding
+inside every message payload, TaskResult and extra_params["input_content"]
+(and being copied into journals, checkpoints and logs on the way), outputs
+above BLOB_INLINE_CHARS are stored once and passed around as a reference:
+
+    blob:sha256:<hex>
+
+Blobs live in memory (LRU, BLOB_MEMORY_CHARS in total) and spill to
+BLOB_DIR when evicted. When agents run in separate processes
+(BROKER_TRANSPORT=ipc) a reference is resolved by a process that never
+saw the text, so every put() also writes through to BLOB_DIR, which they
+must share (BLOB_WRITE_THROUGH overrides). Files not read or written for
+BLOB_TTL_SECONDS are swept - each access refreshes a file's mtime, so a
+blob a checkpoint still uses stays.
+Identical outputs share one blob. Consumers resolve() a reference when they
+need the whole text or read() just a range of it (a log preview, a prompt
+hint). Both also accept plain strings, so inline values keep working.
+Code on the event loop uses aput() / aref_for() / aexternalize(), which do
+the same with the disk writes (and the periodic sweep) in a worker thread.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.utils.broker import BROKER_TRANSPORT
+
+logger = logging.getLogger(__name__)
+
+BLOB_INLINE_CHARS = int(os.getenv("BLOB_INLINE_CHARS", "4096"))
+BLOB_MEMORY_CHARS = int(os.getenv("BLOB_MEMORY_CHARS", str(64 * 1024 * 1024)))
+BLOB_DIR = os.getenv("BLOB_DIR", "blob_store")
+BLOB_TTL_SECONDS = float(os.getenv("BLOB_TTL_SECONDS", str(24 * 3600)))
+BLOB_WRITE_THROUGH = os.getenv("BLOB_WRITE_THROUGH", str(BROKER_TRANSPORT == "ipc")).lower() == "true"
+
+REF_PREFIX = "blob:sha256:"
+READ_CHUNK_CHARS = 64 * 1024
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(REF_PREFIX) and len(value) == len(REF_PREFIX) + 64
+
+
+class BlobStore:
+    """sha256-addressed text blobs: in-memory LRU spilling to disk"""
+
+    def __init__(self, directory: str = BLOB_DIR, memory_chars: int = BLOB_MEMORY_CHARS,
+                 inline_chars: int = BLOB_INLINE_CHARS, write_through: bool = BLOB_WRITE_THROUGH):
+        self.directory = directory
+        self.memory_chars = memory_chars
+        self.inline_chars = inline_chars
+        self.write_through = write_through
+        self.blobs: "OrderedDict[str, str]" = OrderedDict()
+        self.spilling: Dict[str, str] = {}  # evicted, still being written to disk
+        self.used_chars = 0
+        self._last_sweep = 0.0
+        self.stats = {"puts": 0, "dedup_hits": 0, "spilled": 0, "disk_reads": 0, "missing": 0}
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    # ---- writes ----
+
+    def put(self, text: str) -> str:
+        """Store text, returning its reference"""
+        ref, writes = self._store(text)
+        self._write(writes)
+        return ref
+
+    async def aput(self, text: str) -> str:
+        """put() for the event loop: the disk writes run in a worker thread"""
+        ref, writes = self._store(text)
+        if writes:
+            await asyncio.to_thread(self._write, writes)
+        return ref
+
+    def ref_for(self, text: str) -> str:
+        """text itself when small, else a reference to it"""
+        if is_ref(text) or len(text) <= self.inline_chars:
+            return text
+        return self.put(text)
+
+    async def aref_for(self, text: str) -> str:
+        if is_ref(text) or len(text) <= self.inline_chars:
+            return text
+        return await self.aput(text)
+
+    def externalize(self, payload: Dict[str, Any], field: str = "content") -> Dict[str, Any]:
+        """Result payload with its (large) output field replaced by a reference"""
+        value = payload.get(field)
+        if isinstance(value, str):
+            payload[field] = self.ref_for(value)
+        return payload
+
+    async def aexternalize(self, payload: Dict[str, Any], field: str = "content") -> Dict[str, Any]:
+        value = payload.get(field)
+        if isinstance(value, str):
+            payload[field] = await self.aref_for(value)
+        return payload
+
+    def _store(self, text: str) -> Tuple[str, List[Tuple[str, Optional[str]]]]:
+        """
+        Memory side of put(): the reference, and the disk writes it needs as
+        (digest, text to spill) - text None only refreshes the file's mtime.
+        """
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self.stats["puts"] += 1
+        writes: List[Tuple[str, Optional[str]]] = []
+        if digest in self.blobs:
+            self.stats["dedup_hits"] += 1
+            self.blobs.move_to_end(digest)
+            if self.write_through:
+                writes.append((digest, None))
+        else:
+            self.blobs[digest] = text
+            self.used_chars += len(text)
+            if self.write_through:
+                # Other processes resolve this reference from disk
+                writes.append((digest, text))
+            writes.extend(self._evict())
+        return REF_PREFIX + digest, writes
+
+    def _write(self, writes: List[Tuple[str, Optional[str]]]):
+        for digest, text in writes:
+            if text is None:
+                self._touch(digest)
+            else:
+                self._spill(digest, text)
+
+    def _evict(self) -> List[Tuple[str, str]]:
+        """Drop least recently used blobs over the memory budget; returns them for spilling"""
+        evicted = []
+        while self.used_chars > self.memory_chars and len(self.blobs) > 1:
+            digest, text = self.blobs.popitem(last=False)
+            self.used_chars -= len(text)
+            self.spilling[digest] = text
+            evicted.append((digest, text))
+        return evicted
+
+    def _spill(self, digest: str, text: str):
+        try:
+            self._spill_file(digest, text)
+        finally:
+            if self.spilling.get(digest) is text:
+                del self.spilling[digest]
+        self._sweep()
+
+    def _spill_file(self, digest: str, text: str):
+        path = self._path(digest)
+        if os.path.exists(path):
+            self._touch(digest)
+            return
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # A temp file per writer: processes spilling the same digest never share one
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{digest}.", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            tmp_path = None
+            self.stats["spilled"] += 1
+        except OSError as e:
+            logger.error(f"❌ Could not spill blob {digest[:12]} to disk: {e}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _sweep(self, min_interval: float = 3600.0):
+        """Delete spilled blobs older than BLOB_TTL_SECONDS"""
+        now = time.time()
+        if now - self._last_sweep < min_interval:
+            return
+        self._last_sweep = now
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if now - os.path.getmtime(path) > BLOB_TTL_SECONDS:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        if removed:
+            logger.info(f"🧹 Removed {removed} expired blob(s)")
+
+    def _touch(self, digest: str):
+        """Mark a spilled blob as used so the sweep keeps it"""
+        try:
+            os.utime(self._path(digest))
+        except OSError:
+            pass
+
+    # ---- reads ----
+
+    def exists(self, ref: str) -> bool:
+        digest = ref[len(REF_PREFIX):]
+        return digest in self.blobs or digest in self.spilling or os.path.exists(self._path(digest))
+
+    def get(self, ref: str) -> Optional[str]:
+        """Whole text of a reference, or None if it is gone"""
+        digest = ref[len(REF_PREFIX):]
+        text = self.blobs.get(digest) or self.spilling.get(digest)
+        if text is not None:
+            if digest in self.blobs:
+                self.blobs.move_to_end(digest)
+            if self.write_through:
+                self._touch(digest)
+            return text
+        try:
+            with open(self._path(digest), encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            self.stats["missing"] += 1
+            logger.warning(f"⚠️ Blob {digest[:12]} not found")
+            return None
+        self.stats["disk_reads"] += 1
+        self._touch(digest)
+        return text
+
+    def resolve(self, value: Optional[str]) -> Optional[str]:
+        """The text behind value if it is a reference, else value unchanged"""
+        return self.get(value) if is_ref(value) else value
+
+    def read(self, value: Optional[str], start: int = 0, length: Optional[int] = None) -> str:
+        """
+        Characters [start, start + length) of a reference or plain string.
+        Spilled blobs are streamed, so a prefix never loads the whole file.
+        """
+        end = None if length is None else start + length
+        if not is_ref(value):
+            return (value or "")[start:end]
+        digest = value[len(REF_PREFIX):]
+        text = self.blobs.get(digest) or self.spilling.get(digest)
+        if text is not None:
+            if self.write_through:
+                self._touch(digest)
+            return text[start:end]
+        self._touch(digest)
+        try:
+            with open(self._path(digest), encoding="utf-8") as f:
+                skip = start
+                while skip > 0:
+                    skipped = len(f.read(min(skip, READ_CHUNK_CHARS)))
+                    if not skipped:
+                        break
+                    skip -= skipped
+                self.stats["disk_reads"] += 1
+                return f.read() if length is None else f.read(length)
+        except OSError:
+            self.stats["missing"] += 1
+            return ""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "memory_blobs": len(self.blobs),
+            "memory_chars": self.used_chars,
+            "inline_chars": self.inline_chars,
+            "write_through": self.write_through,
+            **self.stats,
+        }
+
+
+blob_store = BlobStore()
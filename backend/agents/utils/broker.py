@@ -1,36 +1,726 @@
-from typing import Dict, List, Callable
-from agents.utils.protocol import AgentMessage
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from enum import Enum, IntEnum
+from typing import Dict, List, Callable, Optional, Any, Tuple
+from agents.utils.protocol import AgentMessage, InternalMessage, MessageType, AgentType, Channels
+from agents.utils.broker_journal import BrokerJournal, JOURNAL_RECOVERY
 
-class MessageBroker:
+logger = logging.getLogger(__name__)
+
+
+class DeliveryMode(str, Enum):
+    """How publish hands a message to a subscriber"""
+    DIRECT = "direct"   # await every callback inline (publisher waits for all subscribers)
+    QUEUED = "queued"   # enqueue into the subscriber's bounded queue and return immediately
+
+
+class OverflowPolicy(str, Enum):
+    """What publish does when a queued subscriber's queue is full"""
+    BLOCK = "block"              # wait until the subscriber frees a slot
+    DROP_OLDEST = "drop_oldest"  # evict the oldest queued message to make room
+    REJECT = "reject"            # discard the new message for that subscriber
+
+
+# Defaults - override per deployment via environment
+DEFAULT_DELIVERY_MODE = os.getenv("BROKER_DELIVERY_MODE", DeliveryMode.DIRECT.value)
+DEFAULT_QUEUE_MAXSIZE = int(os.getenv("BROKER_QUEUE_MAXSIZE", 1000))
+DEFAULT_OVERFLOW_POLICY = os.getenv("BROKER_OVERFLOW_POLICY", OverflowPolicy.BLOCK.value)
+BROKER_TRANSPORT = os.getenv("BROKER_TRANSPORT", "inproc")  # inproc | ipc
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("BROKER_MAX_IN_FLIGHT", 1000))
+DEFAULT_ORPHAN_TTL = float(os.getenv("BROKER_ORPHAN_TTL_SECONDS", 300))
+
+
+# Priority lanes for prioritized subscribers
+PRIORITY_AGING_MS = float(os.getenv("BROKER_PRIORITY_AGING_MS", 10000))
+LONG_TASK_SECONDS = float(os.getenv("BROKER_LONG_TASK_SECONDS", 60))
+
+
+class Priority(IntEnum):
+    """Delivery lane of a queued message (lower runs first)"""
+    CONTROL = 0     # interrupt / session control - always first, never dropped for space
+    HIGH = 1        # short, user-facing work
+    NORMAL = 2
+    LOW = 3         # long or background work
+
+
+# TaskMessage.priority / ActionTask.priority strings -> lane
+PRIORITY_NAMES = {
+    "critical": Priority.CONTROL,
+    "control": Priority.CONTROL,
+    "high": Priority.HIGH,
+    "normal": Priority.NORMAL,
+    "low": Priority.LOW,
+    "background": Priority.LOW,
+}
+
+# Control-plane topics preempt everything else
+CONTROL_TOPICS = frozenset({Channels.INTERRUPT_CONTROL, Channels.SESSION_CONTROL})
+# Channels whose session sub-topics also reach the bare channel's subscribers
+HIERARCHICAL_CHANNELS = frozenset({Channels.BROADCAST})
+
+
+def message_priority(topic: str, message: Any) -> Priority:
+    """
+    Lane for a message: control topics first, then the payload's 'priority'.
+    Normal-priority work whose 'timeout' marks it as long runs in the low lane
+    so short tasks are not stuck behind it.
+    """
+    if topic in CONTROL_TOPICS:
+        return Priority.CONTROL
+    payload = getattr(message, "payload", None)
+    if not isinstance(payload, dict):
+        return Priority.NORMAL
+    lane = PRIORITY_NAMES.get(str(payload.get("priority") or "normal").lower(), Priority.NORMAL)
+    if lane == Priority.NORMAL:
+        try:
+            if float(payload.get("timeout") or 0) > LONG_TASK_SECONDS:
+                return Priority.LOW
+        except (TypeError, ValueError):
+            pass
+    return lane
+
+
+class InFlightLimitError(RuntimeError):
+    """Raised when the request/reply table is full"""
+
+
+class DuplicateRequestError(RuntimeError):
+    """Raised when a correlation ID already has a waiter"""
+
+
+class TopicStats:
+    """Per-topic delivery counters"""
     def __init__(self):
-        self.subscribers: Dict[str, List[Callable]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+
+    def record_lag(self, lag_ms: float):
+        self.delivered += 1
+        self.last_lag_ms = lag_ms
+        self.total_lag_ms += lag_ms
+        if lag_ms > self.max_lag_ms:
+            self.max_lag_ms = lag_ms
+
+
+class LaneQueue:
+    """
+    Bounded multi-lane queue with the asyncio.Queue calls the broker uses.
+
+    get() serves the control lane first, then the highest non-empty lane -
+    except that a lane head older than aging_ms is served before fresher
+    higher-priority work, so low lanes cannot starve. Control items are
+    always accepted, even when the queue is full.
+    """
+    def __init__(self, maxsize: int, aging_ms: float = PRIORITY_AGING_MS):
+        self.maxsize = maxsize
+        self.aging = aging_ms / 1000
+        self.lanes: List[deque] = [deque() for _ in Priority]
+        self.aged = 0   # items served early because they waited past aging_ms
+        self._size = 0
+        self._changed = asyncio.Event()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= self._size
+
+    def put_nowait(self, item: Tuple[float, Any], lane: Priority = Priority.NORMAL):
+        self.lanes[lane].append(item)
+        self._size += 1
+        self._changed.set()
+
+    async def put(self, item: Tuple[float, Any], lane: Priority = Priority.NORMAL):
+        """Wait for space (BLOCK overflow); control items never wait"""
+        while lane != Priority.CONTROL and self.full():
+            self._changed.clear()
+            await self._changed.wait()
+        self.put_nowait(item, lane)
+
+    def get_nowait(self) -> Tuple[float, Any]:
+        if not self._size:
+            raise asyncio.QueueEmpty
+        return self._take(self._pick())
+
+    async def get(self) -> Tuple[float, Any]:
+        while not self._size:
+            self._changed.clear()
+            await self._changed.wait()
+        return self._take(self._pick())
+
+    def task_done(self):
+        pass
+
+    def evict(self) -> Optional[Tuple[float, Any]]:
+        """Drop the oldest item of the least important non-control lane (DROP_OLDEST)"""
+        for lane in reversed(Priority):
+            if lane != Priority.CONTROL and self.lanes[lane]:
+                return self._take(lane)
+        return None
+
+    def purge(self, predicate: Callable[[Any], bool]) -> List[Any]:
+        """Remove and return queued messages matching predicate"""
+        removed = []
+        for lane in self.lanes:
+            keep = deque()
+            for item in lane:
+                (removed if predicate(item[1]) else keep).append(item)
+            lane.clear()
+            lane.extend(keep)
+        self._size -= len(removed)
+        if removed:
+            self._changed.set()
+        return [message for _, message in removed]
+
+    def _pick(self) -> Priority:
+        if self.lanes[Priority.CONTROL]:
+            return Priority.CONTROL
+        # Starvation guard: the longest-waiting head past the aging limit goes first
+        now = time.perf_counter()
+        oldest_lane, oldest_at = None, now - self.aging
+        for lane in Priority:
+            if self.lanes[lane] and self.lanes[lane][0][0] <= oldest_at:
+                oldest_lane, oldest_at = lane, self.lanes[lane][0][0]
+        first = next(lane for lane in Priority if self.lanes[lane])
+        if oldest_lane is not None and oldest_lane != first:
+            self.aged += 1
+            return oldest_lane
+        return first
+
+    def _take(self, lane: Priority) -> Tuple[float, Any]:
+        item = self.lanes[lane].popleft()
+        self._size -= 1
+        self._changed.set()
+        return item
+
+
+class Subscriber:
+    """A single callback registered on a topic, optionally with its own queue and workers"""
+    def __init__(
+        self,
+        topic: str,
+        callback: Callable,
+        mode: DeliveryMode,
+        maxsize: int,
+        overflow: OverflowPolicy,
+        concurrency: int,
+        prioritized: bool = False
+    ):
+        self.topic = topic
+        self.callback = callback
+        self.mode = mode
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.concurrency = max(1, concurrency)
+        self.prioritized = prioritized and mode == DeliveryMode.QUEUED
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.active = True
+        self._broker: Optional["MessageBroker"] = None
+
+        if mode == DeliveryMode.QUEUED:
+            self.queue = LaneQueue(maxsize) if self.prioritized else asyncio.Queue(maxsize=maxsize)
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    def unsubscribe(self):
+        """Release this subscription (safe to call more than once)"""
+        if self._broker is not None:
+            self._broker.unsubscribe(self)
+
+
+class ReplyRouter:
+    """
+    Correlation table for request/reply over pub/sub.
+
+    A requester registers a correlation ID (message_id, task_id, ...) and
+    awaits its future; whoever produces the answer calls resolve() with the
+    same ID. Entries are always removed when the waiter finishes, and stale
+    entries whose waiter vanished are swept once they outlive orphan_ttl.
+    """
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, orphan_ttl: float = DEFAULT_ORPHAN_TTL):
+        self.max_in_flight = max_in_flight
+        self.orphan_ttl = orphan_ttl
+        self.pending: Dict[str, Tuple[asyncio.Future, float, Optional[asyncio.Task]]] = {}
+
+        # Metrics
+        self.requests = 0
+        self.replies = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.orphaned = 0    # replies with no waiter (late, unknown or duplicate)
+        self.swept = 0
+        self.latencies_ms: deque = deque(maxlen=1000)
+
+    def expect(self, correlation_id: str) -> asyncio.Future:
+        """Register a waiter for correlation_id and return its future; one waiter per ID"""
+        if correlation_id in self.pending:
+            raise DuplicateRequestError(f"{correlation_id} already has a waiter")
+
+        if len(self.pending) >= self.max_in_flight:
+            self.sweep()
+            if len(self.pending) >= self.max_in_flight:
+                self.rejected += 1
+                raise InFlightLimitError(f"{len(self.pending)} requests already in flight")
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending[correlation_id] = (future, time.perf_counter(), None)
+        self.requests += 1
+        return future
+
+    def resolve(self, correlation_id: Optional[str], result: Any) -> bool:
+        """Complete the waiter for correlation_id; False if nobody is waiting"""
+        entry = self.pending.get(correlation_id) if correlation_id else None
+        if entry is None or entry[0].done():
+            self.orphaned += 1
+            return False
+
+        future, started, _ = entry
+        future.set_result(result)
+        self.replies += 1
+        self.latencies_ms.append((time.perf_counter() - started) * 1000)
+        return True
+
+    def discard(self, correlation_id: str, future: Optional[asyncio.Future] = None):
+        """Drop a waiter (only if it still owns future, when given), cancelling it if still pending"""
+        entry = self.pending.get(correlation_id)
+        if entry is None or (future is not None and entry[0] is not future):
+            return
+        del self.pending[correlation_id]
+        if not entry[0].done():
+            entry[0].cancel()
+
+    async def wait(self, correlation_id: str, timeout: float) -> Any:
+        """
+        Await the reply registered with expect() (registering it now if not);
+        the entry is removed however the wait ends.
+        """
+        entry = self.pending.get(correlation_id)
+        if entry is None or entry[2] is not None:
+            self.expect(correlation_id)  # raises if another waiter owns it
+            entry = self.pending[correlation_id]
+        future, started, _ = entry
+        self.pending[correlation_id] = (future, started, asyncio.current_task())
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.discard(correlation_id, future)
+
+    def sweep(self):
+        """Remove completed entries and entries older than orphan_ttl that nobody awaits any more"""
+        now = time.perf_counter()
+        for cid, (future, started, waiter) in list(self.pending.items()):
+            abandoned = waiter is None or waiter.done()
+            if future.done() or (now - started > self.orphan_ttl and abandoned):
+                self.discard(cid)
+                self.swept += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+
+        def pct(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+        return {
+            "in_flight": len(self.pending),
+            "max_in_flight": self.max_in_flight,
+            "requests": self.requests,
+            "replies": self.replies,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "orphaned_replies": self.orphaned,
+            "swept": self.swept,
+            "latency_ms_p50": pct(0.50),
+            "latency_ms_p95": pct(0.95),
+            "latency_ms_max": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+
+class MessageBroker:
+    def __init__(
+        self,
+        delivery_mode: str = DEFAULT_DELIVERY_MODE,
+        queue_maxsize: int = DEFAULT_QUEUE_MAXSIZE,
+        overflow: str = DEFAULT_OVERFLOW_POLICY
+    ):
+        self.subscribers: Dict[str, List[Subscriber]] = {}
+        self.stats: Dict[str, TopicStats] = {}
+        self.delivery_mode = DeliveryMode(delivery_mode)
+        self.queue_maxsize = queue_maxsize
+        self.overflow = OverflowPolicy(overflow)
+        self.replies = ReplyRouter()
+        self.journal: Optional[BrokerJournal] = None
         self._running = False # Add a running state
 
     async def start(self):
         """Initializes the broker (e.g., connects to Redis, starts threads)."""
-        # For this in-memory broker, simply set the running state.
+        # For this in-memory broker, set the running state and spin up queued workers.
         self._running = True
-        print("MessageBroker started.") 
+        for subs in self.subscribers.values():
+            for sub in subs:
+                self._start_workers(sub)
+        if self.journal:
+            await self.journal.start()
+        print("MessageBroker started.")
 
     async def stop(self):
         """Cleans up broker resources (e.g., closes connections)."""
-        # For this in-memory broker, simply set the running state.
         self._running = False
+        workers = [w for subs in self.subscribers.values() for sub in subs for w in sub.workers]
+        for worker in workers:
+            worker.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+        for subs in self.subscribers.values():
+            for sub in subs:
+                sub.workers.clear()
+        if self.journal:
+            await self.journal.stop()
         print("MessageBroker stopped.")
-        
+
     # Helper property for health check in server.py
     @property
     def running(self):
         return self._running
 
-    def subscribe(self, topic: str, callback: Callable):
+    def subscribe(
+        self,
+        topic: str,
+        callback: Callable,
+        queued: Optional[bool] = None,
+        maxsize: Optional[int] = None,
+        overflow: Optional[OverflowPolicy] = None,
+        concurrency: int = 1,
+        prioritized: bool = False
+    ) -> Subscriber:
+        """
+        Register a callback on a topic.
+
+        Args:
+            queued: Force queued (True) or direct (False) delivery; None uses the broker default
+            maxsize: Queue bound for queued delivery
+            overflow: Policy applied when the queue is full
+            concurrency: Number of worker tasks draining the queue (1 keeps per-subscriber FIFO order)
+            prioritized: Serve the queue by priority lane (see message_priority) instead of FIFO
+        """
+        if queued is None:
+            mode = self.delivery_mode
+        else:
+            mode = DeliveryMode.QUEUED if queued else DeliveryMode.DIRECT
+
+        sub = Subscriber(
+            topic,
+            callback,
+            mode,
+            maxsize if maxsize is not None else self.queue_maxsize,
+            OverflowPolicy(overflow) if overflow is not None else self.overflow,
+            concurrency,
+            prioritized
+        )
+
+        sub._broker = self
+
         if topic not in self.subscribers:
             self.subscribers[topic] = []
-        self.subscribers[topic].append(callback)
+        self.subscribers[topic].append(sub)
+        self.stats.setdefault(topic, TopicStats())
+
+        self._start_workers(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        """Remove a subscription and stop its workers; empty topics are dropped entirely"""
+        if not sub.active:
+            return
+        sub.active = False
+
+        subs = self.subscribers.get(sub.topic)
+        if subs and sub in subs:
+            subs.remove(sub)
+            if not subs:
+                del self.subscribers[sub.topic]
+                self.stats.pop(sub.topic, None)
+
+        for worker in sub.workers:
+            worker.cancel()
+        sub.workers.clear()
+
+    def enable_journal(self, journal: BrokerJournal):
+        """Journal messages on journal.topics until their reply is resolved"""
+        self.journal = journal
+
+    async def route_count(self, topic: str) -> int:
+        """Number of subscribers a publish on topic would reach"""
+        return sum(len(self.subscribers.get(t, ())) for t in self._topic_chain(topic))
+
+    async def publish_routed(self, topic: str, message: AgentMessage) -> int:
+        """publish() and return how many subscribers it reached (0: nobody got it)"""
+        reached = await self.route_count(topic)
+        await self.publish(topic, message)
+        return reached
+
+    async def recover_journal(self, policy: str = JOURNAL_RECOVERY, replay_wait: float = 120.0):
+        """
+        Handle requests left unacknowledged by a crash.
+
+        policy="replay" re-publishes each EXECUTION_REQUEST once its topic has a
+        subscriber again (in any process, see route_count) and acknowledges it
+        only once the publish reached one; policy="fail" (or no delivery within
+        replay_wait) acknowledges it and tells the session the task was lost.
+        """
+        if not self.journal:
+            return
+
+        for record in self.journal.recover():
+            message = record.message
+            if getattr(message, "message_type", None) != MessageType.EXECUTION_REQUEST.value:
+                self.journal.ack(record.offset)
+                continue
+
+            if policy == "replay":
+                deadline = time.monotonic() + replay_wait
+                replayed = False
+                while True:
+                    if await self.route_count(record.topic):
+                        logger.info(f"🔁 Replaying journaled task {message.task_id} on '{record.topic}'")
+                        # The publish journals the task again; the old record goes once it was delivered
+                        replayed = bool(await self.publish_routed(record.topic, message))
+                        if not replayed:
+                            # The subscriber left in between - drop the new record, keep waiting
+                            self.journal.ack_key(message.task_id or message.message_id)
+                    if replayed or time.monotonic() >= deadline:
+                        break
+                    await asyncio.sleep(0.5)
+                if replayed:
+                    self.journal.ack(record.offset)
+                    continue
+
+            logger.warning(f"⚠️ Failing journaled task {message.task_id} interrupted by restart")
+            self.journal.ack(record.offset)
+            if message.session_id:
+                await self.publish(
+                    Channels.session_topic(Channels.BROADCAST, message.session_id),
+                    InternalMessage(
+                        message_type=MessageType.STATUS_UPDATE,
+                        sender=AgentType.COORDINATOR,
+                        receiver=AgentType.LANGUAGE,
+                        session_id=message.session_id,
+                        task_id=message.task_id,
+                        payload={
+                            "action": "task_failed",
+                            "task_id": message.task_id,
+                            "error": "Task was interrupted by a backend restart",
+                            "session_id": message.session_id
+                        }
+                    )
+                )
+
+    @staticmethod
+    def _topic_chain(topic: str) -> List[str]:
+        """'broadcast.sess_1' -> ['broadcast.sess_1', 'broadcast']; other topics match only themselves"""
+        channel, dot, _ = topic.partition(".")
+        if dot and channel in HIERARCHICAL_CHANNELS:
+            return [topic, channel]
+        return [topic]
 
     async def publish(self, topic: str, message: AgentMessage):
-        if topic in self.subscribers:
-            for callback in self.subscribers[topic]:
-                await callback(message)
+        """
+        Deliver to subscribers of the topic and, for session sub-topics of
+        HIERARCHICAL_CHANNELS, of the bare channel - so a publish to
+        'broadcast.<session_id>' reaches that session's listeners plus anyone
+        on 'broadcast' without touching other sessions.
+        """
+        if self.journal and topic in self.journal.topics:
+            self.journal.append(topic, message)
+
+        control = topic in CONTROL_TOPICS
+        lane = None
+
+        for match in self._topic_chain(topic):
+            subs = self.subscribers.get(match)
+            if not subs:
+                continue
+
+            stats = self.stats.get(match)
+            if stats is None:
+                stats = self.stats[match] = TopicStats()
+            stats.published += 1
+
+            for sub in list(subs):
+                if sub.mode == DeliveryMode.DIRECT or (control and not sub.prioritized):
+                    # Control-plane messages never wait behind a FIFO backlog
+                    started = time.perf_counter()
+                    await sub.callback(message)
+                    stats.record_lag((time.perf_counter() - started) * 1000)
+                else:
+                    if lane is None and sub.prioritized:
+                        lane = message_priority(topic, message)
+                    await self._enqueue(sub, message, stats, lane)
+
+    async def request(
+        self,
+        topic: str,
+        message: AgentMessage,
+        timeout: float,
+        correlation_id: Optional[str] = None
+    ) -> Any:
+        """
+        Publish a message and wait for its correlated reply.
+
+        The reply is whatever the responder passes to resolve() under the same
+        correlation ID (defaults to message.message_id). Raises
+        asyncio.TimeoutError on timeout and InFlightLimitError when the reply
+        table is full.
+        """
+        cid = correlation_id or message.message_id
+        self.replies.expect(cid)
+        try:
+            await self.publish(topic, message)
+        except BaseException:
+            self.replies.discard(cid)
+            raise
+        try:
+            return await self.replies.wait(cid, timeout)
+        finally:
+            # Timed out or answered - either way the journaled request is settled
+            if self.journal:
+                self.journal.ack_key(cid)
+
+    def resolve(self, correlation_id: Optional[str], result: Any) -> bool:
+        """Route a reply to the waiting requester; False if none is waiting"""
+        if self.journal:
+            # A reply settles the journaled request even when nobody waits (e.g. a replay)
+            self.journal.ack_key(correlation_id)
+        return self.replies.resolve(correlation_id, result)
+
+    async def _enqueue(self, sub: Subscriber, message: Any, stats: TopicStats, lane: Optional[Priority] = None):
+        """Hand a message to a queued subscriber according to its overflow policy"""
+        if not sub.active:
+            return
+        item = (time.perf_counter(), message)
+
+        if sub.prioritized and lane == Priority.CONTROL:
+            sub.queue.put_nowait(item, lane)
+        else:
+            if sub.queue.full():
+                if sub.overflow == OverflowPolicy.REJECT:
+                    stats.rejected += 1
+                    logger.warning(f"⚠️ Broker queue full on '{sub.topic}' - rejected message")
+                    return
+                if sub.overflow == OverflowPolicy.DROP_OLDEST:
+                    try:
+                        if sub.prioritized:
+                            sub.queue.evict()
+                        else:
+                            sub.queue.get_nowait()
+                            sub.queue.task_done()
+                        stats.dropped += 1
+                    except asyncio.QueueEmpty:
+                        pass
+
+            if sub.prioritized:
+                await sub.queue.put(item, lane if lane is not None else Priority.NORMAL)
+            else:
+                await sub.queue.put(item)
+        if sub.queue.qsize() > stats.max_depth:
+            stats.max_depth = sub.queue.qsize()
+
+    def purge(self, topic: str, predicate: Callable[[Any], bool]) -> List[Any]:
+        """
+        Remove still-queued messages matching predicate from prioritized
+        subscribers of topic (e.g. a stopped session's pending tasks).
+        Returns the removed messages so the caller can answer their requesters.
+        """
+        removed = []
+        for sub in self.subscribers.get(topic, []):
+            if sub.prioritized:
+                removed.extend(sub.queue.purge(predicate))
+        if removed and topic in self.stats:
+            self.stats[topic].dropped += len(removed)
+        return removed
+
+    def _start_workers(self, sub: Subscriber):
+        """Spawn worker tasks for a queued subscriber (needs a running loop)"""
+        if sub.mode != DeliveryMode.QUEUED or sub.workers:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop yet - start() will pick this subscriber up
+            return
+        for _ in range(sub.concurrency):
+            sub.workers.append(asyncio.create_task(self._worker(sub)))
+
+    async def _worker(self, sub: Subscriber):
+        """Drain one subscriber's queue, isolating the publisher from slow callbacks"""
+        stats = self.stats.setdefault(sub.topic, TopicStats())
+        while True:
+            enqueued_at, message = await sub.queue.get()
+            stats.record_lag((time.perf_counter() - enqueued_at) * 1000)
+            try:
+                await sub.callback(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"❌ Subscriber on '{sub.topic}' failed: {e}", exc_info=True)
+            finally:
+                sub.queue.task_done()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-topic queue depth and lag counters"""
+        report = {}
+        for topic, stats in self.stats.items():
+            subs = self.subscribers.get(topic, [])
+            report[topic] = {
+                "subscribers": len(subs),
+                "prioritized_subscribers": sum(1 for s in subs if s.prioritized),
+                "queued_subscribers": sum(1 for s in subs if s.mode == DeliveryMode.QUEUED),
+                "queue_depth": sum(s.depth for s in subs),
+                "max_depth": stats.max_depth,
+                "published": stats.published,
+                "delivered": stats.delivered,
+                "dropped": stats.dropped,
+                "rejected": stats.rejected,
+                "failed": stats.failed,
+                "lag_ms_last": round(stats.last_lag_ms, 3),
+                "lag_ms_max": round(stats.max_lag_ms, 3),
+                "lag_ms_avg": round(stats.total_lag_ms / stats.delivered, 3) if stats.delivered else 0.0,
+            }
+            lane_subs = [s for s in subs if s.prioritized]
+            if lane_subs:
+                report[topic]["lanes"] = {
+                    lane.name.lower(): sum(len(s.queue.lanes[lane]) for s in lane_subs) for lane in Priority
+                }
+                report[topic]["aged"] = sum(s.queue.aged for s in lane_subs)
+        return report
+
+def create_broker(transport: str = BROKER_TRANSPORT) -> MessageBroker:
+    """Build the process-wide broker for the configured transport"""
+    if transport == "ipc":
+        # Imported lazily: the IPC transport subclasses MessageBroker
+        from agents.utils.broker_ipc import IPCMessageBroker
+        return IPCMessageBroker()
+    return MessageBroker()
 
-broker = MessageBroker()
\ No newline at end of file
+broker = create_broker()
@@ -0,0 +1,339 @@
+"""
+Multi-process broker transport
+
+Lets agents run in separate worker processes while keeping the
+MessageBroker subscribe/publish API. A small local daemon routes frames
+between processes over a Unix domain socket (or localhost TCP where Unix
+sockets are unavailable, e.g. Windows):
+
+    server.py (hosts daemon)  <──socket──>  agent_worker.py execution
+                              <──socket──>  agent_worker.py reasoning
+
+Each process keeps its own in-process subscribers. publish() delivers to
+local subscribers first and forwards one frame to the daemon, which fans
+it out to every *other* connected process subscribed to the topic or one
+of its parents.
+
+Wire format: 4-byte big-endian length + UTF-8 JSON object.
+    {"op": "sub",   "topic": "..."}
+    {"op": "unsub", "topic": "..."}
+    {"op": "pub",   "topic": "...", "kind": "agent" | "raw", "message": {...}[, "id": n]}
+    {"op": "route", "topic": "...", "id": n}
+
+A "route" query, or a "pub" carrying an id, is answered to the sender with
+{"op": "reply", "id": n, "subscribers" | "delivered": count} - how many
+other processes are subscribed / got the frame.
+
+Run a standalone daemon with:  python -m agents.utils.broker_ipc
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import struct
+import sys
+from typing import Any, Dict, Optional, Set, Tuple
+
+from agents.utils.broker import MessageBroker, Subscriber
+from agents.utils.protocol import AgentMessage, AGENT_MESSAGE_TYPES, InternalMessage
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_ADDRESS = "tcp://127.0.0.1:8765" if sys.platform == "win32" else "/tmp/aura_broker.sock"
+BROKER_ADDRESS = os.getenv("BROKER_ADDRESS", _DEFAULT_ADDRESS)
+
+# Frames waiting in a slow client's socket buffer before the daemon starts dropping
+MAX_CLIENT_BUFFER_BYTES = int(os.getenv("BROKER_MAX_CLIENT_BUFFER", 16 * 1024 * 1024))
+
+_HEADER = struct.Struct(">I")
+
+
+# ============================================================================
+# Framing helpers
+# ============================================================================
+
+def encode_frame(obj: Dict[str, Any]) -> bytes:
+    body = json.dumps(obj, default=str, ensure_ascii=False).encode("utf-8")
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[Dict[str, Any], bytes]:
+    """Read one frame; returns (decoded object, raw frame bytes)"""
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    body = await reader.readexactly(length)
+    return json.loads(body), header + body
+
+
+def _parse_address(address: str) -> Tuple[str, Any]:
+    """'tcp://host:port' -> ('tcp', (host, port)); anything else is a Unix socket path"""
+    if address.startswith("tcp://"):
+        host, port = address[len("tcp://"):].rsplit(":", 1)
+        return "tcp", (host, int(port))
+    return "unix", address
+
+
+async def open_connection(address: str = BROKER_ADDRESS):
+    kind, target = _parse_address(address)
+    if kind == "tcp":
+        return await asyncio.open_connection(*target)
+    return await asyncio.open_unix_connection(target)
+
+
+# ============================================================================
+# Daemon
+# ============================================================================
+
+class BrokerDaemon:
+    """Routes published frames between broker client processes"""
+
+    def __init__(self, address: str = BROKER_ADDRESS):
+        self.address = address
+        self.routes: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self.clients: Dict[asyncio.StreamWriter, Set[str]] = {}
+        self.forwarded = 0
+        self.dropped = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        kind, target = _parse_address(self.address)
+        if kind == "tcp":
+            self._server = await asyncio.start_server(self._handle_client, *target)
+        else:
+            # Remove a stale socket left behind by a crashed daemon
+            if os.path.exists(target):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._handle_client, path=target)
+        logger.info(f"✅ Broker daemon listening on {self.address}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in list(self.clients):
+            writer.close()
+        self.clients.clear()
+        self.routes.clear()
+        kind, target = _parse_address(self.address)
+        if kind == "unix" and os.path.exists(target):
+            os.unlink(target)
+        logger.info("🛑 Broker daemon stopped")
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients[writer] = set()
+        logger.info(f"🔌 Broker client connected ({len(self.clients)} total)")
+        try:
+            while True:
+                frame, raw = await read_frame(reader)
+                op = frame.get("op")
+                topic = frame.get("topic", "")
+
+                if op == "pub":
+                    delivered = self._route(topic, raw, origin=writer)
+                    if "id" in frame:
+                        writer.write(encode_frame({"op": "reply", "id": frame["id"], "delivered": delivered}))
+                elif op == "route":
+                    subscribers = len(self._targets(topic, origin=writer))
+                    writer.write(encode_frame({"op": "reply", "id": frame.get("id"), "subscribers": subscribers}))
+                elif op == "sub":
+                    self.routes.setdefault(topic, set()).add(writer)
+                    self.clients[writer].add(topic)
+                elif op == "unsub":
+                    self._remove_route(topic, writer)
+                    self.clients[writer].discard(topic)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Client went away, or the daemon is shutting down
+            pass
+        except Exception as e:
+            logger.error(f"❌ Broker daemon client error: {e}")
+        finally:
+            for topic in self.clients.pop(writer, set()):
+                self._remove_route(topic, writer)
+            writer.close()
+            logger.info(f"🔌 Broker client disconnected ({len(self.clients)} remaining)")
+
+    def _remove_route(self, topic: str, writer: asyncio.StreamWriter):
+        writers = self.routes.get(topic)
+        if writers is not None:
+            writers.discard(writer)
+            if not writers:
+                del self.routes[topic]
+
+    def _targets(self, topic: str, origin: asyncio.StreamWriter) -> Set[asyncio.StreamWriter]:
+        """Processes subscribed to topic or one of its parents, except origin"""
+        targets: Set[asyncio.StreamWriter] = set()
+        for match in MessageBroker._topic_chain(topic):
+            targets.update(self.routes.get(match, ()))
+        targets.discard(origin)
+        return targets
+
+    def _route(self, topic: str, raw: bytes, origin: asyncio.StreamWriter) -> int:
+        """Forward a pub frame verbatim to each subscribed process except the sender; returns how many got it"""
+        delivered = 0
+        for writer in self._targets(topic, origin):
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER_BYTES:
+                self.dropped += 1
+                logger.warning(f"⚠️ Broker daemon dropping frame for slow client on '{topic}'")
+                continue
+            writer.write(raw)
+            self.forwarded += 1
+            delivered += 1
+        return delivered
+
+
+# ============================================================================
+# Client transport
+# ============================================================================
+
+class IPCMessageBroker(MessageBroker):
+    """MessageBroker that also exchanges messages with other processes via the daemon"""
+
+    def __init__(self, address: str = BROKER_ADDRESS, **kwargs):
+        super().__init__(**kwargs)
+        self.address = address
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._dispatch_tasks: Set[asyncio.Task] = set()
+        self._queries: Dict[int, asyncio.Future] = {}
+        self._query_ids = itertools.count()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def start(self, connect_retries: int = 50, retry_delay: float = 0.1):
+        await super().start()
+        for attempt in range(connect_retries):
+            try:
+                self._reader, self._writer = await open_connection(self.address)
+                break
+            except (ConnectionError, FileNotFoundError, OSError):
+                await asyncio.sleep(retry_delay)
+        else:
+            logger.error(f"❌ Could not reach broker daemon at {self.address} - running in-process only")
+            return
+
+        # Announce topics that were subscribed before the connection existed
+        for topic in self.subscribers:
+            self._writer.write(encode_frame({"op": "sub", "topic": topic}))
+        await self._writer.drain()
+
+        self._reader_task = asyncio.create_task(self._read_loop())
+        logger.info(f"✅ Connected to broker daemon at {self.address}")
+
+    async def stop(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+        for task in list(self._dispatch_tasks):
+            task.cancel()
+        if self._writer:
+            self._writer.close()
+        self._reader = self._writer = None
+        await super().stop()
+
+    async def route_count(self, topic: str) -> int:
+        """Local subscribers plus the other processes the daemon would route topic to"""
+        local = await super().route_count(topic)
+        if not self.connected:
+            return local
+        reply = await self._query({"op": "route", "topic": topic})
+        return local + reply.get("subscribers", 0)
+
+    async def publish_routed(self, topic: str, message: AgentMessage) -> int:
+        """publish() and return how many local subscribers and remote processes it reached"""
+        local = await super().route_count(topic)
+        await MessageBroker.publish(self, topic, message)
+        if not self.connected:
+            return local
+        reply = await self._query(self._pub_frame(topic, message))
+        return local + reply.get("delivered", 0)
+
+    async def _query(self, frame: Dict[str, Any], timeout: float = 5.0) -> Dict[str, Any]:
+        """Send a frame the daemon answers with a reply; {} if none arrives in time"""
+        query_id = next(self._query_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._queries[query_id] = future
+        try:
+            self._writer.write(encode_frame({**frame, "id": query_id}))
+            await self._writer.drain()
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            return {}
+        finally:
+            self._queries.pop(query_id, None)
+
+    def subscribe(self, topic: str, callback, **kwargs) -> Subscriber:
+        is_new_topic = topic not in self.subscribers
+        sub = super().subscribe(topic, callback, **kwargs)
+        if is_new_topic and self.connected:
+            self._writer.write(encode_frame({"op": "sub", "topic": topic}))
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        super().unsubscribe(sub)
+        if sub.topic not in self.subscribers and self.connected:
+            self._writer.write(encode_frame({"op": "unsub", "topic": sub.topic}))
+
+    async def publish(self, topic: str, message: AgentMessage):
+        """Deliver locally, then forward to other processes through the daemon"""
+        await super().publish(topic, message)
+
+        if not self.connected:
+            return
+        self._writer.write(encode_frame(self._pub_frame(topic, message)))
+        await self._writer.drain()
+
+    @staticmethod
+    def _pub_frame(topic: str, message: Any) -> Dict[str, Any]:
+        if isinstance(message, AGENT_MESSAGE_TYPES):
+            return {"op": "pub", "topic": topic, "kind": "agent", "message": message.model_dump(mode="json")}
+        return {"op": "pub", "topic": topic, "kind": "raw", "message": message}
+
+    async def _read_loop(self):
+        try:
+            while True:
+                frame, _ = await read_frame(self._reader)
+                if frame.get("op") == "reply":
+                    future = self._queries.get(frame.get("id"))
+                    if future is not None and not future.done():
+                        future.set_result(frame)
+                    continue
+                if frame.get("op") != "pub":
+                    continue
+                message = frame.get("message")
+                if frame.get("kind") == "agent":
+                    # Frames come from our own processes; skip re-validation
+                    message = InternalMessage.from_dict(message)
+
+                # Dispatch off the read loop so a long-running local callback
+                # (e.g. a desktop execution) never blocks interrupts behind it
+                task = asyncio.create_task(MessageBroker.publish(self, frame["topic"], message))
+                self._dispatch_tasks.add(task)
+                task.add_done_callback(self._dispatch_done)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.error("❌ Lost connection to broker daemon")
+        except asyncio.CancelledError:
+            raise
+
+    def _dispatch_done(self, task: asyncio.Task):
+        self._dispatch_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"❌ Remote message dispatch failed: {task.exception()}")
+
+
+async def run_daemon(address: str = BROKER_ADDRESS):
+    daemon = BrokerDaemon(address)
+    await daemon.start()
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await daemon.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_daemon())
@@ -0,0 +1,349 @@
+"""
+Durable append-only journal for selected broker topics
+
+Messages published on journaled topics (by default the coordinator's
+execution/reasoning requests) are appended to memory-mapped, pre-allocated
+segment files before delivery. Replies acknowledge them by correlation key
+(task_id / message_id). After a crash, whatever was never acknowledged is
+handed back by recover() so the broker can replay it or fail it fast.
+
+Layout (BROKER_JOURNAL_DIR):
+    segment_<first offset>.log   records, zero-filled tail marks the end
+    acks.log                     8-byte big-endian acknowledged offsets
+
+Record: header (length, crc32, offset) + UTF-8 JSON
+    {"topic": ..., "kind": "agent" | "raw", "message": {...}, "ts": ...}
+
+Appends are a memcpy into the mapped segment; a background flusher msyncs
+dirty segments every flush interval (group commit), so publishers never
+wait on disk I/O. The durability window is one flush interval.
+"""
+import asyncio
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from agents.utils.protocol import AGENT_MESSAGE_TYPES, InternalMessage
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_ENABLED = os.getenv("BROKER_JOURNAL", "0") == "1"
+JOURNAL_DIR = os.getenv("BROKER_JOURNAL_DIR", "broker_journal")
+JOURNAL_TOPICS = os.getenv("BROKER_JOURNAL_TOPICS", "coordinator.to.execution,coordinator.to.reasoning")
+JOURNAL_SEGMENT_BYTES = int(os.getenv("BROKER_JOURNAL_SEGMENT_BYTES", 16 * 1024 * 1024))
+JOURNAL_FLUSH_MS = float(os.getenv("BROKER_JOURNAL_FLUSH_MS", 5))
+JOURNAL_RECOVERY = os.getenv("BROKER_JOURNAL_RECOVERY", "fail")  # fail | replay
+
+_RECORD_HEADER = struct.Struct(">IIQ")  # body length, crc32, offset
+_ACK = struct.Struct(">Q")
+
+
+class JournalRecord:
+    """One recovered, unacknowledged journal entry"""
+    __slots__ = ("offset", "topic", "message", "timestamp")
+
+    def __init__(self, offset: int, topic: str, message: Any, timestamp: float):
+        self.offset = offset
+        self.topic = topic
+        self.message = message
+        self.timestamp = timestamp
+
+
+class _Segment:
+    """A pre-allocated, memory-mapped segment file"""
+
+    def __init__(self, path: str, size: int, first_offset: int):
+        self.path = path
+        self.first_offset = first_offset
+        self.last_offset = first_offset - 1
+        self.pos = 0
+        self.dirty = False
+
+        exists = os.path.exists(path)
+        self._file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(size)
+        self.size = os.path.getsize(path)
+        self.mm = mmap.mmap(self._file.fileno(), self.size)
+
+    def scan(self) -> List[Tuple[int, bytes]]:
+        """Read back valid records, stopping at the zero tail or a torn write"""
+        records = []
+        pos = 0
+        while pos + _RECORD_HEADER.size <= self.size:
+            length, crc, offset = _RECORD_HEADER.unpack_from(self.mm, pos)
+            if length == 0:
+                break
+            start = pos + _RECORD_HEADER.size
+            body = bytes(self.mm[start:start + length])
+            if len(body) != length or zlib.crc32(body) != crc:
+                logger.warning(f"⚠️ Torn journal record in {os.path.basename(self.path)} at byte {pos}")
+                break
+            records.append((offset, body))
+            self.last_offset = offset
+            pos = start + length
+        self.pos = pos
+        return records
+
+    def fits(self, n: int) -> bool:
+        return self.pos + n <= self.size
+
+    def write(self, offset: int, body: bytes):
+        header = _RECORD_HEADER.pack(len(body), zlib.crc32(body), offset)
+        end = self.pos + len(header) + len(body)
+        self.mm[self.pos:self.pos + len(header)] = header
+        self.mm[self.pos + len(header):end] = body
+        self.pos = end
+        self.last_offset = offset
+        self.dirty = True
+
+    def flush(self):
+        if self.dirty and not self.mm.closed:
+            self.dirty = False
+            try:
+                self.mm.flush()
+            except ValueError:
+                # Segment was reclaimed while a background flush was running
+                pass
+
+    def close(self):
+        self.flush()
+        self.mm.close()
+        self._file.close()
+
+
+class BrokerJournal:
+    """Segment-rotated, memory-mapped message journal with acknowledgement offsets"""
+
+    def __init__(
+        self,
+        directory: str = JOURNAL_DIR,
+        topics: Optional[Set[str]] = None,
+        segment_bytes: int = JOURNAL_SEGMENT_BYTES,
+        flush_interval_ms: float = JOURNAL_FLUSH_MS
+    ):
+        self.directory = directory
+        self.topics = topics if topics is not None else {t.strip() for t in JOURNAL_TOPICS.split(",") if t.strip()}
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval_ms / 1000
+
+        self.segments: List[_Segment] = []
+        self.next_offset = 0
+        self.unacked: Dict[int, str] = {}     # offset -> topic
+        self.keys: Dict[str, int] = {}        # correlation key -> offset
+        self._offset_keys: Dict[int, Tuple[str, ...]] = {}
+        self._recovered: List[JournalRecord] = []
+        self._ack_file = None
+        self._acks_dirty = False
+        self._flusher: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.appended = 0
+        self.acked = 0
+        self.flushes = 0
+        self.append_us_total = 0.0
+
+        self._open()
+
+    # ------------------------------------------------------------------
+    # Startup / recovery
+    # ------------------------------------------------------------------
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+        acked: Set[int] = set()
+        ack_path = os.path.join(self.directory, "acks.log")
+        if os.path.exists(ack_path):
+            with open(ack_path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % _ACK.size
+            acked = {_ACK.unpack_from(data, i)[0] for i in range(0, usable, _ACK.size)}
+
+        for path in sorted(glob.glob(os.path.join(self.directory, "segment_*.log"))):
+            first = int(os.path.basename(path)[len("segment_"):-len(".log")])
+            segment = _Segment(path, self.segment_bytes, first)
+            for offset, body in segment.scan():
+                self.next_offset = max(self.next_offset, offset + 1)
+                if offset in acked:
+                    continue
+                try:
+                    record = json.loads(body)
+                except ValueError:
+                    continue
+                message = record.get("message")
+                if record.get("kind") == "agent":
+                    try:
+                        message = InternalMessage.from_dict(message)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Skipping undecodable journal record {offset}: {e}")
+                        continue
+                self.unacked[offset] = record.get("topic", "")
+                if isinstance(message, AGENT_MESSAGE_TYPES):
+                    keys = tuple(k for k in (message.task_id, message.message_id) if k)
+                    for key in keys:
+                        self.keys[key] = offset
+                    self._offset_keys[offset] = keys
+                self._recovered.append(JournalRecord(offset, record.get("topic", ""), message, record.get("ts", 0.0)))
+            self.segments.append(segment)
+
+        # Drop fully acknowledged segments, keep the newest one for appends
+        for segment in self.segments[:-1]:
+            if not self._segment_has_unacked(segment):
+                self._delete_segment(segment)
+        self.segments = [s for s in self.segments if s.mm is not None and not s.mm.closed]
+
+        # Rewrite the ack log with only the offsets that still matter
+        live = {o for o in acked if any(s.first_offset <= o <= s.last_offset for s in self.segments)}
+        with open(ack_path, "wb") as f:
+            for offset in sorted(live):
+                f.write(_ACK.pack(offset))
+        self._ack_file = open(ack_path, "ab")
+
+        if not self.segments:
+            self._new_segment(self.segment_bytes)
+
+        if self._recovered:
+            logger.warning(f"⚠️ Broker journal recovered {len(self._recovered)} unacknowledged message(s)")
+        logger.info(f"✅ Broker journal open at {self.directory} (next offset {self.next_offset})")
+
+    def recover(self) -> List[JournalRecord]:
+        """Unacknowledged records found at startup (handed out once)"""
+        records, self._recovered = self._recovered, []
+        return records
+
+    # ------------------------------------------------------------------
+    # Append / ack
+    # ------------------------------------------------------------------
+
+    def append(self, topic: str, message: Any) -> int:
+        """Journal a message; returns its offset. Durable after the next group commit."""
+        started = time.perf_counter()
+
+        if isinstance(message, AGENT_MESSAGE_TYPES):
+            record = {"topic": topic, "kind": "agent", "message": message.model_dump(mode="json"), "ts": time.time()}
+            keys = tuple(k for k in (message.task_id, message.message_id) if k)
+        else:
+            record = {"topic": topic, "kind": "raw", "message": message, "ts": time.time()}
+            keys = ()
+        body = json.dumps(record, default=str, ensure_ascii=False).encode("utf-8")
+
+        needed = _RECORD_HEADER.size + len(body)
+        segment = self.segments[-1]
+        if not segment.fits(needed):
+            segment = self._rotate(needed)
+
+        offset = self.next_offset
+        self.next_offset += 1
+        segment.write(offset, body)
+
+        self.unacked[offset] = topic
+        for key in keys:
+            self.keys[key] = offset
+        self._offset_keys[offset] = keys
+
+        self.appended += 1
+        self.append_us_total += (time.perf_counter() - started) * 1_000_000
+        return offset
+
+    def ack_key(self, key: Optional[str]) -> bool:
+        """Acknowledge the message journaled under a correlation key"""
+        offset = self.keys.get(key) if key else None
+        if offset is None:
+            return False
+        return self.ack(offset)
+
+    def ack(self, offset: int) -> bool:
+        if self.unacked.pop(offset, None) is None:
+            return False
+        for key in self._offset_keys.pop(offset, ()):
+            if self.keys.get(key) == offset:
+                del self.keys[key]
+        self._ack_file.write(_ACK.pack(offset))
+        self._acks_dirty = True
+        self.acked += 1
+        return True
+
+    # ------------------------------------------------------------------
+    # Group commit
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        self.flush()
+        for segment in self.segments:
+            segment.close()
+        self._ack_file.close()
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self._acks_dirty or any(s.dirty for s in self.segments):
+                # msync/fsync off the event loop
+                await loop.run_in_executor(None, self.flush)
+
+    def flush(self):
+        for segment in self.segments:
+            segment.flush()
+        if self._acks_dirty:
+            self._acks_dirty = False
+            self._ack_file.flush()
+            os.fsync(self._ack_file.fileno())
+        self.flushes += 1
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    def _new_segment(self, size: int) -> _Segment:
+        path = os.path.join(self.directory, f"segment_{self.next_offset:020d}.log")
+        segment = _Segment(path, size, self.next_offset)
+        self.segments.append(segment)
+        return segment
+
+    def _rotate(self, needed: int) -> _Segment:
+        self.segments[-1].flush()
+        segment = self._new_segment(max(self.segment_bytes, needed))
+
+        # Reclaim closed segments whose messages were all acknowledged
+        for old in self.segments[:-1]:
+            if not self._segment_has_unacked(old):
+                self._delete_segment(old)
+        self.segments = [s for s in self.segments if not s.mm.closed]
+        return segment
+
+    def _segment_has_unacked(self, segment: _Segment) -> bool:
+        return any(segment.first_offset <= o <= segment.last_offset for o in self.unacked)
+
+    def _delete_segment(self, segment: _Segment):
+        segment.close()
+        try:
+            os.unlink(segment.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not delete journal segment {segment.path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "topics": sorted(self.topics),
+            "segments": len(self.segments),
+            "next_offset": self.next_offset,
+            "unacked": len(self.unacked),
+            "appended": self.appended,
+            "acked": self.acked,
+            "flushes": self.flushes,
+            "append_us_avg": round(self.append_us_total / self.appended, 2) if self.appended else 0.0,
+        }
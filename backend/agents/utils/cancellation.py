@@ -0,0 +1,171 @@
+"""
+Cancel scopes for in-flight work
+
+A CancelScope wraps one running task. Cancelling it:
+    1. sets a threading.Event, visible to code running in worker threads
+    2. runs the registered hooks (kill the sandbox subprocess, ...)
+    3. cancels the asyncio task doing the work
+
+Blocking code finds its scope with current_scope() - a contextvar, so it
+follows asyncio.to_thread - and registers a hook via on_cancel().
+run_process() is subprocess.run() that is killed when its scope is cancelled.
+"""
+import asyncio
+import contextvars
+import logging
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_scope: contextvars.ContextVar = contextvars.ContextVar("cancel_scope", default=None)
+
+
+class TaskCancelled(Exception):
+    """The work was cancelled through its CancelScope (e.g. the user pressed stop)"""
+
+
+class CancelScope:
+    """Cancellation handle for one task: its asyncio task plus cleanup hooks"""
+
+    def __init__(self, task_id: str, session_id: Optional[str] = None):
+        self.task_id = task_id
+        self.session_id = session_id
+        self.cancelled = threading.Event()
+        self.reason = ""
+        self.cancel_requested_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._hooks: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+
+    def on_cancel(self, hook: Callable[[], Any]) -> Callable[[], None]:
+        """Run hook when the scope is cancelled (immediately if it already is); returns a remover"""
+        with self._lock:
+            if not self.cancelled.is_set():
+                self._hooks.append(hook)
+                return lambda: self._remove_hook(hook)
+        self._run_hook(hook)
+        return lambda: None
+
+    def _remove_hook(self, hook: Callable[[], Any]):
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def _run_hook(self, hook: Callable[[], Any]):
+        try:
+            hook()
+        except Exception as e:
+            logger.warning(f"⚠️ Cancel hook for {self.task_id} failed: {e}")
+
+    def cancel(self, reason: str = "Cancelled") -> bool:
+        with self._lock:
+            if self.cancelled.is_set():
+                return False
+            self.reason = reason
+            self.cancel_requested_at = time.perf_counter()
+            self.cancelled.set()
+            hooks, self._hooks = self._hooks, []
+        for hook in hooks:
+            self._run_hook(hook)
+        if self.task and not self.task.done():
+            self.task.cancel()
+        return True
+
+    async def run(self, coro: Awaitable[Any]) -> Any:
+        """Run coro as this scope's task; raises TaskCancelled if the scope is cancelled"""
+        token = _current_scope.set(self)
+        try:
+            self.task = asyncio.ensure_future(coro)
+        finally:
+            _current_scope.reset(token)
+        if self.cancelled.is_set():
+            self.task.cancel()
+        try:
+            return await self.task
+        except asyncio.CancelledError:
+            if self.cancelled.is_set() and self.task.cancelled():
+                raise TaskCancelled(self.reason) from None
+            raise
+
+
+def current_scope() -> Optional[CancelScope]:
+    return _current_scope.get()
+
+
+class CancelRegistry:
+    """Open scopes by task_id, cancellable one at a time or per session"""
+
+    def __init__(self):
+        self.scopes: Dict[str, CancelScope] = {}
+        self.opened = 0
+        self.cancelled = 0
+        self.last_quiesce_ms: Optional[float] = None
+        self.max_quiesce_ms = 0.0
+
+    @contextmanager
+    def open(self, task_id: str, session_id: Optional[str] = None):
+        scope = CancelScope(task_id, session_id)
+        self.scopes[task_id] = scope
+        self.opened += 1
+        try:
+            yield scope
+        finally:
+            if self.scopes.get(task_id) is scope:
+                del self.scopes[task_id]
+            if scope.cancel_requested_at is not None:
+                # Cancel-to-quiescence: hooks ran and the work has unwound
+                quiesce_ms = (time.perf_counter() - scope.cancel_requested_at) * 1000
+                self.last_quiesce_ms = quiesce_ms
+                self.max_quiesce_ms = max(self.max_quiesce_ms, quiesce_ms)
+
+    def cancel(self, task_id: str, reason: str = "Cancelled") -> bool:
+        scope = self.scopes.get(task_id)
+        if scope and scope.cancel(reason):
+            self.cancelled += 1
+            return True
+        return False
+
+    def cancel_session(self, session_id: str, reason: str = "Cancelled") -> int:
+        count = 0
+        for task_id, scope in list(self.scopes.items()):
+            if scope.session_id == session_id and self.cancel(task_id, reason):
+                count += 1
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self.scopes),
+            "opened": self.opened,
+            "cancelled": self.cancelled,
+            "last_quiesce_ms": round(self.last_quiesce_ms, 1) if self.last_quiesce_ms is not None else None,
+            "max_quiesce_ms": round(self.max_quiesce_ms, 1),
+        }
+
+
+def run_process(args: List[str], timeout: Optional[float] = None, **kwargs) -> subprocess.CompletedProcess:
+    """
+    subprocess.run(args, capture_output=True, text=True, timeout=timeout) that
+    is killed as soon as the current CancelScope is cancelled.
+    """
+    scope = current_scope()
+    with subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, **kwargs) as process:
+        remove_hook = scope.on_cancel(process.kill) if scope else (lambda: None)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        finally:
+            remove_hook()
+        if scope and scope.cancelled.is_set():
+            stderr = (stderr or "") + f"\n{scope.reason}"
+        return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+
+# Scopes of the execution agent's in-flight tasks
+execution_scopes = CancelRegistry()
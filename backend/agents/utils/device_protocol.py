@@ -14,6 +14,8 @@ from typing import List, Dict, Any, Optional, Literal
 from datetime import datetime
 import json
 
+from agents.utils.shared_state import shared_dict
+
 
 # ============================================================================
 # UI TREE MODELS (Android → Backend)
@@ -306,3 +308,14 @@ class MobileActionResultMessage(BaseModel):
     session_id: str
     result: ActionResult
     timestamp: float = Field(default_factory=lambda: datetime.now().timestamp())
+
+
+def action_correlation_id(device_id: str, action_id: str) -> str:
+    """Broker reply key for a device action - namespaced so it never collides with task ids"""
+    return f"device_action:{device_id}:{action_id}"
+
+
+# Reported action results by action_correlation_id, shared by all workers: behind
+# worker_router the device's POST can land on a worker other than the one waiting
+ACTION_OUTCOMES = shared_dict("device_action_outcomes")
+ACTION_OUTCOME_TTL_SECONDS = 600
@@ -0,0 +1,168 @@
+"""
+Deterministic LLM response cache
+
+Low-temperature calls with identical inputs (RAG code generation for the
+same request, the reasoning agent on the same content, preference
+extraction on repeated phrases) get the stored reply instead of a new
+completion. A call site opts in with chat(..., cache=True); LLM_CACHE=false
+turns caching off everywhere.
+
+The key is a sha256 of (provider, model, temperature, messages - i.e. the
+system prompt and the prompt - and the remaining request parameters such
+as max_tokens). Lookups go through two tiers:
+
+    memory   LRU of LLM_CACHE_MEMORY_ENTRIES replies - microseconds
+    disk     SQLite in WAL mode at LLM_CACHE_PATH, shared by local
+             workers and kept across restarts, capped at
+             LLM_CACHE_DISK_ENTRIES (oldest dropped first)
+
+Entries expire after LLM_CACHE_TTL_SECONDS (or the call's cache_ttl).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE = os.getenv("LLM_CACHE", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1000"))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "50000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+PRUNE_EVERY = 200  # disk writes between expiry/size pruning
+
+# (content, model, usage, expires)
+CachedReply = Tuple[str, str, Dict[str, int], float]
+
+
+def cache_key(provider: str, model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    payload = json.dumps([provider, model, messages, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """In-memory LRU in front of a SQLite store of replies"""
+
+    def __init__(self, enabled: bool = LLM_CACHE, path: str = LLM_CACHE_PATH,
+                 memory_entries: int = LLM_CACHE_MEMORY_ENTRIES):
+        self.enabled = enabled
+        self.path = path
+        self.memory_entries = memory_entries
+        self.memory: "OrderedDict[str, CachedReply]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_ok = True
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.sites: Dict[str, Dict[str, int]] = {}
+
+    # ---- disk tier ----
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and self._disk_ok:
+            try:
+                self._conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS replies ("
+                    " key TEXT PRIMARY KEY, call_site TEXT, content TEXT NOT NULL, model TEXT,"
+                    " usage TEXT, created REAL NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS replies_created ON replies (created)")
+                logger.info(f"✅ LLM response cache (SQLite WAL) at {self.path}")
+            except sqlite3.Error as e:
+                logger.error(f"❌ LLM cache disk tier unavailable, memory only: {e}")
+                self._conn, self._disk_ok = None, False
+        return self._conn
+
+    def _disk_get(self, key: str) -> Optional[CachedReply]:
+        with self._lock:
+            db = self._db()
+            if db is None:
+                return None
+            row = db.execute("SELECT content, model, usage, expires FROM replies WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2] or "{}"), row[3]
+
+    def _disk_put(self, key: str, call_site: str, reply: CachedReply):
+        content, model, usage, expires = reply
+        with self._lock:
+            db = self._db()
+            if db is None:
+                return
+            db.execute(
+                "INSERT OR REPLACE INTO replies (key, call_site, content, model, usage, created, expires)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, call_site, content, model, json.dumps(usage), time.time(), expires),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                db.execute("DELETE FROM replies WHERE expires < ?", (time.time(),))
+                db.execute(
+                    "DELETE FROM replies WHERE key IN (SELECT key FROM replies ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (LLM_CACHE_DISK_ENTRIES,),
+                )
+
+    # ---- lookups ----
+
+    def _site(self, call_site: str) -> Dict[str, int]:
+        if call_site not in self.sites:
+            self.sites[call_site] = {"lookups": 0, "memory_hits": 0, "disk_hits": 0, "expired": 0, "stores": 0}
+        return self.sites[call_site]
+
+    def _remember(self, key: str, reply: CachedReply):
+        self.memory[key] = reply
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    async def get(self, key: str, call_site: str) -> Optional[CachedReply]:
+        site = self._site(call_site)
+        site["lookups"] += 1
+        reply = self.memory.get(key)
+        tier = "memory_hits"
+        if reply is None:
+            try:
+                reply = await asyncio.to_thread(self._disk_get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ LLM cache read failed: {e}")
+                reply = None
+            tier = "disk_hits"
+        if reply is None:
+            return None
+        if reply[3] < time.time():
+            site["expired"] += 1
+            self.memory.pop(key, None)
+            return None
+        self._remember(key, reply)
+        site[tier] += 1
+        return reply
+
+    async def put(self, key: str, call_site: str, content: str, model: str, usage: Dict[str, int],
+                  ttl: Optional[float] = None):
+        reply = (content, model, usage, time.time() + (ttl or LLM_CACHE_TTL_SECONDS))
+        self._remember(key, reply)
+        self._site(call_site)["stores"] += 1
+        try:
+            await asyncio.to_thread(self._disk_put, key, call_site, reply)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ LLM cache write failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        sites = {}
+        for name, site in self.sites.items():
+            hits = site["memory_hits"] + site["disk_hits"]
+            sites[name] = {**site, "hit_rate": round(hits / site["lookups"], 3) if site["lookups"] else None}
+        return {"enabled": self.enabled, "memory_entries": len(self.memory), "path": self.path, "call_sites": sites}
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,133 @@
+"""
+Model cascade: small model first, large model only when needed
+
+Each call site starts at a tier (LLM_CASCADE_TIERS overrides the defaults,
+e.g. "language_clarity=large,preference_extraction=small"). The call goes
+to that tier's model, and the reply is checked by the caller's validator,
+a function that parses the expected JSON and raises ValueError (or a
+pydantic ValidationError) when it does not fit. A reply that fails
+validation, or a failed request, escalates to the next tier. The answer
+from the last tier is returned even when it does not validate, so the
+call site's own fallback parsing still applies.
+
+    response = await model_cascade.chat(messages, "preference_extraction", validate_preferences)
+    response.parsed  # the validator's result, or None
+
+LLM_CASCADE=false sends every call straight to the large tier.
+"""
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from agents.utils.llm_gateway import LLMError, LLMResponse, Messages, llm_gateway
+
+logger = logging.getLogger(__name__)
+
+LLM_CASCADE = os.getenv("LLM_CASCADE", "true").lower() == "true"
+SMALL_MODEL = os.getenv("LLM_SMALL_MODEL", "llama-3.1-8b-instant")
+LARGE_MODEL = os.getenv("LLM_LARGE_MODEL", os.getenv("LLM_MODEL", "llama-3.3-70b-versatile"))
+
+TIERS = ["small", "large"]
+TIER_MODELS = {"small": SMALL_MODEL, "large": LARGE_MODEL}
+
+# USD per million tokens (input, output), Groq on-demand list prices -
+# only used to report what each call site costs
+MODEL_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+# Extraction and classification start small; any other call site starts large
+DEFAULT_SITE_TIERS = {
+    "language_clarity": "small",
+    "preference_extraction": "small",
+}
+
+
+def load_site_tiers() -> Dict[str, str]:
+    tiers = dict(DEFAULT_SITE_TIERS)
+    for entry in os.getenv("LLM_CASCADE_TIERS", "").split(","):
+        site, _, tier = entry.partition("=")
+        if tier.strip() in TIERS:
+            tiers[site.strip()] = tier.strip()
+    return tiers
+
+
+def token_cost(model: str, usage: Dict[str, int]) -> float:
+    """USD cost of one call's usage, 0 for models without a known price"""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (usage.get("prompt_tokens", 0) * input_price + usage.get("completion_tokens", 0) * output_price) / 1e6
+
+
+class ModelCascade:
+    """Routes call sites to model tiers and escalates replies that fail validation"""
+
+    def __init__(self, enabled: bool = LLM_CASCADE):
+        self.enabled = enabled
+        self.site_tiers = load_site_tiers()
+        self.sites: Dict[str, Dict[str, Any]] = {}
+
+    def tiers_for(self, call_site: str) -> List[str]:
+        if not self.enabled:
+            return ["large"]
+        start = self.site_tiers.get(call_site, "large")
+        return TIERS[TIERS.index(start):]
+
+    def _site(self, call_site: str) -> Dict[str, Any]:
+        if call_site not in self.sites:
+            self.sites[call_site] = {
+                "calls": 0, "escalations": 0, "unvalidated": 0,
+                "tiers": {tier: {"answered": 0, "invalid": 0, "errors": 0, "cost_usd": 0.0} for tier in TIERS},
+            }
+        return self.sites[call_site]
+
+    async def chat(self, messages: Union[str, Messages], call_site: str,
+                   validate: Callable[[str], Any], tiers: Optional[List[str]] = None, **kwargs) -> LLMResponse:
+        """
+        Chat through the call site's tiers until a reply validates. kwargs
+        go to llm_gateway.chat (temperature, max_tokens, hedge, ...).
+        """
+        site = self._site(call_site)
+        site["calls"] += 1
+        tiers = tiers or self.tiers_for(call_site)
+        response = None
+        for i, tier in enumerate(tiers):
+            last = i == len(tiers) - 1
+            model = TIER_MODELS[tier]
+            try:
+                response = await llm_gateway.chat(messages, model=model, call_site=f"{call_site}:{tier}", **kwargs)
+            except LLMError as e:
+                site["tiers"][tier]["errors"] += 1
+                if last:
+                    raise
+                logger.warning(f"⚠️ {call_site}: {tier} model failed ({e}) - escalating")
+                site["escalations"] += 1
+                continue
+
+            site["tiers"][tier]["cost_usd"] += token_cost(model, response.usage)
+            try:
+                response.parsed = validate(response.content)
+                site["tiers"][tier]["answered"] += 1
+                return response
+            except ValueError as e:
+                site["tiers"][tier]["invalid"] += 1
+                if last:
+                    break
+                logger.info(f"🔼 {call_site}: {tier} reply failed validation ({str(e)[:120]}) - escalating")
+                site["escalations"] += 1
+
+        site["unvalidated"] += 1
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        sites = {}
+        for name, site in self.sites.items():
+            sites[name] = {
+                **site,
+                "escalation_rate": round(site["escalations"] / site["calls"], 3) if site["calls"] else None,
+                "tiers": {tier: {**t, "cost_usd": round(t["cost_usd"], 6)} for tier, t in site["tiers"].items()},
+            }
+        return {"enabled": self.enabled, "models": TIER_MODELS, "site_tiers": self.site_tiers, "call_sites": sites}
+
+
+model_cascade = ModelCascade()
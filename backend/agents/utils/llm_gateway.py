@@ -0,0 +1,703 @@
+"""
+Async LLM gateway
+
+Every agent's chat-completion call goes through here instead of its own
+SDK client, so that under load they share:
+
+    - one pooled httpx.AsyncClient per event loop (OpenAI-compatible
+      /chat/completions for groq, openai and ollama)
+    - per-provider token buckets for requests/minute and tokens/minute,
+      sized from the provider's x-ratelimit-limit-* headers and corrected
+      from its x-ratelimit-remaining-* headers
+    - jittered exponential backoff on 429/5xx/connection errors
+      (retry-after is honoured), all inside a per-call deadline
+    - a global semaphore capping in-flight requests (LLM_MAX_CONCURRENCY)
+    - opt-in request hedging for latency-critical calls (llm_hedging)
+    - an opt-in response cache for repeated deterministic calls (llm_cache)
+
+Async code awaits chat() / stream(). Code running in a worker thread (the
+RAG code generators) calls chat_sync(), which runs the request on the
+server's loop so it still shares the pool and the limits.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+
+import httpx
+
+from agents.utils.llm_cache import cache_key, llm_cache
+from agents.utils.llm_hedging import HedgePolicy
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "32"))
+
+PROVIDERS = {
+    "groq": {
+        "base_url": os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1"),
+        "api_key_env": "GROQ_API_KEY",
+        "rpm": int(os.getenv("GROQ_RPM", "30")),
+        "tpm": int(os.getenv("GROQ_TPM", "30000")),
+        # x-ratelimit-limit-requests is per day on Groq - only the token limit is per minute
+        "minute_limit_headers": ("tokens",),
+    },
+    "openai": {
+        "base_url": os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+        "api_key_env": "OPENAI_API_KEY",
+        "rpm": int(os.getenv("OPENAI_RPM", "500")),
+        "tpm": int(os.getenv("OPENAI_TPM", "200000")),
+        "minute_limit_headers": ("requests", "tokens"),
+    },
+    "ollama": {
+        "base_url": os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1"),
+        "api_key_env": None,
+        "rpm": int(os.getenv("OLLAMA_RPM", "100000")),
+        "tpm": int(os.getenv("OLLAMA_TPM", "100000000")),
+        "minute_limit_headers": (),
+    },
+}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+Messages = List[Dict[str, str]]
+
+
+class LLMError(Exception):
+    """A call that failed for good (non-retryable status, or retries exhausted)"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class LLMDeadlineExceeded(LLMError):
+    """The call's deadline passed before a response arrived"""
+
+
+class LLMResponse:
+    """A completed chat call; .content matches what LangChain messages expose"""
+
+    def __init__(self, content: str, model: str, usage: Optional[Dict[str, int]] = None,
+                 latency_ms: float = 0.0, attempts: int = 1, cached: bool = False):
+        self.content = content
+        self.model = model
+        self.usage = usage or {}
+        self.latency_ms = latency_ms
+        self.attempts = attempts
+        self.cached = cached
+        self.parsed: Any = None  # set by the model cascade once the reply validates
+
+    def __str__(self):
+        return self.content
+
+
+class LLMChunk:
+    """One streamed piece of content"""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from a rate-limit reset header: '7.66s', '2m59.56s', '120ms' or plain seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def estimate_tokens(messages: Messages, max_tokens: Optional[int]) -> int:
+    """Rough prompt + completion size for the token bucket (~4 chars per token)"""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return prompt_chars // 4 + (max_tokens or 512)
+
+
+class TokenBucket:
+    """Refills at per_minute/60 per second up to per_minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def set_limit(self, per_minute: float) -> bool:
+        """Resize to the provider's advertised per-minute limit; True if it changed"""
+        if per_minute <= 0 or per_minute == self.capacity:
+            return False
+        now = time.monotonic()
+        self._refill(now)
+        # A raised limit is usable now; a lowered one caps what is left
+        self.tokens = min(per_minute, self.tokens + max(0.0, per_minute - self.capacity))
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        return True
+
+    def observe(self, remaining: Optional[float], reset_seconds: Optional[float]):
+        """Trust the provider's view: it also counts other clients on the same key"""
+        now = time.monotonic()
+        self._refill(now)
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset_seconds:
+                self.blocked_until = max(self.blocked_until, now + reset_seconds)
+
+    def block_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class ProviderLimits:
+    """
+    Request and token buckets for one provider. They start at the configured
+    rpm/tpm and follow the x-ratelimit-limit-* headers once the provider
+    sends them (minute_headers names the ones that are per-minute limits).
+    """
+
+    def __init__(self, rpm: float, tpm: float, minute_headers: Tuple[str, ...] = ("requests", "tokens")):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.minute_headers = minute_headers
+
+    async def acquire(self, tokens: int):
+        while True:
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait <= 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                return
+            await asyncio.sleep(min(wait, 5.0))
+
+    def observe(self, headers: httpx.Headers):
+        def number(name):
+            try:
+                return float(headers[name])
+            except (KeyError, ValueError):
+                return None
+
+        for kind in self.minute_headers:
+            limit = number(f"x-ratelimit-limit-{kind}")
+            bucket = getattr(self, kind)
+            if limit is not None and bucket.set_limit(limit):
+                logger.info(f"🚦 Provider {kind} limit is now {limit:.0f}/min")
+
+        self.requests.observe(number("x-ratelimit-remaining-requests"),
+                              parse_duration(headers.get("x-ratelimit-reset-requests")))
+        self.tokens.observe(number("x-ratelimit-remaining-tokens"),
+                            parse_duration(headers.get("x-ratelimit-reset-tokens")))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests_available": round(self.requests.tokens, 1),
+            "tokens_available": round(self.tokens.tokens),
+            "rpm": round(self.requests.capacity),
+            "tpm": round(self.tokens.capacity),
+        }
+
+
+async def _first_chunk(source: AsyncIterator[str]):
+    """(source, its first delta) - delta None for an empty stream"""
+    try:
+        return source, await source.__anext__()
+    except StopAsyncIteration:
+        return source, None
+
+
+async def _discard_stream(task: asyncio.Task):
+    """Stop a losing hedged stream; its generator closes the response on the way out"""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    if not task.cancelled() and task.exception() is None:
+        source, _ = task.result()
+        await source.aclose()
+
+
+class LLMGateway:
+    """Shared async client, limits and retry policy for all LLM calls"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.limits = {
+            name: ProviderLimits(p["rpm"], p["tpm"], p["minute_limit_headers"]) for name, p in PROVIDERS.items()
+        }
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._throwaway_loops: Set[int] = set()
+        self._clients: Dict[int, httpx.AsyncClient] = {}
+        self._semaphores: Dict[int, asyncio.Semaphore] = {}
+        self.hedging = HedgePolicy()
+        self.in_flight = 0
+        self.call_sites: Dict[str, Dict[str, Any]] = {}
+
+    # ---- setup ----
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Remember the server's loop; chat_sync() from worker threads runs there"""
+        self._loop = loop or asyncio.get_running_loop()
+
+    def _resources(self):
+        loop = asyncio.get_running_loop()
+        key = id(loop)
+        if self._loop is None and key not in self._throwaway_loops:
+            self._loop = loop
+        if key not in self._clients:
+            self._clients[key] = httpx.AsyncClient(
+                timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0),
+                limits=httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE),
+            )
+            self._semaphores[key] = asyncio.Semaphore(self.max_concurrency)
+        return self._clients[key], self._semaphores[key]
+
+    async def close(self):
+        key = id(asyncio.get_running_loop())
+        client = self._clients.pop(key, None)
+        self._semaphores.pop(key, None)
+        if client is not None:
+            await client.aclose()
+
+    # ---- requests ----
+
+    def _request(self, provider: str, messages: Messages, model: str, temperature: float,
+                 max_tokens: Optional[int], stream: bool, extra: Dict[str, Any]):
+        config = PROVIDERS.get(provider)
+        if config is None:
+            raise LLMError(f"Unknown LLM provider: {provider}")
+        headers = {"Content-Type": "application/json"}
+        if config["api_key_env"]:
+            api_key = os.getenv(config["api_key_env"])
+            if not api_key:
+                raise LLMError(f"{config['api_key_env']} is not set")
+            headers["Authorization"] = f"Bearer {api_key}"
+        body = {"model": model, "messages": messages, "temperature": temperature, **extra}
+        if max_tokens is not None:
+            body["max_tokens"] = max_tokens
+        if stream:
+            body["stream"] = True
+        return f"{config['base_url']}/chat/completions", headers, body
+
+    def _site(self, call_site: str) -> Dict[str, Any]:
+        if call_site not in self.call_sites:
+            self.call_sites[call_site] = {
+                "calls": 0, "errors": 0, "retries": 0, "rate_limited": 0, "deadline_exceeded": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "total_latency_ms": 0.0,
+            }
+        return self.call_sites[call_site]
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = parse_duration(response.headers.get("retry-after"))
+            if retry_after is not None:
+                return retry_after
+        # Full jitter: spreads out clients that were throttled together
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+    def _release(self, semaphore: asyncio.Semaphore):
+        self.in_flight -= 1
+        semaphore.release()
+
+    async def _send(self, provider: str, url: str, headers: Dict[str, str], body: Dict[str, Any],
+                    estimate: int, site: Dict[str, Any], deadline: float, stream: bool):
+        """
+        POST with limits and retries until a 200 arrives. Returns the response
+        (still open when streaming; the caller closes it and releases the
+        concurrency slot) and the attempt count.
+        """
+        client, semaphore = self._resources()
+        limits = self.limits[provider]
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await limits.acquire(estimate)
+            response = None
+            error = None
+            await semaphore.acquire()
+            self.in_flight += 1
+            try:
+                request = client.build_request("POST", url, headers=headers, json=body)
+                response = await client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                self._release(semaphore)
+                raise
+            if not (stream and response is not None and response.status_code == 200):
+                self._release(semaphore)
+
+            if response is not None:
+                limits.observe(response.headers)
+                if response.status_code == 200:
+                    return response, attempt + 1
+                if stream:
+                    await response.aread()
+                    await response.aclose()
+                if response.status_code == 429:
+                    site["rate_limited"] += 1
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise LLMError(f"{provider} returned {response.status_code}: {response.text[:300]}",
+                                   status=response.status_code)
+                error = LLMError(f"{provider} returned {response.status_code}", status=response.status_code)
+
+            if attempt == LLM_MAX_RETRIES:
+                raise LLMError(f"{provider} failed after {attempt + 1} attempts: {error}",
+                               status=getattr(error, "status", None))
+            delay = self._backoff(attempt, response)
+            if response is not None and response.status_code == 429:
+                limits.requests.block_for(delay)
+            if loop.time() + delay >= deadline:
+                raise LLMDeadlineExceeded(f"No time left to retry {provider} after: {error}")
+            site["retries"] += 1
+            logger.warning(f"⚠️ {provider} attempt {attempt + 1} failed ({error}) - retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def chat(self, messages: Union[str, Messages], model: str, call_site: str = "default",
+                   hedge: Optional[bool] = None, cache: bool = False, cache_ttl: Optional[float] = None,
+                   **kwargs) -> LLMResponse:
+        """
+        One chat completion; raises LLMError / LLMDeadlineExceeded.
+        hedge=True opts the call into request hedging (see llm_hedging),
+        cache=True into the response cache (see llm_cache).
+        """
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        key = None
+        if cache and llm_cache.enabled:
+            started = time.perf_counter()
+            params = {k: v for k, v in kwargs.items() if k not in ("provider", "timeout")}
+            key = cache_key(kwargs.get("provider", "groq"), model, messages, params)
+            hit = await llm_cache.get(key, call_site)
+            if hit is not None:
+                content, cached_model, usage, _ = hit
+                return LLMResponse(content, cached_model, usage, (time.perf_counter() - started) * 1000,
+                                   attempts=0, cached=True)
+
+        if self.hedging.applies(hedge):
+            response = await self._hedged_chat(messages, model, call_site, **kwargs)
+        else:
+            response = await self._chat(messages, model, call_site=call_site, **kwargs)
+        if key is not None and response.content:
+            await llm_cache.put(key, call_site, response.content, response.model, response.usage, cache_ttl)
+        return response
+
+    async def _hedged_chat(self, messages: Union[str, Messages], model: str, call_site: str,
+                           timeout: Optional[float] = None, **kwargs) -> LLMResponse:
+        """Send a duplicate once the call outlives the site's hedge delay; first answer wins"""
+        timeout = timeout or LLM_TIMEOUT_SECONDS
+        started = time.perf_counter()
+        primary = asyncio.create_task(self._chat(messages, model, call_site=call_site, timeout=timeout, **kwargs))
+        hedge = None
+        try:
+            if self.hedging.holdout():
+                response = await primary
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.hedging.record(call_site, elapsed_ms, holdout=True)
+                return response
+            delay = self.hedging.delay_for(call_site)
+            if delay is not None and delay < timeout:
+                await asyncio.wait({primary}, timeout=delay)
+            if primary.done() or delay is None or delay >= timeout or not self.hedging.try_spend(call_site):
+                response = await primary
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.hedging.record(call_site, elapsed_ms)
+                return response
+
+            logger.info(f"🔀 Hedging {call_site} after {delay * 1000:.0f}ms")
+            hedge = asyncio.create_task(self._chat(
+                messages, self.hedging.fallback_model or model, call_site=f"{call_site}:hedge",
+                timeout=timeout - delay, **kwargs,
+            ))
+            pending = {primary, hedge}
+            winner = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if not t.exception()), None)
+                if winner is not None:
+                    break
+            if winner is None:
+                return primary.result()  # both failed: raise the primary's error
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.hedging.record(call_site, elapsed_ms, hedged=True, hedge_won=winner is hedge)
+            return winner.result()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def _chat(self, messages: Union[str, Messages], model: str, provider: str = "groq",
+                    temperature: float = 0.1, max_tokens: Optional[int] = 1024,
+                    call_site: str = "default", timeout: Optional[float] = None, **extra) -> LLMResponse:
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        url, headers, body = self._request(provider, messages, model, temperature, max_tokens, False, extra)
+        site = self._site(call_site)
+        site["calls"] += 1
+        loop = asyncio.get_running_loop()
+        timeout = timeout or LLM_TIMEOUT_SECONDS
+        deadline = loop.time() + timeout
+        started = time.perf_counter()
+
+        try:
+            response, attempts = await asyncio.wait_for(
+                self._send(provider, url, headers, body, estimate_tokens(messages, max_tokens), site, deadline, False),
+                timeout,
+            )
+            data = response.json()
+        except asyncio.TimeoutError:
+            site["errors"] += 1
+            site["deadline_exceeded"] += 1
+            raise LLMDeadlineExceeded(f"{call_site}: no response from {provider} within {timeout:.0f}s")
+        except LLMError:
+            site["errors"] += 1
+            raise
+        except ValueError as e:
+            site["errors"] += 1
+            raise LLMError(f"{provider} returned invalid JSON: {e}")
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        usage = data.get("usage") or {}
+        site["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        site["completion_tokens"] += usage.get("completion_tokens", 0)
+        site["total_latency_ms"] += latency_ms
+        content = data["choices"][0]["message"].get("content") or ""
+        return LLMResponse(content, data.get("model", model), usage, latency_ms, attempts)
+
+    async def stream(self, messages: Union[str, Messages], model: str, call_site: str = "default",
+                     hedge: Optional[bool] = None, **kwargs) -> AsyncIterator[str]:
+        """
+        Content deltas of a streamed completion. Retries happen only before
+        the first byte; hedge=True hedges on time to first chunk (see llm_hedging).
+        """
+        if self.hedging.applies(hedge):
+            source = self._hedged_stream(messages, model, call_site, **kwargs)
+        else:
+            source = self._stream(messages, model, call_site=call_site, **kwargs)
+        try:
+            async for delta in source:
+                yield delta
+        finally:
+            await source.aclose()
+
+    async def _hedged_stream(self, messages: Union[str, Messages], model: str, call_site: str,
+                             timeout: Optional[float] = None, **kwargs) -> AsyncIterator[str]:
+        """Open a duplicate stream once the first chunk is later than the site's hedge delay; first to yield wins"""
+        timeout = timeout or LLM_TIMEOUT_SECONDS
+        hedge_site = f"{call_site}:first_chunk"  # time-to-first-chunk samples, apart from whole-reply latencies
+        started = time.perf_counter()
+        sources = []
+
+        def open_stream(stream_model: str, site: str, stream_timeout: float) -> asyncio.Task:
+            source = self._stream(messages, stream_model, call_site=site, timeout=stream_timeout, **kwargs)
+            sources.append(source)
+            return asyncio.create_task(_first_chunk(source))
+
+        primary = open_stream(model, call_site, timeout)
+        hedge = None
+        try:
+            holdout = self.hedging.holdout()
+            delay = None if holdout else self.hedging.delay_for(hedge_site)
+            if delay is not None and delay < timeout:
+                await asyncio.wait({primary}, timeout=delay)
+                if not primary.done() and self.hedging.try_spend(hedge_site):
+                    logger.info(f"🔀 Hedging {call_site} stream after {delay * 1000:.0f}ms without a first chunk")
+                    hedge = open_stream(self.hedging.fallback_model or model, f"{call_site}:hedge", timeout - delay)
+
+            pending = {task for task in (primary, hedge) if task is not None}
+            winner = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if not t.exception()), None)
+                if winner is not None:
+                    break
+            if winner is None:
+                primary.result()  # both failed: raise the primary's error
+
+            self.hedging.record(hedge_site, (time.perf_counter() - started) * 1000,
+                                hedged=hedge is not None, hedge_won=winner is hedge, holdout=holdout)
+            loser = hedge if winner is primary else primary
+            if loser is not None:
+                await _discard_stream(loser)
+
+            source, first = winner.result()
+            if first is None:
+                return
+            yield first
+            async for delta in source:
+                yield delta
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    await _discard_stream(task)
+            for source in sources:
+                await source.aclose()
+
+    async def _stream(self, messages: Union[str, Messages], model: str, provider: str = "groq",
+                      temperature: float = 0.1, max_tokens: Optional[int] = 1024,
+                      call_site: str = "default", timeout: Optional[float] = None, **extra) -> AsyncIterator[str]:
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        url, headers, body = self._request(provider, messages, model, temperature, max_tokens, True, extra)
+        site = self._site(call_site)
+        site["calls"] += 1
+        loop = asyncio.get_running_loop()
+        _, semaphore = self._resources()
+        timeout = timeout or LLM_TIMEOUT_SECONDS
+        started = time.perf_counter()
+
+        try:
+            response, _ = await asyncio.wait_for(
+                self._send(provider, url, headers, body, estimate_tokens(messages, max_tokens), site,
+                           loop.time() + timeout, True),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            site["errors"] += 1
+            site["deadline_exceeded"] += 1
+            raise LLMDeadlineExceeded(f"{call_site}: no response from {provider} within {timeout:.0f}s")
+        except LLMError:
+            site["errors"] += 1
+            raise
+
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                usage = event.get("usage") or (event.get("x_groq") or {}).get("usage")
+                if usage:
+                    site["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                    site["completion_tokens"] += usage.get("completion_tokens", 0)
+                if event.get("choices"):
+                    delta = event["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+        except (httpx.TransportError, ValueError) as e:
+            site["errors"] += 1
+            raise LLMError(f"{provider} stream broke off: {e}")
+        finally:
+            try:
+                await response.aclose()
+            finally:
+                self._release(semaphore)  # the slot _send handed over covers the whole stream
+            site["total_latency_ms"] += (time.perf_counter() - started) * 1000
+
+    def chat_sync(self, messages: Union[str, Messages], model: str, **kwargs) -> LLMResponse:
+        """
+        Blocking chat() for worker threads. Runs on the server's loop when
+        there is one, so the call still shares the pool, limits and semaphore.
+        """
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            if self._on_loop(loop):
+                raise RuntimeError("chat_sync() called on the event loop thread - await chat() instead")
+            future = asyncio.run_coroutine_threadsafe(self.chat(messages, model, **kwargs), loop)
+            return future.result()
+        return asyncio.run(self._chat_once(messages, model, **kwargs))
+
+    @staticmethod
+    def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            return asyncio.get_running_loop() is loop
+        except RuntimeError:
+            return False
+
+    async def _chat_once(self, messages, model, **kwargs) -> LLMResponse:
+        """chat() on a throwaway loop (scripts, no server running); never becomes the bound loop"""
+        key = id(asyncio.get_running_loop())
+        self._throwaway_loops.add(key)
+        try:
+            return await self.chat(messages, model, **kwargs)
+        finally:
+            await self.close()
+            self._throwaway_loops.discard(key)
+
+    # ---- stats ----
+
+    def get_stats(self) -> Dict[str, Any]:
+        call_sites = {}
+        for name, site in self.call_sites.items():
+            completed = site["calls"] - site["errors"]
+            call_sites[name] = {
+                **{k: v for k, v in site.items() if k != "total_latency_ms"},
+                "avg_latency_ms": round(site["total_latency_ms"] / completed, 1) if completed else None,
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "providers": {name: limits.get_stats() for name, limits in self.limits.items()},
+            "call_sites": call_sites,
+            "hedging": self.hedging.get_stats(),
+            "cache": llm_cache.get_stats(),
+        }
+
+
+llm_gateway = LLMGateway()
+
+
+class GatewayChatModel:
+    """
+    Drop-in for the ChatGroq calls the agents make: ainvoke(prompt) returns
+    something with .content, astream(prompt) yields chunks with .content.
+    """
+
+    def __init__(self, model: str, temperature: float = 0.1, max_tokens: Optional[int] = None,
+                 provider: str = "groq", call_site: str = "default", system_prompt: Optional[str] = None):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.provider = provider
+        self.call_site = call_site
+        self.system_prompt = system_prompt
+
+    def _messages(self, prompt: Union[str, Messages]) -> Messages:
+        if not isinstance(prompt, str):
+            return prompt
+        messages = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        return messages + [{"role": "user", "content": prompt}]
+
+    async def ainvoke(self, prompt: Union[str, Messages], call_site: Optional[str] = None, **kwargs) -> LLMResponse:
+        return await llm_gateway.chat(
+            self._messages(prompt), self.model, provider=self.provider, temperature=self.temperature,
+            max_tokens=self.max_tokens, call_site=call_site or self.call_site, **kwargs,
+        )
+
+    async def astream(self, prompt: Union[str, Messages], call_site: Optional[str] = None, **kwargs) -> AsyncIterator[LLMChunk]:
+        async for delta in llm_gateway.stream(
+            self._messages(prompt), self.model, provider=self.provider, temperature=self.temperature,
+            max_tokens=self.max_tokens, call_site=call_site or self.call_site, **kwargs,
+        ):
+            yield LLMChunk(delta)
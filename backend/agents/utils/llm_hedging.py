@@ -0,0 +1,138 @@
+"""
+Hedged LLM requests
+
+For call sites that opt in (chat(..., hedge=True)) and with LLM_HEDGING
+enabled, the gateway sends a duplicate request when the first one has not
+answered by the call site's LLM_HEDGE_PERCENTILE latency (p90 by default).
+The duplicate may go to LLM_HEDGE_FALLBACK_MODEL. Whichever answers first
+wins and the other is cancelled. At most LLM_HEDGE_MAX_PER_MINUTE hedges
+are sent, so a slow provider cannot double our traffic.
+
+Streamed calls (stream(..., hedge=True)) hedge on time to first chunk
+instead: a duplicate stream is opened once the first chunk is later than
+the percentile of "<call_site>:first_chunk", and the stream that yields
+first is consumed while the other is closed.
+
+The hedge delay comes from the primary requests' latencies; a primary
+cancelled because the hedge won is left out, as its real latency is never
+known. So the gain is measured against a holdout: LLM_HEDGE_HOLDOUT of
+opted-in calls are never hedged, and
+
+    p99 improvement = p99(holdout calls) - p99(hedge-eligible calls)
+"""
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+LLM_HEDGE_MAX_PER_MINUTE = float(os.getenv("LLM_HEDGE_MAX_PER_MINUTE", "20"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_FALLBACK_MODEL = os.getenv("LLM_HEDGE_FALLBACK_MODEL") or None
+LLM_HEDGE_HOLDOUT = float(os.getenv("LLM_HEDGE_HOLDOUT", "0.05"))
+LATENCY_WINDOW = int(os.getenv("LLM_HEDGE_LATENCY_WINDOW", "500"))
+
+
+class LatencyWindow:
+    """The most recent latencies of a call site"""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=size)
+
+    def add(self, latency_ms: float):
+        self.samples.append(latency_ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class HedgePolicy:
+    """When to hedge, how many hedges we can afford, and how much they helped"""
+
+    def __init__(self, enabled: bool = LLM_HEDGING, percentile: float = LLM_HEDGE_PERCENTILE,
+                 max_per_minute: float = LLM_HEDGE_MAX_PER_MINUTE,
+                 fallback_model: Optional[str] = LLM_HEDGE_FALLBACK_MODEL):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.fallback_model = fallback_model
+        self.max_per_minute = max_per_minute
+        self.recent_hedges = deque()  # send times within the last minute
+        self.sites: Dict[str, Dict[str, Any]] = {}
+
+    def _site(self, call_site: str) -> Dict[str, Any]:
+        if call_site not in self.sites:
+            self.sites[call_site] = {
+                "primary": LatencyWindow(), "observed": LatencyWindow(), "holdout": LatencyWindow(),
+                "calls": 0, "hedged": 0, "hedge_wins": 0, "over_budget": 0,
+            }
+        return self.sites[call_site]
+
+    def applies(self, hedge: Optional[bool]) -> bool:
+        return self.enabled and bool(hedge)
+
+    def holdout(self) -> bool:
+        """Leave this call unhedged, as a baseline for the p99 improvement"""
+        return random.random() < LLM_HEDGE_HOLDOUT
+
+    def delay_for(self, call_site: str) -> Optional[float]:
+        """Seconds to wait before hedging, None until the site has enough history"""
+        primary = self._site(call_site)["primary"]
+        if len(primary.samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return primary.percentile(self.percentile) / 1000
+
+    def try_spend(self, call_site: str) -> bool:
+        now = time.monotonic()
+        while self.recent_hedges and now - self.recent_hedges[0] > 60:
+            self.recent_hedges.popleft()
+        if len(self.recent_hedges) >= self.max_per_minute:
+            self._site(call_site)["over_budget"] += 1
+            return False
+        self.recent_hedges.append(now)
+        return True
+
+    def record(self, call_site: str, latency_ms: float, hedged: bool = False,
+               hedge_won: bool = False, holdout: bool = False):
+        site = self._site(call_site)
+        site["calls"] += 1
+        if not hedge_won:
+            # When the hedge wins, latency_ms is not how long the primary took
+            # (it was cut short) - only the end-to-end window gets it
+            site["primary"].add(latency_ms)
+        site["holdout" if holdout else "observed"].add(latency_ms)
+        site["hedged"] += hedged
+        site["hedge_wins"] += hedge_won
+
+    def get_stats(self) -> Dict[str, Any]:
+        sites = {}
+        for name, site in self.sites.items():
+            delay = self.delay_for(name)
+            observed_p99 = site["observed"].percentile(99)
+            holdout_p99 = site["holdout"].percentile(99)
+            sites[name] = {
+                "calls": site["calls"],
+                "hedged": site["hedged"],
+                "hedge_rate": round(site["hedged"] / site["calls"], 3) if site["calls"] else None,
+                "hedge_wins": site["hedge_wins"],
+                "over_budget": site["over_budget"],
+                "hedge_after_ms": round(delay * 1000) if delay is not None else None,
+                "p99_ms": round(observed_p99) if observed_p99 is not None else None,
+                "holdout_calls": len(site["holdout"].samples),
+                "p99_holdout_ms": round(holdout_p99) if holdout_p99 is not None else None,
+                "p99_improvement_ms": (round(holdout_p99 - observed_p99)
+                                       if holdout_p99 is not None and observed_p99 is not None else None),
+            }
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "fallback_model": self.fallback_model,
+            "holdout": LLM_HEDGE_HOLDOUT,
+            "max_per_minute": self.max_per_minute,
+            "hedges_last_minute": len(self.recent_hedges),
+            "call_sites": sites,
+        }
@@ -0,0 +1,242 @@
+"""
+Prompt registry
+
+Long prompts are split into two kinds of parts:
+
+    static sections   rules, examples, output schemas - built once at import,
+                      versioned by a hash of their text and token-counted once
+    dynamic sections  what changes per call (history, RAG contexts, UI trees,
+                      preferences) - counted per call and trimmed to fit
+
+assemble() joins the parts in order and enforces the call site's token
+budget (PROMPT_BUDGETS, e.g. "decompose=12000,mobile_react=6000"). When the
+prompt is over budget, dynamic sections are trimmed lowest priority first:
+whole items are dropped (the oldest history turn, the least relevant
+context) while each is no bigger than the overage; the item that is
+bigger is cut at a token boundary instead. The same inputs always
+produce the same prompt.
+
+Tokens are counted locally with tiktoken (PROMPT_TOKENIZER, cl100k_base by
+default - close to the Llama 3 tokenizer); without it, ~4 characters per
+token. Prompt tokens per call site are in /broker/stats under "prompts".
+"""
+import hashlib
+import logging
+import os
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "cl100k_base")
+DEFAULT_BUDGETS = {
+    "decompose": 12000,
+    "desktop_codegen": 8000,
+    "web_codegen": 8000,
+    "mobile_react": 6000,
+}
+DEFAULT_BUDGET = 8000
+TRIM_MARK = "…[trimmed]"
+
+
+def load_budgets() -> Dict[str, int]:
+    budgets = dict(DEFAULT_BUDGETS)
+    for entry in os.getenv("PROMPT_BUDGETS", "").split(","):
+        site, _, tokens = entry.partition("=")
+        if tokens.strip().isdigit():
+            budgets[site.strip()] = int(tokens)
+    return budgets
+
+
+class Tokenizer:
+    """Local token counts; tiktoken when installed, else a character estimate"""
+
+    def __init__(self, encoding: str = PROMPT_TOKENIZER):
+        self.encoding_name = encoding
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def encoding(self):
+        if not self._loaded:
+            self._loaded = True
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                logger.warning(f"⚠️ tiktoken unavailable ({e}) - estimating ~4 chars per token")
+        return self._encoding
+
+    @property
+    def name(self) -> str:
+        return self.encoding_name if self.encoding is not None else "chars/4"
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int, keep: str = "first") -> str:
+        """text cut to max_tokens, keeping its start (keep="first") or its end"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            kept = tokens[:max_tokens] if keep == "first" else tokens[-max_tokens:]
+            text = self.encoding.decode(kept)
+        else:
+            if len(text) <= max_tokens * 4:
+                return text
+            text = text[:max_tokens * 4] if keep == "first" else text[-max_tokens * 4:]
+        return f"{text}{TRIM_MARK}" if keep == "first" else f"{TRIM_MARK}{text}"
+
+
+class StaticSection:
+    """Fixed prompt text, built once; version is a hash of the text"""
+
+    def __init__(self, name: str, text: str, tokens: int):
+        self.name = name
+        self.text = text
+        self.tokens = tokens
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+class Section:
+    """
+    Per-call prompt text. items are trimmed as a unit from the end
+    (keep="first": most relevant first) or the start (keep="last": most
+    recent last); trim=False sections are never cut.
+    """
+
+    def __init__(self, name: str, items: Union[str, List[str], None], header: str = "",
+                 priority: int = 0, keep: str = "first", separator: str = "\n",
+                 min_items: int = 0, trim: bool = True):
+        if isinstance(items, str):
+            items = [items] if items else []
+        self.name = name
+        self.items = list(items or [])
+        self.header = header
+        self.priority = priority
+        self.keep = keep
+        self.separator = separator
+        self.min_items = min_items
+        self.trim = trim
+
+    def render(self, items: Optional[List[str]] = None) -> str:
+        items = self.items if items is None else items
+        if not items:
+            return ""
+        body = self.separator.join(items)
+        return f"{self.header}{body}" if self.header else body
+
+
+class AssembledPrompt:
+    def __init__(self, text: str, tokens: int, budget: int, trimmed: Dict[str, int]):
+        self.text = text
+        self.tokens = tokens
+        self.budget = budget
+        self.trimmed = trimmed
+
+    def __str__(self):
+        return self.text
+
+
+Part = Union[StaticSection, Section]
+
+
+class PromptRegistry:
+    """Static sections by name, budgeted assembly, and prompt-token metrics per call site"""
+
+    def __init__(self, tokenizer: Optional[Tokenizer] = None, budgets: Optional[Dict[str, int]] = None):
+        self.tokenizer = tokenizer or Tokenizer()
+        self.budgets = budgets if budgets is not None else load_budgets()
+        self.sections: Dict[str, StaticSection] = {}
+        self.sites: Dict[str, Dict[str, Any]] = {}
+
+    def static(self, name: str, text: str) -> StaticSection:
+        """Register (or fetch) a static section; changed text gets a new version"""
+        section = self.sections.get(name)
+        if section is not None and section.text == text:
+            return section
+        section = StaticSection(name, text, self.tokenizer.count(text))
+        if name in self.sections:
+            logger.info(f"📝 Prompt section {name} changed: {self.sections[name].version} -> {section.version}")
+        self.sections[name] = section
+        return section
+
+    def count(self, text: str) -> int:
+        return self.tokenizer.count(text)
+
+    def budget_for(self, call_site: str) -> int:
+        return self.budgets.get(call_site, DEFAULT_BUDGET)
+
+    def assemble(self, call_site: str, parts: List[Part], budget: Optional[int] = None,
+                 reserved: int = 0, joiner: str = "\n") -> AssembledPrompt:
+        """
+        Join parts in order within budget tokens. reserved counts tokens sent
+        alongside this text (a separate system prompt) against the budget.
+        """
+        budget = budget or self.budget_for(call_site)
+        items = {i: list(p.items) for i, p in enumerate(parts) if isinstance(p, Section)}
+        tokens = {i: p.tokens if isinstance(p, StaticSection) else self.count(p.render())
+                  for i, p in enumerate(parts)}
+        over = reserved + sum(tokens.values()) - budget
+        trimmed: Dict[str, int] = {}
+
+        trim_order = sorted((i for i, p in items.items() if parts[i].trim), key=lambda i: (parts[i].priority, i))
+        for i in trim_order:
+            if over <= 0:
+                break
+            section, kept, before = parts[i], items[i], tokens[i]
+            edge = -1 if section.keep == "first" else 0
+            # Drop whole items first, unless the next one alone covers the overage
+            while over > 0 and len(kept) > section.min_items and self.count(kept[edge]) <= over:
+                kept.pop(edge)
+                now = self.count(section.render(kept))
+                over -= tokens[i] - now
+                tokens[i] = now
+            # Then cut the item next in line to be dropped
+            if over > 0 and kept:
+                target = self.count(kept[edge]) - over - self.count(TRIM_MARK)
+                kept[edge] = self.tokenizer.truncate(kept[edge], target, section.keep)
+                now = self.count(section.render(kept))
+                over -= tokens[i] - now
+                tokens[i] = now
+            trimmed[section.name] = before - tokens[i]
+
+        rendered = [p.text if isinstance(p, StaticSection) else p.render(items[i]) for i, p in enumerate(parts)]
+        text = joiner.join(r for r in rendered if r)
+        total = reserved + sum(tokens.values())
+        if over > 0:
+            logger.warning(f"⚠️ {call_site} prompt is {total} tokens, over its {budget} budget after trimming")
+        self._record(call_site, parts, total, budget, trimmed)
+        return AssembledPrompt(text, total, budget, trimmed)
+
+    def _record(self, call_site: str, parts: List[Part], total: int, budget: int, trimmed: Dict[str, int]):
+        site = self.sites.setdefault(call_site, {
+            "calls": 0, "prompt_tokens": 0, "max_prompt_tokens": 0,
+            "trimmed_calls": 0, "trimmed_tokens": 0, "sections": {},
+        })
+        site["calls"] += 1
+        site["prompt_tokens"] += total
+        site["max_prompt_tokens"] = max(site["max_prompt_tokens"], total)
+        site["budget"] = budget
+        site["static_tokens"] = sum(p.tokens for p in parts if isinstance(p, StaticSection))
+        site["sections"] = {p.name: p.version for p in parts if isinstance(p, StaticSection)}
+        trimmed_tokens = sum(trimmed.values())
+        if trimmed_tokens:
+            site["trimmed_calls"] += 1
+            site["trimmed_tokens"] += trimmed_tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        sites = {
+            name: {**site, "avg_prompt_tokens": round(site["prompt_tokens"] / site["calls"])}
+            for name, site in self.sites.items()
+        }
+        return {"tokenizer": self.tokenizer.name, "budgets": self.budgets, "call_sites": sites}
+
+
+prompt_registry = PromptRegistry()
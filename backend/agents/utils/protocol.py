@@ -3,9 +3,22 @@ Protocol definitions for agent communication
 Defines message formats and channels
 """
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional, List
-from datetime import datetime
+from typing import Dict, Any, Optional
 from enum import Enum
+import itertools
+import os
+import time
+import uuid
+
+# Message IDs: per-process random prefix + monotonic counter. Unique across
+# processes and never collides within one, unlike wall-clock timestamps.
+_MESSAGE_ID_PREFIX = f"{os.getpid():x}{uuid.uuid4().hex[:6]}"
+_message_counter = itertools.count(1)
+
+
+def new_message_id() -> str:
+    return f"msg_{_MESSAGE_ID_PREFIX}_{next(_message_counter)}"
+
 
 class MessageType(str, Enum):
     """Message types for agent communication"""
@@ -30,11 +43,11 @@ class AgentType(str, Enum):
 
 class AgentMessage(BaseModel):
     """Base message format for all agent communication"""
-    message_id: str = Field(default_factory=lambda: f"msg_{datetime.now().timestamp()}")
+    message_id: str = Field(default_factory=new_message_id)
     message_type: MessageType
     sender: AgentType
     receiver: AgentType
-    timestamp: float = Field(default_factory=lambda: datetime.now().timestamp())
+    timestamp: float = Field(default_factory=time.time)
     
     # Session tracking
     session_id: Optional[str] = None
@@ -49,6 +62,78 @@ class AgentMessage(BaseModel):
     class Config:
         use_enum_values = True
 
+    def to_internal(self) -> "InternalMessage":
+        return InternalMessage(**self.__dict__)
+
+
+class InternalMessage:
+    """
+    Lightweight AgentMessage for the in-process hot path
+
+    Same fields and attribute access as AgentMessage but no validation:
+    agents construct these for broker traffic between trusted components.
+    Validation happens once at the boundaries - HTTP input (AgentMessage)
+    and to_agent_message() when a message leaves the process.
+    """
+    __slots__ = (
+        "message_id", "message_type", "sender", "receiver", "timestamp",
+        "session_id", "task_id", "payload", "response_to",
+    )
+
+    def __init__(
+        self,
+        message_type: Any,
+        sender: Any,
+        receiver: Any,
+        session_id: Optional[str] = None,
+        task_id: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        response_to: Optional[str] = None,
+        message_id: Optional[str] = None,
+        timestamp: Optional[float] = None,
+    ):
+        # Store enum values like AgentMessage(use_enum_values=True) does
+        self.message_type = getattr(message_type, "value", message_type)
+        self.sender = getattr(sender, "value", sender)
+        self.receiver = getattr(receiver, "value", receiver)
+        self.session_id = session_id
+        self.task_id = task_id
+        self.payload = payload if payload is not None else {}
+        self.response_to = response_to
+        self.message_id = message_id or new_message_id()
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    def model_dump(self, mode: Optional[str] = None) -> Dict[str, Any]:
+        """Same shape as AgentMessage.model_dump()"""
+        return {
+            "message_id": self.message_id,
+            "message_type": self.message_type,
+            "sender": self.sender,
+            "receiver": self.receiver,
+            "timestamp": self.timestamp,
+            "session_id": self.session_id,
+            "task_id": self.task_id,
+            "payload": self.payload,
+            "response_to": self.response_to,
+        }
+
+    def to_agent_message(self) -> AgentMessage:
+        """Validate into an AgentMessage (process/HTTP boundary)"""
+        return AgentMessage(**self.model_dump())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InternalMessage":
+        """Trusted decode of a model_dump() dict (journal / IPC frames)"""
+        return cls(**data)
+
+    def __repr__(self) -> str:
+        return (f"InternalMessage(message_id={self.message_id!r}, message_type={self.message_type!r}, "
+                f"sender={self.sender!r}, receiver={self.receiver!r}, task_id={self.task_id!r})")
+
+
+# Either representation may travel through the broker
+AGENT_MESSAGE_TYPES = (AgentMessage, InternalMessage)
+
 class TaskMessage(BaseModel):
     """Task specification message"""
     action: str
@@ -94,5 +179,11 @@ class Channels:
     BROADCAST = "broadcast"  # For status updates
     SESSION_CONTROL = "session_control"
     PREFERENCE_STORAGE = "preference_storage"
+    DEVICE_ACTION_RESULT = "device.action_result"  # Android action results, keyed by action_correlation_id
     
-    INTERRUPT_CONTROL="interrupt_control"
\ No newline at end of file
+    INTERRUPT_CONTROL="interrupt_control"
+
+    @staticmethod
+    def session_topic(channel: str, session_id: str) -> str:
+        """Session-scoped sub-topic, e.g. broadcast.<session_id> (dots in the id escaped)"""
+        return f"{channel}.{str(session_id).replace('%', '%25').replace('.', '%2E')}"
@@ -0,0 +1,348 @@
+"""
+Pluggable shared state for running the backend as several worker processes
+
+Process-agnostic state (device registry, pending device actions, thinking
+steps) lives behind a small namespaced key/value API so every worker sees
+the same data:
+
+    AURA_STATE_BACKEND=memory   plain dicts, single process (default)
+    AURA_STATE_BACKEND=sqlite   one SQLite file in WAL mode shared by all
+                                local workers (AURA_STATE_PATH)
+
+Session-bound objects that cannot be serialized (LanguageAgent instances,
+the coordinator's task queues, reply futures, job records) stay in the
+worker that owns the session; worker_router.py routes each session to the
+same worker so they never need to be shared.
+
+Values must be JSON-serializable. Reads return copies under the SQLite
+backend, so write a mutated value back (registry[key] = value) or use the
+atomic helpers (update_fields / append / pop_all).
+
+Resources that exist once per machine - the physical desktop - are guarded
+with process_lock(name), an OS file lock that holds across every local
+worker and agent process.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_BACKEND = os.getenv("AURA_STATE_BACKEND", "memory")  # memory | sqlite
+STATE_PATH = os.getenv("AURA_STATE_PATH", "aura_state.db")
+LOCK_DIR = os.getenv("AURA_LOCK_DIR", tempfile.gettempdir())
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class InProcessStateBackend:
+    """Namespaced dicts - values are stored by reference"""
+
+    def __init__(self):
+        self.data: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, ns: str, key: str, default: Any = None) -> Any:
+        return self.data.get(ns, {}).get(key, default)
+
+    def set(self, ns: str, key: str, value: Any):
+        self.data.setdefault(ns, {})[key] = value
+
+    def delete(self, ns: str, key: str) -> bool:
+        return self.data.get(ns, {}).pop(key, None) is not None
+
+    def contains(self, ns: str, key: str) -> bool:
+        return key in self.data.get(ns, {})
+
+    def keys(self, ns: str) -> List[str]:
+        return list(self.data.get(ns, {}))
+
+    def items(self, ns: str) -> List[tuple]:
+        return list(self.data.get(ns, {}).items())
+
+    def count(self, ns: str) -> int:
+        return len(self.data.get(ns, {}))
+
+    def update_fields(self, ns: str, key: str, fields: Dict[str, Any], default: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        bucket = self.data.setdefault(ns, {})
+        if key not in bucket:
+            bucket[key] = dict(default or {})
+        bucket[key].update(fields)
+        return bucket[key]
+
+    def append(self, ns: str, key: str, item: Any):
+        self.data.setdefault(ns, {}).setdefault(key, []).append(item)
+
+    def pop_all(self, ns: str, key: str) -> List[Any]:
+        bucket = self.data.setdefault(ns, {})
+        items = bucket.get(key) or []
+        bucket[key] = []
+        return items
+
+
+class SQLiteStateBackend:
+    """
+    Namespaced JSON values in a WAL-mode SQLite file.
+
+    WAL lets readers in every worker proceed while one writer commits;
+    read-modify-write helpers run in BEGIN IMMEDIATE transactions so they
+    are atomic across processes.
+    """
+
+    def __init__(self, path: str = STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated REAL NOT NULL,"
+            " PRIMARY KEY (ns, key)) WITHOUT ROWID"
+        )
+        logger.info(f"✅ Shared state (SQLite WAL) at {path}")
+
+    def _read(self, sql: str, params: tuple) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, ns: str, key: str, value: Any):
+        self._conn.execute(
+            "INSERT INTO state (ns, key, value, updated) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(ns, key) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+            (ns, key, json.dumps(value, default=str), time.time())
+        )
+
+    def _load(self, ns: str, key: str, default: Any = None) -> Any:
+        row = self._conn.execute("SELECT value FROM state WHERE ns = ? AND key = ?", (ns, key)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _transaction(self, fn):
+        """Run fn() inside BEGIN IMMEDIATE (exclusive writer) and commit"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, ns: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._load(ns, key, default)
+
+    def set(self, ns: str, key: str, value: Any):
+        with self._lock:
+            self._write(ns, key, value)
+
+    def delete(self, ns: str, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute("DELETE FROM state WHERE ns = ? AND key = ?", (ns, key)).rowcount > 0
+
+    def contains(self, ns: str, key: str) -> bool:
+        return bool(self._read("SELECT 1 FROM state WHERE ns = ? AND key = ?", (ns, key)))
+
+    def keys(self, ns: str) -> List[str]:
+        return [r[0] for r in self._read("SELECT key FROM state WHERE ns = ?", (ns,))]
+
+    def items(self, ns: str) -> List[tuple]:
+        return [(k, json.loads(v)) for k, v in self._read("SELECT key, value FROM state WHERE ns = ?", (ns,))]
+
+    def count(self, ns: str) -> int:
+        return self._read("SELECT COUNT(*) FROM state WHERE ns = ?", (ns,))[0][0]
+
+    def update_fields(self, ns: str, key: str, fields: Dict[str, Any], default: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        def merge():
+            value = self._load(ns, key)
+            if value is None:
+                value = dict(default or {})
+            value.update(fields)
+            self._write(ns, key, value)
+            return value
+        return self._transaction(merge)
+
+    def append(self, ns: str, key: str, item: Any):
+        def push():
+            items = self._load(ns, key) or []
+            items.append(item)
+            self._write(ns, key, items)
+        self._transaction(push)
+
+    def pop_all(self, ns: str, key: str) -> List[Any]:
+        def take():
+            items = self._load(ns, key) or []
+            self._write(ns, key, [])
+            return items
+        return self._transaction(take)
+
+
+class SharedDict(MutableMapping):
+    """dict-like view of one namespace of the state backend"""
+
+    def __init__(self, namespace: str, backend=None, initial: Optional[Dict[str, Any]] = None):
+        self.namespace = namespace
+        self.backend = backend or get_state_backend()
+        for key, value in (initial or {}).items():
+            if not self.backend.contains(namespace, key):
+                self.backend.set(namespace, key, value)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.backend.get(self.namespace, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        self.backend.set(self.namespace, key, value)
+
+    def __delitem__(self, key: str):
+        if not self.backend.delete(self.namespace, key):
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return self.backend.contains(self.namespace, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.backend.keys(self.namespace))
+
+    def __len__(self) -> int:
+        return self.backend.count(self.namespace)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.backend.get(self.namespace, key, default)
+
+    def items(self):
+        return self.backend.items(self.namespace)
+
+    def values(self):
+        return [value for _, value in self.backend.items(self.namespace)]
+
+    def update_fields(self, key: str, fields: Dict[str, Any], default: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Atomically merge fields into the dict stored at key (created from default)"""
+        return self.backend.update_fields(self.namespace, key, fields, default)
+
+    def append(self, key: str, item: Any):
+        """Atomically append to the list stored at key"""
+        self.backend.append(self.namespace, key, item)
+
+    def pop_all(self, key: str) -> List[Any]:
+        """Atomically take every item of the list at key, leaving it empty"""
+        return self.backend.pop_all(self.namespace, key)
+
+
+class _Missing:
+    pass
+
+
+_MISSING = _Missing()
+_backend = None
+
+
+def get_state_backend():
+    """Process-wide state backend selected by AURA_STATE_BACKEND"""
+    global _backend
+    if _backend is None:
+        if STATE_BACKEND == "sqlite":
+            _backend = SQLiteStateBackend(STATE_PATH)
+        else:
+            _backend = InProcessStateBackend()
+    return _backend
+
+
+def shared_dict(namespace: str, initial: Optional[Dict[str, Any]] = None) -> SharedDict:
+    return SharedDict(namespace, initial=initial)
+
+
+class ProcessLock:
+    """
+    Async exclusive lock held across every local process - an asyncio.Lock
+    for this process in front of a non-blocking OS file lock polled every
+    poll_interval seconds.
+
+        async with process_lock("desktop"):
+            ...
+    """
+
+    def __init__(self, name: str, lock_dir: str = LOCK_DIR, poll_interval: float = 0.05):
+        self.name = name
+        self.path = os.path.join(lock_dir, f"aura_{name}.lock")
+        self.poll_interval = poll_interval
+        self._local = asyncio.Lock()
+        self._fd: Optional[int] = None
+        self.acquisitions = 0
+        self.max_wait_ms = 0.0
+
+    def _try_lock(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def _unlock(self):
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    async def __aenter__(self):
+        started = time.perf_counter()
+        await self._local.acquire()
+        try:
+            while not self._try_lock():
+                await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            self._local.release()
+            raise
+        self.acquisitions += 1
+        self.max_wait_ms = max(self.max_wait_ms, (time.perf_counter() - started) * 1000)
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            self._unlock()
+        finally:
+            self._local.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "held": self._fd is not None,
+            "acquisitions": self.acquisitions,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+        }
+
+
+_process_locks: Dict[str, ProcessLock] = {}
+
+
+def process_lock(name: str) -> ProcessLock:
+    """The process-wide ProcessLock for name"""
+    if name not in _process_locks:
+        _process_locks[name] = ProcessLock(name)
+    return _process_locks[name]
@@ -0,0 +1,156 @@
+"""
+Latency and token cost per call site: small tier vs large tier vs cascade.
+
+Sends the same sample inputs through each cascaded call site with the
+model pinned to the small tier, pinned to the large tier, and through the
+cascade (small first, escalating when the reply fails validation). Needs
+GROQ_API_KEY.
+
+    python benchmark_llm_cascade.py --repeats 5 --out cascade.json
+    LLM_SMALL_MODEL=llama-3.1-8b-instant python benchmark_llm_cascade.py --sites preference_extraction
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from agents.coordinator_agent.memory.preference_miner import build_extraction_prompt, validate_preferences
+from agents.language_agent import SYSTEM_PROMPT, validate_clarity_reply
+from agents.utils.llm_cascade import TIER_MODELS, TIERS, model_cascade
+from agents.utils.llm_gateway import LLMError, llm_gateway
+
+CLARITY_INPUTS = [
+    "open calculator",
+    "send an email",
+    "what is the capital of france",
+    "create a file called notes.txt on my desktop",
+    "play some music",
+]
+
+PREFERENCE_BATCHES = [
+    [{"kind": "turn", "message": "I always use chrome, never edge"},
+     {"kind": "turn", "message": "my name is sara and I work as a nurse"}],
+    [{"kind": "plan", "request": "open spotify and play my liked songs",
+      "steps": ["open spotify", "go to liked songs", "press play"]}],
+    [{"kind": "turn", "message": "open notepad"}],
+]
+
+
+def clarity_cases():
+    for text in CLARITY_INPUTS:
+        yield [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": text}], 200
+
+
+def preference_cases():
+    for items in PREFERENCE_BATCHES:
+        yield build_extraction_prompt(items, []), 1024
+
+
+SITES = {
+    "language_clarity": (clarity_cases, validate_clarity_reply),
+    "preference_extraction": (preference_cases, validate_preferences),
+}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def spent(site):
+    """Cost and tokens the site has used so far, rejected replies included"""
+    cost = sum(t["cost_usd"] for t in model_cascade._site(site)["tiers"].values())
+    tokens = sum(
+        llm_gateway.call_sites[name]["prompt_tokens"] + llm_gateway.call_sites[name]["completion_tokens"]
+        for name in (f"{site}:{tier}" for tier in TIERS) if name in llm_gateway.call_sites
+    )
+    return cost, tokens
+
+
+async def run_site(site, mode, repeats):
+    cases, validate = SITES[site]
+    tiers = TIERS if mode == "cascade" else [mode]
+    results = []
+    for _ in range(repeats):
+        for messages, max_tokens in cases():
+            escalations_before = model_cascade._site(site)["escalations"]
+            cost_before, tokens_before = spent(site)
+            started = time.perf_counter()
+            try:
+                response = await model_cascade.chat(
+                    messages, site, validate, tiers=tiers, temperature=0.1, max_tokens=max_tokens,
+                )
+            except LLMError as e:
+                results.append({"ok": False, "error": str(e)})
+                continue
+            cost_after, tokens_after = spent(site)
+            results.append({
+                "ok": True,
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "valid": response.parsed is not None,
+                "escalated": model_cascade._site(site)["escalations"] > escalations_before,
+                "tokens": tokens_after - tokens_before,
+                "cost_usd": cost_after - cost_before,
+            })
+    return results
+
+
+def summarize(site, mode, results):
+    ok = [r for r in results if r["ok"]]
+    latencies = [r["latency_ms"] for r in ok]
+    return {
+        "site": site,
+        "mode": mode,
+        "model": TIER_MODELS.get(mode, "cascade"),
+        "calls": len(results),
+        "errors": len(results) - len(ok),
+        "valid_rate": round(sum(r["valid"] for r in ok) / len(ok), 3) if ok else 0.0,
+        "escalation_rate": round(sum(r["escalated"] for r in ok) / len(ok), 3) if ok else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "mean_ms": round(statistics.mean(latencies), 1) if latencies else 0.0,
+        # escalated cascade calls include the rejected small reply
+        "tokens_per_call": round(statistics.mean(r["tokens"] for r in ok), 1) if ok else 0.0,
+        "cost_per_1k_calls_usd": round(sum(r["cost_usd"] for r in ok) / len(ok) * 1000, 4) if ok else 0.0,
+    }
+
+
+async def run_benchmark(args):
+    summaries = []
+    for site in args.sites:
+        for mode in args.modes:
+            summaries.append(summarize(site, mode, await run_site(site, mode, args.repeats)))
+    return summaries
+
+
+def print_summaries(summaries):
+    columns = ("mode", "model", "calls", "errors", "valid_rate", "escalation_rate",
+               "p50_ms", "p95_ms", "tokens_per_call", "cost_per_1k_calls_usd")
+    for site in dict.fromkeys(s["site"] for s in summaries):
+        print("=" * 70)
+        print(f"📊 {site}")
+        print("=" * 70)
+        for summary in (s for s in summaries if s["site"] == site):
+            print("   " + "  ".join(f"{key}={summary[key]}" for key in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", nargs="*", default=list(SITES), choices=list(SITES))
+    parser.add_argument("--modes", nargs="*", default=["small", "large", "cascade"], choices=["small", "large", "cascade"])
+    parser.add_argument("--repeats", type=int, default=3, help="passes over the sample inputs")
+    parser.add_argument("--out", help="write the summaries as JSON")
+    args = parser.parse_args()
+
+    summaries = asyncio.run(run_benchmark(args))
+    print_summaries(summaries)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
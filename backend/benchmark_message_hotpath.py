@@ -0,0 +1,90 @@
+"""
+Micro-benchmark for the in-process message hot path.
+
+Compares the pydantic AgentMessage against the slots-based InternalMessage
+for construction and for dispatch through the MessageBroker (publish to a
+topic with one direct subscriber and one parent-topic subscriber).
+
+    python benchmark_message_hotpath.py
+    python benchmark_message_hotpath.py --n 200000
+"""
+import argparse
+import asyncio
+import time
+
+from agents.utils.broker import MessageBroker
+from agents.utils.protocol import AgentMessage, InternalMessage, MessageType, AgentType
+
+PAYLOAD = {"action": "step_update", "step": "Opening calculator", "index": 1}
+
+
+def make_agent_message(i):
+    return AgentMessage(
+        message_type=MessageType.STATUS_UPDATE,
+        sender=AgentType.COORDINATOR,
+        receiver=AgentType.LANGUAGE,
+        session_id="bench_session",
+        task_id=f"task_{i}",
+        payload=PAYLOAD,
+    )
+
+
+def make_internal_message(i):
+    return InternalMessage(
+        message_type=MessageType.STATUS_UPDATE,
+        sender=AgentType.COORDINATOR,
+        receiver=AgentType.LANGUAGE,
+        session_id="bench_session",
+        task_id=f"task_{i}",
+        payload=PAYLOAD,
+    )
+
+
+def bench_construct(factory, n):
+    started = time.perf_counter()
+    for i in range(n):
+        factory(i)
+    return (time.perf_counter() - started) / n * 1_000_000
+
+
+async def bench_dispatch(factory, n):
+    broker = MessageBroker()
+    received = 0
+
+    async def on_message(message):
+        nonlocal received
+        received += 1
+
+    broker.subscribe("broadcast.bench_session", on_message)
+    broker.subscribe("broadcast", on_message)
+
+    started = time.perf_counter()
+    for i in range(n):
+        await broker.publish("broadcast.bench_session", factory(i))
+    elapsed = time.perf_counter() - started
+    assert received == 2 * n
+    return elapsed / n * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=50000, help="messages per measurement")
+    args = parser.parse_args()
+
+    construct_before = bench_construct(make_agent_message, args.n)
+    construct_after = bench_construct(make_internal_message, args.n)
+    dispatch_before = asyncio.run(bench_dispatch(make_agent_message, args.n))
+    dispatch_after = asyncio.run(bench_dispatch(make_internal_message, args.n))
+
+    print("=" * 70)
+    print(f"📊 Message hot path ({args.n} messages)")
+    print("=" * 70)
+    print(f"{'metric':<28} {'AgentMessage':>14} {'InternalMessage':>16} {'speedup':>9}")
+    print(f"{'construct (µs/msg)':<28} {construct_before:>14.2f} {construct_after:>16.2f} "
+          f"{construct_before / construct_after:>8.1f}x")
+    print(f"{'construct+dispatch (µs/msg)':<28} {dispatch_before:>14.2f} {dispatch_after:>16.2f} "
+          f"{dispatch_before / dispatch_after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+End-to-end /process latency benchmark under N concurrent sessions.
+
+Run it once against each deployment and compare:
+
+    # single process (default)
+    python server.py
+    python benchmark_process_latency.py --label single --sessions 8 --out single.json
+
+    # multi-process (execution + reasoning in workers)
+    BROKER_TRANSPORT=ipc AURA_EXTERNAL_AGENTS=execution,reasoning python server.py
+    python agent_worker.py execution
+    python agent_worker.py reasoning
+    python benchmark_process_latency.py --label multi --sessions 8 --out multi.json
+
+    python benchmark_process_latency.py --compare single.json multi.json
+
+Each session posts as its own user, so the per-user admission limits
+(admission.py) don't turn the run into a test of the limiter. Latency
+percentiles cover 200 responses only; 429s and requests that waited in the
+admission queue are reported as separate counters.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+import httpx
+
+DEFAULT_INPUTS = [
+    "open calculator",
+    "open notepad",
+    "what is the capital of france",
+    "go to google",
+]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def run_session(client, url, session_idx, requests_per_session, inputs, device_type, results):
+    session_id = f"bench_{session_idx}_{uuid.uuid4().hex[:6]}"
+    user_id = f"bench_user_{session_idx}"
+    for i in range(requests_per_session):
+        text = inputs[(session_idx + i) % len(inputs)]
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await client.post(
+                f"{url}/process",
+                json={"session_id": session_id, "input": text, "device_type": device_type, "user_id": user_id},
+            )
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        results.append({"latency_ms": (time.perf_counter() - started) * 1000, "status": status})
+
+
+async def admission_queued(client, url):
+    """/process requests that have waited in the admission queue so far (None if unavailable)"""
+    try:
+        response = await client.get(f"{url}/broker/stats")
+        return response.json()["admission"]["process"]["queued"]
+    except (httpx.HTTPError, ValueError, KeyError, TypeError):
+        return None
+
+
+async def run_benchmark(args):
+    results = []
+    async with httpx.AsyncClient(timeout=args.timeout) as client:
+        queued_before = await admission_queued(client, args.url)
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            run_session(client, args.url, idx, args.requests, args.inputs, args.device_type, results)
+            for idx in range(args.sessions)
+        ])
+        wall_s = time.perf_counter() - started
+        queued_after = await admission_queued(client, args.url)
+
+    ok = [r for r in results if r["status"] == "200"]
+    latencies = [r["latency_ms"] for r in ok]  # fast 429s and errors would flatter the percentiles
+    summary = {
+        "label": args.label,
+        "sessions": args.sessions,
+        "requests": len(results),
+        "ok": len(ok),
+        "rejected_429": sum(1 for r in results if r["status"] == "429"),
+        "queued": queued_after - queued_before if None not in (queued_before, queued_after) else None,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(ok) / wall_s, 3) if wall_s else 0.0,
+        "mean_ms": round(statistics.mean(latencies), 1) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "statuses": {s: sum(1 for r in results if r["status"] == s) for s in {r["status"] for r in results}},
+    }
+    return summary
+
+
+def print_summary(summary):
+    print("=" * 70)
+    print(f"📊 /process latency - {summary['label']} ({summary['sessions']} sessions)")
+    print("=" * 70)
+    for key in ("requests", "ok", "rejected_429", "queued", "wall_s", "throughput_rps",
+                "mean_ms", "p50_ms", "p95_ms", "p99_ms", "statuses"):
+        print(f"   {key:<15} {summary[key]}")
+
+
+def compare(path_a, path_b):
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+    print(f"{'metric':<15} {a['label']:>12} {b['label']:>12} {'change':>10}")
+    for key in ("throughput_rps", "mean_ms", "p50_ms", "p95_ms", "p99_ms"):
+        change = ((b[key] - a[key]) / a[key] * 100) if a[key] else 0.0
+        print(f"{key:<15} {a[key]:>12} {b[key]:>12} {change:>9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--requests", type=int, default=3, help="sequential requests per session")
+    parser.add_argument("--device-type", default="desktop")
+    parser.add_argument("--timeout", type=float, default=90.0)
+    parser.add_argument("--inputs", nargs="*", default=DEFAULT_INPUTS)
+    parser.add_argument("--out", help="write the summary as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("A.json", "B.json"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    summary = asyncio.run(run_benchmark(args))
+    print_summary(summary)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Stop-to-quiescence benchmark for in-flight execution.
+
+Runs the real execution intake (subscribe_execution_intake) on a private
+MessageBroker with a handler that either runs a sandbox subprocess through
+run_process() (desktop tasks) or awaits a long coroutine (a stand-in for an
+awaited Playwright call), publishes a "stop" on INTERRUPT_CONTROL while the
+task is running, and measures:
+
+    reply   stop published -> the requester holds a failed reply
+    quiet   stop published -> the sandbox process is gone (desktop only)
+
+It also stops plans while they are still being planned: the coordinator
+graph runs with a decomposition that never answers (awaited, or feeding a
+plan stream), the session's TaskQueue is stopped as handle_interrupt_command
+does, and it measures:
+
+    plan    stop -> the graph has returned with the decomposition cancelled
+            and no task started
+
+Target: all under 200 ms.
+
+    python benchmark_stop_latency.py
+    python benchmark_stop_latency.py --runs 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from agents.coordinator_agent import coordinator_agent as coordinator
+from agents.execution_agent.RAG.code_execution import subscribe_execution_intake
+from agents.utils.broker import MessageBroker
+from agents.utils.cancellation import run_process, execution_scopes
+from agents.utils.protocol import InternalMessage, MessageType, AgentType, Channels
+
+TARGET_MS = 200
+SESSION = "bench_session"
+SLEEPER = "import os, sys, time\nopen(sys.argv[1], 'w').write(str(os.getpid()))\ntime.sleep(60)\n"
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+async def wait_for_pid(path: str) -> int:
+    while True:
+        try:
+            with open(path) as f:
+                content = f.read()
+            if content:
+                return int(content)
+        except FileNotFoundError:
+            pass
+        await asyncio.sleep(0.005)
+
+
+async def measure(broker: MessageBroker, kind: str, run: int, pid_dir: str):
+    task_id = f"{kind}_{run}"
+    pid_file = os.path.join(pid_dir, f"{task_id}.pid")
+    request = InternalMessage(
+        message_type=MessageType.EXECUTION_REQUEST,
+        sender=AgentType.COORDINATOR,
+        receiver=AgentType.EXECUTION,
+        session_id=SESSION,
+        task_id=task_id,
+        payload={"task_id": task_id, "kind": kind, "pid_file": pid_file}
+    )
+    reply = asyncio.ensure_future(broker.request(Channels.COORDINATOR_TO_EXECUTION, request, timeout=60,
+                                                 correlation_id=task_id))
+
+    pid = None
+    if kind == "sandbox":
+        pid = await wait_for_pid(pid_file)
+    else:
+        await asyncio.sleep(0.2)
+
+    stop = InternalMessage(
+        message_type=MessageType.STATUS_UPDATE,
+        sender=AgentType.LANGUAGE,
+        receiver=AgentType.COORDINATOR,
+        session_id=SESSION,
+        payload={"command": "stop"}
+    )
+    stopped_at = time.perf_counter()
+    await broker.publish(Channels.INTERRUPT_CONTROL, stop)
+
+    result = await reply
+    reply_ms = (time.perf_counter() - stopped_at) * 1000
+    assert result["status"] == "failed", result
+
+    quiet_ms = None
+    if pid is not None:
+        while process_alive(pid):
+            await asyncio.sleep(0.001)
+        quiet_ms = (time.perf_counter() - stopped_at) * 1000
+    return reply_ms, quiet_ms
+
+
+async def run_benchmark(runs: int):
+    broker = MessageBroker()
+
+    async def handle_execution_request(message):
+        if message.payload["kind"] == "sandbox":
+            await asyncio.to_thread(
+                run_process, [sys.executable, "-c", SLEEPER, message.payload["pid_file"]], 60
+            )
+        else:
+            await asyncio.sleep(60)
+
+    async def handle_execution_response(message):
+        broker.resolve(message.task_id, message.payload)
+
+    subscribe_execution_intake(broker, handle_execution_request)
+    broker.subscribe(Channels.EXECUTION_TO_COORDINATOR, handle_execution_response)
+    await broker.start()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as pid_dir:
+        for kind in ("sandbox", "playwright"):
+            samples = [await measure(broker, kind, i, pid_dir) for i in range(runs)]
+            results[kind] = samples
+    await broker.stop()
+    return results
+
+
+async def measure_planning(streamed: bool, run: int):
+    session_id = f"{SESSION}_plan_{run}"
+    planning = asyncio.Event()
+    cancelled = []
+
+    async def never_answers(*args, **kwargs):
+        planning.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {"tasks": []}
+
+    coordinator.decompose_task_to_actions = never_answers
+    coordinator.PLAN_STREAMING = streamed
+    task_queue = coordinator.task_queues.get(session_id)
+    task_queue.reset()  # as run_plan does when it accepts the request
+    state = {
+        "input": {"confirmation": "open calculator", "device_type": "desktop"},
+        "session_id": session_id,
+        "original_message_id": f"plan_{run}",
+        "user_id": "bench_user",
+        "conversation_history": [],
+    }
+    graph_run = asyncio.ensure_future(
+        coordinator.coordinator_graph.ainvoke(state, {"configurable": {"thread_id": session_id}})
+    )
+    await planning.wait()
+
+    stopped_at = time.perf_counter()
+    task_queue.stop()
+    await graph_run
+    plan_ms = (time.perf_counter() - stopped_at) * 1000
+    assert cancelled, "decomposition was not cancelled"
+    assert not task_queue.execution_history, "a task ran after the stop"
+    return plan_ms
+
+
+async def run_planning_benchmark(runs: int):
+    decompose, streaming = coordinator.decompose_task_to_actions, coordinator.PLAN_STREAMING
+    try:
+        return {
+            "planning": [await measure_planning(False, i) for i in range(runs)],
+            "streaming": [await measure_planning(True, i) for i in range(runs)],
+        }
+    finally:
+        coordinator.decompose_task_to_actions, coordinator.PLAN_STREAMING = decompose, streaming
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.runs))
+    planning = asyncio.run(run_planning_benchmark(args.runs))
+
+    print("=" * 70)
+    print(f"📊 Stop to quiescence ({args.runs} runs each, target < {TARGET_MS} ms)")
+    print("=" * 70)
+    print(f"{'task':<12} {'metric':<8} {'p50 ms':>9} {'max ms':>9}  ok")
+    passed = True
+    rows = []
+    for kind, samples in results.items():
+        rows += [(kind, "reply", [s[0] for s in samples]), (kind, "quiet", [s[1] for s in samples])]
+    rows += [(kind, "plan", samples) for kind, samples in planning.items()]
+    for kind, label, values in rows:
+        if values[0] is None:
+            continue
+        ok = max(values) < TARGET_MS
+        passed = passed and ok
+        print(f"{kind:<12} {label:<8} {statistics.median(values):>9.1f} {max(values):>9.1f}  {'✅' if ok else '❌'}")
+    print(f"execution scopes: {execution_scopes.get_stats()}")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
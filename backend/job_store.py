@@ -0,0 +1,165 @@
+"""
+Job Store - Bounded, TTL-evicted records for asynchronous /jobs requests
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+JOB_STORE_MAX = int(os.getenv("JOB_STORE_MAX", 10000))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", 600))
+JOB_MAX_EVENTS = int(os.getenv("JOB_MAX_EVENTS", 200))
+
+# Terminal states
+FINISHED_STATES = ("completed", "failed", "timeout")
+
+
+class JobStoreFullError(RuntimeError):
+    """Raised when every slot holds a job that is still running"""
+
+
+class Job:
+    """One submitted request: status, progress events and final result"""
+    __slots__ = (
+        "job_id", "session_id", "user_id", "status", "created_at", "updated_at",
+        "result", "error", "events", "next_seq", "_changed",
+    )
+
+    def __init__(self, job_id: str, session_id: str, user_id: str):
+        self.job_id = job_id
+        self.session_id = session_id
+        self.user_id = user_id
+        self.status = "queued"
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.events: deque = deque(maxlen=JOB_MAX_EVENTS)
+        self.next_seq = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def add_event(self, event_type: str, data: Any):
+        self.events.append({"seq": self.next_seq, "type": event_type, "data": data})
+        self.next_seq += 1
+        self._touch()
+
+    def set_status(self, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        self.status = status
+        if result is not None:
+            self.result = result
+        if error is not None:
+            self.error = error
+        self.add_event("status", {"status": status})
+
+    def events_since(self, seq: int) -> List[Dict[str, Any]]:
+        return [e for e in self.events if e["seq"] >= seq]
+
+    async def wait_for_change(self, seq: int, timeout: float) -> bool:
+        """Wait until the job has an event numbered seq or later; False on timeout"""
+        if self.next_seq > seq:
+            # Added while the caller was busy (e.g. suspended at a yield) - already here
+            return True
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _touch(self):
+        self.updated_at = time.time()
+        # Wake current waiters, then give later waiters a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "result": self.result,
+            "error": self.error,
+            "events": self.next_seq,
+        }
+
+
+class JobStore:
+    """
+    Insertion-ordered job table with a hard size bound.
+
+    Finished jobs live for ttl seconds after their last update; when the
+    table is full the oldest finished jobs are evicted first.
+    """
+
+    def __init__(self, max_jobs: int = JOB_STORE_MAX, ttl: float = JOB_TTL_SECONDS):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._last_sweep = 0.0
+
+        # Metrics
+        self.submitted = 0
+        self.evicted = 0
+        self.rejected = 0
+
+    def create(self, job_id: str, session_id: str, user_id: str) -> Job:
+        self.sweep()
+        if len(self.jobs) >= self.max_jobs:
+            self._evict_finished(len(self.jobs) - self.max_jobs + 1)
+            if len(self.jobs) >= self.max_jobs:
+                self.rejected += 1
+                raise JobStoreFullError(f"{len(self.jobs)} jobs still running")
+
+        job = Job(job_id, session_id, user_id)
+        self.jobs[job_id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is not None and self._expired(job, time.time()):
+            del self.jobs[job_id]
+            self.evicted += 1
+            return None
+        return job
+
+    def sweep(self, min_interval: float = 1.0):
+        """Drop expired finished jobs (at most once per min_interval)"""
+        now = time.time()
+        if now - self._last_sweep < min_interval:
+            return
+        self._last_sweep = now
+        for job_id in [j.job_id for j in self.jobs.values() if self._expired(j, now)]:
+            del self.jobs[job_id]
+            self.evicted += 1
+
+    def _expired(self, job: Job, now: float) -> bool:
+        return job.finished and now - job.updated_at > self.ttl
+
+    def _evict_finished(self, count: int):
+        for job_id in [j.job_id for j in self.jobs.values() if j.finished][:count]:
+            del self.jobs[job_id]
+            self.evicted += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        running = sum(1 for j in self.jobs.values() if not j.finished)
+        return {
+            "jobs": len(self.jobs),
+            "running": running,
+            "max_jobs": self.max_jobs,
+            "ttl_seconds": self.ttl,
+            "submitted": self.submitted,
+            "evicted": self.evicted,
+            "rejected": self.rejected,
+        }
+
+
+# Global job store
+job_store = JobStore()
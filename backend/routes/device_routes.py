@@ -3,15 +3,22 @@ FIXED Device Routes - Properly converts global_action to navigate_home/navigate_
 """
 
 from fastapi import APIRouter, HTTPException, Path, Body
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional
 import logging
+import time
+from agents.utils.shared_state import shared_dict
+from agents.utils.broker import broker
+from agents.utils.protocol import Channels
+from agents.utils.device_protocol import action_correlation_id, ACTION_OUTCOMES, ACTION_OUTCOME_TTL_SECONDS
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/device", tags=["device"])
 
-# Device registry
-DEVICE_REGISTRY: Dict[str, Dict[str, Any]] = {
+# Device registry - shared by all workers (see agents/utils/shared_state.py).
+# Update devices with DEVICE_REGISTRY.update_fields so concurrent heartbeats
+# and registrations from different workers never overwrite each other.
+DEVICE_REGISTRY = shared_dict("device_registry", initial={
     "default_device": {
         "device_id": "default_device",
         "name": "Default Device",
@@ -23,11 +30,38 @@ DEVICE_REGISTRY: Dict[str, Dict[str, Any]] = {
         "app_name": "com.google.android.gm",
         "ui_tree": None
     }
-}
+})
 
-# Pending actions and results
-PENDING_ACTIONS: Dict[str, List[Dict[str, Any]]] = {}
-ACTION_RESULTS: Dict[str, List[Dict[str, Any]]] = {}
+# Pending actions per device (atomic append / pop_all)
+PENDING_ACTIONS = shared_dict("device_pending_actions")
+
+# Waiters pop their own outcome; results reported after the waiter gave up
+# are swept at most this often (a sweep reads the whole namespace)
+ACTION_OUTCOME_SWEEP_SECONDS = 60
+_last_outcome_sweep = 0.0
+
+
+def sweep_action_outcomes(now: float):
+    """Expire orphaned ACTION_OUTCOMES, throttled to one sweep per ACTION_OUTCOME_SWEEP_SECONDS"""
+    global _last_outcome_sweep
+    if now - _last_outcome_sweep < ACTION_OUTCOME_SWEEP_SECONDS:
+        return
+    _last_outcome_sweep = now
+    for key, outcome in ACTION_OUTCOMES.items():
+        if now - outcome.get("received", 0) > ACTION_OUTCOME_TTL_SECONDS:
+            ACTION_OUTCOMES.pop(key, None)  # reported after its waiter gave up
+
+
+def new_device(device_id: str, name: Optional[str] = None) -> Dict[str, Any]:
+    """Registry entry for a device seen for the first time"""
+    return {
+        "device_id": device_id,
+        "name": name or f"Device {device_id}",
+        "status": "online",
+        "last_seen": None,
+        "screen_width": 1080,
+        "screen_height": 2340
+    }
 
 
 @router.get("/{device_id}/ui-tree")
@@ -69,24 +103,12 @@ async def update_ui_tree(
     """Update UI tree from device"""
     logger.info(f"📥 Received UI tree update from device: {device_id}")
     
-    if device_id not in DEVICE_REGISTRY:
-        DEVICE_REGISTRY[device_id] = {
-            "device_id": device_id,
-            "name": f"Device {device_id}",
-            "status": "online",
-            "last_seen": None,
-            "screen_width": tree_data.get("screen_width", 1080) if tree_data else 1080,
-            "screen_height": tree_data.get("screen_height", 2340) if tree_data else 2340,
-            "ui_tree": tree_data
-        }
-        logger.info(f"✅ Auto-registered new device: {device_id}")
-    else:
-        device = DEVICE_REGISTRY[device_id]
-        device["status"] = "online"
-        device["ui_tree"] = tree_data
-        if tree_data:
-            device["screen_width"] = tree_data.get("screen_width", 1080)
-            device["screen_height"] = tree_data.get("screen_height", 2340)
+    fields = {"status": "online", "ui_tree": tree_data}
+    if tree_data:
+        fields["screen_width"] = tree_data.get("screen_width", 1080)
+        fields["screen_height"] = tree_data.get("screen_height", 2340)
+    # Atomic merge; auto-registers a device seen for the first time
+    DEVICE_REGISTRY.update_fields(device_id, fields, default=new_device(device_id))
     
     return {"status": "ok", "message": f"UI tree updated for {device_id}"}
 
@@ -99,24 +121,13 @@ async def update_device_status(
     """Update device status"""
     logger.info(f"📝 Updating status for device: {device_id}")
     
-    if device_id not in DEVICE_REGISTRY:
-        DEVICE_REGISTRY[device_id] = {
-            "device_id": device_id,
-            "name": f"Device {device_id}",
-            "status": "online",
-            "last_seen": None,
-            "screen_width": 1080,
-            "screen_height": 2340
-        }
-    
-    device = DEVICE_REGISTRY[device_id]
-    device["status"] = "online"
-    
+    fields = {"status": "online"}
     if status_data:
-        device["android_version"] = status_data.get("android_version")
-        device["app_name"] = status_data.get("app_name")
-        device["screen_width"] = status_data.get("screen_width", 1080)
-        device["screen_height"] = status_data.get("screen_height", 2340)
+        fields["android_version"] = status_data.get("android_version")
+        fields["app_name"] = status_data.get("app_name")
+        fields["screen_width"] = status_data.get("screen_width", 1080)
+        fields["screen_height"] = status_data.get("screen_height", 2340)
+    DEVICE_REGISTRY.update_fields(device_id, fields, default=new_device(device_id))
     
     return {"status": "ok", "message": f"Status updated for {device_id}"}
 
@@ -126,10 +137,8 @@ async def get_pending_actions(device_id: str = Path(...)):
     """Get pending actions for device (polling endpoint)"""
     # logger.info(f"📥 Android polling for actions: {device_id}")  # Commented to reduce log spam
     
-    if device_id not in PENDING_ACTIONS:
-        PENDING_ACTIONS[device_id] = []
-    
-    actions = PENDING_ACTIONS[device_id]
+    # Take and clear in one step so two workers never hand out the same action
+    actions = PENDING_ACTIONS.pop_all(device_id)
     
     if actions:
         logger.info(f"   📤 Returning {len(actions)} pending actions")
@@ -139,9 +148,6 @@ async def get_pending_actions(device_id: str = Path(...)):
         "count": len(actions)
     }
     
-    # Clear after returning
-    PENDING_ACTIONS[device_id] = []
-    
     return response
 
 
@@ -193,10 +199,7 @@ async def execute_action_on_device(
             # Keep as global_action
     
     # Queue the action
-    if device_id not in PENDING_ACTIONS:
-        PENDING_ACTIONS[device_id] = []
-    
-    PENDING_ACTIONS[device_id].append(action_data)
+    PENDING_ACTIONS.append(device_id, action_data)
     logger.info(f"✅ Action queued for polling: {action_data.get('action_type')}")
     
     # Return immediate success
@@ -216,25 +219,15 @@ async def register_device_post(
     """Register device"""
     logger.info(f"✅ Registering device via POST: {device_id}")
     
-    if device_id not in DEVICE_REGISTRY:
-        DEVICE_REGISTRY[device_id] = {
-            "device_id": device_id,
-            "name": device_data.get("name", f"Device {device_id}") if device_data else f"Device {device_id}",
-            "status": "online",
-            "last_seen": None,
-            "screen_width": 1080,
-            "screen_height": 2340
-        }
-    
-    device = DEVICE_REGISTRY[device_id]
-    device["status"] = "online"
-    
+    fields = {"status": "online"}  # Mark as online when registering
     if device_data:
-        device["name"] = device_data.get("name", device["name"])
-        device["android_version"] = device_data.get("android_version")
-        device["device_model"] = device_data.get("device_model")
-        device["screen_width"] = device_data.get("screen_width", 1080)
-        device["screen_height"] = device_data.get("screen_height", 2340)
+        if device_data.get("name"):
+            fields["name"] = device_data["name"]
+        fields["android_version"] = device_data.get("android_version")
+        fields["device_model"] = device_data.get("device_model")
+        fields["screen_width"] = device_data.get("screen_width", 1080)
+        fields["screen_height"] = device_data.get("screen_height", 2340)
+    device = DEVICE_REGISTRY.update_fields(device_id, fields, default=new_device(device_id))
     
     logger.info(f"✅ Device {device_id} is now ONLINE")
     
@@ -280,29 +273,18 @@ async def register_device_get(
     """
     logger.info(f"✅ Registering device: {device_id}")
     
-    if device_id not in DEVICE_REGISTRY:
-        DEVICE_REGISTRY[device_id] = {
-            "device_id": device_id,
-            "name": name or f"Device {device_id}",
-            "status": "online",
-            "last_seen": None,
-            "android_version": android_version,
-            "screen_width": 1080,
-            "screen_height": 2340
-        }
-        logger.info(f"✅ Device registered: {device_id}")
-    else:
-        device = DEVICE_REGISTRY[device_id]
-        device["status"] = "online"
-        if name:
-            device["name"] = name
-        if android_version:
-            device["android_version"] = android_version
+    fields = {"status": "online"}
+    if name:
+        fields["name"] = name
+    if android_version:
+        fields["android_version"] = android_version
+    device = DEVICE_REGISTRY.update_fields(device_id, fields, default=new_device(device_id))
+    logger.info(f"✅ Device registered: {device_id}")
     
     return {
         "status": "ok",
         "message": f"Device {device_id} registered",
-        "device_info": DEVICE_REGISTRY[device_id]
+        "device_info": device
     }
 
 
@@ -326,25 +308,15 @@ async def register_device_post(
     """
     logger.info(f"✅ Registering device via POST: {device_id}")
     
-    if device_id not in DEVICE_REGISTRY:
-        DEVICE_REGISTRY[device_id] = {
-            "device_id": device_id,
-            "name": device_data.get("name", f"Device {device_id}") if device_data else f"Device {device_id}",
-            "status": "online",
-            "last_seen": None,
-            "screen_width": 1080,
-            "screen_height": 2340
-        }
-    
-    device = DEVICE_REGISTRY[device_id]
-    device["status"] = "online"  # Mark as online when registering
-    
+    fields = {"status": "online"}  # Mark as online when registering
     if device_data:
-        device["name"] = device_data.get("name", device["name"])
-        device["android_version"] = device_data.get("android_version")
-        device["device_model"] = device_data.get("device_model")
-        device["screen_width"] = device_data.get("screen_width", 1080)
-        device["screen_height"] = device_data.get("screen_height", 2340)
+        if device_data.get("name"):
+            fields["name"] = device_data["name"]
+        fields["android_version"] = device_data.get("android_version")
+        fields["device_model"] = device_data.get("device_model")
+        fields["screen_width"] = device_data.get("screen_width", 1080)
+        fields["screen_height"] = device_data.get("screen_height", 2340)
+    device = DEVICE_REGISTRY.update_fields(device_id, fields, default=new_device(device_id))
     
     logger.info(f"✅ Device {device_id} is now ONLINE")
     
@@ -358,9 +330,7 @@ async def register_device_post(
 # REACT LOOP ENDPOINTS (for LLM-driven automation)
 # ============================================================================
 
-# Store pending actions and results per device
-PENDING_ACTIONS: Dict[str, List[Dict[str, Any]]] = {}
-ACTION_RESULTS: Dict[str, List[Dict[str, Any]]] = {}
+# Pending actions per device: PENDING_ACTIONS above; results go to ACTION_OUTCOMES
 
 
 @router.get("/{device_id}/pending-actions")
@@ -375,10 +345,8 @@ async def get_pending_actions(device_id: str = Path(..., description="Device ID"
     """
     # logger.info(f"📥 Android polling for actions: {device_id}")  # Commented to reduce log spam
     
-    if device_id not in PENDING_ACTIONS:
-        PENDING_ACTIONS[device_id] = []
-    
-    actions = PENDING_ACTIONS[device_id]
+    # Take and clear in one step so two workers never hand out the same action
+    actions = PENDING_ACTIONS.pop_all(device_id)
     
     if actions:
         logger.info(f"   📤 Returning {len(actions)} pending actions")
@@ -389,9 +357,6 @@ async def get_pending_actions(device_id: str = Path(..., description="Device ID"
         "count": len(actions)
     }
     
-    # Clear pending actions after returning them
-    PENDING_ACTIONS[device_id] = []
-    
     return response
 
 
@@ -423,11 +388,17 @@ async def receive_action_result(
         if not result_data.get('success'):
             logger.warning(f"   Error: {result_data.get('error')}")
     
-    if device_id not in ACTION_RESULTS:
-        ACTION_RESULTS[device_id] = []
-    
-    # Store the result
-    ACTION_RESULTS[device_id].append(result_data)
+    # Hand it to the strategy waiting on this action: through this worker's
+    # broker, and through shared state for a strategy running in another worker
+    if result_data and result_data.get('action_id'):
+        correlation_id = action_correlation_id(device_id, result_data['action_id'])
+        now = time.time()
+        sweep_action_outcomes(now)
+        ACTION_OUTCOMES[correlation_id] = {"result": result_data, "received": now}
+        await broker.publish(Channels.DEVICE_ACTION_RESULT, {
+            "correlation_id": correlation_id,
+            "result": result_data
+        })
     
     return {
         "status": "ok",
@@ -480,10 +451,7 @@ async def execute_action_on_device(
         action_data["action_type"] = "goToHome"
     
     # Queue the action for polling
-    if device_id not in PENDING_ACTIONS:
-        PENDING_ACTIONS[device_id] = []
-    
-    PENDING_ACTIONS[device_id].append(action_data)
+    PENDING_ACTIONS.append(device_id, action_data)
     logger.info(f"✅ Action queued for polling: {action_data.get('action_type')}")
     
     # Return immediate success - actual execution happens on Android
@@ -9,7 +9,7 @@ import wave
 from pathlib import Path
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
 # Use Google Gemini API for transcription and TTS
 from google import genai
@@ -20,9 +20,12 @@ from pathlib import Path
 import base64
 import logging
 # Import broker and agents
-from agents.utils.broker import broker
+from agents.utils.broker import broker, OverflowPolicy, InFlightLimitError, BROKER_TRANSPORT
+from agents.utils.broker_journal import BrokerJournal, JOURNAL_ENABLED
 from agents.language_agent import start_language_agent
-from agents.coordinator_agent.coordinator_agent import start_coordinator_agent
+from agents.coordinator_agent.coordinator_agent import (
+    start_coordinator_agent, stop_coordinator_agent, get_scheduler_stats, get_task_latency_stats
+)
 from agents.reasoning_agent import start_reasoning_agent
 # from agents.execution_agent.Coordinator import start_execution_agent
 from agents.execution_agent.RAG.code_execution import initialize_execution_agent_for_server
@@ -31,13 +34,28 @@ from agents.utils.protocol import (
     ClarificationMessage
 )
 from ThinkingStepManager import ThinkingStepManager
+from job_store import job_store, JobStoreFullError
+from admission import (
+    AdmissionRejected, process_admission, transcribe_admission, tts_admission, get_admission_stats
+)
 from routes.device_routes import router as device_router
 from dotenv import load_dotenv
 import json
+import uuid
+from urllib.parse import urlencode
 from memory_api import router as memory_router
 
 load_dotenv()
 
+# Agents running in their own processes (see agent_worker.py), e.g. "execution,reasoning".
+# Only meaningful with BROKER_TRANSPORT=ipc.
+EXTERNAL_AGENTS = {a.strip() for a in os.getenv("AURA_EXTERNAL_AGENTS", "").split(",") if a.strip()}
+# Host the IPC broker daemon inside this process (disable when running it standalone)
+HOST_BROKER_DAEMON = os.getenv("BROKER_HOST_DAEMON", "1") == "1"
+broker_daemon = None
+# How long a submitted /jobs request may run before it is marked timed out
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", 300))
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -45,9 +63,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Store pending responses (for HTTP API)
-pending_responses = {}
-
 # Initialize Google Gemini API client using new SDK
 GEMINI_KEY = os.environ.get("GEMINI_API_KEY")
 if not GEMINI_KEY:
@@ -67,9 +82,16 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting AURA Backend...")
     
-    # Start broker
+    # Start broker (and the cross-process daemon when agents run in worker processes)
+    global broker_daemon
+    if BROKER_TRANSPORT == "ipc" and HOST_BROKER_DAEMON:
+        from agents.utils.broker_ipc import BrokerDaemon
+        broker_daemon = BrokerDaemon()
+        await broker_daemon.start()
+    if JOURNAL_ENABLED:
+        broker.enable_journal(BrokerJournal())
     await broker.start()
-    logger.info("✅ Broker started")
+    logger.info(f"✅ Broker started (transport: {BROKER_TRANSPORT})")
     
     # Subscribe to output channels BEFORE starting agents
     broker.subscribe(Channels.LANGUAGE_OUTPUT, handle_language_output)
@@ -78,23 +100,25 @@ async def lifespan(app: FastAPI):
     
     # Start all agents as background tasks (don't wait for them)
     try:
-        logger.info("🚀 Starting Language Agent...")
-        asyncio.create_task(start_language_agent(broker))
-        await asyncio.sleep(0.1)  # Allow task to register
-        
-        logger.info("🚀 Starting Coordinator Agent...")
-        asyncio.create_task(start_coordinator_agent(broker))
-        await asyncio.sleep(0.1)
-        
-        logger.info("🚀 Starting Reasoning Agent...")
-        asyncio.create_task(start_reasoning_agent())
-        await asyncio.sleep(0.1)
-        
-        logger.info("🚀 Starting Execution Agent...")
-        asyncio.create_task(initialize_execution_agent_for_server(broker))
-        await asyncio.sleep(0.1)
+        agent_starters = [
+            ("language", "Language Agent", lambda: start_language_agent(broker)),
+            ("coordinator", "Coordinator Agent", lambda: start_coordinator_agent(broker)),
+            ("reasoning", "Reasoning Agent", lambda: start_reasoning_agent()),
+            ("execution", "Execution Agent", lambda: initialize_execution_agent_for_server(broker)),
+        ]
+        for key, name, starter in agent_starters:
+            if key in EXTERNAL_AGENTS:
+                logger.info(f"↪️ {name} runs in a separate worker process")
+                continue
+            logger.info(f"🚀 Starting {name}...")
+            asyncio.create_task(starter())
+            await asyncio.sleep(0.1)  # Allow task to register
         
         logger.info("✅ All agents scheduled successfully")
+        
+        # Replay or fail requests a previous crash left unacknowledged
+        if broker.journal:
+            asyncio.create_task(broker.recover_journal())
     except Exception as e:
         logger.error(f"❌ Error starting agents: {e}", exc_info=True)
     
@@ -103,7 +127,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down AURA Backend...")
+    if "coordinator" not in EXTERNAL_AGENTS:
+        stop_coordinator_agent()
     await broker.stop()
+    if broker_daemon:
+        await broker_daemon.stop()
     logger.info("✅ Broker stopped")
 
 
@@ -143,8 +171,49 @@ logger.info("✅ CORS middleware configured")
 
 logger = logging.getLogger(__name__)
 
+def admission_error(e: AdmissionRejected) -> HTTPException:
+    logger.warning(f"🚦 Shedding request: {e.reason} (retry after {e.retry_after_header}s)")
+    return HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": e.retry_after_header})
+
+
+async def admission_key(request: Request) -> str:
+    """Identity used for per-user limits: user_id, else session_id, else client address"""
+    try:
+        data = await request.json()  # body is cached, the handler can read it again
+    except Exception:
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+    key = data.get("user_id") or data.get("session_id")
+    if not key:
+        key = request.client.host if request.client else "anonymous"
+    return str(key)
+
+
+@asynccontextmanager
+async def admitted(controller, request: Request):
+    """Hold one admission slot of controller for the duration of the block (429 when shed)"""
+    try:
+        controller.check_rate()  # before the body is read
+        user_key = await admission_key(request)
+        controller.check_rate(user_key)
+        acquired_at = await controller.acquire(user_key)
+    except AdmissionRejected as e:
+        raise admission_error(e)
+    try:
+        yield
+    finally:
+        controller.release(user_key, acquired_at)
+
+
 @app.post("/text-to-speech")
 async def text_to_speech(request: Request):
+    """Admission-controlled TTS (see synthesize_speech)"""
+    async with admitted(tts_admission, request):
+        return await synthesize_speech(request)
+
+
+async def synthesize_speech(request: Request):
     """
     Convert text to speech using gTTS (Google Text-to-Speech)
     
@@ -222,6 +291,12 @@ async def text_to_speech(request: Request):
 
 @app.post("/transcribe")
 async def transcribe_audio(request: Request):
+    """Admission-controlled transcription (see run_transcription)"""
+    async with admitted(transcribe_admission, request):
+        return await run_transcription(request)
+
+
+async def run_transcription(request: Request):
     """
     Transcribe audio using Google Gemini with file upload.
     Supports bilingual Arabic/English transcription.
@@ -369,60 +444,62 @@ async def create_new_session(request: Request):
         logger.error(f"❌ Session creation failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
     
+def build_process_message(data: dict) -> AgentMessage:
+    """Validate a /process or /jobs body into the Language Agent input message"""
+    session_id = data.get("session_id", "default")
+    user_input = data.get("input", "").strip()
+    is_clarification = data.get("is_clarification", False)
+    device_type = data.get("device_type", "mobile")
+    user_id = data.get("user_id", "test_user")  # ✅ ADD THIS LINE
+    
+    if not user_input:
+        raise HTTPException(status_code=400, detail="Missing 'input' field")
+    
+    logger.info(f"📥 HTTP request from session {session_id}: {user_input}")
+    logger.info(f"📱 Device type: {device_type}")
+    
+    if is_clarification:
+        return AgentMessage(
+            message_type=MessageType.CLARIFICATION_RESPONSE,
+            sender=AgentType.LANGUAGE,
+            receiver=AgentType.LANGUAGE,
+            session_id=session_id,
+            payload={"answer": user_input, "input": user_input, "device_type": device_type, "user_id": user_id}
+        )
+    return AgentMessage(
+        message_type=MessageType.TASK_REQUEST,
+        sender=AgentType.LANGUAGE,
+        receiver=AgentType.LANGUAGE,
+        session_id=session_id,
+        payload={"input": user_input, "device_type": device_type,"user_id": user_id}
+    )
+
+
 @app.post("/process")
 async def process_user_input(request: Request):
+    """Admission-controlled /process (see run_process_request)"""
+    async with admitted(process_admission, request):
+        return await run_process_request(request)
+
+
+async def run_process_request(request: Request):
     """
     Main endpoint for user input
     
     Flow: HTTP → Language Agent → Coordinator → Execution → HTTP Response
+    Holds the connection until the answer arrives; long plans should use /jobs.
     """
     try:
         data = await request.json()
-        session_id = data.get("session_id", "default")
-        user_input = data.get("input", "").strip()
-        is_clarification = data.get("is_clarification", False)
-        device_type = data.get("device_type", "mobile")
-        user_id = data.get("user_id", "test_user")  # ✅ ADD THIS LINE
-        
-        if not user_input:
-            raise HTTPException(status_code=400, detail="Missing 'input' field")
-        
-        logger.info(f"📥 HTTP request from session {session_id}: {user_input}")
-        logger.info(f"📱 Device type: {device_type}")
-        
-        # Create message
-        if is_clarification:
-            message = AgentMessage(
-                message_type=MessageType.CLARIFICATION_RESPONSE,
-                sender=AgentType.LANGUAGE,
-                receiver=AgentType.LANGUAGE,
-                session_id=session_id,
-                payload={"answer": user_input, "input": user_input, "device_type": device_type, "user_id": user_id}
-            )
-        else:
-            message = AgentMessage(
-                message_type=MessageType.TASK_REQUEST,
-                sender=AgentType.LANGUAGE,
-                receiver=AgentType.LANGUAGE,
-                session_id=session_id,
-                payload={"input": user_input, "device_type": device_type,"user_id": user_id}
-            )
-        
-        logger.info(f"⏳ Creating pending response for message ID: {message.message_id}")
-        future = asyncio.Future()
-        pending_responses[message.message_id] = future
-        logger.info(f"📝 Registered pending response. Total pending: {len(pending_responses)}")
-        logger.info(f"📝 Pending IDs: {list(pending_responses.keys())}")
+        message = build_process_message(data)
+        session_id = message.session_id
         
         # NEW: Send initial thinking update
         await ThinkingStepManager.update_step(session_id, "Processing input...", message.message_id)
         
-        logger.info(f"📤 Publishing message to {Channels.LANGUAGE_INPUT}")
-        await broker.publish(Channels.LANGUAGE_INPUT, message)
-        
-        logger.info(f"⏰ Waiting up to 60s for response...")
+        logger.info(f"📤 Publishing message to {Channels.LANGUAGE_INPUT} (reply expected on {message.message_id})")
         try:
-            response = await asyncio.wait_for(future, timeout=60.0)
+            response = await broker.request(Channels.LANGUAGE_INPUT, message, timeout=60.0)
             logger.info(f"✅ Response received: {response}")
             
             # NEW: Clear thinking steps
@@ -431,13 +508,12 @@ async def process_user_input(request: Request):
             return response
         except asyncio.TimeoutError:
             logger.error(f"❌ TIMEOUT waiting for response to message: {message.message_id}")
-            logger.error(f"❌ Pending responses at timeout: {list(pending_responses.keys())}")
             await ThinkingStepManager.clear_steps(session_id)
             raise HTTPException(status_code=504, detail="Request timeout")
-        finally:
-            if message.message_id in pending_responses:
-                pending_responses.pop(message.message_id)
-                logger.info(f"🗑️ Cleaned up pending response: {message.message_id}")
+        except InFlightLimitError as e:
+            logger.error(f"❌ Too many requests in flight: {e}")
+            await ThinkingStepManager.clear_steps(session_id)
+            raise HTTPException(status_code=503, detail="Server busy, please retry")
     
     except asyncio.TimeoutError:
         logger.error("❌ Request timeout - already handled in main flow")
@@ -448,6 +524,146 @@ async def process_user_input(request: Request):
         logger.error(f"❌ Error processing request: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+# ============================================================================
+# Asynchronous Job API
+# ============================================================================
+
+# Background job runners (kept referenced until they finish)
+job_tasks = set()
+
+
+async def run_job(job, message: AgentMessage, user_key: str):
+    """Wait for an execution slot, then drive the job: forward session progress and record the answer"""
+    # Admitted when it starts executing; until then the job just stays queued
+    try:
+        acquired_at = await process_admission.acquire_for_job(user_key, JOB_TIMEOUT_SECONDS)
+    except AdmissionRejected as e:
+        logger.error(f"❌ Job {job.job_id} never got a slot: {e.reason}")
+        job.set_status("timeout", error="Server busy, please retry")
+        return
+    try:
+        await execute_job(job, message)
+    finally:
+        process_admission.release(user_key, acquired_at)
+
+
+async def execute_job(job, message: AgentMessage):
+    session_id = message.session_id
+
+    async def handle_progress(update):
+        if hasattr(update, 'payload'):
+            job.add_event("progress", update.payload)
+
+    # Session-scoped progress (thinking steps, task updates) while the job runs.
+    # Direct delivery: the callback only appends to the job's bounded event log.
+    subscription = broker.subscribe(
+        Channels.session_topic(Channels.BROADCAST, session_id),
+        handle_progress,
+        queued=False
+    )
+    job.set_status("running")
+    try:
+        await ThinkingStepManager.update_step(session_id, "Processing input...", message.message_id)
+        response = await broker.request(Channels.LANGUAGE_INPUT, message, timeout=JOB_TIMEOUT_SECONDS)
+        job.add_event("result", response)
+        job.set_status("completed", result=response)
+        logger.info(f"✅ Job {job.job_id} completed")
+    except asyncio.TimeoutError:
+        logger.error(f"❌ Job {job.job_id} timed out after {JOB_TIMEOUT_SECONDS}s")
+        job.set_status("timeout", error="Request timeout")
+    except InFlightLimitError as e:
+        logger.error(f"❌ Job {job.job_id} rejected: {e}")
+        job.set_status("failed", error="Server busy, please retry")
+    except Exception as e:
+        logger.error(f"❌ Job {job.job_id} failed: {e}", exc_info=True)
+        job.set_status("failed", error=str(e))
+    finally:
+        await ThinkingStepManager.clear_steps(session_id)
+        subscription.unsubscribe()
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: Request):
+    """
+    Submit user input without holding the connection open.
+
+    Returns a job ID at once; poll GET /jobs/{job_id} or stream
+    GET /jobs/{job_id}/stream for progress and the final response.
+    """
+    # Rate limits only - never waits, so the job ID comes back at once.
+    # The concurrency slot is taken when the job starts executing (run_job).
+    try:
+        process_admission.check_rate()  # before the body is read
+        data = await request.json()
+        message = build_process_message(data)
+        user_key = await admission_key(request)
+        process_admission.check_rate(user_key)
+    except AdmissionRejected as e:
+        raise admission_error(e)
+
+    try:
+        # Random, not the sequential message id: a job id must not be guessable
+        job = job_store.create(uuid.uuid4().hex, message.session_id, message.payload.get("user_id", "test_user"))
+    except JobStoreFullError as e:
+        logger.error(f"❌ Job store full: {e}")
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
+
+    task = asyncio.create_task(run_job(job, message, user_key))
+    job_tasks.add(task)
+    task.add_done_callback(job_tasks.discard)
+
+    logger.info(f"📥 Job {job.job_id} submitted for session {job.session_id}")
+    owner = urlencode({"user_id": job.user_id, "session_id": job.session_id})
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.job_id}?{owner}",
+        "stream_url": f"/jobs/{job.job_id}/stream?{owner}"
+    }
+
+
+def owned_job(job_id: str, user_id: str, session_id: str):
+    """The job if it belongs to this user and session; 404 otherwise, so ids can't be probed"""
+    job = job_store.get(job_id)
+    if job is None or job.user_id != user_id or job.session_id != session_id:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, session_id: str, user_id: str = "test_user"):
+    """Current status and, once finished, the final response of a job"""
+    return owned_job(job_id, user_id, session_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str, session_id: str, user_id: str = "test_user", after: int = 0):
+    """
+    Server-Sent Events for a job: progress/status/result events, replayed
+    from sequence number `after`, then live until the job finishes.
+    """
+    job = owned_job(job_id, user_id, session_id)
+
+    async def event_generator():
+        seq = after
+        try:
+            while True:
+                for event in job.events_since(seq):
+                    seq = event["seq"] + 1
+                    yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+                if job.finished:
+                    yield f"event: done\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+                    break
+                if not await job.wait_for_change(seq, timeout=30):
+                    # Keep connection alive with heartbeat
+                    yield ": heartbeat\n\n"
+        except GeneratorExit:
+            logger.info(f"🔌 Client disconnected from job stream: {job_id}")
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
 """
 Fixed message handlers for server.py
 Replace your handle_language_output and handle_coordinator_output functions with these
@@ -465,7 +681,7 @@ async def handle_language_output(message):
     logger.info(f"📋 Message ID: {message.message_id}")
     logger.info(f"📋 Response to: {message.response_to}")
     logger.info(f"📋 Payload: {message.payload}")
-    logger.info(f"📋 Current pending responses: {list(pending_responses.keys())}")
+    logger.info(f"📋 Requests in flight: {len(broker.replies.pending)}")
     
     if message.message_type == MessageType.CLARIFICATION_REQUEST:
         response_content = {
@@ -479,10 +695,8 @@ async def handle_language_output(message):
         target_id = message.response_to
         logger.info(f"🔍 Looking for pending response with ID: {target_id}")
         
-        if target_id and target_id in pending_responses:
-            logger.info(f"✅ FOUND! Resolving pending request: {target_id}")
-            pending_responses[target_id].set_result(response_content)
-            logger.info(f"✅ Response resolved successfully")
+        if broker.resolve(target_id, response_content):
+            logger.info(f"✅ Resolved pending request: {target_id}")
         else:
             logger.error(f"❌ NO PENDING RESPONSE FOUND for: {target_id}")
     
@@ -496,9 +710,8 @@ async def handle_language_output(message):
         logger.info(f"✅ Task response from Language Agent: {response_content}")
         
         target_id = message.response_to
-        if target_id and target_id in pending_responses:
-            logger.info(f"✅ Resolving pending request: {target_id}")
-            pending_responses[target_id].set_result(response_content)
+        if broker.resolve(target_id, response_content):
+            logger.info(f"✅ Resolved pending request: {target_id}")
         else:
             logger.error(f"❌ NO PENDING RESPONSE FOUND for: {target_id}")
 
@@ -537,9 +750,8 @@ async def handle_coordinator_output(message):
         logger.info(f"✅ Task completed, sending to TTS: '{response_text}'")
         
         target_id = message.response_to
-        if target_id and target_id in pending_responses:
-            logger.info(f"✅ Resolving pending request: {target_id}")
-            pending_responses[target_id].set_result(response)
+        if broker.resolve(target_id, response):
+            logger.info(f"✅ Resolved pending request: {target_id}")
         else:
             logger.warning(f"⚠️ No pending response for {target_id}, trying fallback...")
 
@@ -561,11 +773,36 @@ async def reset_session(request: Request):
         payload={"action": "reset"}
     )
     
-    await broker.publish(Channels.BROADCAST, reset_msg)
+    await broker.publish(Channels.session_topic(Channels.BROADCAST, session_id), reset_msg)
     
     return {"status": "reset", "session_id": session_id}
 
 
+@app.post("/interrupt")
+async def interrupt_session(request: Request):
+    """Pause, resume, stop or retry the running plan of a session"""
+    data = await request.json()
+    session_id = data.get("session_id", "default")
+    command = data.get("command", "")
+
+    if command not in ("pause", "resume", "stop", "retry"):
+        raise HTTPException(status_code=400, detail=f"Unknown command: {command}")
+
+    logger.info(f"⏯️ Interrupt '{command}' for session: {session_id}")
+
+    # Control-plane topic: delivered ahead of any queued task work
+    interrupt_msg = AgentMessage(
+        message_type=MessageType.STATUS_UPDATE,
+        sender=AgentType.LANGUAGE,
+        receiver=AgentType.COORDINATOR,
+        session_id=session_id,
+        payload={"command": command}
+    )
+    await broker.publish(Channels.INTERRUPT_CONTROL, interrupt_msg)
+
+    return {"status": "sent", "command": command, "session_id": session_id}
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -574,11 +811,33 @@ async def health_check():
         "service": "YUSR Unified Backend (Pub/Sub)",
         "version": "3.0.0",
         "broker": "running" if broker.running else "stopped",
+        "broker_transport": BROKER_TRANSPORT,
+        "worker_id": os.getenv("AURA_WORKER_ID", "0"),
         "transcription": "available (Google Gemini)" if genai_client else "unavailable",
         "tts": "available (Google Gemini TTS)" if genai_client else "unavailable"
     }
 
 
+@app.get("/broker/stats")
+async def broker_stats():
+    """Per-topic queue depth, lag and drop counters for spotting slow agents"""
+    return {
+        "delivery_mode": broker.delivery_mode.value,
+        "topics": broker.get_stats(),
+        "replies": broker.replies.get_stats(),
+        "journal": broker.journal.get_stats() if broker.journal else None,
+        "jobs": job_store.get_stats(),
+        "admission": get_admission_stats(),
+        "scheduler": get_scheduler_stats()
+    }
+
+
+@app.get("/tasks/latency")
+async def task_latency_stats():
+    """Learned latency percentiles and the adaptive timeout per task kind"""
+    return get_task_latency_stats()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -592,7 +851,9 @@ async def root():
             "/transcribe": "POST - Transcribe audio to text",
             "/text-to-speech": "POST - Convert text to speech",
             "/reset": "POST - Reset conversation session",
-            "/health": "GET - Service health check"
+            "/health": "GET - Service health check",
+            "/broker/stats": "GET - Message broker queue/lag and reply metrics",
+            "/tasks/latency": "GET - Task latency percentiles and adaptive timeouts"
         },
         "agents": {
             "language": "Natural language understanding",
@@ -603,6 +864,8 @@ async def root():
 
 from fastapi.responses import StreamingResponse
 
+THINKING_STREAM_MAXSIZE = 100
+
 @app.get("/thinking-stream/{session_id}")
 async def thinking_stream(session_id: str):
     """
@@ -610,16 +873,24 @@ async def thinking_stream(session_id: str):
     Frontend connects to this endpoint to receive real-time thinking steps
     """
     async def event_generator():
-        thinking_queue = asyncio.Queue()
+        # Bounded like the subscription: a slow client loses its oldest steps, never grows memory
+        thinking_queue = asyncio.Queue(maxsize=THINKING_STREAM_MAXSIZE)
         
         async def handle_thinking_update(message):
-            if hasattr(message, 'session_id') and message.session_id == session_id:
-                if hasattr(message, 'payload'):
-                    # Forward the entire payload so clients can react to different actions
-                    await thinking_queue.put(message.payload)
-        
-        # Subscribe to broadcast channel
-        broker.subscribe(Channels.BROADCAST, handle_thinking_update)
+            if hasattr(message, 'payload'):
+                # Forward the entire payload so clients can react to different actions
+                if thinking_queue.full():
+                    thinking_queue.get_nowait()
+                thinking_queue.put_nowait(message.payload)
+        
+        # Subscribe to this session's broadcast topic only - queued so a slow client never stalls publishers
+        subscription = broker.subscribe(
+            Channels.session_topic(Channels.BROADCAST, session_id),
+            handle_thinking_update,
+            queued=True,
+            maxsize=THINKING_STREAM_MAXSIZE,
+            overflow=OverflowPolicy.DROP_OLDEST
+        )
         
         try:
             while True:
@@ -635,6 +906,10 @@ async def thinking_stream(session_id: str):
             logger.info(f"🔌 Client disconnected from thinking stream: {session_id}")
         except Exception as e:
             logger.error(f"❌ Thinking stream error: {e}")
+        finally:
+            # Release the subscription so closed connections don't accumulate callbacks
+            subscription.unsubscribe()
+            logger.info(f"🔌 Released thinking stream subscription: {session_id}")
     
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
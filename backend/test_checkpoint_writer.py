@@ -0,0 +1,147 @@
+"""
+Test delta coalescing and the write-behind retry path of the checkpoint writer
+"""
+
+import asyncio
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+from agents.coordinator_agent import checkpoint_writer as writer_module
+from agents.coordinator_agent.checkpoint_writer import CheckpointWriter, coalesce, fold
+
+
+class FakeCollection:
+    """Records bulk_write batches; fails while fail_writes > 0"""
+
+    def __init__(self, fail_writes: int = 0):
+        self.fail_writes = fail_writes
+        self.batches = []
+
+    def bulk_write(self, operations, ordered=True):
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise ConnectionError("mongo unavailable")
+        self.batches.append(operations)
+
+    def find_one(self, query):
+        return None
+
+
+def test_reset_push_set_fold_into_one_replace():
+    kind, document = coalesce([
+        ("reset", {"plan": [{"task_id": "t1"}], "status": {}, "completed_task_ids": []}),
+        ("push", "plan", {"task_id": "t2"}),
+        ("set", "status.t1", "success"),
+        ("add", "completed_task_ids", "t1"),
+        ("add", "completed_task_ids", "t1"),
+    ])
+
+    assert kind == "replace"
+    assert document == {
+        "plan": [{"task_id": "t1"}, {"task_id": "t2"}],
+        "status": {"t1": "success"},
+        "completed_task_ids": ["t1"],
+    }
+
+
+def test_delete_after_reset_is_a_delete():
+    assert coalesce([("reset", {"plan": []}), ("set", "state", "running"), ("delete",)]) == ("delete", {})
+    assert fold([("reset", {"plan": []}), ("delete",)]) == [("delete",)]
+
+
+def test_reset_after_delete_is_a_replace():
+    kind, document = coalesce([("delete",), ("reset", {"plan": []}), ("set", "state", "finished")])
+
+    assert kind == "replace"
+    assert document == {"plan": [], "state": "finished"}
+
+
+def test_update_only_batch_uses_set_push_and_add_to_set():
+    kind, update = coalesce([
+        ("set", "status.t1", "success"),
+        ("add", "completed_task_ids", "t1"),
+        ("push", "plan", {"task_id": "t2"}),
+        ("set", "outputs.t1", "done"),
+        ("push", "plan", {"task_id": "t3"}),
+    ])
+
+    assert kind == "update"
+    assert update == {
+        "$set": {"status.t1": "success", "outputs.t1": "done"},
+        "$addToSet": {"completed_task_ids": {"$each": ["t1"]}},
+        "$push": {"plan": {"$each": [{"task_id": "t2"}, {"task_id": "t3"}]}},
+    }
+    assert fold([("set", "state", "running")]) == [("set", "state", "running")]
+
+
+def test_failed_flush_is_folded_into_later_deltas():
+    async def run():
+        collection = FakeCollection(fail_writes=1)
+        writer = CheckpointWriter(collection, flush_seconds=3600)
+        writer.begin("s1", {"confirmation": "open calculator"}, [{"task_id": "t1"}], {})
+
+        await writer.flush()  # fails; the reset waits for the next flush
+        assert writer.failures == 1
+        assert writer.pending["s1"][0][0] == "reset"
+
+        writer.task_finished("s1", "t1", "success", "42")
+        assert len(writer.pending["s1"]) == 4  # folded reset + three new deltas
+
+        await writer.flush()
+        assert len(collection.batches) == 1
+        [operation] = collection.batches[0]
+        assert isinstance(operation, ReplaceOne)  # one write carrying the reset and what followed
+        assert "s1" not in writer.pending and "s1" not in writer.attempts
+
+    asyncio.run(run())
+
+
+def test_update_batch_is_one_update_per_session():
+    async def run():
+        collection = FakeCollection()
+        writer = CheckpointWriter(collection, flush_seconds=3600)
+        writer.begin("s1", {}, [{"task_id": "t1"}], {})
+        writer.begin("s2", {}, [{"task_id": "t1"}], {})
+        await writer.flush()
+        writer.task_finished("s1", "t1", "success", "out")
+        writer.clear("s2")
+        await writer.flush()
+
+        operations = collection.batches[-1]
+        assert len(operations) == 2
+        assert sum(isinstance(op, UpdateOne) for op in operations) == 1
+        assert sum(isinstance(op, DeleteOne) for op in operations) == 1
+        assert writer.writes == 4
+
+    asyncio.run(run())
+
+
+def test_failed_flush_is_dropped_after_max_retries():
+    async def run():
+        collection = FakeCollection(fail_writes=writer_module.MAX_RETRIES + 1)
+        writer = CheckpointWriter(collection, flush_seconds=3600)
+        writer.begin("s1", {}, [{"task_id": "t1"}], {})
+
+        for attempt in range(writer_module.MAX_RETRIES):
+            await writer.flush()
+            assert "s1" in writer.pending, f"dropped after {attempt + 1} failures"
+        await writer.flush()
+
+        assert "s1" not in writer.pending and "s1" not in writer.attempts
+        assert writer.dropped == 1
+        assert collection.batches == []
+        # The in-memory resume point survives the dropped write
+        assert (await writer.load("s1"))["failed_task_id"] == "t1"
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_reset_push_set_fold_into_one_replace()
+    test_delete_after_reset_is_a_delete()
+    test_reset_after_delete_is_a_replace()
+    test_update_only_batch_uses_set_push_and_add_to_set()
+    test_failed_flush_is_folded_into_later_deltas()
+    test_update_batch_is_one_update_per_session()
+    test_failed_flush_is_dropped_after_max_retries()
+    print("✅ Checkpoint writer tests passed")
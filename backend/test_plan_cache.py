@@ -0,0 +1,127 @@
+"""
+Test slot extraction, template reuse, expiry and invalidation in the plan cache
+"""
+
+import asyncio
+
+from agents.coordinator_agent.plan_cache import PlanCache, extract_slots
+
+PREFERENCES = "No user preferences available"
+
+
+def open_app_plan(app: str):
+    return [{
+        "task_id": "task_1",
+        "ai_prompt": f"Open the {app} application",
+        "device": "desktop",
+        "target_agent": "action",
+        "extra_params": {"app_name": app, "action": "open_app"},
+    }]
+
+
+def new_cache(**kwargs) -> PlanCache:
+    return PlanCache(embedding_model=None, **kwargs)
+
+
+def key_for(cache: PlanCache, text: str, device_type: str = "desktop"):
+    return cache.cache_key(text, device_type, PREFERENCES)
+
+
+def test_extract_slots():
+    assert extract_slots("open calculator") == ("open {app}", [("app", "calculator")])
+    assert extract_slots("open youtube") == ("open {site}", [("site", "youtube")])
+    assert extract_slots("search cats on youtube") == ("search {query} on youtube", [("query", "cats")])
+    template, slots = extract_slots('type "hello world" in notepad')
+    assert template == 'type "{text}" in notepad' and slots == [("text", "hello world")]
+
+
+def test_exact_hit():
+    async def run():
+        cache = new_cache()
+        await cache.store(key_for(cache, "open calculator"), open_app_plan("calculator"))
+
+        plan = await cache.lookup(key_for(cache, "Open Calculator."))
+        assert plan == open_app_plan("calculator")
+        assert cache.exact_hits == 1
+
+    asyncio.run(run())
+
+
+def test_template_hit_substitutes_the_new_value():
+    async def run():
+        cache = new_cache()
+        await cache.store(key_for(cache, "open calculator"), open_app_plan("calculator"))
+
+        plan = await cache.lookup(key_for(cache, "open notepad"))
+        assert plan == open_app_plan("notepad")
+        assert cache.template_hits == 1
+
+    asyncio.run(run())
+
+
+def test_no_reuse_across_verbs_or_site_and_app():
+    async def run():
+        cache = new_cache()
+        await cache.store(key_for(cache, "open calculator"), open_app_plan("calculator"))
+
+        assert await cache.lookup(key_for(cache, "close calculator")) is None
+        assert await cache.lookup(key_for(cache, "open youtube")) is None
+        assert await cache.lookup(key_for(cache, "open notepad", device_type="mobile")) is None
+        assert cache.misses == 3
+
+    asyncio.run(run())
+
+
+def test_template_not_stored_when_a_slot_value_is_missing_from_the_plan():
+    async def run():
+        cache = new_cache()
+        plan = [{"task_id": "task_1", "ai_prompt": "Press the Windows key and run the app", "extra_params": {}}]
+        await cache.store(key_for(cache, "open calculator"), plan)
+
+        assert await cache.lookup(key_for(cache, "open notepad")) is None
+        assert await cache.lookup(key_for(cache, "open calculator")) == plan  # the exact entry still is
+
+    asyncio.run(run())
+
+
+def test_entries_expire_after_ttl():
+    async def run():
+        cache = new_cache(ttl_seconds=60)
+        await cache.store(key_for(cache, "open calculator"), open_app_plan("calculator"))
+        for entry in cache.entries.values():
+            entry.created -= 61
+
+        assert await cache.lookup(key_for(cache, "open calculator")) is None
+        assert await cache.lookup(key_for(cache, "open notepad")) is None
+        assert cache.expirations == 2 and not cache.entries
+
+    asyncio.run(run())
+
+
+def test_failed_plan_is_invalidated():
+    async def run():
+        cache = new_cache()
+        await cache.store(key_for(cache, "open calculator"), open_app_plan("calculator"))
+
+        # The template entry ran for "open notepad" and failed - it goes, the exact one stays
+        cache.invalidate(key_for(cache, "open notepad"))
+        assert cache.invalidations == 1
+        assert await cache.lookup(key_for(cache, "open paint")) is None
+        assert await cache.lookup(key_for(cache, "open calculator")) == open_app_plan("calculator")
+
+        cache.invalidate(key_for(cache, "open calculator"))
+        assert await cache.lookup(key_for(cache, "open calculator")) is None
+        assert cache.invalidations == 2
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_extract_slots()
+    test_exact_hit()
+    test_template_hit_substitutes_the_new_value()
+    test_no_reuse_across_verbs_or_site_and_app()
+    test_template_not_stored_when_a_slot_value_is_missing_from_the_plan()
+    test_entries_expire_after_ttl()
+    test_failed_plan_is_invalidated()
+    print("✅ Plan cache tests passed")
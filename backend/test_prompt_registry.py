@@ -0,0 +1,34 @@
+"""
+Test prompt budget trimming in the prompt registry
+"""
+
+from agents.utils.prompt_registry import PromptRegistry, Section
+
+
+def test_single_item_is_cut_not_dropped():
+    registry = PromptRegistry(budgets={})
+    full = registry.assemble("test", [Section("contexts", ["a" * 8000])], budget=100000).tokens
+
+    prompt = registry.assemble("test", [Section("contexts", ["a" * 8000])], budget=full - 100)
+
+    assert prompt.tokens <= full - 100
+    assert prompt.tokens >= full - 110, f"lost {full - prompt.tokens} tokens to a 100-token overage"
+    assert prompt.trimmed["contexts"] < 110
+
+
+def test_small_items_are_dropped_then_the_next_is_cut():
+    registry = PromptRegistry(budgets={})
+    items = [f"{n} " + "x" * 40 for n in range(10)]
+    full = registry.assemble("test", [Section("contexts", items)], budget=100000).tokens
+
+    prompt = registry.assemble("test", [Section("contexts", items)], budget=full - 25)
+
+    assert prompt.tokens <= full - 25
+    assert prompt.tokens >= full - 35
+    assert "6 " in prompt.text and "9 " not in prompt.text
+
+
+if __name__ == "__main__":
+    test_single_item_is_cut_not_dropped()
+    test_small_items_are_dropped_then_the_next_is_cut()
+    print("✅ Prompt registry trimming tests passed")
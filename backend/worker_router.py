@@ -0,0 +1,206 @@
+"""
+Run several backend workers behind a session-affinity router.
+
+Usage:
+    python worker_router.py --workers 4 --port 8000
+
+Starts `uvicorn server:app` N times on ports PORT+1..PORT+N and serves a
+small reverse proxy on PORT. Every request is routed by its session so a
+session's language agent, task queue and pending replies always live in
+the same worker:
+
+    /thinking-stream/{session_id}      -> worker of session_id
+    /jobs/{job_id}[/stream]            -> worker that accepted the job
+    JSON body / query session_id       -> worker of session_id
+    (old_session_id, then user_id, as fallbacks)
+    anything else                      -> round robin
+
+Workers share process-agnostic state through SQLite (AURA_STATE_BACKEND,
+see agents/utils/shared_state.py) and get their own broker journal
+directory and IPC broker address.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("worker_router")
+
+# Headers that must not be forwarded verbatim
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te",
+    "trailers", "transfer-encoding", "upgrade", "content-length", "content-encoding", "host",
+}
+MAX_TRACKED_JOBS = 100000
+
+
+class WorkerPool:
+    """Spawns the worker processes and picks one per request"""
+
+    def __init__(self, count: int, base_port: int, host: str = "127.0.0.1"):
+        self.ports = [base_port + 1 + i for i in range(count)]
+        self.host = host
+        self.processes: List[subprocess.Popen] = []
+        self.jobs: "OrderedDict[str, int]" = OrderedDict()  # job_id -> worker index
+        self.routed = [0] * count
+        self._round_robin = itertools.cycle(range(count))
+
+    def start(self):
+        for index, port in enumerate(self.ports):
+            env = dict(os.environ)
+            env["AURA_WORKER_ID"] = str(index)
+            env.setdefault("AURA_STATE_BACKEND", "sqlite")
+            env["BROKER_JOURNAL_DIR"] = os.path.join(os.getenv("BROKER_JOURNAL_DIR", "broker_journal"), f"worker_{index}")
+            if sys.platform == "win32":
+                env["BROKER_ADDRESS"] = f"tcp://127.0.0.1:{8765 + index}"
+            else:
+                env["BROKER_ADDRESS"] = f"/tmp/aura_broker_{index}.sock"
+            self.processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "server:app", "--host", self.host, "--port", str(port)],
+                env=env
+            ))
+            logger.info(f"🚀 Worker {index} starting on port {port}")
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        logger.info("🛑 Workers stopped")
+
+    def url(self, index: int) -> str:
+        return f"http://{self.host}:{self.ports[index]}"
+
+    def pick(self, key: Optional[str]) -> int:
+        if key is None:
+            return next(self._round_robin)
+        return zlib.crc32(key.encode("utf-8")) % len(self.ports)
+
+    def remember_job(self, job_id: str, index: int):
+        self.jobs[job_id] = index
+        if len(self.jobs) > MAX_TRACKED_JOBS:
+            self.jobs.popitem(last=False)
+
+
+def affinity_key(path: str, body: bytes, query: dict) -> Optional[str]:
+    """Session key for a request, or None when any worker will do"""
+    parts = path.strip("/").split("/")
+    if len(parts) >= 2 and parts[0] == "thinking-stream":
+        return parts[1]
+    if query.get("session_id"):
+        return query["session_id"]
+    if body:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        if isinstance(data, dict):
+            for field in ("session_id", "old_session_id", "user_id"):
+                if data.get(field):
+                    return str(data[field])
+    return None
+
+
+def create_router_app(pool: WorkerPool) -> FastAPI:
+    client: Optional[httpx.AsyncClient] = None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        nonlocal client
+        pool.start()
+        client = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=5.0))
+        yield
+        await client.aclose()
+        pool.stop()
+
+    app = FastAPI(title="AURA worker router", lifespan=lifespan)
+
+    @app.get("/router/stats")
+    async def router_stats():
+        return {
+            "workers": [
+                {"index": i, "port": port, "alive": pool.processes[i].poll() is None if pool.processes else False,
+                 "routed": pool.routed[i]}
+                for i, port in enumerate(pool.ports)
+            ],
+            "tracked_jobs": len(pool.jobs),
+        }
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
+    async def proxy(path: str, request: Request):
+        body = await request.body()
+        parts = path.strip("/").split("/")
+
+        if len(parts) >= 2 and parts[0] == "jobs" and parts[1] in pool.jobs:
+            index = pool.jobs[parts[1]]
+        else:
+            index = pool.pick(affinity_key(path, body, dict(request.query_params)))
+        pool.routed[index] += 1
+
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP}
+        upstream = client.build_request(
+            request.method,
+            f"{pool.url(index)}/{path}",
+            params=request.query_params,
+            headers=headers,
+            content=body
+        )
+        response = await client.send(upstream, stream=True)
+        response_headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_BY_HOP}
+
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            async def relay():
+                try:
+                    async for chunk in response.aiter_raw():
+                        yield chunk
+                finally:
+                    await response.aclose()
+            return StreamingResponse(relay(), status_code=response.status_code, headers=response_headers)
+
+        content = await response.aread()
+        await response.aclose()
+
+        if parts == ["jobs"] and request.method == "POST" and response.status_code == 202:
+            try:
+                pool.remember_job(json.loads(content)["job_id"], index)
+            except (ValueError, KeyError):
+                pass
+
+        return Response(content=content, status_code=response.status_code, headers=response_headers)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    args = parser.parse_args()
+
+    pool = WorkerPool(args.workers, args.port)
+    logger.info(f"🔀 Routing :{args.port} to {args.workers} workers by session")
+    uvicorn.run(create_router_app(pool), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()